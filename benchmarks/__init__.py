@@ -0,0 +1 @@
+"""Performance benchmarks for Polymarket Analyzer backend (run from the repo root with python -m)."""
@@ -0,0 +1,263 @@
+"""
+Alert engine benchmark: sorted threshold index vs scanning alerts.
+
+Generates N price_above / price_below alerts (with a share of spike and
+correlation alerts the index skips or keeps on other channels) over M
+markets, with a Zipf-like skew so popular markets carry most of them, and
+thresholds spread around each market's starting price. It then replays
+random-walk price ticks and reports:
+
+    build       building AlertIndex from the rows (what a full load does
+                after fetching), and the memory it retains (tracemalloc,
+                in a second build)
+    tick        per tick, the index (bisect + cut) vs scanning the ticked
+                market's alerts (first --scan-ticks ticks) vs scanning every
+                alert, and checks the index triggers exactly the alerts the
+                scan does
+    changes     adding and removing single alerts on the busiest market
+                (incremental sync), removal with and without the threshold
+    writes      UPDATE statements AlertEngine issues for the triggers,
+                batched by ALERT_FLUSH_BATCH, vs one per alert (writes are
+                counted, not sent)
+
+Usage:
+    python -m benchmarks.alert_engine --alerts 1000000 --markets 5000
+    python -m benchmarks.alert_engine --ticks 100000 --output alert_engine.json
+"""
+
+import gc
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from shared.alert_engine import AlertIndex, AlertEngine, PRICE_ABOVE, PRICE_BELOW
+
+Alert = Tuple[int, str, str, float]
+
+# Alert type mix
+TYPE_WEIGHTS = {
+    PRICE_ABOVE: 0.45,
+    PRICE_BELOW: 0.45,
+    "sentiment_spike": 0.04,
+    "volume_spike": 0.04,
+    "correlation_alert": 0.02,
+}
+
+
+def generate(alerts: int, markets: int, seed: int) -> Tuple[List[Alert], List[str], Dict[str, float]]:
+    rng = random.Random(seed)
+    market_ids = [f"0x{index:064x}" for index in range(markets)]
+    prices = {market_id: rng.uniform(0.1, 0.9) for market_id in market_ids}
+    # Zipf-like popularity: market k gets weight 1 / (k + 1)
+    cumulative, total = [], 0.0
+    for rank in range(markets):
+        total += 1.0 / (rank + 1)
+        cumulative.append(total)
+    types, weights = zip(*TYPE_WEIGHTS.items())
+
+    rows = []
+    picks = rng.choices(market_ids, cum_weights=cumulative, k=alerts)
+    kinds = rng.choices(types, weights=weights, k=alerts)
+    for alert_id, (market_id, kind) in enumerate(zip(picks, kinds), start=1):
+        price = prices[market_id]
+        if kind == PRICE_ABOVE:
+            threshold = round(min(price + abs(rng.gauss(0, 0.1)), 0.999), 4)
+        elif kind == PRICE_BELOW:
+            threshold = round(max(price - abs(rng.gauss(0, 0.1)), 0.001), 4)
+        else:
+            threshold = round(rng.uniform(2, 5), 2)
+        rows.append((alert_id, market_id, kind, threshold))
+    return rows, market_ids, prices
+
+
+class ScanIndex:
+    """The baseline: every armed price alert per market in a list, scanned per tick"""
+
+    def __init__(self, rows: List[Alert]):
+        self.by_market: Dict[str, List[Alert]] = {}
+        for row in rows:
+            if row[2] in (PRICE_ABOVE, PRICE_BELOW):
+                self.by_market.setdefault(row[1], []).append(row)
+
+    def evaluate(self, market_id: str, price: float) -> List[int]:
+        alerts = self.by_market.get(market_id)
+        if not alerts:
+            return []
+        fired, kept = [], []
+        for row in alerts:
+            crossed = price >= row[3] if row[2] == PRICE_ABOVE else price <= row[3]
+            (fired if crossed else kept).append(row)
+        self.by_market[market_id] = kept
+        return [row[0] for row in fired]
+
+
+class CountingEngine(AlertEngine):
+    """AlertEngine whose trigger writes are counted instead of sent"""
+
+    def __init__(self, index: AlertIndex, **kwargs):
+        super().__init__(**kwargs)
+        self.index = index
+        self.statements = 0
+
+    def _mark_triggered(self, batch):
+        self.statements += 1
+        return len(batch)
+
+
+def timed_build(rows: List[Alert]) -> Tuple[AlertIndex, int, float]:
+    """(index, bytes it retains, build ms); timed without tracemalloc, which slows allocation"""
+    gc.collect()
+    tracemalloc.start()
+    index = AlertIndex(rows)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del index
+    gc.collect()
+
+    start = time.perf_counter()
+    index = AlertIndex(rows)
+    build_ms = (time.perf_counter() - start) * 1000
+    return index, size, build_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the alert threshold index")
+    parser.add_argument("--alerts", type=int, default=1_000_000)
+    parser.add_argument("--markets", type=int, default=5000)
+    parser.add_argument("--ticks", type=int, default=50_000, help="Price ticks to replay")
+    parser.add_argument("--scan-ticks", type=int, default=5000, help="Ticks timed against a per-market scan")
+    parser.add_argument("--full-scans", type=int, default=20, help="Ticks timed against a scan of every alert")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    rows, market_ids, prices = generate(args.alerts, args.markets, args.seed)
+    rng = random.Random(args.seed + 1)
+
+    index, index_bytes, build_ms = timed_build(rows)
+    indexed = len(index)
+    scan = ScanIndex(rows)
+    largest = max(len(alerts) for alerts in scan.by_market.values())
+
+    # Ticks land on markets by the same popularity as alerts
+    cumulative, total = [], 0.0
+    for rank in range(args.markets):
+        total += 1.0 / (rank + 1)
+        cumulative.append(total)
+    ticks = []
+    for market_id in rng.choices(market_ids, cum_weights=cumulative, k=args.ticks):
+        prices[market_id] = min(max(prices[market_id] + rng.gauss(0, 0.01), 0.001), 0.999)
+        ticks.append((market_id, prices[market_id]))
+
+    start = time.perf_counter()
+    index_fired = [index.evaluate("price", market_id, price) for market_id, price in ticks]
+    index_s = time.perf_counter() - start
+
+    # The scan replays a prefix of the same ticks (it is orders of magnitude slower)
+    scan_ticks = ticks[:args.scan_ticks]
+    start = time.perf_counter()
+    scan_fired = [scan.evaluate(market_id, price) for market_id, price in scan_ticks]
+    scan_s = time.perf_counter() - start
+
+    identical = all(sorted(a) == sorted(b) for a, b in zip(index_fired, scan_fired))
+    triggered = sum(len(fired) for fired in index_fired)
+    index_us = index_s * 1e6 / len(ticks)
+    scan_us = scan_s * 1e6 / max(len(scan_ticks), 1)
+
+    # Scanning every alert on every tick (what evaluating without a per-market index costs)
+    start = time.perf_counter()
+    for market_id, price in ticks[:args.full_scans]:
+        [row for row in rows if row[1] == market_id and
+         (price >= row[3] if row[2] == PRICE_ABOVE else price <= row[3] if row[2] == PRICE_BELOW else False)]
+    full_scan_ms = (time.perf_counter() - start) * 1000 / max(min(args.full_scans, len(ticks)), 1)
+
+    # Incremental changes against the busiest market
+    busiest = market_ids[0]
+    next_id = args.alerts + 1
+    thresholds = [round(rng.uniform(0.5, 0.999), 4) for _ in range(2000)]
+
+    def changes(with_threshold: bool) -> Tuple[float, float]:
+        start = time.perf_counter()
+        for offset, threshold in enumerate(thresholds):
+            index.add(next_id + offset, busiest, PRICE_ABOVE, threshold)
+        add_us = (time.perf_counter() - start) * 1e6 / len(thresholds)
+        start = time.perf_counter()
+        for offset, threshold in enumerate(thresholds):
+            index.remove(next_id + offset, threshold if with_threshold else None)
+        return add_us, (time.perf_counter() - start) * 1e6 / len(thresholds)
+
+    # Incremental syncs know the threshold (the changed row carries it)
+    add_us, remove_us = changes(True)
+    _, remove_scan_us = changes(False)
+
+    # Trigger writes through the engine on a fresh index
+    engine = CountingEngine(AlertIndex(rows), flush_seconds=float("inf"))
+    for market_id, price in ticks:
+        engine.evaluate("price", market_id, price)
+    engine.flush()
+
+    results = {
+        "build": {
+            "ms": round(build_ms, 1),
+            "bytes": index_bytes,
+            "bytes_per_alert": round(index_bytes / max(indexed, 1)),
+            "indexed": indexed,
+            "unsupported": index.unsupported,
+            "largest_market_alerts": largest,
+        },
+        "tick": {
+            "ticks": len(ticks),
+            "triggered": triggered,
+            "index_us": round(index_us, 2),
+            "market_scan_ticks": len(scan_ticks),
+            "market_scan_us": round(scan_us, 2),
+            "full_scan_ms": round(full_scan_ms, 1),
+            "speedup_vs_market_scan": round(scan_us / index_us, 1) if index_us else None,
+            "identical": identical,
+        },
+        "changes": {
+            "market_alerts": len(scan.by_market.get(busiest, [])),
+            "add_us": round(add_us, 2),
+            "remove_us": round(remove_us, 2),
+            "remove_without_threshold_us": round(remove_scan_us, 2),
+        },
+        "writes": {
+            "triggers": engine.status()["counters"]["triggered"],
+            "statements": engine.statements,
+            "per_alert_statements": engine.status()["counters"]["triggered"],
+            "batch": engine.flush_batch,
+        },
+    }
+
+    tick = results["tick"]
+    print(f"{args.alerts} alerts / {args.markets} markets: build {build_ms:.0f}ms, "
+          f"{index_bytes / 2**20:.1f} MiB; tick {tick['index_us']:.2f}us index vs "
+          f"{tick['market_scan_us']:.1f}us market scan vs {tick['full_scan_ms']:.1f}ms full scan; "
+          f"{triggered} triggered in {engine.statements} UPDATEs, identical={identical}",
+          file=sys.stderr)
+
+    report = {
+        "benchmark": "alert_engine",
+        "timestamp": datetime.utcnow().isoformat(),
+        "alerts": args.alerts,
+        "markets": args.markets,
+        "seed": args.seed,
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Anomaly detection benchmark: streaming statistics at 100k markets.
+
+Simulates N markets ticking every ~60s (jittered) on a simulated clock:
+random-walk prices with per-market volatility and cumulative volume with
+a per-market log-normal rate, plus a consensus sentiment score every
+--sentiment-every ticks. After warm-up it injects, at random:
+
+    price jumps     one tick moves --jump standard deviations
+    volume bursts   one interval trades --burst times the usual rate
+    sentiment shifts the sentiment level moves --shift standard
+                    deviations and stays there (with at least SHIFT_WINDOW
+                    scores left in the run)
+
+and reports, for shared/anomaly_detector.py AnomalyDetector (alerts and
+writes off, so only the statistics are timed):
+
+    throughput  microseconds per price tick and per sentiment score, after
+                the first round (which creates every market's slots)
+    memory      bytes the detector retains per market (tracemalloc)
+    detection   share of injected jumps and bursts flagged on their tick,
+                share of sentiment shifts flagged and the median number of
+                scores it took, and false positives per 1k clean ticks
+
+Usage:
+    python -m benchmarks.anomaly_detection --markets 100000 --ticks 70
+    python -m benchmarks.anomaly_detection --markets 10000 --output anomalies.json
+"""
+
+import gc
+import sys
+import math
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from shared.anomaly_detector import AnomalyDetector, MIN_SAMPLES, PRICE, VOLUME, SENTIMENT
+
+# Sentiment shifts are injected only with this many scores left to catch them
+SHIFT_WINDOW = 15
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming anomaly detection")
+    parser.add_argument("--markets", type=int, default=100_000)
+    parser.add_argument("--ticks", type=int, default=70, help="Price ticks per market")
+    parser.add_argument("--sentiment-every", type=int, default=1, help="Ticks per sentiment score")
+    parser.add_argument("--inject", type=float, default=0.01, help="Injection probability per observation")
+    parser.add_argument("--jump", type=float, default=8.0, help="Price jump, in standard deviations")
+    parser.add_argument("--burst", type=float, default=50.0, help="Volume burst, times the usual rate")
+    parser.add_argument("--shift", type=float, default=2.0, help="Sentiment shift, in standard deviations")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    start_time = datetime(2026, 1, 1).timestamp()
+    market_ids = [f"0x{index:064x}" for index in range(args.markets)]
+    # Price points per sqrt(hour), log-uniform over 0.002..0.05
+    sigma = [10 ** rng.uniform(math.log10(0.002), math.log10(0.05)) for _ in market_ids]
+    rate = [10 ** rng.uniform(2, 5) for _ in market_ids]  # volume per hour
+    prices = [rng.uniform(0.2, 0.8) for _ in market_ids]
+    volumes = [rng.uniform(1e4, 1e6) for _ in market_ids]
+    levels = [rng.uniform(-0.5, 0.5) for _ in market_ids]
+    sentiment_noise = 0.05
+    clocks = [start_time + rng.uniform(0, 60) for _ in market_ids]
+
+    detector = AnomalyDetector(alerts=False, persist=False)
+    gc.collect()
+    tracemalloc.start()
+
+    price_s = sentiment_s = 0.0
+    price_ticks = sentiment_scores = 0
+    injected = {PRICE: 0, VOLUME: 0}
+    caught = {PRICE: 0, VOLUME: 0}
+    clean = {PRICE: 0, VOLUME: 0, SENTIMENT: 0}
+    false_positives = {PRICE: 0, VOLUME: 0, SENTIMENT: 0}
+    shifted_at: Dict[int, Optional[int]] = {}  # market -> scores since its shift, None once caught
+    shift_delays = []
+    shifts = 0
+    memory_bytes = None
+    perf_counter = time.perf_counter
+
+    for tick in range(args.ticks):
+        warm = tick > MIN_SAMPLES + 1
+        for index, market_id in enumerate(market_ids):
+            gap = rng.uniform(45, 75)
+            clocks[index] += gap
+            hours = gap / 3600.0
+            step = rng.gauss(0, sigma[index] * math.sqrt(hours))
+            jump = warm and rng.random() < args.inject
+            if jump:
+                step = math.copysign(args.jump * sigma[index] * math.sqrt(hours), rng.random() - 0.5)
+            prices[index] += step
+            burst = warm and not jump and rng.random() < args.inject
+            traded = rate[index] * hours * math.exp(rng.gauss(0, 0.3))
+            volumes[index] += traded * (args.burst if burst else 1.0)
+
+            begin = perf_counter()
+            found = detector.observe_price(market_id, prices[index], volumes[index], now=clocks[index])
+            price_s += perf_counter() - begin
+            price_ticks += 1
+
+            flagged = {anomaly["metric"] for anomaly in found if anomaly["kind"] == "spike"}
+            for metric, hit in ((PRICE, jump), (VOLUME, burst)):
+                if hit:
+                    injected[metric] += 1
+                    caught[metric] += metric in flagged
+                elif warm:
+                    clean[metric] += 1
+                    false_positives[metric] += metric in flagged
+
+            if tick % args.sentiment_every == 0:
+                sentiment_warm = tick // args.sentiment_every > MIN_SAMPLES + 1
+                room = (args.ticks - tick) // args.sentiment_every >= SHIFT_WINDOW
+                if sentiment_warm and room and index not in shifted_at and rng.random() < args.inject:
+                    levels[index] += args.shift * sentiment_noise * (1 if levels[index] < 0 else -1)
+                    shifted_at[index] = 0
+                    shifts += 1
+                score = levels[index] + rng.gauss(0, sentiment_noise)
+
+                begin = perf_counter()
+                found = detector.observe_sentiment(market_id, score, now=clocks[index])
+                sentiment_s += perf_counter() - begin
+                sentiment_scores += 1
+
+                if index in shifted_at:
+                    if shifted_at[index] is not None:
+                        shifted_at[index] += 1
+                        if found:
+                            shift_delays.append(shifted_at[index])
+                            shifted_at[index] = None  # detected; not counted again
+                elif sentiment_warm:
+                    clean[SENTIMENT] += 1
+                    false_positives[SENTIMENT] += bool(found)
+
+        if tick == 0:
+            gc.collect()
+            memory_bytes = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            # Timing starts after the traced first round (tracemalloc slows allocation)
+            price_s = sentiment_s = 0.0
+            price_ticks = sentiment_scores = 0
+
+    shift_delays.sort()
+
+    def per_1k(metric):
+        return round(1000 * false_positives[metric] / max(clean[metric], 1), 3)
+
+    results: Dict[str, Any] = {
+        "throughput": {
+            "price_ticks": price_ticks,
+            "price_tick_us": round(price_s * 1e6 / max(price_ticks, 1), 2),
+            "sentiment_scores": sentiment_scores,
+            "sentiment_score_us": round(sentiment_s * 1e6 / max(sentiment_scores, 1), 2),
+            "ticks_per_second": round(price_ticks / price_s) if price_s else None,
+        },
+        "memory": {
+            "bytes": memory_bytes,
+            "bytes_per_market": round(memory_bytes / args.markets),
+        },
+        "detection": {
+            "price_jumps": injected[PRICE],
+            "price_jump_recall": round(caught[PRICE] / max(injected[PRICE], 1), 3),
+            "volume_bursts": injected[VOLUME],
+            "volume_burst_recall": round(caught[VOLUME] / max(injected[VOLUME], 1), 3),
+            "sentiment_shifts": shifts,
+            "sentiment_shift_recall": round(len(shift_delays) / max(shifts, 1), 3),
+            "sentiment_shift_median_scores": shift_delays[len(shift_delays) // 2] if shift_delays else None,
+            "false_positives_per_1k": {metric: per_1k(metric) for metric in clean},
+        },
+    }
+
+    throughput, detection = results["throughput"], results["detection"]
+    print(f"{args.markets} markets: {throughput['price_tick_us']:.1f}us/tick, "
+          f"{throughput['sentiment_score_us']:.1f}us/score, {memory_bytes / 2**20:.1f} MiB "
+          f"({results['memory']['bytes_per_market']} B/market); recall price "
+          f"{detection['price_jump_recall']:.2f}, volume {detection['volume_burst_recall']:.2f}, "
+          f"sentiment {detection['sentiment_shift_recall']:.2f} "
+          f"(median {detection['sentiment_shift_median_scores']} scores); "
+          f"false positives/1k {detection['false_positives_per_1k']}",
+          file=sys.stderr)
+
+    report = {
+        "benchmark": "anomaly_detection",
+        "timestamp": datetime.utcnow().isoformat(),
+        "markets": args.markets,
+        "ticks": args.ticks,
+        "seed": args.seed,
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,513 @@
+"""
+Local simulator for the Polymarket CLOB REST API.
+
+Serves a synthetic, deterministic universe of markets (50k by default)
+with the endpoints PolymarketClient and py_clob_client read:
+    GET  /markets?next_cursor=...     cursor-paginated market list
+    GET  /markets/{condition_id}
+    GET  /book?token_id=...           POST /books
+    GET  /price?token_id=&side=       POST /prices
+    GET  /midpoint?token_id=          POST /midpoints
+    GET  /spread?token_id=
+    GET  /last-trade-price?token_id=
+    GET  /, /time                     health and server time
+    GET  /stats                       request counts per endpoint and outcome
+
+Markets carry the CLOB fields (condition_id, tokens, question, ...) plus the
+volume and outcome_prices fields PolymarketClient normalizes. Order books
+follow the live API's ordering: bids ascending and asks descending, so the
+best quotes are the last entries.
+
+Prices move with a per-market cycle on --tick-seconds steps; --tick-seconds 0
+freezes them. Latency, 429 and 5xx injection are drawn from a seeded RNG per
+request, and --rate-limit-rps adds a token bucket that answers 429 with
+Retry-After when exceeded.
+
+Point the backend at it with POLYMARKET_HOST=http://127.0.0.1:8766
+
+Usage:
+    python -m benchmarks.clob_simulator --markets 50000 --port 8766
+    python -m benchmarks.clob_simulator --latency lognormal:80:0.5 --rate-limited-rate 0.02 --error-rate 0.01
+
+Config (--config JSON; "endpoints" overrides the profile per path):
+    {"latency": "lognormal:60:0.4", "error_rate": 0.01,
+     "endpoints": {"/markets": {"latency": "lognormal:400:0.3"}}}
+"""
+
+import sys
+import json
+import math
+import time
+import base64
+import random
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+from benchmarks.llm_standin import parse_latency
+
+# Cursor values used by the live API: base64("0") starts, base64("-1") ends
+START_CURSOR = "MA=="
+END_CURSOR = "LTE="
+
+DEFAULT_PROFILE = {
+    "latency": "fixed:0",
+    "error_rate": 0.0,           # 500/502/503 responses
+    "rate_limited_rate": 0.0,    # random 429 responses
+}
+
+DEFAULT_UNIVERSE = {
+    "markets": 50_000,
+    "page_size": 500,
+    "active_fraction": 0.8,
+    "book_depth": 10,
+    "tick_seconds": 5.0,
+}
+
+TICK_SIZE = 0.01
+TOPICS = ("election", "rates", "bitcoin", "playoffs", "weather", "earnings", "launch", "treaty")
+
+
+def encode_cursor(offset: int) -> str:
+    return base64.b64encode(str(offset).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    """Offset for a next_cursor value; raises ValueError for junk"""
+    return int(base64.b64decode(cursor.encode(), validate=True).decode())
+
+
+def _hex_id(seed: int, index: int, kind: str) -> str:
+    return hashlib.sha256(f"{seed}:{kind}:{index}".encode()).hexdigest()
+
+
+def _clamp_price(value: float) -> float:
+    return round(min(max(round(value / TICK_SIZE) * TICK_SIZE, TICK_SIZE), 1 - TICK_SIZE), 2)
+
+
+class MarketUniverse:
+    """
+    Deterministic synthetic markets.
+
+    Only the id indexes are held in memory; market, price and book payloads
+    are generated from (seed, index, tick) on request.
+    """
+
+    def __init__(self, markets: int, seed: int = 0, page_size: int = 500,
+                 active_fraction: float = 0.8, book_depth: int = 10, tick_seconds: float = 5.0):
+        self.size = markets
+        self.seed = seed
+        self.page_size = page_size
+        self.active_fraction = active_fraction
+        self.book_depth = book_depth
+        self.tick_seconds = tick_seconds
+        self.epoch = datetime(2026, 1, 1)
+
+        self.condition_ids: List[str] = []
+        self.token_ids: List[Tuple[str, str]] = []
+        self._by_condition: Dict[str, int] = {}
+        self._by_token: Dict[str, Tuple[int, int]] = {}
+        for index in range(markets):
+            condition_id = "0x" + _hex_id(seed, index, "condition")
+            tokens = tuple(str(int(_hex_id(seed, index, f"token{o}")[:30], 16)) for o in (0, 1))
+            self.condition_ids.append(condition_id)
+            self.token_ids.append(tokens)
+            self._by_condition[condition_id] = index
+            self._by_token[tokens[0]] = (index, 0)
+            self._by_token[tokens[1]] = (index, 1)
+
+    def find_condition(self, condition_id: str) -> Optional[int]:
+        return self._by_condition.get(condition_id.lower())
+
+    def find_token(self, token_id: str) -> Optional[Tuple[int, int]]:
+        return self._by_token.get(token_id)
+
+    def _rng(self, index: int, *extra) -> random.Random:
+        return random.Random(":".join(str(part) for part in (self.seed, index) + extra))
+
+    def tick(self) -> int:
+        return int(time.time() // self.tick_seconds) if self.tick_seconds > 0 else 0
+
+    def yes_price(self, index: int, tick: Optional[int] = None) -> float:
+        """YES price at a tick: a per-market base plus a slow cycle and noise"""
+        tick = self.tick() if tick is None else tick
+        rng = self._rng(index, "price")
+        base, amplitude = rng.uniform(0.05, 0.95), rng.uniform(0.0, 0.08)
+        period, phase = rng.uniform(200, 2000), rng.random()
+        noise = self._rng(index, "noise", tick).gauss(0, 0.005)
+        return _clamp_price(base + amplitude * math.sin(2 * math.pi * (tick / period + phase)) + noise)
+
+    def token_price(self, index: int, outcome: int, tick: Optional[int] = None) -> float:
+        price = self.yes_price(index, tick)
+        return price if outcome == 0 else _clamp_price(1 - price)
+
+    def market(self, index: int) -> Dict[str, Any]:
+        """Full CLOB market object"""
+        rng = self._rng(index, "market")
+        topic = TOPICS[index % len(TOPICS)]
+        active = rng.random() < self.active_fraction
+        end = self.epoch + timedelta(days=rng.randint(1, 365))
+        yes = self.yes_price(index)
+        prices = (yes, _clamp_price(1 - yes))
+
+        return {
+            "condition_id": self.condition_ids[index],
+            "question_id": "0x" + _hex_id(self.seed, index, "question"),
+            "question": f"Will simulated {topic} market {index} resolve YES by {end:%B %d, %Y}?",
+            "description": f"Synthetic {topic} market {index} served by the CLOB simulator.",
+            "market_slug": f"sim-{topic}-{index}",
+            "end_date_iso": end.isoformat() + "Z",
+            "game_start_time": None,
+            "active": active,
+            "closed": not active,
+            "archived": False,
+            "accepting_orders": active,
+            "enable_order_book": True,
+            "minimum_order_size": 5,
+            "minimum_tick_size": TICK_SIZE,
+            "neg_risk": False,
+            "tags": [topic],
+            "tokens": [
+                {"token_id": token_id, "outcome": outcome, "price": price, "winner": False}
+                for token_id, outcome, price in zip(self.token_ids[index], ("Yes", "No"), prices)
+            ],
+            "outcome_prices": list(prices),
+            "volume": round(rng.lognormvariate(9, 1.5), 2),
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+
+    def page(self, offset: int) -> Dict[str, Any]:
+        """One /markets page starting at offset"""
+        end = min(offset + self.page_size, self.size)
+        data = [self.market(index) for index in range(offset, end)]
+        return {
+            "limit": self.page_size,
+            "count": len(data),
+            "next_cursor": encode_cursor(end) if end < self.size else END_CURSOR,
+            "data": data,
+        }
+
+    def book(self, index: int, outcome: int) -> Dict[str, Any]:
+        """Order book with bids ascending and asks descending, like the live API"""
+        tick = self.tick()
+        mid = self.token_price(index, outcome, tick)
+        rng = self._rng(index, "book", outcome, tick)
+        half_spread = rng.randint(1, 3) * TICK_SIZE
+
+        bids, asks = [], []
+        for level in range(self.book_depth):
+            bid = round(mid - half_spread - level * TICK_SIZE, 2)
+            ask = round(mid + half_spread + level * TICK_SIZE, 2)
+            if bid > 0:
+                bids.append({"price": str(bid), "size": str(round(rng.lognormvariate(5, 1), 2))})
+            if ask < 1:
+                asks.append({"price": str(ask), "size": str(round(rng.lognormvariate(5, 1), 2))})
+
+        token_id = self.token_ids[index][outcome]
+        return {
+            "market": self.condition_ids[index],
+            "asset_id": token_id,
+            "timestamp": str(int(time.time() * 1000)),
+            "hash": hashlib.sha1(f"{token_id}:{tick}".encode()).hexdigest(),
+            "bids": bids[::-1],
+            "asks": asks[::-1],
+            "min_order_size": "5",
+            "tick_size": str(TICK_SIZE),
+            "neg_risk": False,
+            "last_trade_price": str(mid),
+        }
+
+    def quote(self, index: int, outcome: int) -> Dict[str, float]:
+        """Best bid, best ask and midpoint"""
+        book = self.book(index, outcome)
+        best_bid = float(book["bids"][-1]["price"]) if book["bids"] else 0.0
+        best_ask = float(book["asks"][-1]["price"]) if book["asks"] else 1.0
+        return {"bid": best_bid, "ask": best_ask, "mid": round((best_bid + best_ask) / 2, 4)}
+
+
+class TokenBucket:
+    """Requests-per-second limiter; rate 0 disables it"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst or max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class SimulatorState:
+    """Universe, fault profiles and counters shared by handler threads"""
+
+    def __init__(self, universe: MarketUniverse, config: Dict[str, Any], seed: int, rate_limit_rps: float = 0.0):
+        self.universe = universe
+        self.seed = seed
+        self.bucket = TokenBucket(rate_limit_rps)
+
+        base = {**DEFAULT_PROFILE, **{k: v for k, v in config.items() if k in DEFAULT_PROFILE}}
+        self.default_profile = self._compile(base)
+        self.endpoint_profiles = {
+            path: self._compile({**base, **overrides})
+            for path, overrides in config.get("endpoints", {}).items()
+        }
+
+        self._sequence = 0
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _compile(profile: Dict[str, Any]) -> Dict[str, Any]:
+        return {**profile, "draw_latency": parse_latency(profile["latency"])}
+
+    def plan(self, endpoint: str) -> Tuple[str, float, int]:
+        """
+        Decide the fate of the next request to an endpoint.
+
+        Returns:
+            (outcome, latency seconds, status); outcome is ok, rate_limited
+            or error
+        """
+        with self._lock:
+            self._sequence += 1
+            rng = random.Random(f"{self.seed}:{self._sequence}")
+
+        profile = self.endpoint_profiles.get(endpoint, self.default_profile)
+        latency = profile["draw_latency"](rng)
+        if not self.bucket.take():
+            return "rate_limited", 0.0, 429
+        roll = rng.random()
+        if roll < profile["rate_limited_rate"]:
+            return "rate_limited", latency, 429
+        if roll < profile["rate_limited_rate"] + profile["error_rate"]:
+            return "error", latency, rng.choice((500, 502, 503))
+        return "ok", latency, 200
+
+    def count(self, endpoint: str, outcome: str):
+        with self._lock:
+            counts = self._stats.setdefault(endpoint, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self._sequence,
+                "markets": self.universe.size,
+                "endpoints": json.loads(json.dumps(self._stats)),
+            }
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    """Routes CLOB API requests to the synthetic universe"""
+
+    server_version = "ClobSimulator/1.0"
+    protocol_version = "HTTP/1.1"
+    state: SimulatorState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_json(self) -> Any:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"[]")
+
+    def _token(self, token_id: Optional[str]) -> Optional[Tuple[int, int]]:
+        return self.state.universe.find_token(token_id) if token_id else None
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _handle(self, method: str):
+        url = urlparse(self.path)
+        path = url.path.rstrip("/") or "/"
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        endpoint = "/markets/{condition_id}" if path.startswith("/markets/") else path
+
+        if path == "/stats":
+            self._send_json(200, self.state.stats())
+            return
+
+        try:
+            body = self._read_json() if method == "POST" else None
+        except ValueError:
+            self._send_json(400, {"error": "Invalid payload"})
+            return
+
+        outcome, latency, status = self.state.plan(endpoint)
+        time.sleep(latency)
+        if outcome == "rate_limited":
+            self.state.count(endpoint, outcome)
+            self._send_json(status, {"error": "Too Many Requests"}, {"Retry-After": "1"})
+            return
+        if outcome == "error":
+            self.state.count(endpoint, outcome)
+            self._send_json(status, {"error": "Simulated upstream error"})
+            return
+
+        status, response = self._route(method, path, query, body)
+        self.state.count(endpoint, "ok" if status < 400 else str(status))
+        self._send_json(status, response)
+
+    def _route(self, method: str, path: str, query: Dict[str, str], body: Any) -> Tuple[int, Any]:
+        universe = self.state.universe
+
+        if path == "/":
+            return 200, "OK"
+        if path == "/time":
+            return 200, int(time.time())
+
+        if method == "GET" and path in ("/markets", "/sampling-markets"):
+            try:
+                offset = decode_cursor(query.get("next_cursor", START_CURSOR))
+            except ValueError:
+                return 400, {"error": "invalid next_cursor"}
+            if offset < 0 or offset >= universe.size:
+                return 200, {"limit": universe.page_size, "count": 0, "next_cursor": END_CURSOR, "data": []}
+            return 200, universe.page(offset)
+
+        if method == "GET" and path.startswith("/markets/"):
+            index = universe.find_condition(path[len("/markets/"):])
+            if index is None:
+                return 404, {"error": "market not found"}
+            return 200, universe.market(index)
+
+        if method == "GET" and path == "/book":
+            found = self._token(query.get("token_id"))
+            if found is None:
+                return 404, {"error": "No orderbook exists for the requested token id"}
+            return 200, universe.book(*found)
+
+        if method == "POST" and path == "/books":
+            found = [self._token(item.get("token_id")) for item in body]
+            return 200, [universe.book(*f) for f in found if f is not None]
+
+        if method == "GET" and path in ("/price", "/midpoint", "/spread", "/last-trade-price"):
+            found = self._token(query.get("token_id"))
+            if found is None:
+                return 404, {"error": "No orderbook exists for the requested token id"}
+            quote = universe.quote(*found)
+            if path == "/price":
+                side = query.get("side", "BUY").upper()
+                # BUY is the price a buyer pays (best ask), SELL the best bid
+                return 200, {"price": str(quote["ask"] if side == "BUY" else quote["bid"])}
+            if path == "/midpoint":
+                return 200, {"mid": str(quote["mid"])}
+            if path == "/spread":
+                return 200, {"spread": str(round(quote["ask"] - quote["bid"], 4))}
+            return 200, {"price": str(universe.token_price(*found)), "side": "BUY"}
+
+        if method == "POST" and path in ("/prices", "/midpoints"):
+            result = {}
+            for item in body:
+                token_id = item.get("token_id")
+                found = self._token(token_id)
+                if found is None:
+                    continue
+                quote = universe.quote(*found)
+                if path == "/midpoints":
+                    result[token_id] = str(quote["mid"])
+                else:
+                    side = item.get("side", "BUY").upper()
+                    result.setdefault(token_id, {})[side] = str(quote["ask"] if side == "BUY" else quote["bid"])
+            return 200, result
+
+        return 404, {"error": f"no route for {method} {path}"}
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8766, universe: Optional[MarketUniverse] = None,
+                config: Optional[Dict[str, Any]] = None, seed: int = 0,
+                rate_limit_rps: float = 0.0) -> ThreadingHTTPServer:
+    """Create (but don't start) a simulator; port 0 picks a free port"""
+    universe = universe or MarketUniverse(DEFAULT_UNIVERSE["markets"], seed)
+    state = SimulatorState(universe, config or {}, seed, rate_limit_rps)
+    handler = type("BoundSimulatorHandler", (SimulatorHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_background(markets: int = DEFAULT_UNIVERSE["markets"], config: Optional[Dict[str, Any]] = None,
+                        seed: int = 0, **universe_options) -> ThreadingHTTPServer:
+    """Start a simulator on a free local port in a daemon thread"""
+    universe = MarketUniverse(markets, seed, **universe_options)
+    server = make_server(port=0, universe=universe, config=config, seed=seed)
+    threading.Thread(target=server.serve_forever, name="clob-simulator", daemon=True).start()
+    return server
+
+
+def client_env(server: ThreadingHTTPServer) -> Dict[str, str]:
+    """Environment variables pointing PolymarketClient at a simulator"""
+    host, port = server.server_address[:2]
+    return {"POLYMARKET_HOST": f"http://{host}:{port}"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Polymarket CLOB API simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--markets", type=int, default=DEFAULT_UNIVERSE["markets"])
+    parser.add_argument("--page-size", type=int, default=DEFAULT_UNIVERSE["page_size"])
+    parser.add_argument("--active-fraction", type=float, default=DEFAULT_UNIVERSE["active_fraction"])
+    parser.add_argument("--book-depth", type=int, default=DEFAULT_UNIVERSE["book_depth"])
+    parser.add_argument("--tick-seconds", type=float, default=DEFAULT_UNIVERSE["tick_seconds"],
+                        help="Seconds between price moves (0 freezes prices)")
+    parser.add_argument("--latency", help="Latency spec, e.g. lognormal:80:0.5 (ms)")
+    parser.add_argument("--error-rate", type=float, help="Share of 5xx responses")
+    parser.add_argument("--rate-limited-rate", type=float, help="Share of random 429 responses")
+    parser.add_argument("--rate-limit-rps", type=float, default=0.0, help="Token bucket limit (0 = off)")
+    parser.add_argument("--config", help="JSON fault profile, with optional per-endpoint overrides")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = {}
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+    for key, value in (("latency", args.latency), ("error_rate", args.error_rate),
+                       ("rate_limited_rate", args.rate_limited_rate)):
+        if value is not None:
+            config[key] = value
+
+    start = time.perf_counter()
+    universe = MarketUniverse(args.markets, args.seed, args.page_size, args.active_fraction,
+                              args.book_depth, args.tick_seconds)
+    server = make_server(args.host, args.port, universe, config, args.seed, args.rate_limit_rps)
+    print(f"CLOB simulator: {args.markets} markets indexed in {time.perf_counter() - start:.1f}s, "
+          f"listening on http://{args.host}:{server.server_address[1]}", file=sys.stderr)
+    print(f"  POLYMARKET_HOST=http://{args.host}:{server.server_address[1]}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
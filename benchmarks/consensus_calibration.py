@@ -0,0 +1,209 @@
+"""
+Consensus source-weight calibration, and batch vs per-market consensus timing.
+
+Fits per-source consensus weights (shared/consensus.py
+fit_source_weights()) on stored sentiment analyses against the market's
+price move over the following --horizon-hours, and writes the calibration
+table SENTIMENT_CALIBRATION_FILE loads:
+
+    {"weights": {source: weight}, "samples", "source_samples",
+     "correlation": {"before", "after"}, "fitted_at", "horizon_hours"}
+
+"correlation" is between consensus and the later price move with the
+default weights (before) and the fitted ones (after), on the same rows;
+hold out a later period (--days) before trusting a gain.
+
+It also times consensus over every row: per market through
+SentimentAnalyzer._calculate_consensus's path (as the cascade does),
+building the SourceMatrix once, and then one batch_consensus() pass over
+it with numpy and with the plain loop (the pass the fit repeats per
+candidate weight), and checks every result equals the per-market one.
+
+History sources:
+    --from-db           sentiment_history joined with price_history
+                        (POSTGRES_* variables)
+    --synthetic N       N simulated analyses whose sources track the price
+                        move with different skill (--skill), to check the
+                        fit recovers their ranking
+
+Usage:
+    python -m benchmarks.consensus_calibration --from-db --horizon-hours 24 --table calibration.json
+    python -m benchmarks.consensus_calibration --synthetic 100000 --output consensus.json
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import datetime
+from typing import Dict, Any, List, Tuple
+
+from shared import consensus
+from shared.consensus import (
+    DEFAULT_SOURCE_WEIGHTS, SourceMatrix, consensus_from_sources, fit_source_weights, _consensus_loop
+)
+
+# Simulated per-source skill: share of each score that is the later price move
+DEFAULT_SKILL = "perplexity:0.6,azure_openai_gpt5_pro:0.3,google_gemini:0.1,local_lexicon:0.05"
+
+Rows = Tuple[List[List[Dict[str, Any]]], List[float]]
+
+
+def load_from_db(horizon_hours: int, days: int, limit: int) -> Rows:
+    """(source lists, later price moves) of stored analyses with prices on both sides"""
+    from shared.database import execute_query
+
+    rows = execute_query(
+        """
+        SELECT h.sources, (later.price - before.price)::float8
+        FROM sentiment_history h
+        JOIN LATERAL (
+            SELECT price FROM price_history
+            WHERE token_id = h.market_id AND timestamp <= h.created_at
+            ORDER BY timestamp DESC LIMIT 1
+        ) before ON true
+        JOIN LATERAL (
+            SELECT price FROM price_history
+            WHERE token_id = h.market_id AND timestamp >= h.created_at + make_interval(hours => %s)
+            ORDER BY timestamp LIMIT 1
+        ) later ON true
+        WHERE h.created_at >= NOW() - make_interval(days => %s)
+            AND h.status <> 'failed_all_sources'
+        ORDER BY h.created_at DESC
+        LIMIT %s
+        """,
+        (horizon_hours, days, limit)
+    )
+    source_lists, outcomes = [], []
+    for sources, move in rows:
+        if isinstance(sources, str):
+            sources = json.loads(sources)
+        if sources:
+            source_lists.append(sources)
+            outcomes.append(move)
+    return source_lists, outcomes
+
+
+def synthetic_rows(count: int, skill: Dict[str, float], seed: int) -> Rows:
+    """Analyses whose source scores mix the later price move with noise by skill"""
+    rng = random.Random(seed)
+    source_lists, outcomes = [], []
+    for _ in range(count):
+        move = rng.gauss(0, 0.05)
+        signal = max(-1.0, min(1.0, move * 10))
+        sources = []
+        # Cascade order, each source present about as often as in production
+        for name, present in (("local_lexicon", 0.5), ("perplexity", 0.9),
+                              ("azure_openai_gpt5_pro", 0.95), ("google_gemini", 0.3)):
+            if rng.random() >= present:
+                continue
+            share = skill.get(name, 0.0)
+            score = max(-1.0, min(1.0, share * signal + (1 - share) * rng.uniform(-1, 1)))
+            sources.append({
+                "source": name,
+                "score": round(score, 4),
+                "confidence": round(rng.uniform(0.3, 0.95), 3),
+                "weight": DEFAULT_SOURCE_WEIGHTS[name],
+            })
+        if sources:
+            source_lists.append(sources)
+            outcomes.append(move)
+    return source_lists, outcomes
+
+
+def time_consensus(source_lists: List[List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Per-market vs batch consensus over every row"""
+    start = time.perf_counter()
+    per_market = [consensus_from_sources([sources])[0] for sources in source_lists]
+    per_market_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    matrix = SourceMatrix(source_lists)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    # The pass fit_source_weights() repeats per candidate, on the built matrix
+    start = time.perf_counter()
+    batch = matrix.consensus(DEFAULT_SOURCE_WEIGHTS)
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    lists = [
+        value.tolist() if hasattr(value, "tolist") else value
+        for value in (matrix.scores, matrix.confidences, matrix.weights(DEFAULT_SOURCE_WEIGHTS), matrix.mask)
+    ]
+    start = time.perf_counter()
+    loop = _consensus_loop(*lists)
+    loop_ms = (time.perf_counter() - start) * 1000
+
+    batch_pairs = [(float(s), float(c)) for s, c in zip(*batch)]
+    return {
+        "rows": len(source_lists),
+        "numpy": consensus.np is not None,
+        "per_market_ms": round(per_market_ms, 1),
+        "matrix_build_ms": round(build_ms, 1),
+        "batch_ms": round(batch_ms, 1),
+        "batch_no_numpy_ms": round(loop_ms, 1),
+        "speedup": round(loop_ms / batch_ms, 1) if batch_ms else None,
+        "identical": batch_pairs == per_market and list(zip(*loop)) == per_market,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit consensus source weights on stored history")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--from-db", action="store_true", help="Read sentiment_history and price_history")
+    source.add_argument("--synthetic", type=int, metavar="N", help="Simulate N analyses")
+    parser.add_argument("--horizon-hours", type=int, default=24, help="Price move window after each analysis")
+    parser.add_argument("--days", type=int, default=90, help="History to fit on")
+    parser.add_argument("--limit", type=int, default=500_000, help="Max analyses to load")
+    parser.add_argument("--skill", default=DEFAULT_SKILL, help="Simulated source skill, name:share,...")
+    parser.add_argument("--min-samples", type=int, default=consensus.MIN_CALIBRATION_SAMPLES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--table", help="Write the calibration table (SENTIMENT_CALIBRATION_FILE) here")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    if args.from_db:
+        source_lists, outcomes = load_from_db(args.horizon_hours, args.days, args.limit)
+    else:
+        skill = {name: float(share) for name, share in (item.split(":") for item in args.skill.split(","))}
+        source_lists, outcomes = synthetic_rows(args.synthetic, skill, args.seed)
+    if not source_lists:
+        parser.error("no analyses with prices before and after them")
+
+    timing = time_consensus(source_lists)
+    print(f"{timing['rows']} rows: per-market {timing['per_market_ms']:.1f}ms, matrix build "
+          f"{timing['matrix_build_ms']:.1f}ms, batch pass {timing['batch_ms']:.1f}ms vs "
+          f"{timing['batch_no_numpy_ms']:.1f}ms without numpy ({timing['speedup']}x), "
+          f"identical={timing['identical']}", file=sys.stderr)
+
+    start = time.perf_counter()
+    table = fit_source_weights(source_lists, outcomes, min_samples=args.min_samples)
+    table["horizon_hours"] = args.horizon_hours
+    fit_s = time.perf_counter() - start
+    print(f"fitted {table['weights']} in {fit_s:.1f}s, correlation with {args.horizon_hours}h price move "
+          f"{table['correlation']['before']} -> {table['correlation']['after']}", file=sys.stderr)
+
+    if args.table:
+        with open(args.table, "w") as f:
+            json.dump(table, f, indent=2)
+
+    report = {
+        "benchmark": "consensus_calibration",
+        "timestamp": datetime.utcnow().isoformat(),
+        "source": "database" if args.from_db else f"synthetic ({args.skill})",
+        "timing": timing,
+        "fit_s": round(fit_s, 2),
+        "calibration": table,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""
+End-to-end benchmarks for the function_app HTTP handlers.
+
+Calls the handlers in-process with func.HttpRequest objects. The CLOB API
+and the LLM providers are replaced by the local simulators
+(benchmarks/clob_simulator.py, benchmarks/llm_standin.py) through their
+endpoint environment variables; the database is whatever the POSTGRES_*
+variables point at (a local Postgres), or absent, in which case the
+handlers take their no-database paths.
+
+For each case it reports:
+    first_ms            first call in the process (client creation, cache miss)
+    latency_ms          p50/p95/p99/mean over --iterations warm calls
+    throughput_rps      warm calls per second, one caller
+    concurrent_rps      calls per second from --threads callers (cache-hit cases)
+    serialize_ms        json.dumps of the response payload
+    response_bytes
+    memory              peak and retained KiB per request (tracemalloc pass)
+
+Usage:
+    python -m benchmarks.endpoints --output endpoints.json
+    python -m benchmarks.endpoints --cases markets_hit,price_hit --iterations 2000 --baseline endpoints.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import platform
+import statistics
+import subprocess
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Callable, Optional
+
+from benchmarks import clob_simulator, llm_standin
+from benchmarks.load_harness import function_handlers, request_body
+
+PERCENTILES = (50, 95, 99)
+
+# Case -> (function name, method, route, query params, route param, body kind, cache hit)
+CASES = {
+    "health": ("health", "GET", "health", {}, None, None, False),
+    "markets_miss": ("markets", "GET", "markets", {"refresh": "true"}, None, None, False),
+    "markets_hit": ("markets", "GET", "markets", {}, None, None, True),
+    "price_miss": ("price", "GET", "price/{token_id}", {"refresh": "true"}, "cycle", None, False),
+    "price_hit": ("price", "GET", "price/{token_id}", {}, "fixed", None, True),
+    "sentiment": ("sentiment_analysis", "POST", "sentiment", {}, None, "sentiment", False),
+    "analyze": ("market_analysis", "POST", "analyze", {}, None, "analyze", False),
+}
+
+# Fewer iterations for cases that go through the LLM stand-in
+SLOW_CASES = ("sentiment", "analyze")
+
+
+def _percentile(sorted_values: List[float], pct: int) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-pct * len(sorted_values) // 100))
+    return round(sorted_values[rank - 1], 3)
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class EndpointCase:
+    """Builds the requests for one case and calls its handler"""
+
+    def __init__(self, name: str, handler: Callable, token_ids: List[str]):
+        import azure.functions as func
+
+        self.name = name
+        self._func = func
+        self.handler = handler
+        self.function, self.method, self.route, self.params, self.route_param, self.body_kind, self.cache_hit = CASES[name]
+        self.token_ids = token_ids
+        self.calls = 0
+
+    def request(self):
+        index = self.calls
+        self.calls += 1
+
+        route_params = {}
+        route = self.route
+        if self.route_param:
+            token_id = self.token_ids[index % len(self.token_ids) if self.route_param == "cycle" else 0]
+            route_params = {"token_id": token_id}
+            route = route.replace("{token_id}", token_id)
+
+        body = None
+        if self.body_kind:
+            body = json.dumps(request_body(self.body_kind, index, markets=10_000)).encode("utf-8")
+
+        return self._func.HttpRequest(
+            method=self.method,
+            url=f"http://localhost/api/{route}",
+            headers={"Content-Type": "application/json"},
+            params=self.params,
+            route_params=route_params,
+            body=body or b"",
+        )
+
+    def call(self):
+        """One timed handler call; returns (elapsed ms, response)"""
+        req = self.request()
+        start = time.perf_counter()
+        response = self.handler(req)
+        return (time.perf_counter() - start) * 1000, response
+
+
+def measure_serialization(body: bytes, repeats: int = 20) -> Dict[str, Any]:
+    """Cost of json.dumps for a response payload"""
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return {"serialize_ms": None, "response_bytes": len(body)}
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        json.dumps(payload)
+    return {
+        "serialize_ms": round((time.perf_counter() - start) * 1000 / repeats, 4),
+        "response_bytes": len(body),
+    }
+
+
+def measure_memory(case: EndpointCase, calls: int) -> Dict[str, float]:
+    """Peak and retained traced allocations per request"""
+    tracemalloc.start()
+    peaks, retained = [], []
+    try:
+        for _ in range(calls):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            case.call()
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(current - before)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "peak_kib": round(statistics.fmean(peaks) / 1024, 1),
+        "retained_kib": round(statistics.fmean(retained) / 1024, 2),
+    }
+
+
+def measure_concurrent(case: EndpointCase, threads: int, duration: float) -> float:
+    """Calls per second with threads callers hammering the handler"""
+    deadline = time.perf_counter() + duration
+
+    def worker() -> int:
+        count = 0
+        while time.perf_counter() < deadline:
+            case.call()
+            count += 1
+        return count
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        total = sum(executor.map(lambda _: worker(), range(threads)))
+    return round(total / (time.perf_counter() - start), 1)
+
+
+def run_case(case: EndpointCase, iterations: int, warmup: int, memory_calls: int,
+             threads: int, concurrent_seconds: float) -> Dict[str, Any]:
+    """First-call, warm latency, serialization and memory figures for one case"""
+    first_ms, response = case.call()
+    result = {
+        "function": case.function,
+        "first_ms": round(first_ms, 3),
+        "status": response.status_code,
+        **measure_serialization(response.get_body() or b""),
+    }
+
+    for _ in range(warmup):
+        case.call()
+
+    statuses: Dict[str, int] = {}
+    timings = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        elapsed, response = case.call()
+        timings.append(elapsed)
+        statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+    total = time.perf_counter() - start
+
+    timings.sort()
+    result.update({
+        "iterations": iterations,
+        "statuses": statuses,
+        "latency_ms": {
+            **{f"p{p}": _percentile(timings, p) for p in PERCENTILES},
+            "mean": round(statistics.fmean(timings), 3),
+        },
+        "throughput_rps": round(iterations / total, 1),
+        "memory": measure_memory(case, memory_calls),
+    })
+    if case.cache_hit and threads > 1:
+        result["concurrent_rps"] = measure_concurrent(case, threads, concurrent_seconds)
+    return result
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """p50 and mean latency change against a previous report, in percent"""
+    deltas = {}
+    for name, result in report["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        deltas[name] = {
+            metric: round(100 * (result["latency_ms"][metric] / previous["latency_ms"][metric] - 1), 1)
+            for metric in ("p50", "mean")
+            if previous["latency_ms"].get(metric)
+        }
+    return {"baseline_revision": baseline.get("revision"), "latency_change_pct": deltas}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark function_app handlers in-process")
+    parser.add_argument("--cases", default=",".join(CASES), help="Comma-separated cases")
+    parser.add_argument("--iterations", type=int, default=500, help="Warm calls per case")
+    parser.add_argument("--slow-iterations", type=int, default=50, help="Warm calls for LLM cases")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--memory-calls", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=8, help="Callers for cache-hit throughput")
+    parser.add_argument("--concurrent-seconds", type=float, default=3.0)
+    parser.add_argument("--markets", type=int, default=10_000, help="Simulated CLOB markets")
+    parser.add_argument("--clob-latency", default="fixed:0", help="CLOB simulator latency spec (ms)")
+    parser.add_argument("--llm-latency", default="fixed:0", help="LLM stand-in latency spec (ms)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Keep logging from the handlers")
+    parser.add_argument("--baseline", help="Previous JSON report to compare against")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.cases.split(",") if name.strip()]
+    unknown = set(names) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+
+    clob = clob_simulator.start_in_background(args.markets, {"latency": args.clob_latency}, seed=args.seed)
+    standin = llm_standin.start_in_background({"default": {"latency": args.llm_latency}}, seed=args.seed)
+    os.environ.update(clob_simulator.client_env(clob))
+    os.environ.update(llm_standin.client_env(standin))
+
+    start = time.perf_counter()
+    handlers = function_handlers()
+    import_ms = (time.perf_counter() - start) * 1000
+    if not args.verbose:
+        logging.disable(logging.CRITICAL)
+
+    import function_app
+
+    token_ids = clob.RequestHandlerClass.state.universe.condition_ids[:1000]
+    results = {}
+    for name in names:
+        case = EndpointCase(name, handlers[CASES[name][0]], token_ids)
+        iterations = args.slow_iterations if name in SLOW_CASES else args.iterations
+        results[name] = run_case(case, iterations, args.warmup, args.memory_calls,
+                                 args.threads, args.concurrent_seconds)
+        r = results[name]
+        print(f"{name:14s} first {r['first_ms']:9.2f}ms  p50 {r['latency_ms']['p50']:8.3f}ms  "
+              f"p99 {r['latency_ms']['p99']:8.3f}ms  {r['throughput_rps']:9.1f} rps  "
+              f"peak {r['memory']['peak_kib']:8.1f}KiB  status {r['statuses']}", file=sys.stderr)
+
+    report = {
+        "benchmark": "endpoints",
+        "timestamp": datetime.utcnow().isoformat(),
+        "revision": _git_revision(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": "available" if function_app._database_available else "unavailable",
+        },
+        "config": {
+            "markets": args.markets,
+            "clob_latency": args.clob_latency,
+            "llm_latency": args.llm_latency,
+            "seed": args.seed,
+        },
+        "import_ms": round(import_ms, 1),
+        "results": results,
+        "simulators": {
+            "clob": clob.RequestHandlerClass.state.stats(),
+            "llm": standin.RequestHandlerClass.state.stats(),
+        },
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(report, json.load(f))
+        for name, change in report["comparison"]["latency_change_pct"].items():
+            print(f"{name:14s} p50 {change.get('p50', 0):+.1f}% vs baseline", file=sys.stderr)
+
+    clob.shutdown()
+    standin.shutdown()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Event clustering benchmark: Perplexity news calls saved on a market snapshot.
+
+Assigns every market of a snapshot to an event cluster with a fresh
+EventClusterIndex (shared/event_clusters.py) and reports how many news
+searches the cluster cache needs against one per market:
+
+    news_calls          before (one per market) / after (one per cluster)
+    perplexity_calls    before (news + sentiment per market) / after
+    reduction_pct       news and total Perplexity calls saved
+    cluster_sizes       histogram, plus the largest clusters with sample
+                        questions to eyeball false merges
+    assign_us           per-market assignment time
+
+Snapshot sources:
+    --snapshot FILE     JSON list of markets, or an object with a "markets"
+                        or "data" list (an /api/markets response, or CLOB
+                        /markets pages); question/description or
+                        market_title/market_description fields
+    --from-db           the markets table (POSTGRES_* variables)
+    --clob              page through the CLOB API at POLYMARKET_HOST
+
+The CLOB simulator's questions are templated ("simulated <topic> market
+<n>"), so against it only the timing figures mean anything.
+
+Usage:
+    python -m benchmarks.event_clusters --snapshot markets.json --thresholds 0.6,0.75,0.9
+    python -m benchmarks.event_clusters --from-db --limit 20000 --output clusters.json
+"""
+
+import sys
+import json
+import time
+import argparse
+import statistics
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Any, List, Tuple
+
+from shared.event_clusters import EventClusterIndex, EVENT_CLUSTER_THRESHOLD, EVENT_TITLE_MIN_OVERLAP
+
+# Cluster size histogram buckets (upper bounds)
+SIZE_BUCKETS = (1, 2, 5, 10, 25)
+
+
+def _market_text(market: Dict[str, Any]) -> Tuple[str, str]:
+    question = market.get("question") or market.get("market_title") or market.get("title") or ""
+    description = market.get("description") or market.get("market_description") or ""
+    return question, description
+
+
+def load_snapshot(path: str) -> List[Tuple[str, str]]:
+    """(question, description) pairs from a snapshot file"""
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("markets") or data.get("data") or []
+    return [_market_text(market) for market in data if _market_text(market)[0]]
+
+
+def load_from_db(limit: int) -> List[Tuple[str, str]]:
+    """(question, description) pairs of active markets, highest volume first"""
+    from shared.database import execute_query
+
+    rows = execute_query(
+        "SELECT question, description FROM markets WHERE active = TRUE "
+        "ORDER BY volume DESC NULLS LAST LIMIT %s",
+        (limit,)
+    )
+    return [(question, description or "") for question, description in rows]
+
+
+def load_from_clob(limit: int) -> List[Tuple[str, str]]:
+    """(question, description) pairs of active markets from the CLOB API"""
+    from shared.polymarket_client import PolymarketClient
+
+    client = PolymarketClient().client
+    markets, cursor = [], "MA=="
+    while cursor != "LTE=" and len(markets) < limit:
+        page = client.get_markets(next_cursor=cursor)
+        markets.extend(_market_text(m) for m in page.get("data", []) if m.get("active", True))
+        cursor = page.get("next_cursor") or "LTE="
+    return [market for market in markets if market[0]][:limit]
+
+
+def run(markets: List[Tuple[str, str]], threshold: float, title_overlap: float, top: int) -> Dict[str, Any]:
+    """Cluster markets in snapshot order and count the news calls needed"""
+    index = EventClusterIndex(threshold=threshold, title_overlap=title_overlap, max_clusters=len(markets) + 1)
+    members: Dict[str, List[str]] = {}
+    timings = []
+
+    for question, description in markets:
+        start = time.perf_counter()
+        cluster = index.assign(question, description)
+        timings.append((time.perf_counter() - start) * 1e6)
+        members.setdefault(cluster["cluster_id"], []).append(question)
+
+    sizes = sorted((len(questions) for questions in members.values()), reverse=True)
+    histogram = Counter()
+    for size in sizes:
+        bucket = next((f"<={bound}" for bound in SIZE_BUCKETS if size <= bound), f">{SIZE_BUCKETS[-1]}")
+        histogram[bucket] += 1
+
+    total, clusters = len(markets), len(members)
+    largest = sorted(members.values(), key=len, reverse=True)[:top]
+    timings.sort()
+    return {
+        "threshold": threshold,
+        "title_overlap": title_overlap,
+        "markets": total,
+        "clusters": clusters,
+        "news_calls": {"before": total, "after": clusters},
+        "perplexity_calls": {"before": 2 * total, "after": total + clusters},
+        "reduction_pct": {
+            "news": round(100 * (1 - clusters / total), 1) if total else 0.0,
+            "perplexity": round(100 * (total - clusters) / (2 * total), 1) if total else 0.0,
+        },
+        "clustered_markets": sum(size for size in sizes if size > 1),
+        "cluster_sizes": {
+            bucket: histogram[bucket]
+            for bucket in [f"<={bound}" for bound in SIZE_BUCKETS] + [f">{SIZE_BUCKETS[-1]}"]
+            if histogram[bucket]
+        },
+        "largest_clusters": [
+            {"size": len(questions), "representative": questions[0], "samples": questions[1:4]}
+            for questions in largest
+        ],
+        "assign_us": {
+            "p50": round(timings[len(timings) // 2], 1) if timings else None,
+            "p99": round(timings[min(len(timings) - 1, len(timings) * 99 // 100)], 1) if timings else None,
+            "mean": round(statistics.fmean(timings), 1) if timings else None,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Perplexity news calls saved by event clustering")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--snapshot", help="Market snapshot JSON file")
+    source.add_argument("--from-db", action="store_true", help="Read the markets table")
+    source.add_argument("--clob", action="store_true", help="Page through the CLOB API (POLYMARKET_HOST)")
+    parser.add_argument("--limit", type=int, default=50_000, help="Max markets to load")
+    parser.add_argument("--thresholds", default=str(EVENT_CLUSTER_THRESHOLD),
+                        help="Comma-separated cosine thresholds to compare")
+    parser.add_argument("--title-overlap", type=float, default=EVENT_TITLE_MIN_OVERLAP)
+    parser.add_argument("--top", type=int, default=10, help="Largest clusters to list")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    if args.snapshot:
+        markets = load_snapshot(args.snapshot)[:args.limit]
+    elif args.from_db:
+        markets = load_from_db(args.limit)
+    else:
+        markets = load_from_clob(args.limit)
+    if not markets:
+        parser.error("snapshot has no markets")
+
+    results = []
+    for threshold in (float(value) for value in args.thresholds.split(",")):
+        result = run(markets, threshold, args.title_overlap, args.top)
+        results.append(result)
+        print(f"threshold {threshold:.2f}: {result['markets']} markets -> {result['clusters']} clusters, "
+              f"news calls -{result['reduction_pct']['news']}%, "
+              f"Perplexity calls -{result['reduction_pct']['perplexity']}%, "
+              f"assign p50 {result['assign_us']['p50']}us", file=sys.stderr)
+
+    report = {
+        "benchmark": "event_clusters",
+        "timestamp": datetime.utcnow().isoformat(),
+        "source": args.snapshot or ("database" if args.from_db else "clob"),
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,450 @@
+"""
+Offline stand-in for the Perplexity, Azure OpenAI and Gemini APIs.
+
+Speaks enough of each wire format for the shared/ clients:
+    POST /chat/completions                                      Perplexity
+    POST /openai/deployments/{name}/chat/completions            Azure OpenAI (stream=true -> SSE)
+    POST /v1beta/models/{model}:generateContent                 Gemini
+    POST /v1beta/models/{model}:streamGenerateContent           Gemini streaming (JSON array, or SSE with alt=sse)
+    GET  /stats                                                 request counts per provider and outcome
+
+Response bodies are deterministic for a given prompt. Latency, error rate,
+timeouts and malformed output are configurable per provider, and the
+fault/latency draws are reproducible for a given --seed and request order.
+
+Point the clients at it with:
+    PERPLEXITY_API_KEY=standin PERPLEXITY_ENDPOINT=http://127.0.0.1:8765/chat/completions
+    GPT5_PRO_KEY=standin AZURE_OPENAI_AUTH=key AZURE_OPENAI_ENDPOINT=http://127.0.0.1:8765/
+    GEMINI_API_KEY=standin GEMINI_API_ENDPOINT=http://127.0.0.1:8765
+
+Usage:
+    python -m benchmarks.llm_standin --port 8765 --config standin.json
+
+Config (every key optional; "default" applies to all providers):
+    {"default": {"latency": "lognormal:800:0.4", "error_rate": 0.01},
+     "azure_openai": {"latency": "lognormal:2500:0.5", "malformed_rate": 0.02}}
+
+Latency specs (milliseconds): fixed:MS, uniform:LOW:HIGH,
+normal:MEAN:STDDEV, lognormal:MEDIAN:SIGMA.
+"""
+
+import re
+import sys
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+PROVIDERS = ("perplexity", "azure_openai", "gemini")
+
+DEFAULT_PROFILE = {
+    "latency": "lognormal:400:0.3",
+    "ttft_fraction": 0.15,   # share of latency before the first streamed chunk
+    "error_rate": 0.0,       # HTTP 500/429 responses
+    "timeout_rate": 0.0,     # requests that stall for timeout_seconds
+    "timeout_seconds": 60.0,
+    "malformed_rate": 0.0,   # 200 responses whose content is not valid JSON
+    "stream_chunk_chars": 24,
+}
+
+_AZURE_PATH = re.compile(r"^/openai/deployments/([^/]+)/chat/completions$")
+_GEMINI_PATH = re.compile(r"^/v1beta/models/([^/:]+):(generateContent|streamGenerateContent)$")
+
+
+def parse_latency(spec: str):
+    """Return a function drawing a latency in seconds from rng"""
+    kind, *args = spec.split(":")
+    values = [float(a) for a in args]
+    if kind == "fixed":
+        return lambda rng: values[0] / 1000
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == "normal":
+        return lambda rng: max(rng.gauss(values[0], values[1]), 0.0) / 1000
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1]) / 1000
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def _digest(*parts: str) -> int:
+    """Stable integer hash of the request content"""
+    return int(hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:12], 16)
+
+
+def sentiment_body(prompt: str, with_sources: bool = False) -> Dict[str, Any]:
+    """Deterministic sentiment JSON for a prompt"""
+    h = _digest("sentiment", prompt)
+    body = {
+        "score": round(((h % 2001) / 1000.0) - 1.0, 3),
+        "confidence": round(0.5 + (h >> 11) % 500 / 1000.0, 3),
+        "reasoning": f"Stand-in sentiment {h % 10000:04d}",
+        "factors": [f"factor-{(h >> s) % 97}" for s in (3, 7, 13)],
+    }
+    if with_sources:
+        body["sources"] = []
+    return body
+
+
+def analysis_body(prompt: str) -> Dict[str, Any]:
+    """Deterministic market analysis JSON for a prompt"""
+    h = _digest("analysis", prompt)
+    return {
+        "price_trend": f"Stand-in trend {h % 1000:03d}",
+        "volume_analysis": f"Stand-in volume {(h >> 10) % 1000:03d}",
+        "key_insights": [f"Insight {(h >> s) % 100}" for s in (2, 5, 9)],
+        "recommendation": ("BUY", "SELL", "HOLD", "WATCH")[h % 4],
+        "risk_level": ("LOW", "MEDIUM", "HIGH")[(h >> 4) % 3],
+        "confidence": round(0.4 + (h >> 6) % 600 / 1000.0, 3),
+    }
+
+
+def completion_text(system: str, prompt: str, provider: str) -> str:
+    """Pick the response content the real model would be asked for"""
+    text = f"{system}\n{prompt}"
+    if "price_trend" in text:
+        return json.dumps(analysis_body(prompt))
+    if provider == "perplexity" and '"summary"' in prompt:
+        h = _digest("news", prompt)
+        return json.dumps({
+            "summary": f"Stand-in news summary {h % 100000:05d}: no market-moving events this week.",
+            **sentiment_body(prompt),
+        })
+    if provider == "perplexity" and "news research" in system:
+        h = _digest("news", prompt)
+        return f"Stand-in news summary {h % 100000:05d}: no market-moving events this week."
+    return json.dumps(sentiment_body(prompt, with_sources=provider == "perplexity"))
+
+
+def malformed(text: str) -> str:
+    """Truncate a response so it no longer parses"""
+    return text[: max(len(text) // 2, 1)]
+
+
+class StandInState:
+    """Profiles, request sequence and counters shared by handler threads"""
+
+    def __init__(self, config: Dict[str, Any], seed: int):
+        self.seed = seed
+        self.profiles = {}
+        for provider in PROVIDERS:
+            profile = {**DEFAULT_PROFILE, **config.get("default", {}), **config.get(provider, {})}
+            profile["draw_latency"] = parse_latency(profile["latency"])
+            self.profiles[provider] = profile
+        self._sequence = 0
+        self._stats: Dict[str, Dict[str, int]] = {p: {} for p in PROVIDERS}
+        self._lock = threading.Lock()
+
+    def plan(self, provider: str) -> Tuple[Dict[str, Any], str, float]:
+        """
+        Decide the fate of the next request.
+
+        Returns:
+            (profile, outcome, latency seconds); outcome is one of ok,
+            error, timeout, malformed
+        """
+        with self._lock:
+            self._sequence += 1
+            rng = random.Random(f"{self.seed}:{self._sequence}")
+
+        profile = self.profiles[provider]
+        roll = rng.random()
+        if roll < profile["error_rate"]:
+            outcome = "error"
+        elif roll < profile["error_rate"] + profile["timeout_rate"]:
+            outcome = "timeout"
+        elif roll < profile["error_rate"] + profile["timeout_rate"] + profile["malformed_rate"]:
+            outcome = "malformed"
+        else:
+            outcome = "ok"
+
+        latency = profile["timeout_seconds"] if outcome == "timeout" else profile["draw_latency"](rng)
+        return profile, outcome, latency
+
+    def count(self, provider: str, outcome: str):
+        with self._lock:
+            self._stats[provider][outcome] = self._stats[provider].get(outcome, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"requests": self._sequence, "providers": json.loads(json.dumps(self._stats))}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Routes requests to the provider emulations"""
+
+    server_version = "LLMStandIn/1.0"
+    protocol_version = "HTTP/1.1"
+    state: StandInState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    # -- plumbing ---------------------------------------------------------
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, status: int, body: Any):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _start_stream(self, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_chunk(self, data: str):
+        raw = data.encode("utf-8")
+        self.wfile.write(f"{len(raw):X}\r\n".encode() + raw + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _fail(self, provider: str, outcome: str, latency: float) -> bool:
+        """Apply error/timeout outcomes; returns True if the request was answered"""
+        if outcome == "timeout":
+            time.sleep(latency)
+            self.state.count(provider, "timeout")
+            self._send_json(504, {"error": {"message": "Stand-in timeout"}})
+            return True
+        if outcome == "error":
+            time.sleep(latency)
+            self.state.count(provider, "error")
+            status = 429 if int(latency * 1000) % 2 else 500
+            self._send_json(status, {"error": {"code": status, "message": "Stand-in injected error"}})
+            return True
+        return False
+
+    def _stream_pieces(self, text: str, profile: Dict[str, Any], latency: float):
+        """Split text into chunks and yield (delay before chunk, chunk)"""
+        size = profile["stream_chunk_chars"]
+        pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        first = latency * profile["ttft_fraction"]
+        rest = (latency - first) / max(len(pieces) - 1, 1)
+        for index, piece in enumerate(pieces):
+            yield (first if index == 0 else rest), piece
+
+    # -- routes -------------------------------------------------------------
+
+    def do_GET(self):
+        if self.path.startswith("/stats"):
+            self._send_json(200, self.state.stats())
+        elif self.path.startswith("/health"):
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        try:
+            body = self._read_json()
+        except ValueError:
+            self._send_json(400, {"error": "invalid JSON"})
+            return
+
+        if url.path == "/chat/completions":
+            self._chat_completions("perplexity", body, body.get("model", "standin"))
+            return
+
+        match = _AZURE_PATH.match(url.path)
+        if match:
+            self._chat_completions("azure_openai", body, match.group(1))
+            return
+
+        match = _GEMINI_PATH.match(url.path)
+        if match:
+            sse = parse_qs(url.query).get("alt") == ["sse"]
+            self._gemini(body, match.group(1), match.group(2) == "streamGenerateContent", sse)
+            return
+
+        self._send_json(404, {"error": f"no route for {url.path}"})
+
+    def _chat_completions(self, provider: str, body: Dict[str, Any], model: str):
+        """OpenAI-style chat completions (Perplexity and Azure OpenAI)"""
+        profile, outcome, latency = self.state.plan(provider)
+        if self._fail(provider, outcome, latency):
+            return
+
+        messages = body.get("messages", [])
+        system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        prompt = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+        text = completion_text(system, prompt, provider)
+        if outcome == "malformed":
+            text = malformed(text)
+
+        usage = {
+            "prompt_tokens": max(len(system + prompt) // 4, 1),
+            "completion_tokens": max(len(text) // 4, 1),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        completion_id = f"standin-{_digest(prompt) % 10**8:08d}"
+        created = int(time.time())
+
+        if body.get("stream"):
+            self._start_stream("text/event-stream")
+            for delay, piece in self._stream_pieces(text, profile, latency):
+                time.sleep(delay)
+                chunk = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                }
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+            final = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            self._write_chunk(f"data: {json.dumps(final)}\n\n")
+            if (body.get("stream_options") or {}).get("include_usage"):
+                usage_chunk = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created,
+                    "model": model, "choices": [], "usage": usage,
+                }
+                self._write_chunk(f"data: {json.dumps(usage_chunk)}\n\n")
+            self._write_chunk("data: [DONE]\n\n")
+            self._end_stream()
+        else:
+            time.sleep(latency)
+            response = {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            }
+            if provider == "perplexity":
+                response["citations"] = [f"https://example.com/standin/{_digest(prompt) % 1000}"]
+            self._send_json(200, response)
+
+        self.state.count(provider, outcome)
+
+    def _gemini(self, body: Dict[str, Any], model: str, stream: bool, sse: bool):
+        """Gemini generateContent / streamGenerateContent"""
+        profile, outcome, latency = self.state.plan("gemini")
+        if self._fail("gemini", outcome, latency):
+            return
+
+        prompt = "".join(
+            part.get("text", "")
+            for content in body.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        text = completion_text("", prompt, "gemini")
+        if outcome == "malformed":
+            text = malformed(text)
+
+        usage = {
+            "promptTokenCount": max(len(prompt) // 4, 1),
+            "candidatesTokenCount": max(len(text) // 4, 1),
+        }
+        usage["totalTokenCount"] = usage["promptTokenCount"] + usage["candidatesTokenCount"]
+
+        def candidate(piece: str, finished: bool) -> Dict[str, Any]:
+            entry = {"content": {"parts": [{"text": piece}], "role": "model"}, "index": 0}
+            if finished:
+                entry["finishReason"] = "STOP"
+            return entry
+
+        if stream:
+            pieces = list(self._stream_pieces(text, profile, latency))
+            self._start_stream("text/event-stream" if sse else "application/json")
+            if not sse:
+                self._write_chunk("[")
+            for index, (delay, piece) in enumerate(pieces):
+                time.sleep(delay)
+                last = index == len(pieces) - 1
+                chunk = {"candidates": [candidate(piece, last)], "modelVersion": model}
+                if last:
+                    chunk["usageMetadata"] = usage
+                if sse:
+                    self._write_chunk(f"data: {json.dumps(chunk)}\r\n\r\n")
+                else:
+                    self._write_chunk(("," if index else "") + json.dumps(chunk))
+            if not sse:
+                self._write_chunk("]")
+            self._end_stream()
+        else:
+            time.sleep(latency)
+            self._send_json(200, {
+                "candidates": [candidate(text, True)],
+                "usageMetadata": usage,
+                "modelVersion": model,
+            })
+
+        self.state.count("gemini", outcome)
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8765,
+                config: Optional[Dict[str, Any]] = None, seed: int = 0) -> ThreadingHTTPServer:
+    """Create (but don't start) a stand-in server; port 0 picks a free port"""
+    handler = type("BoundStandInHandler", (StandInHandler,), {"state": StandInState(config or {}, seed)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_background(config: Optional[Dict[str, Any]] = None, seed: int = 0) -> ThreadingHTTPServer:
+    """Start a stand-in on a free local port in a daemon thread"""
+    server = make_server(port=0, config=config, seed=seed)
+    threading.Thread(target=server.serve_forever, name="llm-standin", daemon=True).start()
+    return server
+
+
+def client_env(server: ThreadingHTTPServer) -> Dict[str, str]:
+    """Environment variables pointing the shared/ clients at a stand-in"""
+    host, port = server.server_address[:2]
+    base = f"http://{host}:{port}"
+    return {
+        "PERPLEXITY_API_KEY": "standin",
+        "PERPLEXITY_ENDPOINT": f"{base}/chat/completions",
+        "GPT5_PRO_KEY": "standin",
+        "AZURE_OPENAI_AUTH": "key",
+        "AZURE_OPENAI_ENDPOINT": f"{base}/",
+        "GEMINI_API_KEY": "standin",
+        "GEMINI_API_ENDPOINT": base,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline stand-in for the Perplexity, Azure OpenAI and Gemini APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--config", help="JSON file with per-provider latency/fault profiles")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = {}
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+
+    server = make_server(args.host, args.port, config, args.seed)
+    print(f"LLM stand-in listening on http://{args.host}:{server.server_address[1]}", file=sys.stderr)
+    for key, value in client_env(server).items():
+        print(f"  {key}={value}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
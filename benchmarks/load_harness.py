@@ -0,0 +1,302 @@
+"""
+Load harness for the sentiment and analysis endpoints.
+
+Sends requests at a fixed target rate (open loop: a slow response does not
+delay the next request) and reports achieved throughput, p50/p95/p99
+latency and the status mix. Latency is measured from each request's
+scheduled send time, so time spent queued behind --concurrency busy
+workers is counted rather than hidden.
+
+Targets:
+    (default)       the function_app handlers, called in-process
+    --url URL       a running Functions host, e.g. http://localhost:7071
+
+With --standin, an offline LLM stand-in (benchmarks/llm_standin.py) is
+started and the Perplexity, Azure OpenAI and Gemini clients are pointed
+at it before function_app is imported, so no provider quota is used.
+Against --url, start the stand-in separately and export its environment
+in the host instead.
+
+Scenarios:
+    sentiment       POST /api/sentiment
+    analyze         POST /api/analyze
+    analyze_async   POST /api/analyze?async=true (enqueue only)
+    sentiment_stream, analyze_stream
+                    POST /api/.../stream (in-process only when buffered)
+    mixed           sentiment and analyze, alternating
+
+Usage:
+    python -m benchmarks.load_harness --standin --scenario mixed --rps 20 --duration 30
+    python -m benchmarks.load_harness --standin --standin-config faults.json --output load.json
+    python -m benchmarks.load_harness --url http://localhost:7071 --scenario analyze --rps 5
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Tuple, Callable, Optional
+
+from benchmarks import llm_standin
+from benchmarks.prompt_features import generated_samples
+
+SCENARIOS = {
+    "sentiment": ("sentiment",),
+    "analyze": ("analyze",),
+    "analyze_async": ("analyze_async",),
+    "sentiment_stream": ("sentiment_stream",),
+    "analyze_stream": ("analyze_stream",),
+    "mixed": ("sentiment", "analyze"),
+}
+
+# Request kind -> (function name, method, route, query params)
+REQUESTS = {
+    "sentiment": ("sentiment_analysis", "POST", "sentiment", {}),
+    "analyze": ("market_analysis", "POST", "analyze", {}),
+    "analyze_async": ("market_analysis", "POST", "analyze", {"async": "true"}),
+    "sentiment_stream": ("sentiment_stream", "POST", "sentiment/stream", {}),
+    "analyze_stream": ("analyze_stream", "POST", "analyze/stream", {}),
+}
+
+PERCENTILES = (50, 95, 99)
+
+# Analysis request bodies (random-walk markets of 5 to 1000 points)
+ANALYSIS_SAMPLES = generated_samples()
+
+
+def _percentile(sorted_values: List[float], pct: int) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-pct * len(sorted_values) // 100))
+    return round(sorted_values[rank - 1], 1)
+
+
+def request_body(kind: str, index: int, markets: int) -> Dict[str, Any]:
+    """Request body for the index-th request, cycling over a fixed market set"""
+    market = index % markets
+    if kind.startswith("sentiment"):
+        return {
+            "market_id": f"load-{market}",
+            "market_title": f"Will load test market {market} resolve YES?",
+            "market_description": f"Synthetic market {market} used by the load harness.",
+        }
+
+    sample = ANALYSIS_SAMPLES[market % len(ANALYSIS_SAMPLES)]
+    return {
+        "market_id": f"load-{market}",
+        "market_data": sample["market_data"],
+        "sentiment_score": sample["sentiment_score"],
+    }
+
+
+def function_handlers() -> Dict[str, Callable]:
+    """
+    Import function_app and map function names to their handlers.
+
+    Set any stand-in environment first: the clients read their endpoints
+    and keys when they are created.
+    """
+    import function_app
+
+    return {fn.get_function_name(): fn.get_user_function() for fn in function_app.app.get_functions()}
+
+
+def in_process_sender() -> Callable[[str, Dict[str, Any]], Tuple[int, int]]:
+    """
+    Call function_app handlers directly.
+
+    Returns:
+        send(kind, body) -> (status code, response bytes)
+    """
+    import asyncio
+    import azure.functions as func
+
+    handlers = function_handlers()
+
+    def send(kind: str, body: Dict[str, Any]) -> Tuple[int, int]:
+        name, method, route, params = REQUESTS[kind]
+        handler = handlers[name]
+        if asyncio.iscoroutinefunction(handler):
+            raise RuntimeError(f"{name} is an HTTP streams handler; benchmark it with --url")
+
+        req = func.HttpRequest(
+            method=method,
+            url=f"http://localhost/api/{route}",
+            headers={"Content-Type": "application/json"},
+            params=params,
+            body=json.dumps(body).encode("utf-8"),
+        )
+        response = handler(req)
+        return response.status_code, len(response.get_body() or b"")
+
+    return send
+
+
+def http_sender(base_url: str, timeout: float) -> Callable[[str, Dict[str, Any]], Tuple[int, int]]:
+    """
+    Send requests to a running Functions host.
+
+    Returns:
+        send(kind, body) -> (status code, response bytes)
+    """
+    def send(kind: str, body: Dict[str, Any]) -> Tuple[int, int]:
+        _, method, route, params = REQUESTS[kind]
+        query = "?" + "&".join(f"{k}={v}" for k, v in params.items()) if params else ""
+        req = urllib.request.Request(
+            f"{base_url.rstrip('/')}/api/{route}{query}",
+            data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method=method,
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as response:
+                return response.status, len(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, len(e.read())
+
+    return send
+
+
+def run_load(send, kinds: Tuple[str, ...], rps: float, duration: float,
+             concurrency: int, markets: int) -> Dict[str, Any]:
+    """
+    Drive send() at rps for duration seconds.
+
+    Returns:
+        Dict with requests, throughput, latency percentiles (from the
+        scheduled send time), service time percentiles (from the actual
+        start), status mix, error types and per-kind latency
+    """
+    total = max(int(rps * duration), 1)
+    results: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+
+    def one(index: int, scheduled: float):
+        kind = kinds[index % len(kinds)]
+        body = request_body(kind, index, markets)
+        started = time.perf_counter()
+        status, error = None, None
+        try:
+            status, _ = send(kind, body)
+        except Exception as e:
+            error = type(e).__name__
+        finished = time.perf_counter()
+        with lock:
+            results.append({
+                "kind": kind,
+                "status": status,
+                "error": error,
+                "latency_ms": (finished - scheduled) * 1000,
+                "service_ms": (finished - started) * 1000,
+                "finished": finished,
+            })
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="load") as executor:
+        for index in range(total):
+            scheduled = start + index / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(one, index, scheduled)
+    elapsed = max(r["finished"] for r in results) - start
+
+    latency = sorted(r["latency_ms"] for r in results)
+    service = sorted(r["service_ms"] for r in results)
+    statuses: Dict[str, int] = {}
+    errors: Dict[str, int] = {}
+    by_kind: Dict[str, List[float]] = {}
+    for r in results:
+        key = str(r["status"]) if r["status"] is not None else "exception"
+        statuses[key] = statuses.get(key, 0) + 1
+        if r["error"]:
+            errors[r["error"]] = errors.get(r["error"], 0) + 1
+        by_kind.setdefault(r["kind"], []).append(r["latency_ms"])
+
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+    return {
+        "requests": len(results),
+        "elapsed_s": round(elapsed, 2),
+        "target_rps": rps,
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else None,
+        "success_rate": round(ok / len(results), 4),
+        "latency_ms": {f"p{p}": _percentile(latency, p) for p in PERCENTILES},
+        "service_ms": {f"p{p}": _percentile(service, p) for p in PERCENTILES},
+        "max_latency_ms": round(latency[-1], 1),
+        "status": statuses,
+        "errors": errors,
+        "by_kind": {
+            kind: {"requests": len(values), **{f"p{p}": _percentile(sorted(values), p) for p in PERCENTILES}}
+            for kind, values in by_kind.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the sentiment and analysis endpoints")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    parser.add_argument("--rps", type=float, default=10.0, help="Target request rate")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load")
+    parser.add_argument("--concurrency", type=int, default=64, help="Max requests in flight")
+    parser.add_argument("--markets", type=int, default=50, help="Distinct markets to cycle through")
+    parser.add_argument("--url", help="Functions host base URL (default: call handlers in-process)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="HTTP timeout with --url")
+    parser.add_argument("--standin", action="store_true", help="Start the offline LLM stand-in")
+    parser.add_argument("--standin-config", help="Stand-in latency/fault profile JSON")
+    parser.add_argument("--seed", type=int, default=0, help="Stand-in seed")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    standin = None
+    if args.standin:
+        config = {}
+        if args.standin_config:
+            with open(args.standin_config) as f:
+                config = json.load(f)
+        standin = llm_standin.start_in_background(config, args.seed)
+        os.environ.update(llm_standin.client_env(standin))
+        print(f"LLM stand-in on port {standin.server_address[1]}", file=sys.stderr)
+
+    if args.url:
+        send = http_sender(args.url, args.timeout)
+    else:
+        send = in_process_sender()
+
+    print(f"{args.scenario}: {args.rps} rps for {args.duration}s", file=sys.stderr)
+    summary = run_load(send, SCENARIOS[args.scenario], args.rps, args.duration, args.concurrency, args.markets)
+    print(f"{summary['requests']} requests, {summary['throughput_rps']} rps, "
+          f"p50 {summary['latency_ms']['p50']}ms p95 {summary['latency_ms']['p95']}ms "
+          f"p99 {summary['latency_ms']['p99']}ms, status {summary['status']}", file=sys.stderr)
+
+    report = {
+        "benchmark": "load_harness",
+        "timestamp": datetime.utcnow().isoformat(),
+        "scenario": args.scenario,
+        "target": args.url or "in-process",
+        "concurrency": args.concurrency,
+        "summary": summary,
+    }
+    if standin is not None:
+        report["standin"] = standin.RequestHandlerClass.state.stats()
+        standin.shutdown()
+    if not args.url:
+        from shared.llm_telemetry import get_llm_telemetry
+        report["llm_telemetry"] = get_llm_telemetry().summary()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Market cache memory benchmark: list of dicts vs MarketStore.
+
+Builds each representation of the markets cache from the same JSON
+payload and reports the memory it retains once the parsed payload is
+dropped (tracemalloc), plus the common access paths:
+
+    list_of_dicts   what PolymarketClient.get_markets returns and the
+                    markets cache used to hold
+    market_store    shared/market_store.py column store
+    market_index    MarketIndex over a MarketStore (what the cache holds
+                    now: the store plus serialized fragments, sort orders
+                    and the search index), for scale
+
+Per size it reports bytes retained in total and per market, build time,
+lookup by token_id (the old cache was scanned linearly; the store has a
+row index), summing the volume column, and materializing every market as
+a dict.
+
+Markets come from the CLOB simulator's generator (benchmarks/
+clob_simulator.py) normalized like get_markets, or from a snapshot file
+(a JSON list, an /api/markets response or CLOB /markets pages), repeated
+to reach each size. The simulator's descriptions are unique per market,
+so real snapshots, where sibling markets share descriptions, save more.
+
+Usage:
+    python -m benchmarks.market_store --sizes 10000,100000
+    python -m benchmarks.market_store --snapshot markets.json --output market_store.json
+"""
+
+import gc
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from datetime import datetime
+from typing import Dict, Any, List, Callable
+
+from shared.market_store import MarketStore
+from shared.market_index import MarketIndex
+
+LOOKUPS = 200
+
+
+def normalize(market: Dict[str, Any]) -> Dict[str, Any]:
+    """A CLOB market in PolymarketClient.get_markets form (already normalized ones pass through)"""
+    if "token_id" in market:
+        return market
+    return {
+        "token_id": market.get("condition_id", ""),
+        "question": market.get("question", ""),
+        "description": market.get("description", ""),
+        "end_date": market.get("end_date_iso", None),
+        "outcome_prices": market.get("outcome_prices", {}),
+        "volume": float(market.get("volume", 0)),
+        "active": market.get("active", True),
+        "slug": market.get("market_slug"),
+        "outcome_token_ids": [str(token["token_id"]) for token in market.get("tokens") or [] if token.get("token_id")],
+    }
+
+
+def simulated_markets(count: int, seed: int) -> List[Dict[str, Any]]:
+    from benchmarks.clob_simulator import MarketUniverse
+
+    universe = MarketUniverse(count, seed)
+    return [normalize(universe.market(index)) for index in range(count)]
+
+
+def snapshot_markets(path: str, count: int) -> List[Dict[str, Any]]:
+    """Snapshot markets repeated (with distinct token_ids) to count"""
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("markets") or data.get("data") or []
+    base = [normalize(market) for market in data]
+    if not base:
+        raise ValueError(f"{path} has no markets")
+    markets = []
+    for index in range(count):
+        market = dict(base[index % len(base)])
+        if index >= len(base):
+            market["token_id"] = f"{market['token_id']}-{index // len(base)}"
+        markets.append(market)
+    return markets
+
+
+def retained(payload: bytes, build: Callable[[List[Dict[str, Any]]], Any]):
+    """(structure, bytes it retains after the parsed payload is freed, build ms)"""
+    gc.collect()
+    tracemalloc.start()
+    parsed = json.loads(payload)
+    start = time.perf_counter()
+    structure = build(parsed)
+    build_ms = (time.perf_counter() - start) * 1000
+    del parsed
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return structure, size, build_ms
+
+
+def _timed_us(fn: Callable[[], Any], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return round((time.perf_counter() - start) * 1e6 / repeat, 2)
+
+
+def run_size(markets: List[Dict[str, Any]], seed: int) -> Dict[str, Any]:
+    payload = json.dumps(markets).encode("utf-8")
+    count = len(markets)
+    rng = random.Random(seed)
+    probe = [markets[rng.randrange(count)]["token_id"] for _ in range(LOOKUPS)]
+
+    dicts, dict_bytes, dict_ms = retained(payload, lambda parsed: parsed)
+    store, store_bytes, store_ms = retained(payload, MarketStore)
+    index, index_bytes, index_ms = retained(payload, lambda parsed: MarketIndex(MarketStore(parsed)))
+    del index
+
+    def scan(token_id):
+        return next((market for market in dicts if market.get("token_id") == token_id), None)
+
+    results = {
+        "list_of_dicts": {
+            "bytes": dict_bytes,
+            "bytes_per_market": round(dict_bytes / count),
+            "build_ms": round(dict_ms, 1),
+            "lookup_us": _timed_us(lambda: [scan(t) for t in probe[:10]], 1) / 10,
+            "sum_volume_ms": round(_timed_us(lambda: sum(m["volume"] for m in dicts), 5) / 1000, 2),
+            "materialize_ms": round(_timed_us(lambda: [dict(m) for m in dicts], 1) / 1000, 1),
+        },
+        "market_store": {
+            "bytes": store_bytes,
+            "bytes_per_market": round(store_bytes / count),
+            "build_ms": round(store_ms, 1),
+            "lookup_us": _timed_us(lambda: [store.get(t) for t in probe], 1) / LOOKUPS,
+            "sum_volume_ms": round(_timed_us(lambda: sum(store.volumes), 5) / 1000, 2),
+            "materialize_ms": round(_timed_us(lambda: list(store), 1) / 1000, 1),
+        },
+        "market_index": {
+            "bytes": index_bytes,
+            "bytes_per_market": round(index_bytes / count),
+            "build_ms": round(index_ms, 1),
+        },
+    }
+
+    # Same markets back out of the store
+    assert all(store.get(t) == next(m for m in dicts if m["token_id"] == t) for t in probe[:10])
+
+    return {
+        "markets": count,
+        "payload_bytes": len(payload),
+        "results": results,
+        "store_vs_dicts_pct": round(100 * (store_bytes / dict_bytes - 1), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare market cache memory: list of dicts vs MarketStore")
+    parser.add_argument("--sizes", default="10000,100000", help="Comma-separated market counts")
+    parser.add_argument("--snapshot", help="Market snapshot JSON file (default: simulated markets)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    runs = []
+    for size in sizes:
+        markets = snapshot_markets(args.snapshot, size) if args.snapshot else simulated_markets(size, args.seed)
+        run = run_size(markets, args.seed)
+        del markets
+        runs.append(run)
+        r = run["results"]
+        print(f"{size:>7} markets: dicts {r['list_of_dicts']['bytes'] / 2**20:7.1f} MiB "
+              f"({r['list_of_dicts']['bytes_per_market']} B/market)  "
+              f"store {r['market_store']['bytes'] / 2**20:7.1f} MiB "
+              f"({r['market_store']['bytes_per_market']} B/market, {run['store_vs_dicts_pct']:+.1f}%)  "
+              f"index {r['market_index']['bytes'] / 2**20:7.1f} MiB  "
+              f"lookup {r['list_of_dicts']['lookup_us']:.1f}us -> {r['market_store']['lookup_us']:.2f}us",
+              file=sys.stderr)
+
+    report = {
+        "benchmark": "market_store",
+        "timestamp": datetime.utcnow().isoformat(),
+        "source": args.snapshot or "simulated",
+        "seed": args.seed,
+        "runs": runs,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Perplexity split vs combined mode benchmark.
+
+Runs the Perplexity stage of the sentiment cascade for the same markets in
+both PERPLEXITY_MODE settings against the offline LLM stand-in
+(benchmarks/llm_standin.py):
+
+    split       search_market_news + analyze_news_sentiment (two searches)
+    combined    research_market (one search, one parse)
+
+and reports, per mode, requests per market (Perplexity quota), latency
+per market, tokens and estimated cost from shared/llm_telemetry.py, and
+how often each part (news summary, sentiment) came back usable. The
+stand-in's latency and fault profile is configurable, so the latency
+saving reflects the configured per-request latency rather than the live
+API's; request and token counts carry over directly.
+
+Usage:
+    python -m benchmarks.perplexity_modes --markets 40 --latency lognormal:1500:0.3
+    python -m benchmarks.perplexity_modes --malformed-rate 0.05 --output perplexity_modes.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List
+
+from benchmarks import llm_standin
+from benchmarks.load_harness import request_body
+
+MODES = ("split", "combined")
+
+
+def _percentile(sorted_values: List[float], pct: int) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    rank = max(1, -(-pct * len(sorted_values) // 100))
+    return round(sorted_values[rank - 1], 1)
+
+
+def run_mode(client, mode: str, markets: int, concurrency: int) -> Dict[str, Any]:
+    """Perplexity stage for every market in one mode"""
+    from shared.llm_telemetry import get_llm_telemetry
+
+    telemetry = get_llm_telemetry()
+    telemetry.reset()
+    client.mode = mode
+
+    def one(index: int) -> Dict[str, Any]:
+        body = request_body("sentiment", index, markets)
+        title, description = body["market_title"], body["market_description"]
+        start = time.perf_counter()
+        if mode == "combined":
+            news, sentiment = client.research_market(title, description)
+        else:
+            news = client.search_market_news(title, description)
+            sentiment = client.analyze_news_sentiment(title, description)
+        return {"ms": (time.perf_counter() - start) * 1000, "news": news is not None, "sentiment": sentiment is not None}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one, range(markets)))
+    elapsed = time.perf_counter() - start
+
+    summary = telemetry.summary()["providers"].get("perplexity", {})
+    latencies = sorted(r["ms"] for r in results)
+    calls = summary.get("calls", 0)
+    tokens = summary.get("tokens", {})
+    return {
+        "markets": markets,
+        "requests": calls,
+        "requests_per_market": round(calls / markets, 2),
+        "latency_ms": {
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "mean": round(statistics.fmean(latencies), 1),
+        },
+        "elapsed_s": round(elapsed, 2),
+        "tokens": {"prompt": tokens.get("prompt", 0), "completion": tokens.get("completion", 0)},
+        "cost_usd": (summary.get("cost_usd") or {}).get("total"),
+        "news_ok": sum(r["news"] for r in results),
+        "sentiment_ok": sum(r["sentiment"] for r in results),
+        "operations": {op: data["calls"] for op, data in summary.get("operations", {}).items()},
+    }
+
+
+def savings(split: Dict[str, Any], combined: Dict[str, Any]) -> Dict[str, Any]:
+    """Combined mode change against split mode, in percent"""
+    def change(before, after):
+        return round(100 * (after / before - 1), 1) if before else None
+
+    split_tokens = split["tokens"]["prompt"] + split["tokens"]["completion"]
+    combined_tokens = combined["tokens"]["prompt"] + combined["tokens"]["completion"]
+    return {
+        "requests_pct": change(split["requests"], combined["requests"]),
+        "latency_p50_pct": change(split["latency_ms"]["p50"], combined["latency_ms"]["p50"]),
+        "latency_mean_pct": change(split["latency_ms"]["mean"], combined["latency_ms"]["mean"]),
+        "tokens_pct": change(split_tokens, combined_tokens),
+        "cost_pct": change(split["cost_usd"], combined["cost_usd"]) if split["cost_usd"] else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Perplexity split and combined modes")
+    parser.add_argument("--markets", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", default="lognormal:1500:0.3", help="Stand-in latency spec (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    profile = {"latency": args.latency, "error_rate": args.error_rate, "malformed_rate": args.malformed_rate}
+    standin = llm_standin.start_in_background({"perplexity": profile}, args.seed)
+    os.environ.update(llm_standin.client_env(standin))
+
+    from shared.perplexity_client import PerplexityClient
+
+    client = PerplexityClient()
+    results = {}
+    for mode in MODES:
+        results[mode] = run_mode(client, mode, args.markets, args.concurrency)
+        r = results[mode]
+        print(f"{mode:9s} {r['requests_per_market']:.2f} requests/market  p50 {r['latency_ms']['p50']:8.1f}ms  "
+              f"mean {r['latency_ms']['mean']:8.1f}ms  tokens {r['tokens']['prompt']}+{r['tokens']['completion']}  "
+              f"news {r['news_ok']}/{args.markets} sentiment {r['sentiment_ok']}/{args.markets}", file=sys.stderr)
+
+    report = {
+        "benchmark": "perplexity_modes",
+        "timestamp": datetime.utcnow().isoformat(),
+        "config": {**profile, "markets": args.markets, "concurrency": args.concurrency, "seed": args.seed},
+        "results": results,
+        "combined_vs_split": savings(results["split"], results["combined"]),
+        "standin": standin.RequestHandlerClass.state.stats(),
+    }
+    standin.shutdown()
+    print(f"combined vs split: {report['combined_vs_split']}", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Prepared statement benchmark.
+
+Runs each hot registry statement as raw text and as a prepared statement on
+the same connection and reports per-call latency and Postgres planning time.
+All writes happen inside a transaction that is rolled back.
+
+Usage:
+    POSTGRES_PASSWORD=... python -m benchmarks.prepared_statements [--iterations 500]
+"""
+
+import re
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+
+from shared.database import PREPARED_QUERIES, get_connection, return_connection
+
+SAMPLE_TOKEN = "bench-prepared-statements"
+SAMPLE_JOB_ID = "00000000-0000-4000-8000-000000000000"
+
+# Parameters used for each registry statement
+SAMPLE_PARAMS = {
+    "upsert_market": (
+        SAMPLE_TOKEN, "Benchmark market?", "Benchmark description", None,
+        json.dumps({"yes": 0.5, "no": 0.5}), 1000.0, True
+    ),
+    "insert_price_history": (SAMPLE_TOKEN, 0.5, 1000.0),
+    "select_price_history_24h": (SAMPLE_TOKEN,),
+    "insert_sentiment_history": (
+        SAMPLE_TOKEN, 0.1, 0.5, json.dumps({}), json.dumps([]), None, "success", datetime.utcnow()
+    ),
+    "upsert_sentiment_rollups": (SAMPLE_TOKEN, datetime.utcnow(), 0.1, 0.5),
+    "select_latest_sentiment": (SAMPLE_TOKEN,),
+    "select_sentiment_rollups": (SAMPLE_TOKEN, "hour", datetime(2000, 1, 1)),
+    "select_market_text": (SAMPLE_TOKEN,),
+    "select_market": (SAMPLE_TOKEN,),
+    "select_refresh_candidates": (100,),
+    "select_price_ranges": (24,),
+    "select_pending_alerts": (0, 100),
+    "select_alert_changes": (datetime(2000, 1, 1),),
+    "mark_alerts_triggered": ([0], [datetime.utcnow()]),
+    "insert_anomaly": (SAMPLE_TOKEN, "price", "spike", 0.1, 5.0, 0.0, 0.02, datetime.utcnow()),
+    "select_anomalies": (datetime(2000, 1, 1), SAMPLE_TOKEN, SAMPLE_TOKEN, "price", "price", 100),
+    "upsert_analysis": (
+        SAMPLE_TOKEN, "flat", "thin", json.dumps([]), "WATCH", "LOW", 0.5, datetime.utcnow()
+    ),
+    "enqueue_analysis_job": (SAMPLE_JOB_ID, SAMPLE_TOKEN, "0" * 64, json.dumps({})),
+    "select_inflight_analysis_job": ("0" * 64,),
+    "claim_analysis_job": (300.0, 3),
+    "complete_analysis_job": (json.dumps({}), SAMPLE_JOB_ID, 1),
+    "retry_analysis_job": ("benchmark", SAMPLE_JOB_ID, 1),
+    "fail_analysis_job": ("benchmark", SAMPLE_JOB_ID, 1),
+    "expire_analysis_jobs": (3,),
+    "select_analysis_job": (SAMPLE_JOB_ID,),
+}
+
+_PLANNING_RE = re.compile(r"Planning Time: ([\d.]+) ms")
+
+
+def _planning_ms(cursor, statement: str, params: tuple) -> float:
+    """Return the planning time Postgres reports for one execution"""
+    cursor.execute(f"EXPLAIN (ANALYZE, SUMMARY) {statement}", params or None)
+    for (line,) in cursor.fetchall():
+        match = _PLANNING_RE.search(line)
+        if match:
+            return float(match.group(1))
+    return 0.0
+
+
+def benchmark_statement(cursor, name: str, iterations: int) -> dict:
+    """Benchmark one statement raw vs prepared"""
+    query = PREPARED_QUERIES[name]
+    params = SAMPLE_PARAMS[name]
+    raw_sql = re.sub(r"\$\d+", "%s", query)
+    placeholders = ", ".join(["%s"] * len(params))
+    execute_sql = f"EXECUTE bench_{name} ({placeholders})"
+
+    cursor.execute(f"PREPARE bench_{name} AS {query}")
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        cursor.execute(raw_sql, params)
+    raw_ms = (time.perf_counter() - start) * 1000 / iterations
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        cursor.execute(execute_sql, params)
+    prepared_ms = (time.perf_counter() - start) * 1000 / iterations
+
+    raw_planning = _planning_ms(cursor, raw_sql, params)
+    prepared_planning = _planning_ms(cursor, execute_sql, params)
+
+    cursor.execute(f"DEALLOCATE bench_{name}")
+
+    return {
+        "raw_ms_per_call": round(raw_ms, 4),
+        "prepared_ms_per_call": round(prepared_ms, 4),
+        "saved_ms_per_call": round(raw_ms - prepared_ms, 4),
+        "raw_planning_ms": raw_planning,
+        "prepared_planning_ms": prepared_planning,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark prepared vs raw hot statements")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    results = {}
+    try:
+        with conn.cursor() as cursor:
+            # Ensure the FK target exists for price_history inserts
+            cursor.execute(re.sub(r"\$\d+", "%s", PREPARED_QUERIES["upsert_market"]),
+                           SAMPLE_PARAMS["upsert_market"])
+            for name in PREPARED_QUERIES:
+                results[name] = benchmark_statement(cursor, name, args.iterations)
+                print(f"{name:28s} raw={results[name]['raw_ms_per_call']:.4f}ms "
+                      f"prepared={results[name]['prepared_ms_per_call']:.4f}ms "
+                      f"planning {results[name]['raw_planning_ms']:.3f}ms -> "
+                      f"{results[name]['prepared_planning_ms']:.3f}ms")
+    finally:
+        conn.rollback()
+        return_connection(conn)
+
+    report = {
+        "benchmark": "prepared_statements",
+        "iterations": args.iterations,
+        "timestamp": datetime.utcnow().isoformat(),
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Price polling benchmark: adaptive per-market cadence vs fixed intervals.
+
+Simulates N markets whose prices are random walks with per-market
+volatility (markets within two days of end_date move three times as
+much), log-uniform volumes and end dates over the next 90 days, and
+polls them on a simulated clock:
+
+    adaptive    shared/price_poller.py PricePollScheduler, seeded with each
+                market's 24h price range as sync() gets it from price_history
+    fixed       every market on the same interval, round robin, spending
+                the same CLOB budget
+
+Every --sample-seconds it compares each market's last polled price with its
+true price and reports the mean and p95 absolute error overall, for
+markets near end_date and for the rest, with the requests each mode made.
+The request rate a 5 second TTL per market would need is reported for
+scale (what polling every market at PRICE_CACHE_TTL costs).
+
+Usage:
+    python -m benchmarks.price_polling --markets 5000 --hours 6
+    python -m benchmarks.price_polling --budget 120 --output price_polling.json
+"""
+
+import sys
+import math
+import json
+import random
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, Any, List
+
+from shared import price_poller
+from shared.market_store import MarketStore
+from shared.price_poller import PricePollScheduler
+
+# Markets this close to end_date count as "near end" (and move more)
+NEAR_END = timedelta(days=2)
+NEAR_END_VOLATILITY = 3.0
+
+
+class SimulatedMarkets:
+    """Random-walk prices advanced lazily on a simulated clock"""
+
+    def __init__(self, count: int, seed: int, start: float):
+        rng = random.Random(seed)
+        self.rng = random.Random(seed + 1)
+        self.start = start
+        self.markets: List[Dict[str, Any]] = []
+        self.sigma: List[float] = []
+        self.near_end: List[bool] = []
+        self.price_ranges: Dict[str, float] = {}
+        for index in range(count):
+            end = start + rng.uniform(0.1, 90) * 86400
+            near = end - start < NEAR_END.total_seconds()
+            # Price points per sqrt(hour), log-uniform over 0.001..0.05
+            sigma = 10 ** rng.uniform(-3, math.log10(0.05)) * (NEAR_END_VOLATILITY if near else 1.0)
+            token_id = f"0x{index:064x}"
+            self.markets.append({
+                "token_id": token_id,
+                "question": f"Simulated market {index}?",
+                "end_date": datetime.utcfromtimestamp(end).isoformat() + "Z",
+                "volume": 10 ** rng.uniform(2, 7),
+                "active": True,
+            })
+            self.sigma.append(sigma)
+            self.near_end.append(near)
+            # The previous day's range: a random walk's expected range is
+            # sqrt(8 / pi) sigma sqrt(T)
+            self.price_ranges[token_id] = sigma * math.sqrt(8 / math.pi * 24) * rng.uniform(0.7, 1.3)
+        self.prices = [rng.uniform(0.1, 0.9) for _ in range(count)]
+        self.updated = [start] * count
+        self.rows = {market["token_id"]: index for index, market in enumerate(self.markets)}
+
+    def price(self, index: int, now: float) -> float:
+        hours = (now - self.updated[index]) / 3600.0
+        if hours > 0:
+            step = self.rng.gauss(0, self.sigma[index] * math.sqrt(hours))
+            self.prices[index] = min(max(self.prices[index] + step, 0.001), 0.999)
+            self.updated[index] = now
+        return self.prices[index]
+
+
+class Run:
+    """One polling mode over a fresh copy of the simulated markets"""
+
+    def __init__(self, args, start: float):
+        self.sim = SimulatedMarkets(args.markets, args.seed, start)
+        self.now = start
+        self.end = start + args.hours * 3600
+        self.sample_every = args.sample_seconds
+        self.next_sample = start + self.sample_every
+        self.known = [None] * args.markets
+        self.requests = 0
+        self.errors = {"near_end": [], "other": []}
+
+    def advance(self, seconds: float):
+        target = min(self.now + max(seconds, 0.0), self.end)
+        while self.next_sample <= target:
+            self.now = self.next_sample
+            self.sample()
+            self.next_sample += self.sample_every
+        self.now = target
+
+    def sample(self):
+        for index, known in enumerate(self.known):
+            if known is None:
+                continue
+            error = abs(self.sim.price(index, self.now) - known)
+            self.errors["near_end" if self.sim.near_end[index] else "other"].append(error)
+
+    def fetch(self, token_id: str) -> float:
+        index = self.sim.rows[token_id]
+        self.requests += 1
+        self.known[index] = self.sim.price(index, self.now)
+        return self.known[index]
+
+    def summary(self, hours: float) -> Dict[str, Any]:
+        def stats(values):
+            if not values:
+                return None
+            values = sorted(values)
+            return {
+                "mean_abs_error": round(sum(values) / len(values), 5),
+                "p95_abs_error": round(values[int(0.95 * (len(values) - 1))], 5),
+            }
+
+        return {
+            "requests": self.requests,
+            "requests_per_minute": round(self.requests / (hours * 60), 1),
+            "all": stats(self.errors["near_end"] + self.errors["other"]),
+            "near_end": stats(self.errors["near_end"]),
+            "other": stats(self.errors["other"]),
+        }
+
+
+def run_adaptive(args, start: float) -> Dict[str, Any]:
+    run = Run(args, start)
+    poller = PricePollScheduler(
+        budget_per_minute=args.budget, clock=lambda: run.now, sleep=run.advance, seed=args.seed
+    )
+    poller.sync(MarketStore(run.sim.markets), run.sim.price_ranges)
+    # One timer run at a time, re-syncing between runs as the timer does
+    while run.now < run.end:
+        poller.run_for(min(60.0, run.end - run.now), run.fetch)
+        poller.sync(poller.store)
+    result = run.summary(args.hours)
+    status = poller.status()
+    result["interval_s"] = status["interval_s"]
+    result["stretch"] = status["budget"]["stretch"]
+    return result
+
+
+def run_fixed(args, start: float) -> Dict[str, Any]:
+    run = Run(args, start)
+    rate = args.budget / 60.0
+    index = 0
+    while run.now < run.end:
+        run.fetch(run.sim.markets[index]["token_id"])
+        index = (index + 1) % args.markets
+        run.advance(1.0 / rate)
+    result = run.summary(args.hours)
+    result["interval_s"] = round(args.markets / rate, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare adaptive and fixed-interval price polling")
+    parser.add_argument("--markets", type=int, default=5000)
+    parser.add_argument("--hours", type=float, default=6.0, help="Simulated time")
+    parser.add_argument("--budget", type=float, default=price_poller.CLOB_BUDGET_PER_MINUTE,
+                        help="CLOB requests per minute")
+    parser.add_argument("--sample-seconds", type=float, default=60.0, help="Error sampling interval")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    start = datetime(2026, 1, 1).timestamp()
+    results = {
+        "adaptive": run_adaptive(args, start),
+        "fixed": run_fixed(args, start),
+    }
+    ttl_rate = args.markets * 60 / price_poller.MIN_POLL_INTERVAL
+
+    for mode, result in results.items():
+        print(f"{mode:>8}: {result['requests_per_minute']:6.1f} req/min, mean error "
+              f"{result['all']['mean_abs_error']:.4f} (near end {result['near_end']['mean_abs_error']:.4f}, "
+              f"other {result['other']['mean_abs_error']:.4f}), p95 {result['all']['p95_abs_error']:.4f}",
+              file=sys.stderr)
+    print(f"a {price_poller.MIN_POLL_INTERVAL:.0f}s TTL for every market would need {ttl_rate:.0f} req/min",
+          file=sys.stderr)
+
+    report = {
+        "benchmark": "price_polling",
+        "timestamp": datetime.utcnow().isoformat(),
+        "markets": args.markets,
+        "hours": args.hours,
+        "budget_per_minute": args.budget,
+        "seed": args.seed,
+        "results": results,
+        "fixed_ttl_requests_per_minute": ttl_rate,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Prompt size and latency: raw market_data vs extracted features.
+
+Builds the analysis prompt for each sample both ways and reports prompt
+tokens and feature-extraction time. With --live, also times
+AzureOpenAIClient.analyze_market end to end in each mode.
+
+Samples come from (first match):
+    --samples FILE   JSON list or NDJSON of /api/analyze request bodies
+    --from-db N      the N most recent payloads in analysis_jobs
+    (default)        generated price walks of 5 to 1000 points
+
+Usage:
+    python -m benchmarks.prompt_features --output prompt_features.json
+    python -m benchmarks.prompt_features --from-db 50 --live --repeats 3
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+from shared import market_features
+from shared.market_features import format_market_data
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except ImportError:
+    _ENCODING = None
+
+# Generated sample sizes: (points, timestamped)
+GENERATED_SAMPLES = ((5, False), (50, False), (100, True), (288, True), (1000, True))
+
+
+def count_tokens(text: str) -> int:
+    """Tokens with tiktoken when installed, else the ~4 chars/token estimate"""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return max(1, round(len(text) / 4))
+
+
+def generated_samples(seed: int = 7) -> list:
+    """Deterministic random-walk markets shaped like /api/analyze bodies"""
+    rng = random.Random(seed)
+    start = datetime(2025, 11, 10)
+    samples = []
+
+    for points, timestamped in GENERATED_SAMPLES:
+        price = rng.uniform(0.2, 0.8)
+        prices = []
+        for _ in range(points):
+            price = min(max(price + rng.gauss(0, 0.01), 0.01), 0.99)
+            prices.append(round(price, 4))
+
+        if timestamped:
+            # Newest first, like GET /api/price
+            history = [
+                {"price": p, "timestamp": (start + timedelta(minutes=5 * i)).isoformat()}
+                for i, p in enumerate(prices)
+            ][::-1]
+        else:
+            history = prices
+
+        samples.append({
+            "market_id": f"bench-{points}",
+            "market_data": {
+                "title": f"Benchmark market with {points} price points?",
+                "description": "Resolves YES if the benchmark completes.",
+                "current_price": prices[-1],
+                "volume_24h": round(rng.uniform(1e3, 1e6), 2),
+                "price_history": history,
+                "volume_history": [round(rng.uniform(1e3, 5e4), 2) for _ in range(min(points, 48))],
+            },
+            "sentiment_score": round(rng.uniform(-1, 1), 2),
+        })
+    return samples
+
+
+def load_samples(path: str) -> list:
+    """Read request bodies from a JSON list or NDJSON file"""
+    with open(path) as f:
+        text = f.read().strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def db_samples(limit: int) -> list:
+    """Recent analysis job payloads (recorded /api/analyze requests)"""
+    from shared.database import get_connection, return_connection
+
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT payload FROM analysis_jobs ORDER BY created_at DESC LIMIT %s",
+                (limit,)
+            )
+            return [row[0] for row in cursor.fetchall()]
+    finally:
+        conn.rollback()
+        return_connection(conn)
+
+
+def _prompt_builder():
+    """Full analysis prompt builder, or just the Market Data section without client deps"""
+    try:
+        from shared.azure_openai import AzureOpenAIClient
+    except ImportError:
+        return "market_data_section", lambda data, score, compact: format_market_data(data, compact)
+
+    def build(data, score, compact):
+        market_features.PROMPT_FEATURES_ENABLED = compact
+        return AzureOpenAIClient._build_analysis_prompt(None, data, score)
+
+    return "full_prompt", build
+
+
+def benchmark_sample(sample: dict, build) -> dict:
+    """Prompt tokens both ways and feature extraction time for one sample"""
+    data = sample["market_data"]
+    score = sample.get("sentiment_score")
+
+    raw_tokens = count_tokens(build(data, score, False))
+
+    start = time.perf_counter()
+    compact_prompt = build(data, score, True)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    compact_tokens = count_tokens(compact_prompt)
+    history = data.get("price_history") or data.get("price_history_24h") or []
+
+    return {
+        "market_id": sample.get("market_id"),
+        "history_points": len(history),
+        "raw_tokens": raw_tokens,
+        "compact_tokens": compact_tokens,
+        "reduction_pct": round(100 * (1 - compact_tokens / raw_tokens), 1),
+        "compact_build_ms": round(build_ms, 3),
+    }
+
+
+def benchmark_live(samples: list, repeats: int) -> dict:
+    """End-to-end analyze_market latency in each prompt mode"""
+    from shared.azure_openai import AzureOpenAIClient
+
+    client = AzureOpenAIClient()
+    results = {}
+    for mode, compact in (("raw", False), ("compact", True)):
+        market_features.PROMPT_FEATURES_ENABLED = compact
+        timings = []
+        for sample in samples:
+            for _ in range(repeats):
+                start = time.perf_counter()
+                client.analyze_market(sample["market_id"], sample["market_data"], sample.get("sentiment_score"))
+                timings.append((time.perf_counter() - start) * 1000)
+        results[mode] = {
+            "calls": len(timings),
+            "mean_ms": round(statistics.fmean(timings), 1),
+            "median_ms": round(statistics.median(timings), 1),
+            "max_ms": round(max(timings), 1),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compact analysis prompt features")
+    parser.add_argument("--samples", help="JSON/NDJSON file of /api/analyze request bodies")
+    parser.add_argument("--from-db", type=int, metavar="N", help="Use the N latest analysis job payloads")
+    parser.add_argument("--live", action="store_true", help="Also time real analyze_market calls")
+    parser.add_argument("--repeats", type=int, default=1, help="Live calls per sample and mode")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    if args.samples:
+        samples, source = load_samples(args.samples), args.samples
+    elif args.from_db:
+        samples, source = db_samples(args.from_db), "analysis_jobs"
+    else:
+        samples, source = generated_samples(), "generated"
+
+    scope, build = _prompt_builder()
+    results = [benchmark_sample(sample, build) for sample in samples]
+    for r in results:
+        print(f"{str(r['market_id']):24s} points={r['history_points']:5d} "
+              f"tokens {r['raw_tokens']:6d} -> {r['compact_tokens']:4d} "
+              f"({-r['reduction_pct']:+.1f}%) build={r['compact_build_ms']:.3f}ms", file=sys.stderr)
+
+    raw_total = sum(r["raw_tokens"] for r in results)
+    compact_total = sum(r["compact_tokens"] for r in results)
+    report = {
+        "benchmark": "prompt_features",
+        "timestamp": datetime.utcnow().isoformat(),
+        "sample_source": source,
+        "scope": scope,
+        "tokenizer": "o200k_base" if _ENCODING is not None else "chars/4 estimate",
+        "results": results,
+        "totals": {
+            "raw_tokens": raw_total,
+            "compact_tokens": compact_total,
+            "reduction_pct": round(100 * (1 - compact_total / raw_total), 1) if raw_total else 0.0,
+        },
+    }
+
+    if args.live:
+        report["live"] = benchmark_live(samples, args.repeats)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,18 +6,50 @@ Azure Functions application for markets, price data, sentiment analysis, and mar
 import azure.functions as func
 import logging
 import json
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+import uuid
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Any, Iterator, Tuple, Union
 
 # Agent 3 imports (Backend Core)
-from shared.database import get_connection, return_connection, execute_query, init_database
+from shared.database import (
+    get_connection, get_read_connection, return_connection, execute_query,
+    execute_prepared, execute_prepared_batch, get_query_stats, get_replica_status, init_database
+)
 from shared.polymarket_client import get_polymarket_client
+from shared.market_index import (
+    MarketIndex, decode_cursor, page_body, SORT_KEYS, DEFAULT_ORDER, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+)
+from shared.field_projection import parse_fields, project
+from shared.market_store import MarketStore
+from shared.market_resolver import Resolution, identifier_kind, CONDITION_ID, TOKEN_ID, SLUG
 
 # Agent 4 imports (Backend AI)
 from shared.sentiment_analyzer import SentimentAnalyzer
+from shared.sentiment_batch import BatchSentimentRunner, MAX_BATCH_SIZE
+from shared.sentiment_scheduler import get_refresh_scheduler
+from shared.price_poller import get_price_poller
+from shared.alert_engine import get_alert_engine
+from shared.anomaly_detector import get_anomaly_detector, METRICS as ANOMALY_METRICS
+from shared.analysis_jobs import get_analysis_job_queue, get_analysis_worker_pool
+from shared.llm_telemetry import get_llm_telemetry
+from shared.streaming import analysis_events, sse_event
 from shared.azure_openai import AzureOpenAIClient
 from shared.database import DatabaseClient
 
+# HTTP streams deliver the /stream endpoints' SSE events as they are
+# produced. It needs azurefunctions-extensions-http-fastapi (in
+# requirements.txt) and the PYTHON_ENABLE_INIT_INDEXING=1 app setting;
+# without the package the same events are returned in one buffered
+# text/event-stream body.
+try:
+    from azurefunctions.extensions.http.fastapi import Request as StreamRequest, StreamingResponse
+    HTTP_STREAMS_ENABLED = True
+except ImportError:
+    HTTP_STREAMS_ENABLED = False
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -25,16 +57,57 @@ logger = logging.getLogger(__name__)
 # Initialize Function App
 app = func.FunctionApp()
 
-# Cache for markets data (5 minute TTL)
-_markets_cache: Optional[Dict] = None
+# Cache for markets data (5 minute TTL): a MarketStore snapshot and the
+# query index over it, both rebuilt and swapped in with every refresh
+_market_index: Optional[MarketIndex] = None
 _markets_cache_time: Optional[datetime] = None
 MARKETS_CACHE_TTL = timedelta(minutes=5)
 
-# Cache for price data (5 second TTL)
+# Cold-start snapshot loads for identifier lookups: one fetch at a time, and
+# after a failure none for MARKETS_LOAD_RETRY_SECONDS
+_markets_load_lock = threading.Lock()
+_markets_load_failed_at: Optional[float] = None  # monotonic
+MARKETS_LOAD_RETRY_SECONDS = 30
+
+# Any of these on GET /api/markets returns one page instead of every market
+MARKET_QUERY_PARAMS = (
+    "q", "active", "min_volume", "max_volume", "end_after", "end_before", "sort", "order", "limit", "cursor"
+)
+
+# Cache for price data (5 second TTL, or the market's poll interval while
+# the price poller keeps it fresh)
 _price_cache: Dict[str, Dict] = {}
 _price_cache_time: Dict[str, datetime] = {}
 PRICE_CACHE_TTL = timedelta(seconds=5)
 
+# How long each price_polling timer run polls (below the 1 minute schedule)
+PRICE_POLL_RUN_SECONDS = 50
+
+# Stored sentiment is served by GET /api/sentiment/{market_id} while newer than this
+SENTIMENT_MAX_AGE = timedelta(minutes=30)
+SENTIMENT_WAIT_TIMEOUT = 120  # seconds a wait=true request blocks on a refresh
+
+# Background sentiment refreshes (one in flight per market). A refresh that
+# fails or can't be stored is not restarted for SENTIMENT_REFRESH_COOLDOWN
+# seconds; until then requests get its finished future back
+_sentiment_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="sentiment-refresh")
+_sentiment_refreshes: Dict[str, Future] = {}
+_sentiment_refresh_held: Dict[str, float] = {}  # market_id -> monotonic time it may rerun
+_sentiment_refresh_lock = threading.RLock()
+SENTIMENT_REFRESH_COOLDOWN = 300
+
+# How long each sentiment_refresh timer run may spend refreshing; leaves
+# room for one slow refresh inside host.json's 5 minute functionTimeout
+SENTIMENT_REFRESH_RUN_SECONDS = 180
+
+# Async analysis jobs: suggested client poll interval, and how long each
+# timer run may spend draining the queue (below the 1 minute schedule)
+ANALYSIS_JOB_RETRY_AFTER = 5  # seconds
+ANALYSIS_JOB_DRAIN_SECONDS = 50
+
+# Headers for SSE responses (no proxy buffering or caching)
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
 # Initialize AI clients (singleton pattern with lazy loading)
 _sentiment_analyzer = None
 _azure_openai = None
@@ -89,7 +162,9 @@ def health_check(req: func.HttpRequest) -> func.HttpResponse:
                 "timestamp": datetime.utcnow().isoformat(),
                 "service": "polymarket-analyzer-backend",
                 "ai_services": services_status,
-                "database": db_status
+                "database": db_status,
+                "database_queries": get_query_stats(),
+                "database_replica": get_replica_status()
             }),
             mimetype="application/json",
             status_code=200
@@ -103,6 +178,39 @@ def health_check(req: func.HttpRequest) -> func.HttpResponse:
         )
 
 
+# =============================================================================
+# METRICS ENDPOINT
+# =============================================================================
+
+@app.function_name(name="metrics")
+@app.route(route="metrics", methods=["GET"], auth_level=func.AuthLevel.FUNCTION)
+def llm_metrics(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Rolling LLM provider telemetry for this instance
+
+    GET /api/metrics
+
+    Returns:
+        JSON with, per provider and per operation: call count, success
+        rate, outcome counts (success, parse_failure, empty, timeout,
+        http_error, cancelled, error), wall time and time-to-first-token p50/p90/p99,
+        prompt/completion token totals and estimated cost in USD
+    """
+    try:
+        return func.HttpResponse(
+            json.dumps({"llm": get_llm_telemetry().summary()}, indent=2),
+            status_code=200,
+            mimetype="application/json"
+        )
+    except Exception as e:
+        logger.error(f"Metrics endpoint failed: {e}", exc_info=True)
+        return func.HttpResponse(
+            json.dumps({"error": "Internal server error", "message": str(e)}),
+            status_code=500,
+            mimetype="application/json"
+        )
+
+
 # =============================================================================
 # MARKETS ENDPOINT (Agent 3 - Backend Core)
 # =============================================================================
@@ -116,6 +224,24 @@ def get_markets(req: func.HttpRequest) -> func.HttpResponse:
     Query parameters:
         - refresh: Force refresh from API (default: false)
         - active_only: Only return active markets (default: true)
+        - fields: Comma-separated market fields to return (token_id is
+          always included), e.g. fields=question,volume,end_date for a list
+          view without descriptions; see GET /api/markets/{market_id}
+
+    Search, filter, sort and page parameters (any of them switches to a
+    paged response served from the market index):
+        - q: Question text search (every word; the last may be a prefix)
+        - active: true/false
+        - min_volume, max_volume: Inclusive volume range
+        - end_after, end_before: ISO end date window, [after, before)
+        - sort: default (upstream order), volume or end_date
+        - order: asc or desc (default desc for volume, else asc)
+        - limit: Page size (default 100, max 1000)
+        - cursor: next_cursor from the previous page
+
+        A page has "markets", "count" (markets in the page),
+        "total_markets" (unfiltered), "next_cursor" (null on the last
+        page), "cached" and "timestamp".
 
     Returns:
         JSON array of markets with structure:
@@ -137,7 +263,16 @@ def get_markets(req: func.HttpRequest) -> func.HttpResponse:
             "timestamp": str
         }
     """
-    global _markets_cache, _markets_cache_time
+
+    try:
+        market_query = _parse_market_query(req.params)
+        fields = parse_fields(req.params.get("fields"), "market")
+    except ValueError as e:
+        return func.HttpResponse(
+            json.dumps({"error": f"Invalid query: {str(e)}"}),
+            mimetype="application/json",
+            status_code=400
+        )
 
     try:
         # Check query parameters
@@ -146,7 +281,7 @@ def get_markets(req: func.HttpRequest) -> func.HttpResponse:
 
         # Check cache
         cache_valid = (
-            _markets_cache is not None and
+            _market_index is not None and
             _markets_cache_time is not None and
             datetime.utcnow() - _markets_cache_time < MARKETS_CACHE_TTL and
             not force_refresh
@@ -154,65 +289,268 @@ def get_markets(req: func.HttpRequest) -> func.HttpResponse:
 
         if cache_valid:
             logger.info("Returning cached markets data")
-            response = _markets_cache.copy()
-            response['cached'] = True
-            return func.HttpResponse(
-                json.dumps(response),
-                mimetype="application/json",
-                status_code=200
+            return _market_page_response(market_query, fields, cached=True)
+
+        _refresh_markets(active_only)
+        return _market_page_response(market_query, fields, cached=False)
+
+    except Exception as e:
+        logger.error(f"Failed to fetch markets: {e}")
+
+        # Try to return cached data as fallback
+        if _market_index is not None:
+            logger.info("Returning stale cache as fallback")
+            return _market_page_response(
+                market_query, fields, cached=True, error="Fresh data unavailable, returning cached data"
             )
 
-        # Fetch fresh data from Polymarket
-        logger.info("Fetching fresh markets data from Polymarket")
-        client = get_polymarket_client()
-        markets = client.get_markets(active_only=active_only)
+        # No cache available, return error
+        return func.HttpResponse(
+            json.dumps({
+                "error": "Failed to fetch markets",
+                "message": str(e),
+                "timestamp": datetime.utcnow().isoformat()
+            }),
+            mimetype="application/json",
+            status_code=500
+        )
+
+
+def _refresh_markets(active_only: bool = True) -> MarketIndex:
+    """Fetch markets from Polymarket, store them, and swap in a new snapshot and index"""
+    global _markets_cache_time, _market_index
+
+    # Fetch fresh data from Polymarket
+    logger.info("Fetching fresh markets data from Polymarket")
+    client = get_polymarket_client()
+    get_price_poller().record_request()
+    markets = client.get_markets(active_only=active_only)
+
+    # Store in database (upsert) - gracefully handle DB failures
+    if markets and _database_available:
+        try:
+            logger.info(f"Storing {len(markets)} markets in database")
+            _upsert_markets(markets)
+        except Exception as db_error:
+            logger.warning(f"Failed to store markets in database (continuing without DB): {db_error}")
+
+    # Update cache: a new store snapshot and its query and identifier indexes
+    index = MarketIndex(MarketStore(markets))
+    _market_index = index
+    _markets_cache_time = datetime.utcnow()
+
+    # Anomaly statistics only for markets in the snapshot (an empty fetch
+    # keeps them)
+    if markets:
+        get_anomaly_detector().retain(index.store.token_ids)
+    return index
 
-        # Store in database (upsert) - gracefully handle DB failures
-        if markets and _database_available:
+
+def _current_market_index(load: bool = False) -> Optional[MarketIndex]:
+    """
+    The current market snapshot's index; with load, fetch markets if none
+    are cached yet. Concurrent loads wait for the first one, and a failed
+    load isn't retried for MARKETS_LOAD_RETRY_SECONDS.
+    """
+    global _markets_load_failed_at
+
+    index = _market_index
+    if index is not None or not load:
+        return index
+
+    with _markets_load_lock:
+        index = _market_index
+        if index is not None:
+            return index
+        if (_markets_load_failed_at is not None and
+                time.monotonic() - _markets_load_failed_at < MARKETS_LOAD_RETRY_SECONDS):
+            return None
+        try:
+            index = _refresh_markets()
+            _markets_load_failed_at = None
+        except Exception as e:
+            logger.warning(f"Could not load markets: {e}")
+            _markets_load_failed_at = time.monotonic()
+    return index
+
+
+def _resolve_market(identifier: Optional[str], load: bool = False) -> Optional[Resolution]:
+    """
+    Market in the current snapshot named by its condition id, an outcome
+    token id or its slug.
+
+    Args:
+        identifier: Any of the three
+        load: Fetch markets first if none are cached yet and identifier
+            is a token id or slug (a condition id is usable without them)
+
+    Returns:
+        Resolution (canonical condition id, store row, ...), or None if
+        the identifier is malformed or not in the snapshot
+    """
+    index = _current_market_index(load and identifier_kind(identifier) in (TOKEN_ID, SLUG))
+    return index.resolve(identifier) if index is not None else None
+
+
+def _canonical_market_id(identifier: str) -> str:
+    """Condition id of the market identifier names; identifier itself if not in the snapshot"""
+    resolution = _resolve_market(identifier)
+    return resolution.condition_id if resolution is not None else identifier
+
+
+def _parse_market_query(params) -> Optional[Dict[str, Any]]:
+    """
+    Parse the /api/markets search, filter, sort and page parameters.
+
+    Returns:
+        MarketIndex.query keyword arguments, or None when none are given
+
+    Raises:
+        ValueError: If a parameter is invalid
+    """
+    if not any(name in params for name in MARKET_QUERY_PARAMS):
+        return None
+
+    sort = params.get("sort") or "default"
+    if sort not in SORT_KEYS:
+        raise ValueError(f"sort must be one of {', '.join(SORT_KEYS)}")
+    order = params.get("order") or None
+    if order not in (None, "asc", "desc"):
+        raise ValueError("order must be asc or desc")
+
+    query: Dict[str, Any] = {"q": params.get("q") or None, "sort": sort, "order": order}
+
+    if params.get("active"):
+        active = params["active"].lower()
+        if active not in ("true", "false"):
+            raise ValueError("active must be true or false")
+        query["active"] = active == "true"
+
+    for name in ("min_volume", "max_volume"):
+        if params.get(name):
             try:
-                logger.info(f"Storing {len(markets)} markets in database")
-                _upsert_markets(markets)
-            except Exception as db_error:
-                logger.warning(f"Failed to store markets in database (continuing without DB): {db_error}")
-
-        # Prepare response
-        response = {
-            "markets": markets,
-            "count": len(markets),
-            "cached": False,
-            "timestamp": datetime.utcnow().isoformat()
-        }
+                query[name] = float(params[name])
+            except ValueError:
+                raise ValueError(f"{name} must be a number")
+
+    for name in ("end_after", "end_before"):
+        if params.get(name):
+            try:
+                moment = datetime.fromisoformat(params[name].replace("Z", "+00:00"))
+            except ValueError:
+                raise ValueError(f"{name} must be an ISO date")
+            if moment.tzinfo is not None:
+                moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+            # Same layout as the stored end dates, so string comparison orders them
+            query[name] = moment.isoformat()
+
+    try:
+        limit = int(params.get("limit") or DEFAULT_PAGE_SIZE)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    query["limit"] = limit
+
+    if params.get("cursor"):
+        cursor = decode_cursor(params["cursor"])
+        if cursor[0] != sort or cursor[1] != (order or DEFAULT_ORDER[sort]):
+            raise ValueError("cursor was issued for a different sort or order")
+        query["cursor"] = cursor
+
+    return query
+
+
+def _market_page_response(
+    query: Optional[Dict[str, Any]],
+    fields: Optional[Tuple[str, ...]],
+    cached: bool,
+    error: Optional[str] = None
+) -> func.HttpResponse:
+    """One page of markets (every market when query is None) from the query index"""
+    index = _market_index
+    if query is None:
+        fragments = index.all(fields)
+        meta = {"count": len(fragments)}
+    else:
+        fragments, next_cursor = index.query(**query, fields=fields)
+        meta = {"count": len(fragments), "total_markets": len(index), "next_cursor": next_cursor}
+    # timestamp is when the snapshot was fetched, as it was for the cached list
+    meta.update({"cached": cached, "timestamp": index.built_at.isoformat()})
+    if error:
+        meta["error"] = error
+    return func.HttpResponse(page_body(fragments, meta), mimetype="application/json", status_code=200)
+
+
+@app.function_name(name="market_detail")
+@app.route(route="markets/{market_id}", methods=["GET"], auth_level=func.AuthLevel.ANONYMOUS)
+def get_market_detail(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Full details of one market, including its description.
+
+    Path parameters:
+        - market_id: Condition ID (the markets' token_id), an outcome
+          token ID or the market slug
+
+    Query parameters:
+        - fields: Comma-separated market fields to return (as /api/markets)
 
-        # Update cache
-        _markets_cache = response.copy()
-        _markets_cache_time = datetime.utcnow()
+    Served from the markets cache, or the markets table for condition IDs
+    not in the current snapshot. Malformed IDs, and outcome token IDs or
+    slugs not in the snapshot, are 404s without a database lookup.
 
+    Returns:
+        {
+            "market": {same fields as the /api/markets entries},
+            "cached": bool (false when read from the database),
+            "timestamp": str
+        }
+    """
+    market_id = req.route_params.get("market_id")
+
+    try:
+        fields = parse_fields(req.params.get("fields"), "market")
+    except ValueError as e:
         return func.HttpResponse(
-            json.dumps(response),
+            json.dumps({"error": f"Invalid query: {str(e)}"}),
             mimetype="application/json",
-            status_code=200
+            status_code=400
         )
 
-    except Exception as e:
-        logger.error(f"Failed to fetch markets: {e}")
-
-        # Try to return cached data as fallback
-        if _markets_cache is not None:
-            logger.info("Returning stale cache as fallback")
-            response = _markets_cache.copy()
-            response['cached'] = True
-            response['error'] = "Fresh data unavailable, returning cached data"
+    try:
+        # Condition ids fall back to the markets table; only token ids and
+        # slugs need the snapshot loaded
+        index = _current_market_index(load=identifier_kind(market_id) in (TOKEN_ID, SLUG))
+        resolution = index.resolve(market_id) if index is not None else None
+        market = index.store.to_dict(resolution.row) if resolution is not None else None
+        cached = market is not None
+        if market is None and _database_available and identifier_kind(market_id) == CONDITION_ID:
+            market = get_db_client().get_market(market_id)
+
+        if market is None:
             return func.HttpResponse(
-                json.dumps(response),
+                json.dumps({"error": "Market not found", "market_id": market_id}),
                 mimetype="application/json",
-                status_code=200
+                status_code=404
             )
 
-        # No cache available, return error
         return func.HttpResponse(
             json.dumps({
-                "error": "Failed to fetch markets",
+                "market": project(market, fields, "market"),
+                "cached": cached,
+                "timestamp": datetime.utcnow().isoformat()
+            }),
+            mimetype="application/json",
+            status_code=200
+        )
+
+    except Exception as e:
+        logger.error(f"Failed to fetch market {market_id}: {e}")
+        return func.HttpResponse(
+            json.dumps({
+                "error": "Failed to fetch market",
                 "message": str(e),
+                "market_id": market_id,
                 "timestamp": datetime.utcnow().isoformat()
             }),
             mimetype="application/json",
@@ -231,10 +569,17 @@ def get_price(req: func.HttpRequest) -> func.HttpResponse:
     Get current price and 24h history for a specific market token.
 
     Path parameters:
-        - token_id: Market token ID
+        - token_id: Condition ID (the markets' token_id), an outcome token
+          ID or the market slug; responses and caches use the condition ID
+
+    Malformed IDs, and outcome token IDs or slugs not in the markets
+    snapshot, are 404s without a CLOB call; unknown condition IDs cost
+    one CLOB call (not-found responses aren't retried).
 
     Query parameters:
         - refresh: Force refresh from API (default: false)
+        - fields: Comma-separated response fields (token_id always
+          included), e.g. fields=current_price to skip the history
 
     Returns:
         JSON with current price and history:
@@ -252,6 +597,7 @@ def get_price(req: func.HttpRequest) -> func.HttpResponse:
             "timestamp": str
         }
     """
+    fields = None
     try:
         # Get token_id from route
         token_id = req.route_params.get('token_id')
@@ -264,12 +610,40 @@ def get_price(req: func.HttpRequest) -> func.HttpResponse:
 
         # Check query parameters
         force_refresh = req.params.get('refresh', 'false').lower() == 'true'
+        try:
+            fields = parse_fields(req.params.get('fields'), "price")
+        except ValueError as e:
+            return func.HttpResponse(
+                json.dumps({"error": f"Invalid query: {str(e)}"}),
+                mimetype="application/json",
+                status_code=400
+            )
 
-        # Check cache
+        # The CLOB market lookup only takes condition IDs; token ids and
+        # slugs are resolved through the snapshot (loaded if needed)
+        resolution = _resolve_market(token_id, load=True)
+        if resolution is not None:
+            token_id = resolution.condition_id
+        elif identifier_kind(token_id) != CONDITION_ID:
+            return func.HttpResponse(
+                json.dumps({
+                    "error": "Market not found",
+                    "token_id": token_id
+                }),
+                mimetype="application/json",
+                status_code=404
+            )
+
+        # Check cache (polled markets stay fresh for their poll interval, up to a minute)
+        poller = get_price_poller()
+        cache_ttl = PRICE_CACHE_TTL
+        poll_interval = poller.cache_ttl(token_id)
+        if poll_interval is not None:
+            cache_ttl = max(cache_ttl, timedelta(seconds=poll_interval))
         cache_valid = (
             token_id in _price_cache and
             token_id in _price_cache_time and
-            datetime.utcnow() - _price_cache_time[token_id] < PRICE_CACHE_TTL and
+            datetime.utcnow() - _price_cache_time[token_id] < cache_ttl and
             not force_refresh
         )
 
@@ -278,17 +652,17 @@ def get_price(req: func.HttpRequest) -> func.HttpResponse:
             response = _price_cache[token_id].copy()
             response['cached'] = True
             return func.HttpResponse(
-                json.dumps(response),
+                json.dumps(project(response, fields, "price")),
                 mimetype="application/json",
                 status_code=200
             )
 
-        # Fetch fresh price from Polymarket
+        # Fetch fresh price from Polymarket (counts against the poller's CLOB budget)
         logger.info(f"Fetching fresh price for {token_id}")
-        client = get_polymarket_client()
-        price_data = client.get_market_price(token_id)
+        poller.record_request()
+        response = _ingest_price(token_id)
 
-        if not price_data:
+        if response is None:
             return func.HttpResponse(
                 json.dumps({
                     "error": "Market not found",
@@ -298,28 +672,10 @@ def get_price(req: func.HttpRequest) -> func.HttpResponse:
                 status_code=404
             )
 
-        # Store in price_history table
-        _store_price_history(price_data)
-
-        # Get 24h price history from database
-        history = _get_price_history_24h(token_id)
-
-        # Prepare response
-        response = {
-            "token_id": token_id,
-            "current_price": price_data['price'],
-            "volume": price_data['volume'],
-            "price_history_24h": history,
-            "cached": False,
-            "timestamp": datetime.utcnow().isoformat()
-        }
-
-        # Update cache
-        _price_cache[token_id] = response.copy()
-        _price_cache_time[token_id] = datetime.utcnow()
+        poller.observe(token_id, response['current_price'])
 
         return func.HttpResponse(
-            json.dumps(response),
+            json.dumps(project(response, fields, "price")),
             mimetype="application/json",
             status_code=200
         )
@@ -334,7 +690,7 @@ def get_price(req: func.HttpRequest) -> func.HttpResponse:
             response['cached'] = True
             response['error'] = "Fresh data unavailable, returning cached data"
             return func.HttpResponse(
-                json.dumps(response),
+                json.dumps(project(response, fields, "price")),
                 mimetype="application/json",
                 status_code=200
             )
@@ -361,8 +717,16 @@ def sentiment_analysis(req: func.HttpRequest) -> func.HttpResponse:
     """
     Multi-source sentiment analysis endpoint
 
-    POST /api/sentiment
-    Body: {"market_id": "string", "market_title": "string", "market_description": "string"}
+    POST /api/sentiment?fields=consensus_sentiment,consensus_confidence
+    Body: {
+        "market_id": "string",
+        "market_title": "string",
+        "market_description": "string",
+        "volume": float (optional, USD; low-volume markets may be scored locally)
+    }
+
+    fields (optional) limits the response to those keys; market_id and
+    status are always included.
 
     Returns:
     {
@@ -379,18 +743,20 @@ def sentiment_analysis(req: func.HttpRequest) -> func.HttpResponse:
             }
         ],
         "news_context": "string",
-        "status": "success/partial/failed_all_sources",
+        "status": "success/partial/local_only/failed_all_sources",
         "timestamp": "ISO8601"
     }
     """
     logger.info("Sentiment analysis endpoint called")
 
     try:
+        fields = parse_fields(req.params.get("fields"), "sentiment")
+
         # Parse request body
         req_body = req.get_json()
 
         # Validate required fields
-        market_id = req_body.get("market_id")
+        market_id = _canonical_market_id(req_body.get("market_id"))
         market_title = req_body.get("market_title")
         market_description = req_body.get("market_description")
 
@@ -406,31 +772,11 @@ def sentiment_analysis(req: func.HttpRequest) -> func.HttpResponse:
 
         logger.info(f"Analyzing sentiment for market: {market_id}")
 
-        # Get sentiment analyzer (lazy-loaded)
-        sentiment_analyzer = get_sentiment_analyzer()
-
-        # Perform multi-source sentiment analysis
-        result = sentiment_analyzer.analyze_multi_source(
-            market_title=market_title,
-            market_description=market_description
-        )
-
-        # Add market_id and timestamp
-        result["market_id"] = market_id
-        result["timestamp"] = datetime.utcnow().isoformat()
-
-        # Store in database
-        try:
-            db_client = get_db_client()
-            db_client.store_sentiment(market_id, result)
-            logger.info(f"Sentiment stored in database for market {market_id}")
-        except Exception as e:
-            logger.warning(f"Failed to store sentiment in database: {e}")
-            # Don't fail the request if DB storage fails
+        result = _run_sentiment_analysis(market_id, market_title, market_description, req_body.get("volume"))
 
         # Return result
         return func.HttpResponse(
-            json.dumps(result, indent=2),
+            json.dumps(project(result, fields, "sentiment"), indent=2),
             status_code=200,
             mimetype="application/json"
         )
@@ -454,158 +800,1011 @@ def sentiment_analysis(req: func.HttpRequest) -> func.HttpResponse:
         )
 
 
-# =============================================================================
-# ANALYZE ENDPOINT (Agent 4 - Backend AI)
-# =============================================================================
-
-@app.route(route="analyze", methods=["POST"], auth_level=func.AuthLevel.ANONYMOUS)
-def market_analysis(req: func.HttpRequest) -> func.HttpResponse:
+def _open_sentiment_stream(req_body: Dict) -> Tuple[int, Union[Dict, Iterator[str]]]:
     """
-    Comprehensive market analysis endpoint
+    Validate a sentiment stream request and start its event stream.
 
-    POST /api/analyze
-    Body: {
-        "market_id": "string",
-        "market_data": {
-            "title": "string",
-            "description": "string",
-            "current_price": float,
-            "volume_24h": float,
-            "price_history": [...],
-            "etc": "..."
-        },
-        "sentiment_score": float (optional)
-    }
+    Events:
+        progress {"stage": provider} before each provider is called
+        news {"news_context"} after the Perplexity news search
+        source {...} each source's result as it lands
+        source_failed {"source", "error"}
+        result {...} the consensus, same shape as POST /api/sentiment (last)
+        error {"error"} if the stream fails
 
     Returns:
-    {
-        "market_id": "string",
-        "price_trend": "string",
-        "volume_analysis": "string",
-        "key_insights": ["string"],
-        "recommendation": "BUY/SELL/HOLD/WATCH",
-        "risk_level": "LOW/MEDIUM/HIGH",
-        "confidence": float (0 to 1),
-        "sentiment_score": float (if provided),
-        "timestamp": "ISO8601"
-    }
+        (200, SSE string iterator) or (status code, error body)
     """
-    logger.info("Market analysis endpoint called")
+    market_id = _canonical_market_id(req_body.get("market_id"))
+    market_title = req_body.get("market_title")
+    market_description = req_body.get("market_description")
+
+    if not market_id or not market_title or not market_description:
+        return 400, {
+            "error": "Missing required fields",
+            "required": ["market_id", "market_title", "market_description"]
+        }
 
     try:
-        # Parse request body
-        req_body = req.get_json()
+        analyzer = get_sentiment_analyzer()
+    except Exception as e:
+        logger.error(f"Sentiment stream setup failed: {e}", exc_info=True)
+        return 500, {"error": "Internal server error", "message": str(e)}
 
-        # Validate required fields
-        market_id = req_body.get("market_id")
-        market_data = req_body.get("market_data")
+    def events() -> Iterator[str]:
+        try:
+            for event, data in analyzer.iter_multi_source(market_title, market_description, req_body.get("volume")):
+                if event == "consensus":
+                    event, data = "result", _finalize_sentiment(market_id, data)
+                yield sse_event(event, data)
+        except Exception as e:
+            logger.error(f"Sentiment stream failed for {market_id}: {e}", exc_info=True)
+            yield sse_event("error", {"error": str(e)})
 
-        if not market_id or not market_data:
-            return func.HttpResponse(
-                json.dumps({
-                    "error": "Missing required fields",
-                    "required": ["market_id", "market_data"]
-                }),
-                status_code=400,
-                mimetype="application/json"
-            )
+    logger.info(f"Streaming sentiment for market: {market_id}")
+    return 200, events()
 
-        sentiment_score = req_body.get("sentiment_score")
 
-        logger.info(f"Analyzing market: {market_id}")
+if HTTP_STREAMS_ENABLED:
+    @app.function_name(name="sentiment_stream")
+    @app.route(route="sentiment/stream", methods=["POST"], auth_level=func.AuthLevel.ANONYMOUS)
+    async def sentiment_stream(req: StreamRequest) -> StreamingResponse:
+        """
+        Multi-source sentiment as Server-Sent Events
 
-        # Get Azure OpenAI client (lazy-loaded)
-        azure_openai = get_azure_openai()
+        POST /api/sentiment/stream
+        Body: same as POST /api/sentiment
 
-        # Perform comprehensive analysis using GPT-5-Pro
-        analysis = azure_openai.analyze_market(
-            market_id=market_id,
-            market_data=market_data,
-            sentiment_score=sentiment_score
-        )
+        Each source's result is sent as it lands, then the consensus.
+        """
+        try:
+            req_body = await req.json()
+        except ValueError as e:
+            return _stream_error_response(400, {"error": f"Invalid request: {str(e)}"})
+        return _streaming_response(*_open_sentiment_stream(req_body))
+else:
+    @app.function_name(name="sentiment_stream")
+    @app.route(route="sentiment/stream", methods=["POST"], auth_level=func.AuthLevel.ANONYMOUS)
+    def sentiment_stream(req: func.HttpRequest) -> func.HttpResponse:
+        """
+        Multi-source sentiment as Server-Sent Events (buffered)
+
+        POST /api/sentiment/stream
+        Body: same as POST /api/sentiment
+
+        Without HTTP streams every event is returned at once when the
+        cascade finishes.
+        """
+        try:
+            req_body = req.get_json()
+        except ValueError as e:
+            return _buffered_sse_response(400, {"error": f"Invalid request: {str(e)}"})
+        return _buffered_sse_response(*_open_sentiment_stream(req_body))
 
-        # Add market_id, sentiment, and timestamp
-        analysis["market_id"] = market_id
-        if sentiment_score is not None:
-            analysis["sentiment_score"] = sentiment_score
 
-        analysis["timestamp"] = datetime.utcnow().isoformat()
+def _open_sentiment_batch(
+    req_body: Dict,
+    fields: Optional[Tuple[str, ...]]
+) -> Tuple[int, Union[Dict, Iterator[str]]]:
+    """
+    Validate a batch sentiment request and start its NDJSON lines.
 
-        # Store in database
-        try:
-            db_client = get_db_client()
-            db_client.store_analysis(market_id, analysis)
-            logger.info(f"Analysis stored in database for market {market_id}")
-        except Exception as e:
-            logger.warning(f"Failed to store analysis in database: {e}")
-            # Don't fail the request if DB storage fails
+    Returns:
+        (200, NDJSON line iterator) or (status code, error body)
+    """
+    markets = req_body.get("markets")
 
-        # Return result
-        return func.HttpResponse(
-            json.dumps(analysis, indent=2),
-            status_code=200,
-            mimetype="application/json"
-        )
+    if not isinstance(markets, list) or not markets:
+        return 400, {
+            "error": "Missing required fields",
+            "required": ["markets"]
+        }
 
-    except ValueError as e:
-        logger.error(f"Invalid request: {e}")
-        return func.HttpResponse(
-            json.dumps({"error": f"Invalid request: {str(e)}"}),
-            status_code=400,
-            mimetype="application/json"
+    if len(markets) > MAX_BATCH_SIZE:
+        return 400, {"error": f"Too many markets (max {MAX_BATCH_SIZE})"}
+
+    required = ("market_id", "market_title", "market_description")
+    invalid = [
+        idx for idx, market in enumerate(markets)
+        if not isinstance(market, dict) or not all(market.get(field) for field in required)
+    ]
+    if invalid:
+        return 400, {
+            "error": "Missing required fields",
+            "required": list(required),
+            "invalid_indexes": invalid[:50]
+        }
+
+    markets = [{**market, "market_id": _canonical_market_id(market["market_id"])} for market in markets]
+    try:
+        runner = BatchSentimentRunner(
+            get_sentiment_analyzer(),
+            persist=_store_sentiments_bulk
         )
     except Exception as e:
-        logger.error(f"Market analysis failed: {e}", exc_info=True)
-        return func.HttpResponse(
-            json.dumps({
-                "error": "Internal server error",
-                "message": str(e)
-            }),
-            status_code=500,
-            mimetype="application/json"
-        )
+        logger.error(f"Batch sentiment setup failed: {e}", exc_info=True)
+        return 500, {"error": "Internal server error", "message": str(e)}
 
+    def lines() -> Iterator[str]:
+        try:
+            for item in runner.run(markets):
+                yield json.dumps(item if "summary" in item else project(item, fields, "sentiment")) + "\n"
+        except Exception as e:
+            logger.error(f"Batch sentiment analysis failed: {e}", exc_info=True)
+            yield json.dumps({"error": str(e)}) + "\n"
 
-# =============================================================================
-# HELPER FUNCTIONS (Agent 3 - Backend Core)
-# =============================================================================
+    logger.info(f"Batch sentiment for {len(markets)} markets")
+    return 200, lines()
 
-def _upsert_markets(markets: List[Dict]):
-    """
-    Upsert markets into database.
 
-    Args:
-        markets: List of market dictionaries
-    """
-    conn = None
-    try:
+if HTTP_STREAMS_ENABLED:
+    @app.function_name(name="sentiment_batch")
+    @app.route(route="sentiment/batch", methods=["POST"], auth_level=func.AuthLevel.ANONYMOUS)
+    async def sentiment_batch(req: StreamRequest) -> StreamingResponse:
+        """
+        Batch multi-source sentiment analysis
+
+        POST /api/sentiment/batch
+        Body: {
+            "markets": [
+                {"market_id": "string", "market_title": "string", "market_description": "string",
+                 "volume": float (optional)}
+            ]
+        }
+
+        Markets with identical title/description are analyzed once. Analyses
+        run on a worker pool bounded by per-provider concurrency limits, and
+        results are stored in bulk as they complete.
+
+        Returns NDJSON (application/x-ndjson), one line per market sent as
+        it completes, with the same fields as POST /api/sentiment plus
+        "deduplicated", followed by a final {"summary": {...}} line (or
+        {"error": ...} if the batch fails partway). ?fields= limits the
+        market lines as on POST /api/sentiment.
+        """
+        try:
+            fields = parse_fields(req.query_params.get("fields"), "sentiment")
+            req_body = await req.json()
+        except ValueError as e:
+            return _stream_error_response(400, {"error": f"Invalid request: {str(e)}"})
+        return _streaming_response(*_open_sentiment_batch(req_body, fields), media_type="application/x-ndjson")
+else:
+    @app.function_name(name="sentiment_batch")
+    @app.route(route="sentiment/batch", methods=["POST"], auth_level=func.AuthLevel.ANONYMOUS)
+    def sentiment_batch(req: func.HttpRequest) -> func.HttpResponse:
+        """
+        Batch multi-source sentiment analysis (buffered)
+
+        POST /api/sentiment/batch
+        Body and response: as above
+
+        Without HTTP streams every line is returned at once when the whole
+        batch finishes.
+        """
+        try:
+            fields = parse_fields(req.params.get("fields"), "sentiment")
+            req_body = req.get_json()
+        except ValueError as e:
+            logger.error(f"Invalid request: {e}")
+            return func.HttpResponse(
+                json.dumps({"error": f"Invalid request: {str(e)}"}),
+                status_code=400,
+                mimetype="application/json"
+            )
+
+        status_code, body = _open_sentiment_batch(req_body, fields)
+        if status_code != 200:
+            return func.HttpResponse(json.dumps(body), status_code=status_code, mimetype="application/json")
+        return func.HttpResponse("".join(body), status_code=200, mimetype="application/x-ndjson")
+
+
+@app.route(route="sentiment/{market_id}", methods=["GET"], auth_level=func.AuthLevel.ANONYMOUS)
+def get_stored_sentiment(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Read-through sentiment lookup served from the database
+
+    GET /api/sentiment/{market_id}?max_age=1800&wait=false
+
+    Query parameters:
+        - max_age: Max age in seconds of a stored result to count as fresh
+          (default: 1800)
+        - wait: If the stored result is stale or missing, run the analysis
+          and return the fresh result (default: false)
+        - market_title, market_description: Used for the refresh when the
+          market is not in the markets table
+        - fields: Comma-separated response fields (as POST /api/sentiment)
+
+    Without wait, a stale result is returned immediately with "stale": true
+    and a background refresh is started; if nothing is stored yet the
+    response is 202 with "status": "pending". If the database can't be
+    read the response is 503 and nothing is refreshed.
+
+    Returns:
+    {
+        "market_id": "string",
+        "consensus_sentiment": float,
+        "consensus_confidence": float,
+        "sources": [...],
+        "source_scores": {"source": float},
+        "news_context": "string",
+        "status": "success/partial/local_only/failed_all_sources",
+        "timestamp": "ISO8601",
+        "age_seconds": float,
+        "stale": bool,
+        "refreshing": bool
+    }
+    """
+    market_id = _canonical_market_id(req.route_params.get("market_id"))
+
+    try:
+        max_age = timedelta(seconds=int(req.params["max_age"])) if "max_age" in req.params else SENTIMENT_MAX_AGE
+        if max_age.total_seconds() < 0:
+            raise ValueError("max_age must be >= 0")
+        wait = req.params.get("wait", "false").lower() == "true"
+        fields = parse_fields(req.params.get("fields"), "sentiment")
+
+        # A failed read is not "never analyzed": refreshing on it would start
+        # a cascade per request whose result can't be stored
+        if not _database_available:
+            return _sentiment_json_response({"error": "Database unavailable"}, status_code=503)
+        try:
+            stored = get_db_client().get_sentiment(market_id)
+        except Exception as e:
+            return _sentiment_json_response(
+                {"error": "Database unavailable", "message": str(e)},
+                status_code=503
+            )
+        age = datetime.utcnow() - stored["created_at"] if stored else None
+
+        if stored and age <= max_age:
+            return _sentiment_json_response(_format_stored_sentiment(stored, age, stale=False, refreshing=False), fields=fields)
+
+        # Stale or missing: find what to analyze
+        title = req.params.get("market_title")
+        description = req.params.get("market_description")
+        volume = None
+        if not title:
+            market_text = _lookup_market_text(market_id)
+            if market_text:
+                title = market_text["question"]
+                description = description or market_text["description"]
+                # Lets the local gate answer for illiquid markets
+                volume = market_text.get("volume")
+
+        if not title:
+            if stored:
+                return _sentiment_json_response(_format_stored_sentiment(stored, age, stale=True, refreshing=False), fields=fields)
+            return _sentiment_json_response(
+                {
+                    "error": "Unknown market",
+                    "message": "No stored sentiment; pass market_title/market_description or POST /api/sentiment",
+                    "market_id": market_id
+                },
+                status_code=404
+            )
+
+        future = _refresh_sentiment_async(market_id, title, description or "", volume)
+
+        if wait:
+            try:
+                result = future.result(timeout=SENTIMENT_WAIT_TIMEOUT)
+                return _sentiment_json_response({**result, "age_seconds": 0.0, "stale": False, "refreshing": False}, fields=fields)
+            except TimeoutError:
+                logger.warning(f"Sentiment refresh for {market_id} still running after {SENTIMENT_WAIT_TIMEOUT}s")
+
+        refreshing = not future.done()
+        if stored:
+            return _sentiment_json_response(
+                _format_stored_sentiment(stored, age, stale=True, refreshing=refreshing), fields=fields
+            )
+
+        return _sentiment_json_response(
+            {"market_id": market_id, "status": "pending", "refreshing": refreshing},
+            status_code=202
+        )
+
+    except ValueError as e:
+        return _sentiment_json_response({"error": f"Invalid request: {str(e)}"}, status_code=400)
+    except Exception as e:
+        logger.error(f"Stored sentiment lookup failed: {e}", exc_info=True)
+        return _sentiment_json_response(
+            {"error": "Internal server error", "message": str(e)},
+            status_code=500
+        )
+
+
+@app.route(route="sentiment/{market_id}/history", methods=["GET"], auth_level=func.AuthLevel.ANONYMOUS)
+def sentiment_history(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Sentiment trend for a market, served from the hourly/daily rollups
+
+    GET /api/sentiment/{market_id}/history?bucket=hour&days=7
+
+    Query parameters:
+        - bucket: "hour" or "day" (default: hour)
+        - days: How far back to go (default: 7, max: 365)
+
+    Returns:
+    {
+        "market_id": "string",
+        "bucket": "hour/day",
+        "points": [
+            {
+                "bucket_start": "ISO8601",
+                "samples": int,
+                "avg_sentiment": float,
+                "avg_confidence": float,
+                "min_sentiment": float,
+                "max_sentiment": float,
+                "last_sentiment": float
+            }
+        ],
+        "count": int,
+        "timestamp": "ISO8601"
+    }
+    """
+    market_id = _canonical_market_id(req.route_params.get("market_id"))
+
+    try:
+        bucket = req.params.get("bucket", "hour").lower()
+        days = int(req.params.get("days", "7"))
+        if bucket not in ("hour", "day") or not 1 <= days <= 365:
+            raise ValueError("bucket must be hour/day and days between 1 and 365")
+
+        db_client = get_db_client()
+        points = db_client.get_sentiment_history(
+            market_id,
+            bucket=bucket,
+            since=datetime.utcnow() - timedelta(days=days)
+        )
+
+        return func.HttpResponse(
+            json.dumps({
+                "market_id": market_id,
+                "bucket": bucket,
+                "points": points,
+                "count": len(points),
+                "timestamp": datetime.utcnow().isoformat()
+            }),
+            status_code=200,
+            mimetype="application/json"
+        )
+
+    except ValueError as e:
+        return func.HttpResponse(
+            json.dumps({"error": f"Invalid request: {str(e)}"}),
+            status_code=400,
+            mimetype="application/json"
+        )
+    except Exception as e:
+        logger.error(f"Sentiment history failed: {e}", exc_info=True)
+        return func.HttpResponse(
+            json.dumps({
+                "error": "Internal server error",
+                "message": str(e)
+            }),
+            status_code=500,
+            mimetype="application/json"
+        )
+
+
+@app.route(route="anomalies", methods=["GET"], auth_level=func.AuthLevel.ANONYMOUS)
+def anomalies(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Price, volume and sentiment anomalies (see shared/anomaly_detector.py),
+    newest first
+
+    GET /api/anomalies?market_id=0x...&metric=volume&hours=24&limit=100
+
+    Query parameters:
+        - market_id: Only this market (condition id, token id or slug)
+        - metric: "price", "volume" or "sentiment"
+        - hours: How far back to go (default: 24, max: 720)
+        - limit: Maximum anomalies (default: 100, max: 1000)
+
+    Returns:
+    {
+        "anomalies": [
+            {
+                "market_id": "string",
+                "metric": "price/volume/sentiment",
+                "kind": "spike/shift_up/shift_down",
+                "value": float,
+                "z_score": float,
+                "mean": float,
+                "std": float,
+                "detected_at": "ISO8601"
+            }
+        ],
+        "count": int,
+        "source": "database/memory",
+        "detector": {"markets": int, "pending_writes": int, "counters": {...}},
+        "timestamp": "ISO8601"
+    }
+    """
+    try:
+        market_id = req.params.get("market_id")
+        if market_id:
+            market_id = _canonical_market_id(market_id)
+        metric = req.params.get("metric")
+        if metric is not None and metric not in ANOMALY_METRICS:
+            raise ValueError(f"metric must be one of {', '.join(ANOMALY_METRICS)}")
+        hours = int(req.params.get("hours", "24"))
+        limit = int(req.params.get("limit", "100"))
+        if not 1 <= hours <= 720 or not 1 <= limit <= 1000:
+            raise ValueError("hours must be between 1 and 720 and limit between 1 and 1000")
+    except ValueError as e:
+        return func.HttpResponse(
+            json.dumps({"error": f"Invalid query: {str(e)}"}),
+            status_code=400,
+            mimetype="application/json"
+        )
+
+    try:
+        detector = get_anomaly_detector()
+        since = datetime.utcnow() - timedelta(hours=hours)
+
+        # The table has every instance's anomalies; memory only this one's
+        found = None
+        if _database_available:
+            detector.flush()
+            found = get_db_client().get_anomalies(since, market_id, metric, limit)
+        source = "database"
+        if found is None:
+            found = detector.recent(market_id, metric, since, limit)
+            source = "memory"
+
+        return func.HttpResponse(
+            json.dumps({
+                "anomalies": found,
+                "count": len(found),
+                "source": source,
+                "detector": detector.status(),
+                "timestamp": datetime.utcnow().isoformat()
+            }),
+            status_code=200,
+            mimetype="application/json"
+        )
+
+    except Exception as e:
+        logger.error(f"Anomalies lookup failed: {e}", exc_info=True)
+        return func.HttpResponse(
+            json.dumps({
+                "error": "Internal server error",
+                "message": str(e)
+            }),
+            status_code=500,
+            mimetype="application/json"
+        )
+
+
+# =============================================================================
+# BACKGROUND SENTIMENT REFRESH (Agent 4 - Backend AI)
+# =============================================================================
+
+@app.function_name(name="sentiment_refresh")
+@app.timer_trigger(schedule="0 */10 * * * *", arg_name="timer", run_on_startup=False)
+def sentiment_refresh(timer: func.TimerRequest) -> None:
+    """
+    Refresh stored sentiment for the highest-priority markets every 10 minutes,
+    within SENTIMENT_REFRESH_HOURLY_BUDGET LLM calls per hour and
+    SENTIMENT_REFRESH_RUN_SECONDS per run.
+    """
+    if timer.past_due:
+        logger.warning("Sentiment refresh timer is past due")
+
+    if not _database_available:
+        logger.warning("Skipping sentiment refresh: database unavailable")
+        return
+
+    scheduler = get_refresh_scheduler(get_sentiment_analyzer(), get_db_client())
+    scheduler.run_once(time_budget=SENTIMENT_REFRESH_RUN_SECONDS)
+
+
+@app.route(route="ops/sentiment-refresh", methods=["GET"], auth_level=func.AuthLevel.FUNCTION)
+def sentiment_refresh_status(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Sentiment refresh scheduler state (function key required)
+
+    GET /api/ops/sentiment-refresh
+
+    Returns:
+    {
+        "running": bool,
+        "budget": {"hourly_limit": int, "used_last_hour": int, "remaining": int},
+        "queue": [
+            {
+                "market_id": "string",
+                "question": "string",
+                "priority": {"score": float, "volume": float, "movement": float,
+                             "urgency": float, "staleness": float}
+            }
+        ],
+        "last_run": {...} or null,
+        "timestamp": "ISO8601"
+    }
+    """
+    try:
+        scheduler = get_refresh_scheduler(get_sentiment_analyzer(), get_db_client())
+        status = scheduler.status()
+        status["queue"] = [
+            {key: value for key, value in entry.items() if key != "description"}
+            for entry in status["queue"]
+        ]
+        status["timestamp"] = datetime.utcnow().isoformat()
+
+        return func.HttpResponse(
+            json.dumps(status),
+            status_code=200,
+            mimetype="application/json"
+        )
+    except Exception as e:
+        logger.error(f"Sentiment refresh status failed: {e}", exc_info=True)
+        return func.HttpResponse(
+            json.dumps({
+                "error": "Internal server error",
+                "message": str(e)
+            }),
+            status_code=500,
+            mimetype="application/json"
+        )
+
+
+@app.function_name(name="price_polling")
+@app.timer_trigger(schedule="0 * * * * *", arg_name="timer", run_on_startup=False)
+def price_polling(timer: func.TimerRequest) -> None:
+    """
+    Poll market prices every minute, each market at its own interval (see
+    shared/price_poller.py), within CLOB_POLL_BUDGET_PER_MINUTE requests.
+
+    Refreshes the markets snapshot first when it is older than
+    MARKETS_CACHE_TTL, re-syncs the poller with each new snapshot, and
+    picks up alert changes before polling (each tick is checked against
+    the alerts; triggers are written in batches). Each tick also updates
+    the market's price and volume anomaly statistics.
+    """
+    if timer.past_due:
+        logger.warning("Price polling timer is past due")
+
+    alerts = get_alert_engine()
+    if _database_available:
+        try:
+            alerts.sync()
+        except Exception as e:
+            logger.warning(f"Alert sync failed (evaluating the alerts already loaded): {e}")
+
+    poller = get_price_poller()
+    index = _market_index
+    if index is None or _markets_cache_time is None or datetime.utcnow() - _markets_cache_time >= MARKETS_CACHE_TTL:
+        try:
+            index = _refresh_markets()
+        except Exception as e:
+            logger.warning(f"Price polling could not refresh markets: {e}")
+    if index is None:
+        logger.warning("Skipping price polling: no markets snapshot")
+        return
+
+    if poller.store is not index.store:
+        price_ranges = get_db_client().get_price_ranges() if _database_available else {}
+        poller.sync(index.store, price_ranges)
+
+    try:
+        poller.run_for(PRICE_POLL_RUN_SECONDS, _poll_price)
+    finally:
+        if _database_available:
+            alerts.flush()
+            get_anomaly_detector().flush()
+
+
+@app.route(route="ops/price-polling", methods=["GET"], auth_level=func.AuthLevel.FUNCTION)
+def price_polling_status(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Price poller state (function key required)
+
+    GET /api/ops/price-polling
+
+    Returns:
+    {
+        "running": bool,
+        "active": bool,
+        "markets": int,
+        "budget": {"per_minute": float, "available": float,
+                   "planned_polls_per_minute": float, "stretch": float,
+                   "requests_total": int},
+        "interval_s": {"min": float, "p50": float, "p90": float, "max": float},
+        "queue": [
+            {
+                "market_id": "string",
+                "due_in_s": float,
+                "interval_s": float,
+                "volatility": float,
+                "activity": {"score": float, "movement": float, "urgency": float, "volume": float},
+                "polls": int,
+                "failures": int
+            }
+        ],
+        "last_run": {...} or null,
+        "timestamp": "ISO8601"
+    }
+    """
+    try:
+        status = get_price_poller().status()
+        status["timestamp"] = datetime.utcnow().isoformat()
+
+        return func.HttpResponse(
+            json.dumps(status),
+            status_code=200,
+            mimetype="application/json"
+        )
+    except Exception as e:
+        logger.error(f"Price polling status failed: {e}", exc_info=True)
+        return func.HttpResponse(
+            json.dumps({
+                "error": "Internal server error",
+                "message": str(e)
+            }),
+            status_code=500,
+            mimetype="application/json"
+        )
+
+
+@app.route(route="ops/alerts", methods=["GET"], auth_level=func.AuthLevel.FUNCTION)
+def alert_engine_status(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Alert engine state (function key required)
+
+    GET /api/ops/alerts
+
+    Returns:
+    {
+        "loaded": bool,
+        "index": {"alerts": int, "markets": {"price": int, ...}, "unsupported": int},
+        "pending_writes": int,
+        "counters": {"triggered": int, "written": int, "flush_failures": int,
+                     "changes_applied": int},
+        "synced_to": "ISO8601" or null,
+        "last_sync": {...} or null,
+        "recent_triggers": [
+            {"market_id": "string", "channel": "price", "value": float,
+             "alert_ids": [int], "count": int, "at": "ISO8601"}
+        ],
+        "timestamp": "ISO8601"
+    }
+    """
+    try:
+        status = get_alert_engine().status()
+        status["timestamp"] = datetime.utcnow().isoformat()
+
+        return func.HttpResponse(
+            json.dumps(status),
+            status_code=200,
+            mimetype="application/json"
+        )
+    except Exception as e:
+        logger.error(f"Alert engine status failed: {e}", exc_info=True)
+        return func.HttpResponse(
+            json.dumps({
+                "error": "Internal server error",
+                "message": str(e)
+            }),
+            status_code=500,
+            mimetype="application/json"
+        )
+
+
+# =============================================================================
+# ANALYZE ENDPOINT (Agent 4 - Backend AI)
+# =============================================================================
+
+@app.route(route="analyze", methods=["POST"], auth_level=func.AuthLevel.ANONYMOUS)
+def market_analysis(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Comprehensive market analysis endpoint
+
+    POST /api/analyze
+    POST /api/analyze?async=true
+    POST /api/analyze?fields=recommendation,confidence
+    Body: {
+        "market_id": "string",
+        "market_data": {
+            "title": "string",
+            "description": "string",
+            "current_price": float,
+            "volume_24h": float,
+            "price_history": [...],
+            "etc": "..."
+        },
+        "sentiment_score": float (optional),
+        "async": bool (optional, same as ?async=true)
+    }
+
+    fields (optional) limits the sync response, or a finished job's
+    "result", to those keys; market_id is always included.
+
+    Async mode returns 202 immediately and queues the analysis; poll the
+    Location header (GET /api/analyze/status/{job_id}) for the result.
+    Identical requests already queued or running return the same job:
+    {
+        "job_id": "uuid",
+        "status": "queued|running",
+        "coalesced": bool,
+        "status_url": "/api/analyze/status/{job_id}"
+    }
+
+    Returns (sync mode):
+    {
+        "market_id": "string",
+        "price_trend": "string",
+        "volume_analysis": "string",
+        "key_insights": ["string"],
+        "recommendation": "BUY/SELL/HOLD/WATCH",
+        "risk_level": "LOW/MEDIUM/HIGH",
+        "confidence": float (0 to 1),
+        "sentiment_score": float (if provided),
+        "timestamp": "ISO8601"
+    }
+    """
+    logger.info("Market analysis endpoint called")
+
+    try:
+        fields = parse_fields(req.params.get("fields"), "analysis")
+
+        # Parse request body
+        req_body = req.get_json()
+
+        # Validate required fields
+        market_id = _canonical_market_id(req_body.get("market_id"))
+        market_data = req_body.get("market_data")
+
+        if not market_id or not market_data:
+            return func.HttpResponse(
+                json.dumps({
+                    "error": "Missing required fields",
+                    "required": ["market_id", "market_data"]
+                }),
+                status_code=400,
+                mimetype="application/json"
+            )
+
+        sentiment_score = req_body.get("sentiment_score")
+
+        async_mode = req.params.get("async", "").lower() == "true" or req_body.get("async") is True
+        if async_mode:
+            return _enqueue_analysis(market_id, market_data, sentiment_score)
+
+        logger.info(f"Analyzing market: {market_id}")
+
+        analysis = _run_market_analysis(market_id, market_data, sentiment_score)
+
+        # Return result
+        return func.HttpResponse(
+            json.dumps(project(analysis, fields, "analysis"), indent=2),
+            status_code=200,
+            mimetype="application/json"
+        )
+
+    except ValueError as e:
+        logger.error(f"Invalid request: {e}")
+        return func.HttpResponse(
+            json.dumps({"error": f"Invalid request: {str(e)}"}),
+            status_code=400,
+            mimetype="application/json"
+        )
+    except Exception as e:
+        logger.error(f"Market analysis failed: {e}", exc_info=True)
+        return func.HttpResponse(
+            json.dumps({
+                "error": "Internal server error",
+                "message": str(e)
+            }),
+            status_code=500,
+            mimetype="application/json"
+        )
+
+
+def _open_analysis_stream(req_body: Dict) -> Tuple[int, Union[Dict, Iterator[str]]]:
+    """
+    Validate an analysis stream request and start its event stream.
+
+    Events:
+        progress {"stage": "started"|"generating"|"fallback", "provider", ...}
+        field {"name", "value"} each analysis field as the model completes it
+        result {...} the analysis, same shape as POST /api/analyze (last)
+        error {"error", "provider"} if generation fails
+
+    Returns:
+        (200, SSE string iterator) or (status code, error body)
+    """
+    market_id = _canonical_market_id(req_body.get("market_id"))
+    market_data = req_body.get("market_data")
+
+    if not market_id or not market_data:
+        return 400, {
+            "error": "Missing required fields",
+            "required": ["market_id", "market_data"]
+        }
+
+    sentiment_score = req_body.get("sentiment_score")
+
+    try:
+        azure_openai = get_azure_openai()
+        gemini = get_sentiment_analyzer().gemini
+    except Exception as e:
+        logger.error(f"Analysis stream setup failed: {e}", exc_info=True)
+        return 500, {"error": "Internal server error", "message": str(e)}
+
+    def events() -> Iterator[str]:
+        for event, data in analysis_events(azure_openai, gemini, market_id, market_data, sentiment_score):
+            if event == "analysis":
+                event, data = "result", _finalize_analysis(market_id, data, sentiment_score)
+            yield sse_event(event, data)
+
+    logger.info(f"Streaming analysis for market: {market_id}")
+    return 200, events()
+
+
+if HTTP_STREAMS_ENABLED:
+    @app.function_name(name="analyze_stream")
+    @app.route(route="analyze/stream", methods=["POST"], auth_level=func.AuthLevel.ANONYMOUS)
+    async def market_analysis_stream(req: StreamRequest) -> StreamingResponse:
+        """
+        Market analysis as Server-Sent Events
+
+        POST /api/analyze/stream
+        Body: same as POST /api/analyze
+
+        Fields are sent as the model completes them, then the full result.
+        """
+        try:
+            req_body = await req.json()
+        except ValueError as e:
+            return _stream_error_response(400, {"error": f"Invalid request: {str(e)}"})
+        return _streaming_response(*_open_analysis_stream(req_body))
+else:
+    @app.function_name(name="analyze_stream")
+    @app.route(route="analyze/stream", methods=["POST"], auth_level=func.AuthLevel.ANONYMOUS)
+    def market_analysis_stream(req: func.HttpRequest) -> func.HttpResponse:
+        """
+        Market analysis as Server-Sent Events (buffered)
+
+        POST /api/analyze/stream
+        Body: same as POST /api/analyze
+
+        Without HTTP streams every event is returned at once when the
+        completion finishes.
+        """
+        try:
+            req_body = req.get_json()
+        except ValueError as e:
+            return _buffered_sse_response(400, {"error": f"Invalid request: {str(e)}"})
+        return _buffered_sse_response(*_open_analysis_stream(req_body))
+
+
+@app.route(route="analyze/status/{job_id}", methods=["GET"], auth_level=func.AuthLevel.ANONYMOUS)
+def analysis_job_status(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Status of an asynchronous analysis job
+
+    GET /api/analyze/status/{job_id}?fields=recommendation,confidence
+
+    Returns:
+    {
+        "job_id": "uuid",
+        "market_id": "string",
+        "status": "queued|running|succeeded|failed",
+        "attempts": int,
+        "created_at": "ISO8601",
+        "started_at": "ISO8601|null",
+        "finished_at": "ISO8601|null",
+        "result": {...} (when succeeded, same shape as the sync response),
+        "error": "string" (last failure, if any)
+    }
+
+    Queued and running jobs include a Retry-After header.
+    """
+    job_id = req.route_params.get("job_id")
+
+    try:
+        job_id = str(uuid.UUID(job_id))
+    except (TypeError, ValueError):
+        return func.HttpResponse(
+            json.dumps({"error": "Invalid job_id"}),
+            status_code=400,
+            mimetype="application/json"
+        )
+
+    try:
+        fields = parse_fields(req.params.get("fields"), "analysis")
+    except ValueError as e:
+        return func.HttpResponse(
+            json.dumps({"error": f"Invalid query: {str(e)}"}),
+            status_code=400,
+            mimetype="application/json"
+        )
+
+    try:
+        job = get_analysis_job_queue().get(job_id)
+        if job is None:
+            return func.HttpResponse(
+                json.dumps({"error": "Job not found", "job_id": job_id}),
+                status_code=404,
+                mimetype="application/json"
+            )
+
+        if job.get("result"):
+            job["result"] = project(job["result"], fields, "analysis")
+
+        headers = {}
+        if job["status"] in ("queued", "running"):
+            headers["Retry-After"] = str(ANALYSIS_JOB_RETRY_AFTER)
+
+        return func.HttpResponse(
+            json.dumps(job, indent=2),
+            status_code=200,
+            mimetype="application/json",
+            headers=headers
+        )
+
+    except Exception as e:
+        logger.error(f"Analysis job status lookup failed: {e}", exc_info=True)
+        return func.HttpResponse(
+            json.dumps({
+                "error": "Internal server error",
+                "message": str(e)
+            }),
+            status_code=500,
+            mimetype="application/json"
+        )
+
+
+@app.function_name(name="analysis_jobs")
+@app.timer_trigger(schedule="0 * * * * *", arg_name="timer", run_on_startup=False)
+def analysis_jobs_timer(timer: func.TimerRequest) -> None:
+    """
+    Drain the analysis job queue every minute.
+
+    In-process workers normally pick jobs up as soon as they are queued;
+    this catches jobs whose instance was recycled and fails jobs whose
+    last lease expired.
+    """
+    if not _database_available:
+        logger.warning("Skipping analysis job drain: database unavailable")
+        return
+
+    ran = get_analysis_worker_pool(_process_analysis_job).drain(ANALYSIS_JOB_DRAIN_SECONDS)
+    if ran:
+        logger.info(f"Analysis job timer ran {ran} jobs")
+
+
+# =============================================================================
+# HELPER FUNCTIONS (Agent 3 - Backend Core)
+# =============================================================================
+
+def _upsert_markets(markets: List[Dict]):
+    """
+    Upsert markets into database.
+
+    Args:
+        markets: List of market dictionaries
+    """
+    conn = None
+    try:
         conn = get_connection()
+        rows = [
+            (
+                market['token_id'],
+                market['question'],
+                market['description'],
+                market['end_date'],
+                json.dumps(market['outcome_prices']),
+                market['volume'],
+                market['active']
+            )
+            for market in markets
+        ]
         with conn.cursor() as cursor:
-            for market in markets:
-                cursor.execute("""
-                    INSERT INTO markets (
-                        token_id, question, description, end_date,
-                        outcome_prices, volume, active, updated_at
-                    )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
-                    ON CONFLICT (token_id)
-                    DO UPDATE SET
-                        question = EXCLUDED.question,
-                        description = EXCLUDED.description,
-                        end_date = EXCLUDED.end_date,
-                        outcome_prices = EXCLUDED.outcome_prices,
-                        volume = EXCLUDED.volume,
-                        active = EXCLUDED.active,
-                        updated_at = NOW()
-                """, (
-                    market['token_id'],
-                    market['question'],
-                    market['description'],
-                    market['end_date'],
-                    json.dumps(market['outcome_prices']),
-                    market['volume'],
-                    market['active']
-                ))
+            # One round trip per 100 markets rather than per market
+            execute_prepared_batch(cursor, "upsert_market", rows)
             conn.commit()
             logger.info(f"Successfully upserted {len(markets)} markets")
     except Exception as e:
@@ -629,10 +1828,7 @@ def _store_price_history(price_data: Dict):
     try:
         conn = get_connection()
         with conn.cursor() as cursor:
-            cursor.execute("""
-                INSERT INTO price_history (token_id, price, volume)
-                VALUES (%s, %s, %s)
-            """, (
+            execute_prepared(cursor, "insert_price_history", (
                 price_data['token_id'],
                 price_data['price'],
                 price_data['volume']
@@ -648,30 +1844,75 @@ def _store_price_history(price_data: Dict):
             return_connection(conn)
 
 
-def _get_price_history_24h(token_id: str) -> List[Dict]:
+def _ingest_price(token_id: str) -> Optional[Dict]:
+    """
+    Fetch a market's price from Polymarket, store it in price_history and
+    update the price cache.
+
+    Args:
+        token_id: Market condition ID
+
+    Returns:
+        The price response cached for GET /api/price, or None if the market
+        is not found
+    """
+    client = get_polymarket_client()
+    price_data = client.get_market_price(token_id)
+    if not price_data:
+        return None
+
+    # Store in price_history table
+    _store_price_history(price_data)
+
+    # Get 24h price history from database (primary: must include the row just written)
+    history = _get_price_history_24h(token_id, consistent=True)
+
+    response = {
+        "token_id": token_id,
+        "current_price": price_data['price'],
+        "volume": price_data['volume'],
+        "price_history_24h": history,
+        "cached": False,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+    # Update cache
+    _price_cache[token_id] = response.copy()
+    _price_cache_time[token_id] = datetime.utcnow()
+
+    # Trigger price_above / price_below alerts this tick crosses
+    get_alert_engine().on_price(token_id, price_data['price'])
+
+    # Price and volume anomalies (feeds volume_spike alerts)
+    get_anomaly_detector().observe_price(token_id, price_data['price'], price_data.get('volume'))
+    return response
+
+
+def _poll_price(token_id: str) -> Optional[float]:
+    """Price poller fetch: ingest one market's price and return it"""
+    response = _ingest_price(token_id)
+    return response['current_price'] if response is not None else None
+
+
+def _get_price_history_24h(token_id: str, consistent: bool = False) -> List[Dict]:
     """
     Get 24h price history for a token.
 
     Args:
         token_id: Market token ID
+        consistent: Read from the primary so writes made earlier in the
+            request are visible (default: replica when configured)
 
     Returns:
         List of price history entries
     """
+    conn = None
     try:
-        conn = get_connection()
+        conn = get_read_connection(consistent)
         with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT price, timestamp
-                FROM price_history
-                WHERE token_id = %s
-                    AND timestamp >= NOW() - INTERVAL '24 hours'
-                ORDER BY timestamp DESC
-                LIMIT 100
-            """, (token_id,))
-
+            execute_prepared(cursor, "select_price_history_24h", (token_id,))
             rows = cursor.fetchall()
-            return_connection(conn)
+            conn.commit()
 
             return [
                 {
@@ -681,8 +1922,307 @@ def _get_price_history_24h(token_id: str) -> List[Dict]:
                 for row in rows
             ]
     except Exception as e:
+        if conn:
+            conn.rollback()
         logger.error(f"Failed to fetch price history: {e}")
         return []
+    finally:
+        if conn:
+            return_connection(conn)
+
+
+# =============================================================================
+# HELPER FUNCTIONS (Agent 4 - Backend AI)
+# =============================================================================
+
+def _run_sentiment_analysis(
+    market_id: str,
+    market_title: str,
+    market_description: str,
+    volume: Optional[float] = None
+) -> Dict:
+    """
+    Run the multi-source cascade for one market and store the result.
+
+    Returns:
+        Sentiment result with market_id and timestamp added
+    """
+    result = get_sentiment_analyzer().analyze_multi_source(
+        market_title=market_title,
+        market_description=market_description,
+        volume=volume
+    )
+
+    return _finalize_sentiment(market_id, result)
+
+
+def _finalize_sentiment(market_id: str, result: Dict) -> Dict:
+    """Add market_id and timestamp to a sentiment result and store it"""
+    _finalize_and_store_sentiment(market_id, result)
+    return result
+
+
+def _finalize_and_store_sentiment(market_id: str, result: Dict) -> bool:
+    """_finalize_sentiment, returning whether the result was stored"""
+    result["market_id"] = market_id
+    result["timestamp"] = datetime.utcnow().isoformat()
+
+    # Store in database
+    stored = False
+    try:
+        db_client = get_db_client()
+        stored = db_client.store_sentiment(market_id, result)
+        if stored:
+            logger.info(f"Sentiment stored in database for market {market_id}")
+    except Exception as e:
+        logger.warning(f"Failed to store sentiment in database: {e}")
+        # Don't fail the request if DB storage fails
+
+    # Sentiment anomalies (feeds sentiment_spike alerts)
+    get_anomaly_detector().observe_sentiment_result(market_id, result)
+    return stored
+
+
+def _store_sentiments_bulk(results: List[Dict]) -> bool:
+    """Batch sentiment persist: store the results and update sentiment anomalies"""
+    stored = get_db_client().store_sentiments_bulk(results)
+    detector = get_anomaly_detector()
+    for result in results:
+        detector.observe_sentiment_result(result["market_id"], result)
+    return stored
+
+
+def _run_sentiment_refresh(
+    market_id: str,
+    market_title: str,
+    market_description: str,
+    volume: Optional[float] = None
+) -> Dict:
+    """
+    _run_sentiment_analysis for a background refresh; a failed run or an
+    unstored result holds the market's next refresh off for
+    SENTIMENT_REFRESH_COOLDOWN.
+    """
+    try:
+        result = get_sentiment_analyzer().analyze_multi_source(
+            market_title=market_title,
+            market_description=market_description,
+            volume=volume
+        )
+        stored = _finalize_and_store_sentiment(market_id, result)
+    except Exception:
+        _hold_sentiment_refresh(market_id)
+        raise
+    if not stored:
+        logger.warning(f"Sentiment refresh for {market_id} was not stored; "
+                       f"next refresh in {SENTIMENT_REFRESH_COOLDOWN}s")
+        _hold_sentiment_refresh(market_id)
+    return result
+
+
+def _hold_sentiment_refresh(market_id: str) -> None:
+    now = time.monotonic()
+    with _sentiment_refresh_lock:
+        for held in [held for held, until in _sentiment_refresh_held.items() if until <= now]:
+            del _sentiment_refresh_held[held]
+            if held != market_id and held in _sentiment_refreshes and _sentiment_refreshes[held].done():
+                del _sentiment_refreshes[held]
+        _sentiment_refresh_held[market_id] = now + SENTIMENT_REFRESH_COOLDOWN
+
+
+def _refresh_sentiment_async(
+    market_id: str,
+    market_title: str,
+    market_description: str,
+    volume: Optional[float] = None
+) -> Future:
+    """
+    Start a background sentiment refresh, or join the one already running.
+
+    Returns:
+        Future resolving to the sentiment result (already done while the
+        market's last refresh is in its cooldown)
+    """
+    with _sentiment_refresh_lock:
+        future = _sentiment_refreshes.get(market_id)
+        if future is not None and not future.done():
+            return future
+        if future is not None and _sentiment_refresh_held.get(market_id, 0.0) > time.monotonic():
+            return future
+
+        _sentiment_refresh_held.pop(market_id, None)
+        logger.info(f"Starting background sentiment refresh for {market_id}")
+        future = _sentiment_refresh_executor.submit(
+            _run_sentiment_refresh, market_id, market_title, market_description, volume
+        )
+        _sentiment_refreshes[market_id] = future
+
+    def _clear(done: Future):
+        with _sentiment_refresh_lock:
+            if _sentiment_refreshes.get(market_id) is done and market_id not in _sentiment_refresh_held:
+                del _sentiment_refreshes[market_id]
+        if done.exception():
+            logger.error(f"Background sentiment refresh for {market_id} failed: {done.exception()}")
+
+    future.add_done_callback(_clear)
+    return future
+
+
+def _lookup_market_text(market_id: str) -> Optional[Dict[str, Any]]:
+    """Find a market's question/description/volume in the markets cache, then the database"""
+    index = _market_index
+    row = index.store.row(market_id) if index is not None else None
+    if row is not None:
+        store = index.store
+        return {
+            "question": store.questions[row],
+            "description": store.descriptions[row] or "",
+            "volume": store.volumes[row]
+        }
+
+    return get_db_client().get_market_text(market_id)
+
+
+def _format_stored_sentiment(stored: Dict, age: timedelta, stale: bool, refreshing: bool) -> Dict:
+    """Shape a sentiment_history row like the POST /api/sentiment response"""
+    return {
+        "market_id": stored["market_id"],
+        "consensus_sentiment": stored["consensus_sentiment"],
+        "consensus_confidence": stored["consensus_confidence"],
+        "sources": stored.get("sources") or [],
+        "source_scores": stored.get("source_scores") or {},
+        "news_context": stored.get("news_context"),
+        "status": stored.get("status"),
+        "timestamp": stored["created_at"].isoformat(),
+        "age_seconds": round(age.total_seconds(), 3),
+        "stale": stale,
+        "refreshing": refreshing
+    }
+
+
+def _buffered_sse_response(status_code: int, body: Union[Dict, Iterator[str]]) -> func.HttpResponse:
+    """Send a stream's events in one text/event-stream body, or a JSON error"""
+    if status_code != 200:
+        return func.HttpResponse(json.dumps(body), status_code=status_code, mimetype="application/json")
+    return func.HttpResponse(
+        "".join(body),
+        status_code=200,
+        mimetype="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+def _streaming_response(
+    status_code: int,
+    body: Union[Dict, Iterator[str]],
+    media_type: str = "text/event-stream"
+):
+    """Stream SSE events (or NDJSON lines) as produced (HTTP streams only), or a JSON error"""
+    if status_code != 200:
+        return _stream_error_response(status_code, body)
+    # A sync iterator is consumed on Starlette's threadpool, so blocking
+    # provider calls don't stall the event loop
+    return StreamingResponse(body, media_type=media_type, headers=SSE_HEADERS)
+
+
+def _stream_error_response(status_code: int, body: Dict):
+    """JSON error for the streaming endpoints (HTTP streams only)"""
+    return StreamingResponse(iter([json.dumps(body)]), status_code=status_code, media_type="application/json")
+
+
+def _sentiment_json_response(
+    body: Dict,
+    status_code: int = 200,
+    fields: Optional[Tuple[str, ...]] = None
+) -> func.HttpResponse:
+    """JSON response for the sentiment read endpoints (fields applies to 200 responses)"""
+    if status_code == 200:
+        body = project(body, fields, "sentiment")
+    return func.HttpResponse(
+        json.dumps(body),
+        status_code=status_code,
+        mimetype="application/json"
+    )
+
+
+def _run_market_analysis(market_id: str, market_data: Dict, sentiment_score: Optional[float]) -> Dict:
+    """
+    Run the GPT market analysis for one market and store the result.
+
+    Returns:
+        Analysis with market_id, sentiment_score (if given) and timestamp added
+    """
+    # Get Azure OpenAI client (lazy-loaded)
+    azure_openai = get_azure_openai()
+
+    # Perform comprehensive analysis using GPT-5-Pro
+    analysis = azure_openai.analyze_market(
+        market_id=market_id,
+        market_data=market_data,
+        sentiment_score=sentiment_score
+    )
+
+    return _finalize_analysis(market_id, analysis, sentiment_score)
+
+
+def _finalize_analysis(market_id: str, analysis: Dict, sentiment_score: Optional[float]) -> Dict:
+    """Add market_id, sentiment_score and timestamp to an analysis and store it"""
+    # Add market_id, sentiment, and timestamp
+    analysis["market_id"] = market_id
+    if sentiment_score is not None:
+        analysis["sentiment_score"] = sentiment_score
+
+    analysis["timestamp"] = datetime.utcnow().isoformat()
+
+    # Store in database
+    try:
+        db_client = get_db_client()
+        db_client.store_analysis(market_id, analysis)
+        logger.info(f"Analysis stored in database for market {market_id}")
+    except Exception as e:
+        logger.warning(f"Failed to store analysis in database: {e}")
+        # Don't fail the request if DB storage fails
+
+    return analysis
+
+
+def _process_analysis_job(payload: Dict) -> Dict:
+    """Analysis job handler: payload is the original request body"""
+    return _run_market_analysis(
+        payload["market_id"],
+        payload["market_data"],
+        payload.get("sentiment_score")
+    )
+
+
+def _enqueue_analysis(market_id: str, market_data: Dict, sentiment_score: Optional[float]) -> func.HttpResponse:
+    """Queue an analysis job and answer 202 with its status link"""
+    try:
+        job, coalesced = get_analysis_job_queue().enqueue(market_id, market_data, sentiment_score)
+    except Exception as e:
+        logger.error(f"Failed to enqueue analysis for {market_id}: {e}")
+        return func.HttpResponse(
+            json.dumps({"error": "Analysis queue unavailable", "message": str(e)}),
+            status_code=503,
+            mimetype="application/json"
+        )
+
+    pool = get_analysis_worker_pool(_process_analysis_job)
+    pool.start()
+    pool.notify()
+
+    status_url = f"/api/analyze/status/{job['job_id']}"
+    return func.HttpResponse(
+        json.dumps({
+            **job,
+            "market_id": market_id,
+            "coalesced": coalesced,
+            "status_url": status_url
+        }),
+        status_code=202,
+        mimetype="application/json",
+        headers={"Location": status_url, "Retry-After": str(ANALYSIS_JOB_RETRY_AFTER)}
+    )
 
 
 # =============================================================================
@@ -700,7 +2240,7 @@ def ensure_database_initialized():
     global _database_available
     if not _database_available:
         try:
-            logger.info("Initializing database schema")
+            logger.info("Checking database schema version")
             init_database()
             _database_available = True
             logger.info("✅ Database initialized successfully")
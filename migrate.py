@@ -2,23 +2,29 @@
 """
 Polymarket Sentiment Analyzer - Database Migration Script
 Agent: 02-database
-Purpose: Create PostgreSQL schema with error recovery and connection pooling
+Purpose: Apply versioned migrations from migrations/ with error recovery
+
+Usage:
+    POSTGRES_PASSWORD=... python migrate.py            # apply pending migrations
+    POSTGRES_PASSWORD=... python migrate.py --status   # show applied/pending only
 """
 
 import os
 import sys
 import psycopg2
-from psycopg2 import pool, OperationalError, sql
+from psycopg2 import pool, OperationalError
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 import json
 from datetime import datetime, timezone
 from typing import Optional, Dict, List
 
-# Configuration
+from shared.migrations import MigrationRunner, MigrationError, load_migrations
+
+# Configuration (same defaults as shared/database.py)
 DB_CONFIG = {
     'host': os.getenv('POSTGRES_HOST', 'postgres-seekapatraining-prod.postgres.database.azure.com'),
-    'port': int(os.getenv('POSTGRES_PORT', '6432')),  # PgBouncer port
-    'database': os.getenv('POSTGRES_DB', 'seekapa_training'),
+    'port': int(os.getenv('POSTGRES_PORT', '5432')),
+    'database': os.getenv('POSTGRES_DB', 'polymarket_analyzer'),
     'user': os.getenv('POSTGRES_USER', 'seekapaadmin'),
     'password': os.getenv('POSTGRES_PASSWORD', ''),  # Must be provided via env
 }
@@ -116,64 +122,55 @@ class DatabaseMigrator:
             self.log('ERROR', 'Failed to create connection pool', {'error': str(e)})
             return False
 
-    def execute_sql_file(self, filepath: str) -> bool:
-        """Execute SQL file with error handling"""
-        self.log('INFO', f'Executing SQL file: {filepath}')
-
-        if not os.path.exists(filepath):
-            self.log('ERROR', f'SQL file not found: {filepath}')
-            return False
+    def run_migrations(self) -> bool:
+        """Apply pending migrations, one transaction per migration"""
+        self.log('INFO', 'Running migrations...')
 
         try:
-            with open(filepath, 'r') as f:
-                sql_content = f.read()
-
-            cursor = self.connection.cursor()
-
-            # Split by semicolons but keep multi-line statements together
-            statements = [s.strip() for s in sql_content.split(';') if s.strip()]
-
-            executed = 0
-            failed = 0
-
-            for idx, statement in enumerate(statements, 1):
-                try:
-                    cursor.execute(statement)
-                    executed += 1
+            runner = MigrationRunner(self.connection, log=self.log)
+            results = runner.run()
+
+            for result in results:
+                self.log('SUCCESS', f"Migration {result['version']:03d}_{result['name']} applied", {
+                    'ms': result['ms'],
+                    'transactional': result['transactional'],
+                    'steps': len(result['steps'])
+                })
 
-                    # Log important operations
-                    if 'CREATE TABLE' in statement.upper():
-                        table_name = statement.split('CREATE TABLE')[1].split('(')[0].strip().split()[-1]
-                        self.log('INFO', f'Created table: {table_name}')
-                    elif 'CREATE INDEX' in statement.upper():
-                        index_name = statement.split('CREATE INDEX')[1].split('ON')[0].strip().split()[-1]
-                        self.log('INFO', f'Created index: {index_name}')
+            self.log('SUCCESS', f'Applied {len(results)} migration(s)')
+            return True
 
-                except Exception as e:
-                    failed += 1
-                    self.log('WARNING', f'Statement {idx} failed (may be expected)', {
-                        'statement': statement[:100] + '...' if len(statement) > 100 else statement,
-                        'error': str(e)
-                    })
+        except MigrationError as e:
+            self.log('ERROR', 'Migration failed', {'error': str(e)})
+            return False
 
+    def migration_status(self) -> bool:
+        """Print applied and pending migrations without changing anything"""
+        try:
+            runner = MigrationRunner(self.connection, log=self.log)
+            cursor = self.connection.cursor()
+            cursor.execute("SELECT to_regclass('schema_migrations') IS NOT NULL")
+            has_table = cursor.fetchone()[0]
             cursor.close()
 
-            self.log('SUCCESS', f'Executed {executed} statements ({failed} failed/skipped)')
+            applied = runner.applied() if has_table else {}
+            for migration in load_migrations():
+                state = 'applied' if migration.version in applied else 'pending'
+                if state == 'applied' and applied[migration.version] != migration.checksum:
+                    state = 'CHECKSUM MISMATCH'
+                self.log('INFO', f'{migration.version:03d}_{migration.name}: {state}')
             return True
 
         except Exception as e:
-            self.log('ERROR', 'Failed to execute SQL file', {
-                'filepath': filepath,
-                'error': str(e)
-            })
+            self.log('ERROR', 'Failed to read migration status', {'error': str(e)})
             return False
 
     def verify_schema(self) -> Dict[str, any]:
         """Verify schema was created correctly"""
         self.log('INFO', 'Verifying schema...')
 
-        expected_tables = ['markets', 'sentiment_data', 'price_history',
-                          'alerts', 'phase_checkpoints', 'error_log']
+        expected_tables = ['markets', 'sentiment_data', 'price_history', 'market_analysis',
+                          'alerts', 'phase_checkpoints', 'error_log', 'schema_migrations']
 
         try:
             cursor = self.connection.cursor()
@@ -330,10 +327,13 @@ def main():
             print("  python migrate.py")
             sys.exit(1)
 
-        # Step 2: Execute schema SQL
-        schema_file = os.path.join(os.path.dirname(__file__), 'schema.sql')
-        if not migrator.execute_sql_file(schema_file):
-            print("\n❌ Migration failed: Could not execute schema.sql")
+        if '--status' in sys.argv:
+            migrator.migration_status()
+            return
+
+        # Step 2: Apply pending migrations
+        if not migrator.run_migrations():
+            print("\n❌ Migration failed: see errors above (failed migration was rolled back)")
             sys.exit(1)
 
         # Step 3: Verify schema
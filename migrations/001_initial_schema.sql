@@ -0,0 +1,226 @@
+-- Polymarket Analyzer Database Schema - Baseline
+-- Applied by migrate.py / shared.migrations.MigrationRunner in one transaction.
+-- Matches the tables the Function App reads and writes; databases created by
+-- the startup DDL that shared.database.init_database ran before migrations
+-- existed adopt this migration as a no-op. Databases built from the old root
+-- schema.sql (markets.id, per-source sentiment_data rows) have a different
+-- layout and fail here on the markets.token_id references; recreate or
+-- convert them by hand before migrating.
+
+-- ============================================
+-- Markets Table: Core market data from Polymarket
+-- ============================================
+CREATE TABLE IF NOT EXISTS markets (
+    token_id VARCHAR(100) PRIMARY KEY,
+    question TEXT NOT NULL,
+    description TEXT,
+    end_date TIMESTAMP,
+    outcome_prices JSONB,
+    volume NUMERIC(20, 2),
+    active BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_markets_active ON markets(active);
+
+-- ============================================
+-- Price History Table: Token price tracking
+-- (indexes are built concurrently in 002)
+-- ============================================
+CREATE TABLE IF NOT EXISTS price_history (
+    id SERIAL PRIMARY KEY,
+    token_id VARCHAR(100) NOT NULL,
+    price NUMERIC(10, 6) NOT NULL,
+    volume NUMERIC(20, 2),
+    timestamp TIMESTAMP DEFAULT NOW(),
+    CONSTRAINT fk_token FOREIGN KEY (token_id) REFERENCES markets(token_id)
+);
+
+-- ============================================
+-- Sentiment Data Table: Latest multi-source consensus per market
+-- ============================================
+CREATE TABLE IF NOT EXISTS sentiment_data (
+    market_id VARCHAR(255) PRIMARY KEY,
+    consensus_sentiment NUMERIC(5, 4),
+    consensus_confidence NUMERIC(5, 4),
+    sources JSONB DEFAULT '[]'::jsonb,
+    news_context TEXT,
+    status VARCHAR(50),
+    created_at TIMESTAMP DEFAULT NOW(),
+
+    CONSTRAINT sentiment_score_range CHECK (consensus_sentiment BETWEEN -1.0 AND 1.0)
+);
+
+-- ============================================
+-- Market Analysis Table: Latest GPT analysis per market
+-- ============================================
+CREATE TABLE IF NOT EXISTS market_analysis (
+    market_id VARCHAR(255) PRIMARY KEY,
+    price_trend TEXT,
+    volume_analysis TEXT,
+    key_insights JSONB DEFAULT '[]'::jsonb,
+    recommendation VARCHAR(20),
+    risk_level VARCHAR(20),
+    confidence NUMERIC(5, 4),
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+-- ============================================
+-- Alerts Table: User-configured price/sentiment alerts
+-- ============================================
+CREATE TABLE IF NOT EXISTS alerts (
+    id SERIAL PRIMARY KEY,
+    user_id VARCHAR(255) NOT NULL,
+    market_id VARCHAR(100) NOT NULL REFERENCES markets(token_id) ON DELETE CASCADE,
+    alert_type VARCHAR(50) NOT NULL, -- 'price_above', 'price_below', 'sentiment_spike', 'volume_spike'
+    threshold DECIMAL(10, 4) NOT NULL,
+    triggered BOOLEAN DEFAULT false,
+    triggered_at TIMESTAMP WITH TIME ZONE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    enabled BOOLEAN DEFAULT true,
+    metadata JSONB DEFAULT '{}'::jsonb,
+
+    CONSTRAINT alert_type_check CHECK (alert_type IN ('price_above', 'price_below', 'sentiment_spike', 'volume_spike', 'correlation_alert'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_alerts_user_id ON alerts(user_id);
+CREATE INDEX IF NOT EXISTS idx_alerts_market_id ON alerts(market_id);
+CREATE INDEX IF NOT EXISTS idx_alerts_triggered ON alerts(triggered);
+CREATE INDEX IF NOT EXISTS idx_alerts_enabled ON alerts(enabled);
+CREATE INDEX IF NOT EXISTS idx_alerts_type ON alerts(alert_type);
+
+-- ============================================
+-- Phase Checkpoints Table: Agent orchestration monitoring
+-- ============================================
+CREATE TABLE IF NOT EXISTS phase_checkpoints (
+    id SERIAL PRIMARY KEY,
+    phase_name VARCHAR(100) NOT NULL,
+    agent_name VARCHAR(100) NOT NULL,
+    status VARCHAR(50) NOT NULL DEFAULT 'pending',
+    details JSONB DEFAULT '{}'::jsonb,
+    error_message TEXT,
+    started_at TIMESTAMP WITH TIME ZONE,
+    completed_at TIMESTAMP WITH TIME ZONE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT phase_status_check CHECK (status IN ('pending', 'in_progress', 'completed', 'failed', 'blocked'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_checkpoint_phase ON phase_checkpoints(phase_name);
+CREATE INDEX IF NOT EXISTS idx_checkpoint_status ON phase_checkpoints(status);
+
+-- ============================================
+-- Error Log Table: Centralized error tracking
+-- ============================================
+CREATE TABLE IF NOT EXISTS error_log (
+    id SERIAL PRIMARY KEY,
+    agent_name VARCHAR(100) NOT NULL,
+    error_type VARCHAR(100),
+    error_message TEXT NOT NULL,
+    stack_trace TEXT,
+    context JSONB DEFAULT '{}'::jsonb,
+    resolution_attempted BOOLEAN DEFAULT false,
+    resolution_notes TEXT,
+    resolved BOOLEAN DEFAULT false,
+    severity VARCHAR(20) DEFAULT 'error',
+    timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT error_severity_check CHECK (severity IN ('info', 'warning', 'error', 'critical'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_error_timestamp ON error_log(timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_error_resolved ON error_log(resolved);
+
+-- ============================================
+-- Views for Common Queries
+-- ============================================
+
+-- View: Active markets with their latest sentiment
+CREATE OR REPLACE VIEW active_markets_with_sentiment AS
+SELECT
+    m.token_id,
+    m.question,
+    m.active,
+    m.volume,
+    s.consensus_sentiment,
+    s.consensus_confidence,
+    s.created_at as last_sentiment_at
+FROM markets m
+LEFT JOIN sentiment_data s ON m.token_id = s.market_id
+WHERE m.active = true;
+
+-- View: Active alerts summary
+CREATE OR REPLACE VIEW active_alerts_summary AS
+SELECT
+    a.user_id,
+    COUNT(*) as total_alerts,
+    COUNT(CASE WHEN a.triggered = true THEN 1 END) as triggered_alerts,
+    COUNT(CASE WHEN a.enabled = true THEN 1 END) as enabled_alerts
+FROM alerts a
+GROUP BY a.user_id;
+
+-- ============================================
+-- Functions and Triggers
+-- ============================================
+
+-- Function: Update timestamp on row modification
+CREATE OR REPLACE FUNCTION update_updated_at_column()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS update_alerts_updated_at ON alerts;
+CREATE TRIGGER update_alerts_updated_at
+    BEFORE UPDATE ON alerts
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+DROP TRIGGER IF EXISTS update_checkpoints_updated_at ON phase_checkpoints;
+CREATE TRIGGER update_checkpoints_updated_at
+    BEFORE UPDATE ON phase_checkpoints
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+-- Function: Log phase checkpoint
+CREATE OR REPLACE FUNCTION log_phase_checkpoint(
+    p_phase_name VARCHAR(100),
+    p_agent_name VARCHAR(100),
+    p_status VARCHAR(50),
+    p_details JSONB DEFAULT '{}'::jsonb
+) RETURNS INTEGER AS $$
+DECLARE
+    checkpoint_id INTEGER;
+BEGIN
+    INSERT INTO phase_checkpoints (phase_name, agent_name, status, details)
+    VALUES (p_phase_name, p_agent_name, p_status, p_details)
+    RETURNING id INTO checkpoint_id;
+
+    RETURN checkpoint_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: Log error
+CREATE OR REPLACE FUNCTION log_error(
+    p_agent_name VARCHAR(100),
+    p_error_type VARCHAR(100),
+    p_error_message TEXT,
+    p_stack_trace TEXT DEFAULT NULL,
+    p_context JSONB DEFAULT '{}'::jsonb,
+    p_severity VARCHAR(20) DEFAULT 'error'
+) RETURNS INTEGER AS $$
+DECLARE
+    error_id INTEGER;
+BEGIN
+    INSERT INTO error_log (agent_name, error_type, error_message, stack_trace, context, severity)
+    VALUES (p_agent_name, p_error_type, p_error_message, p_stack_trace, p_context, p_severity)
+    RETURNING id INTO error_id;
+
+    RETURN error_id;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,6 @@
+-- migrate:no-transaction
+-- price_history is the largest table; build its indexes without blocking
+-- writes. Each statement runs on its own outside a transaction.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_price_history_token ON price_history(token_id, timestamp DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_price_history_timestamp ON price_history(timestamp DESC);
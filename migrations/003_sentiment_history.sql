@@ -0,0 +1,111 @@
+-- Append-only sentiment time series with hourly/daily rollups.
+-- DatabaseClient.store_sentiment appends to sentiment_history and updates
+-- both rollup buckets in the same transaction; sentiment_data is no longer
+-- written and is kept only for the backfill below.
+
+-- ============================================
+-- Sentiment History: one row per analysis run
+-- ============================================
+CREATE TABLE IF NOT EXISTS sentiment_history (
+    id BIGSERIAL PRIMARY KEY,
+    market_id VARCHAR(255) NOT NULL,
+    consensus_sentiment NUMERIC(5, 4),
+    consensus_confidence NUMERIC(5, 4),
+    source_scores JSONB NOT NULL DEFAULT '{}'::jsonb, -- {"perplexity": 0.42, ...}
+    sources JSONB NOT NULL DEFAULT '[]'::jsonb,
+    news_context TEXT,
+    status VARCHAR(50),
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+
+    CONSTRAINT sentiment_history_score_range CHECK (consensus_sentiment BETWEEN -1.0 AND 1.0)
+);
+
+-- Latest-row lookup for get_sentiment
+CREATE INDEX IF NOT EXISTS idx_sentiment_history_market_created
+    ON sentiment_history(market_id, created_at DESC);
+
+-- ============================================
+-- Sentiment Rollups: incremental hourly/daily aggregates
+-- ============================================
+CREATE TABLE IF NOT EXISTS sentiment_rollups (
+    market_id VARCHAR(255) NOT NULL,
+    bucket_size VARCHAR(10) NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    samples INTEGER NOT NULL,
+    sentiment_sum DOUBLE PRECISION NOT NULL,
+    confidence_sum DOUBLE PRECISION NOT NULL,
+    sentiment_min DOUBLE PRECISION NOT NULL,
+    sentiment_max DOUBLE PRECISION NOT NULL,
+    last_sentiment DOUBLE PRECISION NOT NULL,
+    last_at TIMESTAMP NOT NULL,
+
+    PRIMARY KEY (market_id, bucket_size, bucket_start),
+    CONSTRAINT sentiment_rollup_bucket_check CHECK (bucket_size IN ('hour', 'day'))
+);
+
+-- ============================================
+-- Backfill from the latest-only table
+-- ============================================
+INSERT INTO sentiment_history (
+    market_id, consensus_sentiment, consensus_confidence,
+    source_scores, sources, news_context, status, created_at
+)
+SELECT
+    sd.market_id,
+    sd.consensus_sentiment,
+    sd.consensus_confidence,
+    COALESCE((
+        SELECT jsonb_object_agg(src->>'source', (src->>'score')::float8)
+        FROM jsonb_array_elements(sd.sources) src
+    ), '{}'::jsonb),
+    COALESCE(sd.sources, '[]'::jsonb),
+    sd.news_context,
+    sd.status,
+    COALESCE(sd.created_at, NOW())
+FROM sentiment_data sd
+WHERE NOT EXISTS (SELECT 1 FROM sentiment_history);
+
+INSERT INTO sentiment_rollups (
+    market_id, bucket_size, bucket_start, samples, sentiment_sum, confidence_sum,
+    sentiment_min, sentiment_max, last_sentiment, last_at
+)
+SELECT
+    h.market_id,
+    b.bucket_size,
+    date_trunc(b.bucket_size, h.created_at),
+    1,
+    h.consensus_sentiment,
+    COALESCE(h.consensus_confidence, 0),
+    h.consensus_sentiment,
+    h.consensus_sentiment,
+    h.consensus_sentiment,
+    h.created_at
+FROM sentiment_history h
+CROSS JOIN (VALUES ('hour'), ('day')) AS b(bucket_size)
+WHERE h.consensus_sentiment IS NOT NULL
+    AND h.status IS DISTINCT FROM 'failed_all_sources'
+ON CONFLICT (market_id, bucket_size, bucket_start) DO NOTHING;
+
+-- ============================================
+-- Views
+-- ============================================
+
+-- View: Active markets with their latest sentiment (now from history)
+CREATE OR REPLACE VIEW active_markets_with_sentiment AS
+SELECT
+    m.token_id,
+    m.question,
+    m.active,
+    m.volume,
+    s.consensus_sentiment,
+    s.consensus_confidence,
+    s.created_at as last_sentiment_at
+FROM markets m
+LEFT JOIN LATERAL (
+    SELECT consensus_sentiment, consensus_confidence, created_at
+    FROM sentiment_history h
+    WHERE h.market_id = m.token_id
+    ORDER BY h.created_at DESC
+    LIMIT 1
+) s ON true
+WHERE m.active = true;
@@ -0,0 +1,34 @@
+-- Durable queue for asynchronous /api/analyze jobs.
+-- Workers claim jobs with FOR UPDATE SKIP LOCKED and hold a lease
+-- (locked_until); expired leases are re-claimed until max attempts.
+
+CREATE TABLE IF NOT EXISTS analysis_jobs (
+    id UUID PRIMARY KEY,
+    market_id VARCHAR(255) NOT NULL,
+    input_hash CHAR(64) NOT NULL, -- sha256 of market_id + market_data + sentiment_score
+    payload JSONB NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result JSONB,
+    error TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    locked_until TIMESTAMP,
+
+    CONSTRAINT analysis_job_status_check CHECK (status IN ('queued', 'running', 'succeeded', 'failed'))
+);
+
+-- At most one in-flight job per input: identical requests coalesce onto it
+CREATE UNIQUE INDEX IF NOT EXISTS idx_analysis_jobs_inflight
+    ON analysis_jobs(input_hash)
+    WHERE status IN ('queued', 'running');
+
+-- Claim order for workers
+CREATE INDEX IF NOT EXISTS idx_analysis_jobs_claimable
+    ON analysis_jobs(created_at)
+    WHERE status IN ('queued', 'running');
+
+CREATE INDEX IF NOT EXISTS idx_analysis_jobs_finished
+    ON analysis_jobs(finished_at)
+    WHERE status IN ('succeeded', 'failed');
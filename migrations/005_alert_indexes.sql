@@ -0,0 +1,7 @@
+-- migrate:no-transaction
+-- Alert engine reads: full loads page through enabled, untriggered alerts
+-- by id; incremental syncs read rows by updated_at. Built without
+-- blocking writes, one statement at a time outside a transaction.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_alerts_pending ON alerts(id) WHERE enabled = true AND triggered = false;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_alerts_updated_at ON alerts(updated_at);
@@ -0,0 +1,22 @@
+-- Anomalies flagged by shared/anomaly_detector.py: price, volume and
+-- sentiment observations far from their market's EWMA baseline (spike) or
+-- a sustained change of level (CUSUM shift). Written in batches, read
+-- newest first by GET /api/anomalies.
+
+CREATE TABLE IF NOT EXISTS anomalies (
+    id BIGSERIAL PRIMARY KEY,
+    market_id VARCHAR(255) NOT NULL,
+    metric VARCHAR(20) NOT NULL,
+    kind VARCHAR(20) NOT NULL,
+    value DOUBLE PRECISION NOT NULL,
+    z_score DOUBLE PRECISION NOT NULL,
+    mean DOUBLE PRECISION NOT NULL,
+    std DOUBLE PRECISION NOT NULL,
+    detected_at TIMESTAMP NOT NULL DEFAULT NOW(),
+
+    CONSTRAINT anomaly_metric_check CHECK (metric IN ('price', 'volume', 'sentiment')),
+    CONSTRAINT anomaly_kind_check CHECK (kind IN ('spike', 'shift_up', 'shift_down'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_anomalies_detected_at ON anomalies(detected_at DESC);
+CREATE INDEX IF NOT EXISTS idx_anomalies_market_detected ON anomalies(market_id, detected_at DESC);
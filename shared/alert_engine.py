@@ -0,0 +1,488 @@
+"""
+Alert evaluation over the alerts table.
+
+AlertIndex holds every enabled, untriggered alert in per-market sorted
+threshold arrays, so a price tick only touches the alerts it crosses:
+one bisect per side and a slice of the k crossed alerts, O(log n + k)
+for a market with n alerts, instead of a scan of every alert.
+
+Each side is ordered so crossed alerts form its tail:
+    above   price_above (and the spike types): key -threshold, crossed
+            when value >= threshold, i.e. key >= -value
+    below   price_below: key threshold, crossed when value <= threshold,
+            i.e. key >= value
+Triggered alerts are cut off the tail and fire once.
+
+AlertEngine keeps an AlertIndex in step with the table and records
+triggers:
+    - the first sync() (and one every ALERT_FULL_RELOAD_SECONDS, which
+      also drops deleted alerts) loads enabled, untriggered alerts in id
+      order pages; syncs in between apply rows whose updated_at moved
+      (the alerts update trigger maintains it), with an overlap so rows
+      from transactions that committed late aren't missed
+    - triggered alerts queue with the tick time and are written in one
+      UPDATE per batch (flush()), at ALERT_FLUSH_BATCH alerts or
+      ALERT_FLUSH_SECONDS, whichever comes first
+
+sentiment_spike and volume_spike alerts trigger when the spike signal fed
+to evaluate() for that type reaches their threshold; correlation_alert
+needs two markets and is not evaluated. benchmarks/alert_engine.py
+measures the index with 1M alerts.
+"""
+
+import os
+import time
+import logging
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from .database import get_connection, get_read_connection, return_connection, execute_prepared
+
+logger = logging.getLogger(__name__)
+
+PRICE_ABOVE = "price_above"
+PRICE_BELOW = "price_below"
+SENTIMENT_SPIKE = "sentiment_spike"
+VOLUME_SPIKE = "volume_spike"
+
+# Value stream each evaluated alert type watches, and the side it sits on
+ALERT_CHANNELS = {
+    PRICE_ABOVE: ("price", "above"),
+    PRICE_BELOW: ("price", "below"),
+    SENTIMENT_SPIKE: (SENTIMENT_SPIKE, "above"),
+    VOLUME_SPIKE: (VOLUME_SPIKE, "above"),
+}
+
+# Triggered alerts written per UPDATE, and the longest one may wait
+ALERT_FLUSH_BATCH = int(os.getenv("ALERT_FLUSH_BATCH", "500"))
+ALERT_FLUSH_SECONDS = float(os.getenv("ALERT_FLUSH_SECONDS", "2"))
+
+# Full reloads (the only way deleted rows are noticed)
+ALERT_FULL_RELOAD_SECONDS = float(os.getenv("ALERT_FULL_RELOAD_SECONDS", "3600"))
+
+# Rows per page of a full load
+ALERT_LOAD_PAGE_SIZE = 50_000
+
+# Incremental syncs re-read changes this far behind the last one
+ALERT_SYNC_OVERLAP = timedelta(seconds=60)
+
+# Triggers are remembered this long, so a sync that read an alert before
+# its trigger was written doesn't re-arm it
+FIRED_MEMORY = timedelta(minutes=10)
+
+# Recent triggers kept for status
+RECENT_TRIGGERS = 50
+
+
+class _Side:
+    """Alerts on one side of one market's value stream, sorted by key"""
+
+    __slots__ = ("sign", "keys", "ids")
+
+    def __init__(self, side: str, pairs: Iterable[Tuple[float, int]] = ()):
+        """
+        Args:
+            side: "above" or "below"
+            pairs: (threshold, alert id) pairs
+        """
+        self.sign = -1.0 if side == "above" else 1.0
+        pairs = sorted((self.sign * threshold, alert_id) for threshold, alert_id in pairs)
+        self.keys = array("d", [key for key, _ in pairs])
+        self.ids = array("q", [alert_id for _, alert_id in pairs])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def insert(self, threshold: float, alert_id: int) -> None:
+        key = self.sign * threshold
+        position = bisect_right(self.keys, key)
+        self.keys.insert(position, key)
+        self.ids.insert(position, alert_id)
+
+    def remove(self, alert_id: int, threshold: Optional[float] = None) -> bool:
+        """
+        Drop an alert. With its threshold only the alerts sharing it are
+        searched; without (or if it has changed since) the whole side is.
+        """
+        position = -1
+        if threshold is not None:
+            key = self.sign * threshold
+            for candidate in range(bisect_left(self.keys, key), bisect_right(self.keys, key)):
+                if self.ids[candidate] == alert_id:
+                    position = candidate
+                    break
+        if position < 0:
+            try:
+                position = self.ids.index(alert_id)
+            except ValueError:
+                return False
+        del self.keys[position]
+        del self.ids[position]
+        return True
+
+    def cut(self, value: float) -> List[int]:
+        """Remove and return the alerts a value crosses (the tail from key = sign * value)"""
+        position = bisect_left(self.keys, self.sign * value)
+        if position == len(self.keys):
+            return []
+        crossed = self.ids[position:].tolist()
+        del self.keys[position:]
+        del self.ids[position:]
+        return crossed
+
+
+class AlertIndex:
+    """Enabled, untriggered alerts by (channel, market) in sorted threshold arrays"""
+
+    def __init__(self, alerts: Iterable[Tuple[int, str, str, float]] = ()):
+        """
+        Args:
+            alerts: (id, market_id, alert_type, threshold) rows; types
+                without a channel are counted and skipped
+        """
+        self.unsupported = 0
+        grouped: Dict[Tuple[str, str, str], List[Tuple[float, int]]] = {}
+        for alert_id, market_id, alert_type, threshold in alerts:
+            channel = ALERT_CHANNELS.get(alert_type)
+            if channel is None or threshold is None:
+                self.unsupported += 1
+                continue
+            name, side = channel
+            grouped.setdefault((name, market_id, side), []).append((float(threshold), alert_id))
+
+        # channel -> market_id -> side -> _Side
+        self._sides: Dict[str, Dict[str, Dict[str, _Side]]] = {}
+        # alert id -> its _Side
+        self._alerts: Dict[int, _Side] = {}
+        for (name, market_id, side), pairs in grouped.items():
+            built = _Side(side, pairs)
+            self._sides.setdefault(name, {}).setdefault(market_id, {})[side] = built
+            self._alerts.update(dict.fromkeys(built.ids, built))
+
+    def __len__(self) -> int:
+        return len(self._alerts)
+
+    def __contains__(self, alert_id: int) -> bool:
+        return alert_id in self._alerts
+
+    def add(self, alert_id: int, market_id: str, alert_type: str, threshold: float) -> bool:
+        """Add (or move) one alert; False if its type isn't evaluated"""
+        self.remove(alert_id, threshold)
+        channel = ALERT_CHANNELS.get(alert_type)
+        if channel is None or threshold is None:
+            return False
+        name, side = channel
+        sides = self._sides.setdefault(name, {}).setdefault(market_id, {})
+        target = sides.get(side)
+        if target is None:
+            target = sides[side] = _Side(side)
+        target.insert(float(threshold), alert_id)
+        self._alerts[alert_id] = target
+        return True
+
+    def remove(self, alert_id: int, threshold: Optional[float] = None) -> bool:
+        """
+        Drop one alert; False if it wasn't indexed.
+
+        Args:
+            threshold: The alert's threshold, if known: the removal is then
+                a bisect instead of a scan of the market's alerts
+        """
+        side = self._alerts.pop(alert_id, None)
+        return side is not None and side.remove(alert_id, None if threshold is None else float(threshold))
+
+    def evaluate(self, channel: str, market_id: str, value: float) -> List[int]:
+        """
+        Remove and return the alerts a new value crosses.
+
+        Args:
+            channel: "price", "sentiment_spike" or "volume_spike"
+            market_id: Market condition id
+            value: The new price, or spike signal
+        """
+        sides = self._sides.get(channel, {}).get(market_id)
+        if sides is None or value != value:  # no alerts, or NaN
+            return []
+        crossed = []
+        for side in sides.values():
+            crossed.extend(side.cut(value))
+        for alert_id in crossed:
+            self._alerts.pop(alert_id, None)
+        return crossed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "alerts": len(self._alerts),
+            "markets": {channel: len(markets) for channel, markets in self._sides.items()},
+            "unsupported": self.unsupported,
+        }
+
+
+class AlertEngine:
+    """Keeps an AlertIndex in step with the alerts table and records triggers in batches"""
+
+    def __init__(
+        self,
+        flush_batch: int = ALERT_FLUSH_BATCH,
+        flush_seconds: float = ALERT_FLUSH_SECONDS,
+        full_reload_seconds: float = ALERT_FULL_RELOAD_SECONDS
+    ):
+        self.flush_batch = flush_batch
+        self.flush_seconds = flush_seconds
+        self.full_reload_seconds = full_reload_seconds
+
+        self.index = AlertIndex()
+        self._loaded_at: Optional[float] = None  # monotonic time of the last full load
+        self._synced_to: Optional[datetime] = None  # updated_at cursor for incremental syncs
+        self._pending: List[Tuple[int, datetime]] = []
+        self._pending_since: Optional[float] = None
+        self._fired: Dict[int, datetime] = {}  # alert id -> when it fired here
+        self._recent: List[Dict[str, Any]] = []
+        self._counters = {"triggered": 0, "written": 0, "flush_failures": 0, "changes_applied": 0}
+        self._last_sync: Optional[Dict[str, Any]] = None
+
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    # -- evaluation -----------------------------------------------------------
+
+    def evaluate(self, channel: str, market_id: str, value: float,
+                 at: Optional[datetime] = None) -> List[int]:
+        """
+        Check a new value against the market's alerts on a channel and queue
+        the ones it triggers (flushing if a batch is due).
+
+        Returns:
+            Ids of the triggered alerts
+        """
+        with self._lock:
+            triggered = self.index.evaluate(channel, market_id, value)
+            if not triggered:
+                return triggered
+            now = datetime.now(timezone.utc)
+            at = at or now
+            for alert_id in triggered:
+                self._fired[alert_id] = now
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.extend((alert_id, at) for alert_id in triggered)
+            self._counters["triggered"] += len(triggered)
+            self._recent.append({
+                "market_id": market_id, "channel": channel, "value": value,
+                "alert_ids": triggered[:20], "count": len(triggered), "at": at.isoformat(),
+            })
+            del self._recent[:-RECENT_TRIGGERS]
+
+        logger.info(f"{len(triggered)} alerts triggered for {market_id} ({channel} {value})")
+        self.flush_if_due()
+        return triggered
+
+    def on_price(self, market_id: str, price: float, at: Optional[datetime] = None) -> List[int]:
+        """Evaluate price_above / price_below alerts on a price tick"""
+        return self.evaluate("price", market_id, price, at)
+
+    # -- trigger writes ---------------------------------------------------------
+
+    def flush_if_due(self) -> int:
+        """Flush when a full batch is queued or the oldest trigger has waited flush_seconds"""
+        with self._lock:
+            due = self._pending and (
+                len(self._pending) >= self.flush_batch or
+                time.monotonic() - self._pending_since >= self.flush_seconds
+            )
+        return self.flush() if due else 0
+
+    def flush(self) -> int:
+        """
+        Mark queued triggers in the alerts table, one UPDATE per batch.
+
+        Returns:
+            Alerts written; failed batches are queued again
+        """
+        if not self._flush_lock.acquire(blocking=False):
+            return 0  # another thread is writing
+        try:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                self._pending_since = None
+            written = 0
+            for start in range(0, len(pending), self.flush_batch):
+                batch = pending[start:start + self.flush_batch]
+                try:
+                    written += self._mark_triggered(batch)
+                except Exception as e:
+                    logger.error(f"Failed to record {len(batch)} triggered alerts: {e}")
+                    with self._lock:
+                        self._pending[:0] = pending[start:]
+                        self._pending_since = self._pending_since or time.monotonic()
+                        self._counters["flush_failures"] += 1
+                    break
+            with self._lock:
+                self._counters["written"] += written
+            return written
+        finally:
+            self._flush_lock.release()
+
+    def _mark_triggered(self, batch: List[Tuple[int, datetime]]) -> int:
+        conn = None
+        try:
+            conn = get_connection()
+            cursor = conn.cursor()
+            execute_prepared(cursor, "mark_alerts_triggered", (
+                [alert_id for alert_id, _ in batch],
+                [at for _, at in batch],
+            ))
+            updated = cursor.rowcount
+            conn.commit()
+            return updated
+        except Exception:
+            if conn:
+                conn.rollback()
+            raise
+        finally:
+            if conn:
+                return_connection(conn)
+
+    # -- sync -------------------------------------------------------------------
+
+    def sync(self, full: bool = False) -> Dict[str, Any]:
+        """
+        Bring the index up to date with the alerts table: a full load the
+        first time, every full_reload_seconds or with full, otherwise the
+        rows changed since the last sync.
+
+        Returns:
+            Sync summary
+        """
+        if not self._sync_lock.acquire(blocking=False):
+            return {"skipped": True, "reason": "already running"}
+        try:
+            start = time.perf_counter()
+            full = (
+                full or self._loaded_at is None or
+                time.monotonic() - self._loaded_at >= self.full_reload_seconds
+            )
+            summary = self._full_load() if full else self._apply_changes()
+            summary["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            summary["alerts"] = len(self.index)
+            self._last_sync = summary
+            return summary
+        finally:
+            self._sync_lock.release()
+
+    def _full_load(self) -> Dict[str, Any]:
+        # Changes made while loading are re-read by the next incremental sync
+        started = datetime.now(timezone.utc) - ALERT_SYNC_OVERLAP
+        rows: List[Tuple[int, str, str, float, datetime]] = []
+        conn = None
+        try:
+            conn = get_read_connection(consistent=True)
+            with conn.cursor() as cursor:
+                after_id = 0
+                while True:
+                    execute_prepared(cursor, "select_pending_alerts", (after_id, ALERT_LOAD_PAGE_SIZE))
+                    page = cursor.fetchall()
+                    rows.extend(page)
+                    if len(page) < ALERT_LOAD_PAGE_SIZE:
+                        break
+                    after_id = page[-1][0]
+            conn.commit()
+        finally:
+            if conn:
+                return_connection(conn)
+
+        with self._lock:
+            self._forget_fired()
+            index = AlertIndex(
+                (alert_id, market_id, alert_type, threshold)
+                for alert_id, market_id, alert_type, threshold, updated_at in rows
+                if not self._fired_after(alert_id, updated_at)
+            )
+            self.index = index
+            self._synced_to = started
+            self._loaded_at = time.monotonic()
+        logger.info(f"Loaded {len(index)} alerts ({index.unsupported} not evaluated)")
+        return {"mode": "full", "rows": len(rows)}
+
+    def _apply_changes(self) -> Dict[str, Any]:
+        since = self._synced_to - ALERT_SYNC_OVERLAP
+        conn = None
+        try:
+            conn = get_read_connection(consistent=True)
+            with conn.cursor() as cursor:
+                execute_prepared(cursor, "select_alert_changes", (since,))
+                rows = cursor.fetchall()
+            conn.commit()
+        finally:
+            if conn:
+                return_connection(conn)
+
+        added = removed = 0
+        with self._lock:
+            self._forget_fired()
+            for alert_id, market_id, alert_type, threshold, enabled, triggered, updated_at in rows:
+                if enabled and not triggered and not self._fired_after(alert_id, updated_at):
+                    added += self.index.add(alert_id, market_id, alert_type, threshold)
+                else:
+                    removed += self.index.remove(alert_id, threshold)
+                if self._synced_to is None or updated_at > self._synced_to:
+                    self._synced_to = updated_at
+            self._counters["changes_applied"] += len(rows)
+        return {"mode": "incremental", "rows": len(rows), "added": added, "removed": removed}
+
+    def _fired_after(self, alert_id: int, updated_at: datetime) -> bool:
+        """Whether the alert fired here after this version of its row (a stale read)"""
+        fired = self._fired.get(alert_id)
+        return fired is not None and updated_at <= fired
+
+    def _forget_fired(self) -> None:
+        cutoff = datetime.now(timezone.utc) - FIRED_MEMORY
+        pending = {alert_id for alert_id, _ in self._pending}
+        self._fired = {
+            alert_id: fired for alert_id, fired in self._fired.items()
+            if fired >= cutoff or alert_id in pending
+        }
+
+    def status(self) -> Dict[str, Any]:
+        """Index size, queued and written triggers, last sync and recent triggers"""
+        with self._lock:
+            return {
+                "loaded": self.loaded,
+                "index": self.index.stats(),
+                "pending_writes": len(self._pending),
+                "counters": dict(self._counters),
+                "synced_to": self._synced_to.isoformat() if self._synced_to else None,
+                "last_sync": self._last_sync,
+                "recent_triggers": list(reversed(self._recent)),
+            }
+
+
+# Module-level singleton instance
+_engine: Optional[AlertEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_alert_engine() -> AlertEngine:
+    """
+    Get or create the alert engine singleton.
+
+    Returns:
+        AlertEngine: Engine instance (empty until its first sync())
+    """
+    global _engine
+
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                logger.info("Creating alert engine")
+                _engine = AlertEngine()
+
+    return _engine
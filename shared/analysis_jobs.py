@@ -0,0 +1,416 @@
+"""
+Durable asynchronous market analysis jobs.
+
+POST /api/analyze?async=true enqueues a job in the analysis_jobs table and
+returns 202 immediately; workers claim jobs with FOR UPDATE SKIP LOCKED, so
+any number of threads or instances can drain the same queue without
+handing one job to two workers. A claimed job holds a lease (locked_until);
+if its worker dies the lease expires and another worker picks it up, until
+ANALYSIS_JOB_MAX_ATTEMPTS is reached. Results and failures are written only
+for the attempt number that was claimed, so a worker whose lease expired
+can't overwrite the outcome of the worker that re-claimed the job.
+
+Requests with the same market_id, market_data and sentiment_score coalesce
+onto the job already queued or running for them (enforced by a partial
+unique index on input_hash).
+"""
+
+import os
+import json
+import uuid
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from psycopg2.extras import RealDictCursor
+
+from .database import get_connection, return_connection, execute_prepared
+
+logger = logging.getLogger(__name__)
+
+# Worker threads per process
+ANALYSIS_JOB_WORKERS = int(os.getenv("ANALYSIS_JOB_WORKERS", "4"))
+
+# Seconds a claimed job is reserved for its worker before others may retake it
+ANALYSIS_JOB_LEASE_SECONDS = float(os.getenv("ANALYSIS_JOB_LEASE_SECONDS", "300"))
+
+# Attempts (including lease expiries) before a job is marked failed
+ANALYSIS_JOB_MAX_ATTEMPTS = int(os.getenv("ANALYSIS_JOB_MAX_ATTEMPTS", "3"))
+
+# Seconds an idle worker waits before polling the queue again
+ANALYSIS_JOB_POLL_INTERVAL = float(os.getenv("ANALYSIS_JOB_POLL_INTERVAL", "5"))
+
+
+def analysis_input_hash(market_id: str, market_data: Dict[str, Any], sentiment_score: Optional[float]) -> str:
+    """Stable hash of an analysis request, used to coalesce identical jobs"""
+    canonical = json.dumps(
+        {"market_id": market_id, "market_data": market_data, "sentiment_score": sentiment_score},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _format_job(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape an analysis_jobs row for the status endpoint"""
+    job = {
+        "job_id": str(row["id"]),
+        "market_id": row["market_id"],
+        "status": row["status"],
+        "attempts": row["attempts"],
+        "created_at": row["created_at"].isoformat(),
+        "started_at": row["started_at"].isoformat() if row["started_at"] else None,
+        "finished_at": row["finished_at"].isoformat() if row["finished_at"] else None,
+    }
+    if row["status"] == "succeeded":
+        job["result"] = row["result"]
+    if row["error"]:
+        job["error"] = row["error"]
+    return job
+
+
+class AnalysisJobQueue:
+    """Postgres-backed queue of analysis jobs"""
+
+    def __init__(
+        self,
+        lease_seconds: float = ANALYSIS_JOB_LEASE_SECONDS,
+        max_attempts: int = ANALYSIS_JOB_MAX_ATTEMPTS
+    ):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def enqueue(
+        self,
+        market_id: str,
+        market_data: Dict[str, Any],
+        sentiment_score: Optional[float] = None
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Queue an analysis, or join the identical one already in flight.
+
+        Returns:
+            (job, coalesced) where job has job_id, status and created_at,
+            and coalesced is True if an existing job was returned
+        """
+        input_hash = analysis_input_hash(market_id, market_data, sentiment_score)
+        payload = json.dumps(
+            {"market_id": market_id, "market_data": market_data, "sentiment_score": sentiment_score},
+            default=str
+        )
+
+        conn = None
+        try:
+            conn = get_connection()
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+            # Two passes: the in-flight job we conflicted with may finish
+            # between the insert and the lookup
+            for _ in range(2):
+                execute_prepared(
+                    cursor, "enqueue_analysis_job",
+                    (str(uuid.uuid4()), market_id, input_hash, payload)
+                )
+                row = cursor.fetchone()
+                coalesced = row is None
+                if coalesced:
+                    execute_prepared(cursor, "select_inflight_analysis_job", (input_hash,))
+                    row = cursor.fetchone()
+                conn.commit()
+
+                if row is not None:
+                    break
+            else:
+                raise RuntimeError(f"Could not enqueue analysis job for {market_id}")
+
+            job = {
+                "job_id": str(row["id"]),
+                "status": row["status"],
+                "created_at": row["created_at"].isoformat()
+            }
+            if coalesced:
+                logger.info(f"Analysis for {market_id} coalesced onto job {job['job_id']}")
+            else:
+                logger.info(f"Queued analysis job {job['job_id']} for {market_id}")
+            return job, coalesced
+
+        except Exception:
+            if conn:
+                conn.rollback()
+            raise
+        finally:
+            if conn:
+                return_connection(conn)
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Claim the oldest runnable job and start its lease.
+
+        Returns:
+            Dict with job_id, market_id, payload and attempts, or None if
+            the queue is empty
+        """
+        conn = None
+        try:
+            conn = get_connection()
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            execute_prepared(cursor, "claim_analysis_job", (self.lease_seconds, self.max_attempts))
+            row = cursor.fetchone()
+            conn.commit()
+
+            if row is None:
+                return None
+            return {
+                "job_id": str(row["id"]),
+                "market_id": row["market_id"],
+                "payload": row["payload"],
+                "attempts": row["attempts"]
+            }
+        except Exception:
+            if conn:
+                conn.rollback()
+            raise
+        finally:
+            if conn:
+                return_connection(conn)
+
+    def complete(self, job: Dict[str, Any], result: Dict[str, Any]) -> bool:
+        """
+        Store a job's result and mark it succeeded.
+
+        Only the attempt that holds the lease may finish the job: if the
+        lease expired and another worker re-claimed it, nothing is written.
+
+        Returns:
+            False if the lease was lost and the result discarded
+        """
+        updated = self._update(
+            "complete_analysis_job", (json.dumps(result, default=str), job["job_id"], job["attempts"])
+        )
+        if not updated:
+            logger.warning(f"Analysis job {job['job_id']} lost its lease (attempt {job['attempts']}); result discarded")
+        return bool(updated)
+
+    def fail(self, job: Dict[str, Any], error: str) -> bool:
+        """
+        Record a failed attempt; the job is re-queued until max_attempts.
+        Ignored, like complete(), if the attempt no longer holds the lease.
+
+        Returns:
+            True if the job will be retried
+        """
+        retry = job["attempts"] < self.max_attempts
+        updated = self._update(
+            "retry_analysis_job" if retry else "fail_analysis_job", (error, job["job_id"], job["attempts"])
+        )
+        if not updated:
+            logger.warning(f"Analysis job {job['job_id']} lost its lease (attempt {job['attempts']}); failure not recorded")
+        return retry
+
+    def expire_leases(self) -> int:
+        """
+        Fail running jobs whose final attempt's lease has expired.
+
+        Returns:
+            Number of jobs marked failed
+        """
+        return self._update("expire_analysis_jobs", (self.max_attempts,))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a job.
+
+        Returns:
+            Job status dict (with result once succeeded), or None if unknown
+        """
+        conn = None
+        try:
+            conn = get_connection()
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            execute_prepared(cursor, "select_analysis_job", (job_id,))
+            row = cursor.fetchone()
+            conn.commit()
+            return _format_job(row) if row else None
+        finally:
+            if conn:
+                return_connection(conn)
+
+    def _update(self, name: str, params: tuple) -> int:
+        """Run one registry UPDATE in its own transaction"""
+        conn = None
+        try:
+            conn = get_connection()
+            cursor = conn.cursor()
+            execute_prepared(cursor, name, params)
+            updated = cursor.rowcount
+            conn.commit()
+            return updated
+        except Exception:
+            if conn:
+                conn.rollback()
+            raise
+        finally:
+            if conn:
+                return_connection(conn)
+
+
+class AnalysisWorkerPool:
+    """Threads that claim and run analysis jobs"""
+
+    def __init__(
+        self,
+        queue: AnalysisJobQueue,
+        handler: Callable[[Dict[str, Any]], Dict[str, Any]],
+        workers: int = ANALYSIS_JOB_WORKERS,
+        poll_interval: float = ANALYSIS_JOB_POLL_INTERVAL
+    ):
+        """
+        Args:
+            queue: Queue to drain
+            handler: Runs one job payload and returns the analysis result
+            workers: Worker threads started by start()
+            poll_interval: Seconds an idle worker sleeps unless notified
+        """
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+
+        self._threads: List[threading.Thread] = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._counters = {"succeeded": 0, "retried": 0, "failed": 0, "lease_lost": 0}
+
+    def start(self):
+        """Start the worker threads (no-op if already running)"""
+        with self._lock:
+            if any(thread.is_alive() for thread in self._threads):
+                return
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._worker_loop, name=f"analysis-job-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+        logger.info(f"Started {self.workers} analysis job workers")
+
+    def stop(self, timeout: Optional[float] = None):
+        """Signal workers to exit after their current job and wait for them"""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def notify(self):
+        """Wake idle workers after a job was queued"""
+        self._wake.set()
+
+    def run_one(self) -> bool:
+        """
+        Claim and run a single job.
+
+        Returns:
+            False if the queue was empty
+        """
+        job = self.queue.claim()
+        if job is None:
+            return False
+
+        logger.info(f"Running analysis job {job['job_id']} for {job['market_id']} (attempt {job['attempts']})")
+        try:
+            result = self.handler(job["payload"])
+        except Exception as e:
+            logger.error(f"Analysis job {job['job_id']} failed: {e}")
+            retried = self.queue.fail(job, str(e))
+            with self._lock:
+                self._counters["retried" if retried else "failed"] += 1
+            return True
+
+        completed = self.queue.complete(job, result)
+        with self._lock:
+            self._counters["succeeded" if completed else "lease_lost"] += 1
+        return True
+
+    def drain(self, time_budget: float) -> int:
+        """
+        Run jobs on the calling thread until the queue is empty or the time
+        budget (seconds) is spent. Used by the timer trigger to pick up jobs
+        left behind by recycled instances.
+
+        Returns:
+            Number of jobs run
+        """
+        deadline = time.monotonic() + time_budget
+        self.queue.expire_leases()
+
+        ran = 0
+        while time.monotonic() < deadline and self.run_one():
+            ran += 1
+        return ran
+
+    def status(self) -> Dict[str, Any]:
+        """Worker liveness and outcome counters for this process"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "alive": sum(thread.is_alive() for thread in self._threads),
+                **self._counters,
+                "checked_at": datetime.utcnow().isoformat()
+            }
+
+    def _worker_loop(self):
+        """Claim jobs until stopped, sleeping while the queue is empty"""
+        while not self._stop.is_set():
+            try:
+                if self.run_one():
+                    continue
+            except Exception as e:
+                logger.error(f"Analysis job worker error: {e}")
+
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+
+# Module-level singleton instances
+_job_queue: Optional[AnalysisJobQueue] = None
+_worker_pool: Optional[AnalysisWorkerPool] = None
+
+
+def get_analysis_job_queue() -> AnalysisJobQueue:
+    """
+    Get or create the analysis job queue singleton.
+
+    Returns:
+        AnalysisJobQueue: Queue instance
+    """
+    global _job_queue
+
+    if _job_queue is None:
+        _job_queue = AnalysisJobQueue()
+
+    return _job_queue
+
+
+def get_analysis_worker_pool(handler: Callable[[Dict[str, Any]], Dict[str, Any]]) -> AnalysisWorkerPool:
+    """
+    Get or create the analysis worker pool singleton.
+
+    Args:
+        handler: Job handler used when the pool is first created
+
+    Returns:
+        AnalysisWorkerPool: Worker pool (not started)
+    """
+    global _worker_pool
+
+    if _worker_pool is None:
+        logger.info("Creating analysis job worker pool")
+        _worker_pool = AnalysisWorkerPool(get_analysis_job_queue(), handler)
+
+    return _worker_pool
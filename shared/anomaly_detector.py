@@ -0,0 +1,482 @@
+"""
+Streaming anomaly detection for price, volume and sentiment.
+
+Each market keeps a fixed set of running statistics per metric (no
+history): an EWMA mean and variance, a two-sided CUSUM and the last
+price, volume and tick time. They live in array('d') columns indexed by a
+per-market slot, about 200 bytes per market, so 100k markets fit in
+about 20 MB and an update is a handful of float operations. retain()
+limits the slots to the current market snapshot: markets that leave it
+free their slot for reuse, and observations of ids outside it (such as
+free-form ids posted to /api/sentiment) are ignored.
+
+Metrics, updated in the write paths:
+    price       price move per sqrt(hour) between ticks (_ingest_price)
+    volume      log1p of volume traded per hour between ticks, from the
+                cumulative volume the CLOB API reports (_ingest_price)
+    sentiment   consensus score of each stored analysis (every sentiment
+                store)
+
+Per observation, once a metric has MIN_SAMPLES:
+    z           (value - EWMA mean) / EWMA std, before the value is folded
+                in; |z| >= ANOMALY_Z_THRESHOLD is a "spike" (volume only
+                counts rises)
+    CUSUM       S+ = max(0, S+ + z - k), S- = max(0, S- - z - k); either
+                above h is a "shift" (a sustained change of level), and
+                both reset
+Values beyond the spike threshold are clipped before they update the
+mean and variance, so one outlier doesn't mask the next.
+
+Flagged anomalies are written to the anomalies table in batches (served
+by GET /api/anomalies) and kept in memory for when the database is down.
+Every volume and sentiment z-score also goes to the alert engine as the
+volume_spike / sentiment_spike signal, so those alerts fire when it
+reaches their threshold. benchmarks/anomaly_detection.py measures
+throughput and memory at 100k markets.
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+from array import array
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional
+
+from .database import get_connection, return_connection, execute_prepared_batch
+from .alert_engine import get_alert_engine, SENTIMENT_SPIKE, VOLUME_SPIKE
+
+logger = logging.getLogger(__name__)
+
+PRICE = "price"
+VOLUME = "volume"
+SENTIMENT = "sentiment"
+METRICS = (PRICE, VOLUME, SENTIMENT)
+
+# EWMA weight of each observation (0.02: about the last 50 observations)
+ANOMALY_EWMA_ALPHA = float(os.getenv("ANOMALY_EWMA_ALPHA", "0.02"))
+
+# |z| at which an observation is a spike
+ANOMALY_Z_THRESHOLD = float(os.getenv("ANOMALY_Z_THRESHOLD", "4"))
+
+# CUSUM slack (k) and decision threshold (h), in standard deviations
+CUSUM_K = 0.5
+CUSUM_H = float(os.getenv("ANOMALY_CUSUM_H", "8"))
+
+# Observations before a metric's z-scores are trusted
+MIN_SAMPLES = 30
+
+# Floor for each metric's standard deviation, so flat series don't turn
+# tiny moves into huge z-scores
+MIN_STD = {
+    PRICE: 0.002,
+    VOLUME: 0.05,
+    SENTIMENT: 0.02,
+}
+
+# Ticks closer together than this are not used for price and volume rates
+MIN_TICK_GAP_SECONDS = 5.0
+
+# Anomalies written per INSERT batch, and the longest one may wait
+ANOMALY_FLUSH_BATCH = 100
+ANOMALY_FLUSH_SECONDS = 5.0
+
+# Anomalies kept in memory for GET /api/anomalies without a database
+RECENT_ANOMALIES = 1000
+
+
+class _MetricColumns:
+    """Running statistics of one metric, one slot per market"""
+
+    __slots__ = ("mean", "var", "cusum_pos", "cusum_neg", "count")
+
+    def __init__(self):
+        self.mean = array("d")
+        self.var = array("d")
+        self.cusum_pos = array("d")
+        self.cusum_neg = array("d")
+        self.count = array("L")
+
+    def append(self) -> None:
+        for column in (self.mean, self.var, self.cusum_pos, self.cusum_neg):
+            column.append(0.0)
+        self.count.append(0)
+
+    def reset(self, slot: int) -> None:
+        for column in (self.mean, self.var, self.cusum_pos, self.cusum_neg):
+            column[slot] = 0.0
+        self.count[slot] = 0
+
+
+class AnomalyDetector:
+    """Per-market EWMA z-scores and CUSUM over price, volume and sentiment"""
+
+    def __init__(
+        self,
+        alpha: float = ANOMALY_EWMA_ALPHA,
+        z_threshold: float = ANOMALY_Z_THRESHOLD,
+        cusum_h: float = CUSUM_H,
+        alerts: bool = True,
+        persist: bool = True
+    ):
+        """
+        Args:
+            alpha: EWMA weight of each observation
+            z_threshold: |z| that flags a spike
+            cusum_h: CUSUM decision threshold
+            alerts: Feed volume and sentiment z-scores to the alert engine
+            persist: Write flagged anomalies to the anomalies table
+        """
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.cusum_h = cusum_h
+        self.alerts = alerts
+        self.persist = persist
+
+        self._slots: Dict[str, int] = {}
+        self._free: List[int] = []  # slots of markets dropped by retain()
+        self._markets: Optional[frozenset] = None  # None: every market id is tracked
+        self._columns = {metric: _MetricColumns() for metric in METRICS}
+        self._last_price = array("d")
+        self._last_volume = array("d")
+        self._last_tick = array("d")  # epoch seconds, 0 before the first tick
+
+        self._recent: deque = deque(maxlen=RECENT_ANOMALIES)
+        self._pending: List[tuple] = []
+        self._pending_since: Optional[float] = None
+        self._counters = {"observations": 0, "anomalies": 0, "written": 0, "write_failures": 0}
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _slot(self, market_id: str) -> Optional[int]:
+        """Slot of a market, allocated on first use; None if the market isn't tracked"""
+        slot = self._slots.get(market_id)
+        if slot is not None:
+            return slot
+        if self._markets is not None and market_id not in self._markets:
+            return None
+
+        if self._free:
+            slot = self._free.pop()
+            for columns in self._columns.values():
+                columns.reset(slot)
+            self._last_price[slot] = self._last_volume[slot] = self._last_tick[slot] = 0.0
+        else:
+            slot = len(self._last_tick)
+            for columns in self._columns.values():
+                columns.append()
+            self._last_price.append(0.0)
+            self._last_volume.append(0.0)
+            self._last_tick.append(0.0)
+        self._slots[market_id] = slot
+        return slot
+
+    def retain(self, market_ids: Iterable[str]) -> int:
+        """
+        Track only these markets (the current snapshot's ids): markets not
+        in it lose their statistics and their slots are reused, and later
+        observations of other ids are ignored.
+
+        Returns:
+            Slots freed
+        """
+        markets = frozenset(market_ids)
+        with self._lock:
+            self._markets = markets
+            dropped = [market_id for market_id in self._slots if market_id not in markets]
+            for market_id in dropped:
+                self._free.append(self._slots.pop(market_id))
+        if dropped:
+            logger.info(f"Anomaly detector dropped {len(dropped)} markets no longer in the snapshot")
+        return len(dropped)
+
+    def _update(self, metric: str, slot: int, value: float) -> Optional[Dict[str, Any]]:
+        """
+        Fold one value into a metric's statistics.
+
+        Returns:
+            {"z", "mean", "std", "kind"} once the metric is warmed up
+            (kind is "spike", "shift_up", "shift_down" or None), else None
+        """
+        columns = self._columns[metric]
+        count = columns.count[slot]
+        mean = columns.mean[slot]
+        std = max(math.sqrt(columns.var[slot]), MIN_STD[metric])
+
+        result = None
+        if count >= MIN_SAMPLES:
+            z = (value - mean) / std
+            kind = None
+            if z >= self.z_threshold or (metric != VOLUME and z <= -self.z_threshold):
+                kind = "spike"
+
+            cusum_pos = max(0.0, columns.cusum_pos[slot] + z - CUSUM_K)
+            cusum_neg = max(0.0, columns.cusum_neg[slot] - z - CUSUM_K)
+            if kind is None and (cusum_pos > self.cusum_h or cusum_neg > self.cusum_h):
+                kind = "shift_up" if cusum_pos > cusum_neg else "shift_down"
+            if cusum_pos > self.cusum_h or cusum_neg > self.cusum_h:
+                cusum_pos = cusum_neg = 0.0
+            columns.cusum_pos[slot], columns.cusum_neg[slot] = cusum_pos, cusum_neg
+            result = {"z": z, "mean": mean, "std": std, "kind": kind}
+
+            # Clip outliers before they move the baseline
+            limit = self.z_threshold * std
+            value = min(max(value, mean - limit), mean + limit)
+
+        # Plain running mean and variance until 1 / n drops below alpha
+        alpha = max(self.alpha, 1.0 / (count + 1))
+        diff = value - mean
+        increment = alpha * diff
+        columns.mean[slot] = mean + increment
+        columns.var[slot] = (1.0 - alpha) * (columns.var[slot] + diff * increment)
+        columns.count[slot] = count + 1
+        return result
+
+    def _record(self, market_id: str, metric: str, value: float, stats: Dict[str, Any],
+                at: datetime) -> Dict[str, Any]:
+        anomaly = {
+            "market_id": market_id,
+            "metric": metric,
+            "kind": stats["kind"],
+            "value": round(value, 6),
+            "z_score": round(stats["z"], 3),
+            "mean": round(stats["mean"], 6),
+            "std": round(stats["std"], 6),
+            "detected_at": at.isoformat(),
+        }
+        self._recent.append(anomaly)
+        self._counters["anomalies"] += 1
+        if self.persist:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.append((
+                market_id, metric, stats["kind"], value, stats["z"], stats["mean"], stats["std"], at
+            ))
+        return anomaly
+
+    def observe_price(self, market_id: str, price: float, volume: Optional[float] = None,
+                      now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Update price (and volume) statistics with a tick.
+
+        Args:
+            market_id: Market condition id
+            price: Current price
+            volume: Cumulative traded volume, if reported
+            now: Tick time (epoch seconds; default now)
+
+        Returns:
+            Anomalies flagged by this tick
+        """
+        now = time.time() if now is None else now
+        anomalies = []
+        signals = []
+        with self._lock:
+            slot = self._slot(market_id)
+            if slot is None:
+                return anomalies
+            last_tick = self._last_tick[slot]
+            gap = now - last_tick
+            if last_tick and gap < MIN_TICK_GAP_SECONDS:
+                return anomalies
+
+            at = datetime.utcfromtimestamp(now)
+            if last_tick:
+                hours = gap / 3600.0
+                move = (price - self._last_price[slot]) / math.sqrt(hours)
+                stats = self._update(PRICE, slot, move)
+                if stats is not None and stats["kind"]:
+                    anomalies.append(self._record(market_id, PRICE, move, stats, at))
+
+                if volume is not None and self._last_volume[slot] > 0:
+                    rate = math.log1p(max(volume - self._last_volume[slot], 0.0) / hours)
+                    stats = self._update(VOLUME, slot, rate)
+                    if stats is not None:
+                        signals.append((VOLUME_SPIKE, stats["z"]))
+                        if stats["kind"]:
+                            anomalies.append(self._record(market_id, VOLUME, rate, stats, at))
+
+            self._last_price[slot] = price
+            if volume is not None:
+                self._last_volume[slot] = volume
+            self._last_tick[slot] = now
+            self._counters["observations"] += 1
+
+        self._after_observe(market_id, signals, anomalies)
+        return anomalies
+
+    def observe_sentiment(self, market_id: str, score: Optional[float],
+                          now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Update sentiment statistics with a stored analysis' consensus score.
+
+        Returns:
+            Anomalies flagged by this score
+        """
+        if score is None:
+            return []
+        now = time.time() if now is None else now
+        anomalies = []
+        signals = []
+        with self._lock:
+            slot = self._slot(market_id)
+            if slot is None:
+                return anomalies
+            stats = self._update(SENTIMENT, slot, float(score))
+            if stats is not None:
+                signals.append((SENTIMENT_SPIKE, abs(stats["z"])))
+                if stats["kind"]:
+                    anomalies.append(
+                        self._record(market_id, SENTIMENT, float(score), stats, datetime.utcfromtimestamp(now))
+                    )
+            self._counters["observations"] += 1
+
+        self._after_observe(market_id, signals, anomalies)
+        return anomalies
+
+    def observe_sentiment_result(self, market_id: str, result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Update sentiment statistics with a stored analysis result (skipped,
+        like the rollups, when every source failed)
+        """
+        if result.get("status") == "failed_all_sources":
+            return []
+        return self.observe_sentiment(market_id, result.get("consensus_sentiment"))
+
+    def _after_observe(self, market_id: str, signals: List[tuple], anomalies: List[Dict[str, Any]]) -> None:
+        if self.alerts:
+            engine = get_alert_engine()
+            for channel, value in signals:
+                engine.evaluate(channel, market_id, value)
+        for anomaly in anomalies:
+            logger.info(f"Anomaly: {anomaly['metric']} {anomaly['kind']} for {market_id} "
+                        f"(z={anomaly['z_score']})")
+        # On every observation, so queued anomalies don't wait for the next flag
+        self.flush_if_due()
+
+    # -- persistence --------------------------------------------------------
+
+    def flush_if_due(self) -> int:
+        """Flush when a full batch is queued or the oldest anomaly has waited ANOMALY_FLUSH_SECONDS"""
+        with self._lock:
+            due = self._pending and (
+                len(self._pending) >= ANOMALY_FLUSH_BATCH or
+                time.monotonic() - self._pending_since >= ANOMALY_FLUSH_SECONDS
+            )
+        return self.flush() if due else 0
+
+    def flush(self) -> int:
+        """
+        Write queued anomalies to the anomalies table.
+
+        Returns:
+            Rows written; on failure they stay queued (up to RECENT_ANOMALIES)
+        """
+        if not self._flush_lock.acquire(blocking=False):
+            return 0
+        try:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                self._pending_since = None
+            if not pending:
+                return 0
+
+            conn = None
+            try:
+                conn = get_connection()
+                cursor = conn.cursor()
+                execute_prepared_batch(cursor, "insert_anomaly", pending)
+                conn.commit()
+            except Exception as e:
+                if conn:
+                    conn.rollback()
+                logger.error(f"Failed to store {len(pending)} anomalies: {e}")
+                with self._lock:
+                    self._pending[:0] = pending
+                    del self._pending[:-RECENT_ANOMALIES]
+                    self._pending_since = self._pending_since or time.monotonic()
+                    self._counters["write_failures"] += 1
+                return 0
+            finally:
+                if conn:
+                    return_connection(conn)
+
+            with self._lock:
+                self._counters["written"] += len(pending)
+            return len(pending)
+        finally:
+            self._flush_lock.release()
+
+    # -- reads ----------------------------------------------------------------
+
+    def recent(self, market_id: Optional[str] = None, metric: Optional[str] = None,
+               since: Optional[datetime] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Anomalies flagged by this process, newest first"""
+        since_iso = since.isoformat() if since else None
+        with self._lock:
+            recent = list(self._recent)
+        matches = []
+        for anomaly in reversed(recent):
+            if market_id is not None and anomaly["market_id"] != market_id:
+                continue
+            if metric is not None and anomaly["metric"] != metric:
+                continue
+            if since_iso is not None and anomaly["detected_at"] < since_iso:
+                break
+            matches.append(anomaly)
+            if len(matches) >= limit:
+                break
+        return matches
+
+    def stats(self, market_id: str) -> Optional[Dict[str, Dict[str, float]]]:
+        """Current mean, std and observation count per metric for one market"""
+        with self._lock:
+            slot = self._slots.get(market_id)
+            if slot is None:
+                return None
+            return {
+                metric: {
+                    "mean": columns.mean[slot],
+                    "std": math.sqrt(columns.var[slot]),
+                    "count": columns.count[slot],
+                }
+                for metric, columns in self._columns.items()
+            }
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "markets": len(self._slots),
+                "free_slots": len(self._free),
+                "pending_writes": len(self._pending),
+                "counters": dict(self._counters),
+            }
+
+
+# Module-level singleton instance
+_detector: Optional[AnomalyDetector] = None
+_detector_lock = threading.Lock()
+
+
+def get_anomaly_detector() -> AnomalyDetector:
+    """
+    Get or create the anomaly detector singleton.
+
+    Returns:
+        AnomalyDetector: Detector instance
+    """
+    global _detector
+
+    if _detector is None:
+        with _detector_lock:
+            if _detector is None:
+                logger.info("Creating anomaly detector")
+                _detector = AnomalyDetector()
+
+    return _detector
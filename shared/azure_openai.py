@@ -2,10 +2,13 @@
 
 import os
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator
 from openai import AzureOpenAI
 from azure.identity import DefaultAzureCredential, ManagedIdentityCredential
 
+from .market_features import format_market_data
+from .llm_telemetry import get_llm_telemetry
+
 logger = logging.getLogger(__name__)
 
 
@@ -17,12 +20,17 @@ class AzureOpenAIClient:
         self.deployment = os.getenv("GPT5_PRO_DEPLOYMENT_NAME", "gpt-5-pro")
         self.api_version = "2025-01-01-preview"
         self.max_retries = 3
+        # "key" skips the Managed Identity attempt (local runs, LLM stand-in)
+        self.auth_mode = os.getenv("AZURE_OPENAI_AUTH", "auto").lower()
 
         # Try Managed Identity first, fallback to API key
         self.client = self._initialize_client()
 
     def _initialize_client(self) -> AzureOpenAI:
         """Initialize client with Managed Identity or API key"""
+        if self.auth_mode == "key":
+            return self._api_key_client()
+
         try:
             # Try Managed Identity first (passwordless)
             logger.info("Attempting Managed Identity authentication...")
@@ -44,15 +52,19 @@ class AzureOpenAIClient:
             logger.warning(f"Managed Identity failed: {e}. Falling back to API key...")
 
             # Fallback to API key
-            api_key = os.getenv("GPT5_PRO_KEY")
-            if not api_key:
-                raise ValueError("No API key found and Managed Identity failed")
+            return self._api_key_client()
 
-            return AzureOpenAI(
-                azure_endpoint=self.endpoint,
-                api_key=api_key,
-                api_version=self.api_version
-            )
+    def _api_key_client(self) -> AzureOpenAI:
+        """Initialize client with the GPT5_PRO_KEY API key"""
+        api_key = os.getenv("GPT5_PRO_KEY")
+        if not api_key:
+            raise ValueError("No API key found and Managed Identity failed")
+
+        return AzureOpenAI(
+            azure_endpoint=self.endpoint,
+            api_key=api_key,
+            api_version=self.api_version
+        )
 
     def analyze_sentiment(
         self,
@@ -74,36 +86,39 @@ class AzureOpenAIClient:
         try:
             prompt = self._build_sentiment_prompt(market_title, market_description, news_context)
 
-            response = self.client.chat.completions.create(
-                model=self.deployment,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are an expert prediction market analyst. "
-                            "Analyze sentiment and provide a score from -1 (very negative) to 1 (very positive). "
-                            "Return ONLY valid JSON with keys: score, confidence, reasoning, factors."
-                        )
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=1000,
-                response_format={"type": "json_object"}
-            )
-
-            result = response.choices[0].message.content
-
-            # Parse JSON response
-            import json
-            sentiment_data = json.loads(result)
-
-            # Validate score range
-            score = float(sentiment_data.get("score", 0))
-            sentiment_data["score"] = max(-1.0, min(1.0, score))
-
-            logger.info(f"GPT-5-Pro sentiment analysis complete: {sentiment_data['score']}")
-            return sentiment_data
+            with get_llm_telemetry().track("azure_openai", "sentiment", self.deployment) as call:
+                response = self.client.chat.completions.create(
+                    model=self.deployment,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": (
+                                "You are an expert prediction market analyst. "
+                                "Analyze sentiment and provide a score from -1 (very negative) to 1 (very positive). "
+                                "Return ONLY valid JSON with keys: score, confidence, reasoning, factors."
+                            )
+                        },
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.3,
+                    max_tokens=1000,
+                    response_format={"type": "json_object"}
+                )
+                if response.usage:
+                    call.usage(response.usage.prompt_tokens, response.usage.completion_tokens)
+
+                result = response.choices[0].message.content
+
+                # Parse JSON response
+                import json
+                sentiment_data = json.loads(result)
+
+                # Validate score range
+                score = float(sentiment_data.get("score", 0))
+                sentiment_data["score"] = max(-1.0, min(1.0, score))
+
+                logger.info(f"GPT-5-Pro sentiment analysis complete: {sentiment_data['score']}")
+                return sentiment_data
 
         except Exception as e:
             logger.error(f"GPT-5-Pro sentiment analysis failed: {e}")
@@ -129,39 +144,67 @@ class AzureOpenAIClient:
             }
         """
         try:
-            prompt = self._build_analysis_prompt(market_data, sentiment_score)
+            with get_llm_telemetry().track("azure_openai", "market_analysis", self.deployment) as call:
+                response = self.client.chat.completions.create(
+                    model=self.deployment,
+                    messages=self._analysis_messages(market_data, sentiment_score),
+                    temperature=0.3,
+                    max_tokens=2000,
+                    response_format={"type": "json_object"}
+                )
+                if response.usage:
+                    call.usage(response.usage.prompt_tokens, response.usage.completion_tokens)
+
+                result = response.choices[0].message.content
+
+                # Parse JSON response
+                import json
+                analysis = json.loads(result)
+
+                logger.info(f"GPT-5-Pro market analysis complete for {market_id}")
+                return analysis
 
-            response = self.client.chat.completions.create(
+        except Exception as e:
+            logger.error(f"GPT-5-Pro market analysis failed: {e}")
+            raise
+
+    def stream_market_analysis(
+        self,
+        market_id: str,
+        market_data: Dict[str, Any],
+        sentiment_score: Optional[float] = None
+    ) -> Iterator[str]:
+        """
+        Market analysis as a stream of completion text deltas
+
+        Same prompt as analyze_market; the concatenated deltas are the JSON
+        document analyze_market would parse.
+
+        Yields:
+            Text fragments as the model produces them
+        """
+        with get_llm_telemetry().track("azure_openai", "market_analysis_stream", self.deployment) as call:
+            stream = self.client.chat.completions.create(
                 model=self.deployment,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are an expert prediction market analyst. "
-                            "Provide comprehensive market analysis with trading recommendations. "
-                            "Return ONLY valid JSON with keys: price_trend, volume_analysis, "
-                            "key_insights, recommendation, risk_level, confidence."
-                        )
-                    },
-                    {"role": "user", "content": prompt}
-                ],
+                messages=self._analysis_messages(market_data, sentiment_score),
                 temperature=0.3,
                 max_tokens=2000,
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                stream=True,
+                stream_options={"include_usage": True}
             )
 
-            result = response.choices[0].message.content
+            for chunk in stream:
+                if chunk.usage:
+                    call.usage(chunk.usage.prompt_tokens, chunk.usage.completion_tokens)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    call.first_token()
+                    yield delta
 
-            # Parse JSON response
-            import json
-            analysis = json.loads(result)
-
-            logger.info(f"GPT-5-Pro market analysis complete for {market_id}")
-            return analysis
-
-        except Exception as e:
-            logger.error(f"GPT-5-Pro market analysis failed: {e}")
-            raise
+        logger.info(f"GPT-5-Pro market analysis stream complete for {market_id}")
 
     def _build_sentiment_prompt(
         self,
@@ -191,6 +234,25 @@ Return as JSON.
 """
         return prompt
 
+    def _analysis_messages(
+        self,
+        market_data: Dict[str, Any],
+        sentiment_score: Optional[float]
+    ) -> list:
+        """Chat messages for market analysis"""
+        return [
+            {
+                "role": "system",
+                "content": (
+                    "You are an expert prediction market analyst. "
+                    "Provide comprehensive market analysis with trading recommendations. "
+                    "Return ONLY valid JSON with keys: price_trend, volume_analysis, "
+                    "key_insights, recommendation, risk_level, confidence."
+                )
+            },
+            {"role": "user", "content": self._build_analysis_prompt(market_data, sentiment_score)}
+        ]
+
     def _build_analysis_prompt(
         self,
         market_data: Dict[str, Any],
@@ -201,7 +263,7 @@ Return as JSON.
 Analyze this prediction market:
 
 **Market Data:**
-{market_data}
+{format_market_data(market_data)}
 """
 
         if sentiment_score is not None:
@@ -0,0 +1,347 @@
+"""
+Batch consensus over many markets' sentiment sources, with calibrated weights.
+
+SentimentAnalyzer combines its sources per market as
+
+    consensus  = sum(score * confidence * weight) / sum(confidence * weight)
+    confidence = sum(confidence * weight) / sum(weight)
+
+both clamped (to -1..1 and 0..1). batch_consensus() computes the same for
+N markets x S sources at once from score, confidence and weight matrices,
+with a mask for sources a market doesn't have. Columns are accumulated in
+order, so each market's result is bit-for-bit what the one-market loop
+gives. It uses numpy when installed and a plain loop otherwise.
+
+Source weights default to the cascade's fixed ones (perplexity and Azure
+OpenAI 0.4, Gemini 0.2, local lexicon LOCAL_SENTIMENT_WEIGHT). Setting
+SENTIMENT_CALIBRATION_FILE to a table written by
+benchmarks/consensus_calibration.py replaces them with weights fitted on
+sentiment_history against later price moves (fit_source_weights()).
+"""
+
+import os
+import json
+import logging
+import statistics
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from .local_sentiment import LOCAL_SENTIMENT_WEIGHT
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Calibration table (JSON) replacing DEFAULT_SOURCE_WEIGHTS; unset = fixed weights
+SENTIMENT_CALIBRATION_FILE = os.getenv("SENTIMENT_CALIBRATION_FILE", "")
+
+DEFAULT_SOURCE_WEIGHTS: Dict[str, float] = {
+    "local_lexicon": LOCAL_SENTIMENT_WEIGHT,
+    "perplexity": 0.4,  # High weight for news-based analysis
+    "azure_openai_gpt5_pro": 0.4,  # High weight for advanced model
+    "google_gemini": 0.2,  # Lower weight for fallback
+}
+
+# Sources with fewer stored observations than this keep their default weight
+MIN_CALIBRATION_SAMPLES = 200
+
+# Candidate weights per source for the coordinate search. No zero: a source
+# keeps a say in markets where it is the only one that answered
+FIT_GRID = tuple(round(0.05 * step, 2) for step in range(1, 21))
+
+# Below this many markets the plain loop beats numpy's per-call overhead
+NUMPY_MIN_ROWS = 64
+
+
+def _clamp(value: float, low: float, high: float) -> float:
+    return max(low, min(high, value))
+
+
+def batch_consensus(
+    scores: Sequence[Sequence[float]],
+    confidences: Sequence[Sequence[float]],
+    weights: Sequence[Sequence[float]],
+    mask: Optional[Sequence[Sequence[bool]]] = None
+) -> Tuple[Sequence[float], Sequence[float]]:
+    """
+    Consensus sentiment and confidence for N markets in one pass.
+
+    Args:
+        scores, confidences, weights: N x S matrices (nested sequences or
+            arrays); column j is each market's j-th source
+        mask: N x S, False where a market has no j-th source (None: all present)
+
+    Returns:
+        (consensus sentiments, consensus confidences), each of length N;
+        numpy arrays when numpy is installed, else lists. A market with no
+        sources, or zero total weight, gets (0.0, 0.0).
+    """
+    if np is None or len(scores) < NUMPY_MIN_ROWS:
+        return _consensus_loop(scores, confidences, weights, mask)
+
+    scores = np.asarray(scores, dtype=np.float64)
+    confidences = np.asarray(confidences, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    count = scores.shape[0] if scores.ndim == 2 else 0
+    if count == 0 or scores.shape[1] == 0:
+        return np.zeros(count), np.zeros(count)
+    mask = np.ones(scores.shape, dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+
+    total_weight = np.zeros(count)
+    weighted_sentiment = np.zeros(count)
+    weight_sum = np.zeros(count)
+    # Column by column, so every market sums its sources in the same order as the loop
+    for j in range(scores.shape[1]):
+        present = mask[:, j]
+        effective = np.where(present, confidences[:, j] * weights[:, j], 0.0)
+        total_weight += effective
+        weighted_sentiment += np.where(present, scores[:, j] * effective, 0.0)
+        weight_sum += np.where(present, weights[:, j], 0.0)
+
+    positive = total_weight > 0
+    consensus = np.where(positive, weighted_sentiment / np.where(positive, total_weight, 1.0), 0.0)
+    confidence = np.where(positive, total_weight / np.where(weight_sum != 0, weight_sum, 1.0), 0.0)
+
+    # Same comparisons as max(low, min(high, x)), NaN included
+    consensus = np.where(consensus < 1.0, consensus, 1.0)
+    consensus = np.where(consensus > -1.0, consensus, -1.0)
+    confidence = np.where(confidence < 1.0, confidence, 1.0)
+    confidence = np.where(confidence > 0.0, confidence, 0.0)
+    return consensus, confidence
+
+
+def _consensus_loop(scores, confidences, weights, mask) -> Tuple[List[float], List[float]]:
+    """batch_consensus without numpy"""
+    consensus, confidence = [], []
+    for i, row in enumerate(scores):
+        total_weight = weighted_sentiment = weight_sum = 0.0
+        for j, score in enumerate(row):
+            if mask is not None and not mask[i][j]:
+                continue
+            effective = confidences[i][j] * weights[i][j]
+            total_weight += effective
+            weighted_sentiment += score * effective
+            weight_sum += weights[i][j]
+        if total_weight > 0:
+            consensus.append(_clamp(weighted_sentiment / total_weight, -1.0, 1.0))
+            confidence.append(_clamp(total_weight / weight_sum, 0.0, 1.0))
+        else:
+            consensus.append(0.0)
+            confidence.append(0.0)
+    return consensus, confidence
+
+
+class SourceMatrix:
+    """
+    Source lists of N markets as padded N x S matrices.
+
+    Column j holds each market's j-th source, so consensus sums them in
+    the order the cascade produced them. Built once, then re-weighted
+    cheaply (weights()), which is what fit_source_weights() needs.
+    """
+
+    def __init__(self, source_lists: Sequence[Sequence[Dict[str, Any]]]):
+        width = max((len(sources) for sources in source_lists), default=0)
+        self.source_names: List[Optional[str]] = []
+        positions: Dict[Optional[str], int] = {}
+        scores, confidences, own_weights, codes, mask = [], [], [], [], []
+        for sources in source_lists:
+            padding = width - len(sources)
+            scores.append([source.get("score", 0) for source in sources] + [0.0] * padding)
+            confidences.append([source.get("confidence", 0.5) for source in sources] + [0.0] * padding)
+            own_weights.append([source.get("weight", 1.0) for source in sources] + [0.0] * padding)
+            row_codes = []
+            for source in sources:
+                name = source.get("source")
+                if name not in positions:
+                    positions[name] = len(self.source_names)
+                    self.source_names.append(name)
+                row_codes.append(positions[name])
+            codes.append(row_codes + [-1] * padding)
+            mask.append([True] * len(sources) + [False] * padding)
+
+        self.rows = len(scores)
+        if np is not None and self.rows >= NUMPY_MIN_ROWS:
+            scores, confidences = np.array(scores, dtype=np.float64), np.array(confidences, dtype=np.float64)
+            own_weights, codes = np.array(own_weights, dtype=np.float64), np.array(codes, dtype=np.intp)
+            mask = np.array(mask, dtype=bool)
+        self.scores, self.confidences, self.own_weights = scores, confidences, own_weights
+        self.codes, self.mask = codes, mask
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def source_counts(self) -> Dict[str, int]:
+        """Markets each source name appears in"""
+        counts = [0] * len(self.source_names)
+        for row in self.codes:
+            for code in row:
+                if code >= 0:
+                    counts[code] += 1
+        return {name: count for name, count in zip(self.source_names, counts) if count}
+
+    def weights(self, source_weights: Optional[Dict[str, float]] = None):
+        """Weight matrix: source_weights by name, else each source's own weight"""
+        if not source_weights:
+            return self.own_weights
+        lookup = [source_weights.get(name) for name in self.source_names]
+        if isinstance(self.codes, list):
+            return [
+                [own if code < 0 or lookup[code] is None else lookup[code] for code, own in zip(row, own_row)]
+                for row, own_row in zip(self.codes, self.own_weights)
+            ]
+        table = np.array([np.nan if value is None else value for value in lookup] + [np.nan], dtype=np.float64)
+        weights = table[self.codes]  # code -1 picks the trailing NaN
+        return np.where(np.isnan(weights), self.own_weights, weights)
+
+    def consensus(self, source_weights: Optional[Dict[str, float]] = None) -> Tuple[Sequence[float], Sequence[float]]:
+        """batch_consensus over every market"""
+        return batch_consensus(self.scores, self.confidences, self.weights(source_weights), self.mask)
+
+
+def consensus_from_sources(
+    source_lists: Sequence[Sequence[Dict[str, Any]]],
+    source_weights: Optional[Dict[str, float]] = None
+) -> List[Tuple[float, float]]:
+    """
+    (consensus_sentiment, consensus_confidence) per market from
+    SentimentAnalyzer-style source lists.
+
+    Args:
+        source_lists: Per market, the "sources" entries (source, score,
+            confidence, weight)
+        source_weights: Weight by source name, overriding each entry's
+            weight (None keeps them, matching _calculate_consensus exactly)
+    """
+    consensus, confidence = SourceMatrix(source_lists).consensus(source_weights)
+    return [(float(s), float(c)) for s, c in zip(consensus, confidence)]
+
+
+def _correlation(xs: Sequence[float], ys: Sequence[float]) -> float:
+    """Pearson correlation, 0.0 when either side is constant"""
+    if np is not None:
+        xs, ys = np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+        if len(xs) < 2 or xs.std() == 0 or ys.std() == 0:
+            return 0.0
+        return float(np.corrcoef(xs, ys)[0, 1])
+    try:
+        return statistics.correlation(list(xs), list(ys))
+    except statistics.StatisticsError:
+        return 0.0
+
+
+def fit_source_weights(
+    source_lists: Sequence[Sequence[Dict[str, Any]]],
+    outcomes: Sequence[float],
+    initial: Optional[Dict[str, float]] = None,
+    grid: Sequence[float] = FIT_GRID,
+    rounds: int = 3,
+    min_samples: int = MIN_CALIBRATION_SAMPLES
+) -> Dict[str, Any]:
+    """
+    Fit per-source weights on stored history.
+
+    Coordinate search: each round tries every grid value for each source in
+    turn (batch_consensus over all rows per candidate) and keeps the one
+    whose consensus correlates best with outcomes. Consensus doesn't change
+    when every weight is scaled, so the result is rescaled to the initial
+    weights' total.
+
+    Args:
+        source_lists: Per stored analysis, its "sources" entries
+        outcomes: Per stored analysis, what consensus should track (the
+            later price move)
+        initial: Starting weights (DEFAULT_SOURCE_WEIGHTS)
+        grid: Candidate weights per source
+        rounds: Passes over the sources
+        min_samples: Sources seen fewer times keep their initial weight
+
+    Returns:
+        Calibration table: {"weights", "samples", "source_samples",
+        "correlation": {"before", "after"}, "fitted_at"}
+    """
+    weights = dict(initial or DEFAULT_SOURCE_WEIGHTS)
+    matrix = SourceMatrix(source_lists)
+
+    seen = matrix.source_counts()
+    fitted = sorted(name for name, count in seen.items() if count >= min_samples and name in weights)
+
+    def score(candidate: Dict[str, float]) -> float:
+        return _correlation(matrix.consensus(candidate)[0], outcomes)
+
+    before = best = score(weights)
+    for _ in range(rounds):
+        improved = False
+        for name in fitted:
+            for value in grid:
+                if value == weights[name]:
+                    continue
+                candidate = {**weights, name: value}
+                result = score(candidate)
+                if result > best + 1e-9:
+                    best, weights, improved = result, candidate, True
+        if not improved:
+            break
+
+    initial_total = sum((initial or DEFAULT_SOURCE_WEIGHTS)[name] for name in fitted)
+    fitted_total = sum(weights[name] for name in fitted)
+    if fitted_total > 0:
+        for name in fitted:
+            weights[name] = round(weights[name] * initial_total / fitted_total, 4)
+
+    return {
+        "weights": {name: weights[name] for name in fitted},
+        "samples": len(matrix),
+        "source_samples": seen,
+        "correlation": {"before": round(before, 4), "after": round(score(weights), 4)},
+        "fitted_at": datetime.utcnow().isoformat(),
+    }
+
+
+def load_source_weights(path: str = SENTIMENT_CALIBRATION_FILE) -> Dict[str, float]:
+    """
+    Source weights: DEFAULT_SOURCE_WEIGHTS, overridden by the calibration
+    table at path (a fit_source_weights() result). A missing or unreadable
+    table logs a warning and leaves the defaults.
+    """
+    weights = dict(DEFAULT_SOURCE_WEIGHTS)
+    if not path:
+        return weights
+
+    try:
+        with open(path) as f:
+            table = json.load(f)
+        calibrated = {str(name): float(value) for name, value in table["weights"].items()}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        logger.warning(f"Ignoring sentiment calibration table {path}: {e}")
+        return weights
+
+    weights.update(calibrated)
+    logger.info(f"Loaded sentiment source weights from {path}: {calibrated}")
+    return weights
+
+
+# Module-level singleton (shared by every SentimentAnalyzer)
+_source_weights: Optional[Dict[str, float]] = None
+_weights_lock = threading.Lock()
+
+
+def get_source_weights() -> Dict[str, float]:
+    """
+    Get or load the consensus source weights.
+
+    Returns:
+        Dict[str, float]: Weight by source name
+    """
+    global _source_weights
+
+    if _source_weights is None:
+        with _weights_lock:
+            if _source_weights is None:
+                _source_weights = load_source_weights()
+
+    return _source_weights
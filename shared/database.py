@@ -7,19 +7,47 @@ Connects to Azure PostgreSQL via PgBouncer (port 6432).
 """
 
 import os
+import re
 import json
+import time
 import logging
+import threading
 import psycopg2
 from psycopg2 import pool
-from psycopg2.extras import RealDictCursor
-from typing import Optional, Dict, Any
-from datetime import datetime
+from psycopg2.extensions import connection as _PgConnection
+from psycopg2.extras import RealDictCursor, execute_batch
+from typing import Optional, Dict, Any, List
+from datetime import datetime, timedelta
+
+from .migrations import MigrationRunner, get_schema_version, latest_version
 
 logger = logging.getLogger(__name__)
 
 # Module-level connection pool (singleton)
 _connection_pool: Optional[pool.ThreadedConnectionPool] = None
 
+# Optional read-replica pool, created when POSTGRES_READ_HOST is set
+_read_connection_pool: Optional[pool.ThreadedConnectionPool] = None
+_read_pool_failed = False
+_read_pool_lock = threading.Lock()
+
+# Reads go back to the primary when the replica is further behind than this
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("POSTGRES_READ_MAX_LAG_SECONDS", "5"))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("POSTGRES_READ_LAG_CHECK_INTERVAL", "10"))
+
+# Server-side PREPARE can be disabled when running behind a transaction-mode
+# PgBouncer, which does not keep prepared statements bound to a session.
+PREPARED_STATEMENTS_ENABLED = os.getenv("POSTGRES_PREPARED_STATEMENTS", "true").lower() == "true"
+
+
+class PreparingConnection(_PgConnection):
+    """psycopg2 connection that remembers which registry statements it has prepared"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+        self.pool_role = "primary"
+
 
 # =============================================================================
 # CONNECTION POOLING (Agent 3 - Backend Core)
@@ -62,7 +90,8 @@ def get_connection_pool() -> pool.ThreadedConnectionPool:
                 keepalives=1,
                 keepalives_idle=30,
                 keepalives_interval=10,
-                keepalives_count=5
+                keepalives_count=5,
+                connection_factory=PreparingConnection
             )
             logger.info("PostgreSQL connection pool initialized successfully")
         except Exception as e:
@@ -98,6 +127,10 @@ def return_connection(conn):
     Args:
         conn: Database connection to return
     """
+    if getattr(conn, "pool_role", "primary") == "replica" and _read_connection_pool is not None:
+        _read_connection_pool.putconn(conn)
+        return
+
     pool_instance = get_connection_pool()
     pool_instance.putconn(conn)
 
@@ -107,13 +140,174 @@ def close_all_connections():
     Close all connections in the pool.
     Call this during application shutdown.
     """
-    global _connection_pool
+    global _connection_pool, _read_connection_pool
 
     if _connection_pool is not None:
         logger.info("Closing all database connections")
         _connection_pool.closeall()
         _connection_pool = None
 
+    if _read_connection_pool is not None:
+        logger.info("Closing all read replica connections")
+        _read_connection_pool.closeall()
+        _read_connection_pool = None
+
+
+# =============================================================================
+# READ REPLICA ROUTING
+# =============================================================================
+
+# Last measured replica lag, refreshed at most every REPLICA_LAG_CHECK_INTERVAL
+_replica_lag: Dict[str, Any] = {
+    "lag_seconds": None,
+    "checked_at": None,
+    "error": None
+}
+_replica_counters: Dict[str, int] = {
+    "replica_reads": 0,
+    "primary_reads": 0,
+    "lag_fallbacks": 0
+}
+_replica_counters_lock = threading.Lock()
+
+
+def _count_read(*counters: str):
+    """Increment read routing counters (called from request threads)"""
+    with _replica_counters_lock:
+        for counter in counters:
+            _replica_counters[counter] += 1
+
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM NOW() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def get_read_connection_pool() -> Optional[pool.ThreadedConnectionPool]:
+    """
+    Get or create the read replica connection pool.
+
+    Settings fall back to the primary's when only POSTGRES_READ_HOST is set:
+    POSTGRES_READ_HOST, POSTGRES_READ_PORT, POSTGRES_READ_DB,
+    POSTGRES_READ_USER, POSTGRES_READ_PASSWORD.
+
+    Returns:
+        ThreadedConnectionPool, or None when no replica is configured or it
+        could not be reached
+    """
+    global _read_connection_pool, _read_pool_failed
+
+    host = os.getenv("POSTGRES_READ_HOST")
+    if not host or _read_pool_failed:
+        return None
+
+    if _read_connection_pool is None:
+        with _read_pool_lock:
+            if _read_connection_pool is None and not _read_pool_failed:
+                logger.info(f"Initializing read replica connection pool ({host})")
+                try:
+                    _read_connection_pool = pool.ThreadedConnectionPool(
+                        minconn=2,
+                        maxconn=int(os.getenv("POSTGRES_READ_MAX_CONNECTIONS", "20")),
+                        host=host,
+                        port=os.getenv("POSTGRES_READ_PORT", os.getenv("POSTGRES_PORT", "5432")),
+                        database=os.getenv("POSTGRES_READ_DB", os.getenv("POSTGRES_DB", "polymarket_analyzer")),
+                        user=os.getenv("POSTGRES_READ_USER", os.getenv("POSTGRES_USER", "seekapaadmin")),
+                        password=os.getenv("POSTGRES_READ_PASSWORD", os.getenv("POSTGRES_PASSWORD")),
+                        sslmode="require",
+                        connect_timeout=10,
+                        keepalives=1,
+                        keepalives_idle=30,
+                        keepalives_interval=10,
+                        keepalives_count=5,
+                        connection_factory=PreparingConnection
+                    )
+                    logger.info("Read replica connection pool initialized successfully")
+                except Exception as e:
+                    # Don't retry on every read; the primary serves reads instead
+                    logger.error(f"Failed to initialize read replica pool, reads will use primary: {e}")
+                    _read_pool_failed = True
+                    return None
+
+    return _read_connection_pool
+
+
+def _measure_replica_lag(read_pool: pool.ThreadedConnectionPool) -> Optional[float]:
+    """Return cached replica lag in seconds, re-measuring when the cache is stale"""
+    now = time.monotonic()
+    checked_at = _replica_lag["checked_at"]
+    if checked_at is not None and now - checked_at < REPLICA_LAG_CHECK_INTERVAL:
+        return _replica_lag["lag_seconds"]
+
+    conn = None
+    try:
+        conn = read_pool.getconn()
+        with conn.cursor() as cursor:
+            cursor.execute(REPLICA_LAG_SQL)
+            lag = float(cursor.fetchone()[0])
+        conn.rollback()
+        _replica_lag.update({"lag_seconds": lag, "checked_at": now, "error": None})
+    except Exception as e:
+        logger.warning(f"Failed to measure replica lag: {e}")
+        _replica_lag.update({"lag_seconds": None, "checked_at": now, "error": str(e)})
+    finally:
+        if conn:
+            read_pool.putconn(conn)
+
+    return _replica_lag["lag_seconds"]
+
+
+def get_read_connection(consistent: bool = False):
+    """
+    Get a connection for a read-only operation.
+
+    Served from the replica pool when one is configured and its lag is within
+    REPLICA_MAX_LAG_SECONDS; otherwise from the primary. Return it with
+    return_connection() as usual.
+
+    Args:
+        consistent: The read must see a write made earlier in the same
+            request, so it always goes to the primary
+
+    Returns:
+        psycopg2.connection: Database connection
+    """
+    read_pool = None if consistent else get_read_connection_pool()
+
+    if read_pool is not None:
+        lag = _measure_replica_lag(read_pool)
+        if lag is not None and lag <= REPLICA_MAX_LAG_SECONDS:
+            conn = read_pool.getconn()
+            conn.pool_role = "replica"
+            _count_read("replica_reads")
+            return conn
+
+        _count_read("lag_fallbacks", "primary_reads")
+    else:
+        _count_read("primary_reads")
+    return get_connection()
+
+
+def get_replica_status() -> Dict[str, Any]:
+    """
+    Get read replica routing status.
+
+    Returns:
+        Dict with configured flag, last measured lag, threshold and read counters
+    """
+    with _replica_counters_lock:
+        counters = dict(_replica_counters)
+    return {
+        "configured": bool(os.getenv("POSTGRES_READ_HOST")) and not _read_pool_failed,
+        "lag_seconds": _replica_lag["lag_seconds"],
+        "max_lag_seconds": REPLICA_MAX_LAG_SECONDS,
+        "lag_error": _replica_lag["error"],
+        **counters
+    }
+
 
 def execute_query(query: str, params: tuple = None, fetch: bool = True):
     """
@@ -172,6 +366,361 @@ def execute_many(query: str, data: list):
             return_connection(conn)
 
 
+# =============================================================================
+# PREPARED STATEMENT REGISTRY
+# =============================================================================
+
+# Hot statements, keyed by name. Each is prepared once per connection with
+# server-side PREPARE and then run with EXECUTE, so Postgres parses and plans
+# it once instead of on every call. Parameters use $n placeholders, each
+# appearing exactly once and in order, so the same text can be converted to
+# psycopg2 %s style when preparation is disabled.
+PREPARED_QUERIES: Dict[str, str] = {
+    "upsert_market": """
+        INSERT INTO markets (
+            token_id, question, description, end_date,
+            outcome_prices, volume, active, updated_at
+        )
+        VALUES ($1, $2, $3, $4, $5, $6, $7, NOW())
+        ON CONFLICT (token_id)
+        DO UPDATE SET
+            question = EXCLUDED.question,
+            description = EXCLUDED.description,
+            end_date = EXCLUDED.end_date,
+            outcome_prices = EXCLUDED.outcome_prices,
+            volume = EXCLUDED.volume,
+            active = EXCLUDED.active,
+            updated_at = NOW()
+    """,
+    "select_market_text": """
+        SELECT question, description, volume
+        FROM markets
+        WHERE token_id = $1
+    """,
+    "select_market": """
+        SELECT token_id, question, description, end_date, outcome_prices, volume, active, updated_at
+        FROM markets
+        WHERE token_id = $1
+    """,
+    "insert_price_history": """
+        INSERT INTO price_history (token_id, price, volume)
+        VALUES ($1, $2, $3)
+    """,
+    "select_price_history_24h": """
+        SELECT price, timestamp
+        FROM price_history
+        WHERE token_id = $1
+            AND timestamp >= NOW() - INTERVAL '24 hours'
+        ORDER BY timestamp DESC
+        LIMIT 100
+    """,
+    "insert_sentiment_history": """
+        INSERT INTO sentiment_history
+        (market_id, consensus_sentiment, consensus_confidence,
+         source_scores, sources, news_context, status, created_at)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+    """,
+    "upsert_sentiment_rollups": """
+        INSERT INTO sentiment_rollups AS r
+        (market_id, bucket_size, bucket_start, samples, sentiment_sum, confidence_sum,
+         sentiment_min, sentiment_max, last_sentiment, last_at)
+        SELECT
+            v.market_id, b.bucket_size, date_trunc(b.bucket_size, v.at), 1,
+            v.sentiment, v.confidence, v.sentiment, v.sentiment, v.sentiment, v.at
+        FROM (VALUES ($1::varchar, $2::timestamp, $3::float8, $4::float8))
+            AS v(market_id, at, sentiment, confidence)
+        CROSS JOIN (VALUES ('hour'), ('day')) AS b(bucket_size)
+        ON CONFLICT (market_id, bucket_size, bucket_start)
+        DO UPDATE SET
+            samples = r.samples + 1,
+            sentiment_sum = r.sentiment_sum + EXCLUDED.sentiment_sum,
+            confidence_sum = r.confidence_sum + EXCLUDED.confidence_sum,
+            sentiment_min = LEAST(r.sentiment_min, EXCLUDED.sentiment_min),
+            sentiment_max = GREATEST(r.sentiment_max, EXCLUDED.sentiment_max),
+            last_sentiment = CASE WHEN EXCLUDED.last_at >= r.last_at
+                THEN EXCLUDED.last_sentiment ELSE r.last_sentiment END,
+            last_at = GREATEST(r.last_at, EXCLUDED.last_at)
+    """,
+    "select_latest_sentiment": """
+        SELECT market_id,
+               consensus_sentiment::float8 AS consensus_sentiment,
+               consensus_confidence::float8 AS consensus_confidence,
+               source_scores, sources, news_context, status, created_at
+        FROM sentiment_history
+        WHERE market_id = $1
+        ORDER BY created_at DESC
+        LIMIT 1
+    """,
+    "select_sentiment_rollups": """
+        SELECT bucket_start, samples,
+               sentiment_sum / samples AS avg_sentiment,
+               confidence_sum / samples AS avg_confidence,
+               sentiment_min, sentiment_max, last_sentiment
+        FROM sentiment_rollups
+        WHERE market_id = $1
+            AND bucket_size = $2
+            AND bucket_start >= $3
+        ORDER BY bucket_start
+    """,
+    "select_refresh_candidates": """
+        SELECT m.token_id, m.question, m.description, m.volume::float8, m.end_date,
+               pm.price_range, s.created_at AS last_sentiment_at
+        FROM markets m
+        LEFT JOIN LATERAL (
+            SELECT (MAX(ph.price) - MIN(ph.price))::float8 AS price_range
+            FROM price_history ph
+            WHERE ph.token_id = m.token_id
+                AND ph.timestamp >= NOW() - INTERVAL '24 hours'
+        ) pm ON true
+        LEFT JOIN LATERAL (
+            SELECT h.created_at
+            FROM sentiment_history h
+            WHERE h.market_id = m.token_id
+            ORDER BY h.created_at DESC
+            LIMIT 1
+        ) s ON true
+        WHERE m.active = true
+        ORDER BY m.volume DESC NULLS LAST
+        LIMIT $1
+    """,
+    "select_price_ranges": """
+        SELECT token_id, (MAX(price) - MIN(price))::float8 AS price_range
+        FROM price_history
+        WHERE timestamp >= NOW() - make_interval(hours => $1)
+        GROUP BY token_id
+    """,
+    "select_pending_alerts": """
+        SELECT id, market_id, alert_type, threshold::float8, updated_at
+        FROM alerts
+        WHERE enabled = true AND triggered = false AND id > $1
+        ORDER BY id
+        LIMIT $2
+    """,
+    "select_alert_changes": """
+        SELECT id, market_id, alert_type, threshold::float8, enabled, triggered, updated_at
+        FROM alerts
+        WHERE updated_at > $1
+        ORDER BY updated_at
+    """,
+    "mark_alerts_triggered": """
+        UPDATE alerts a
+        SET triggered = true, triggered_at = t.triggered_at
+        FROM unnest($1::int[], $2::timestamptz[]) AS t(id, triggered_at)
+        WHERE a.id = t.id AND a.triggered = false
+    """,
+    "insert_anomaly": """
+        INSERT INTO anomalies (market_id, metric, kind, value, z_score, mean, std, detected_at)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+    """,
+    "select_anomalies": """
+        SELECT market_id, metric, kind, value, z_score, mean, std, detected_at
+        FROM anomalies
+        WHERE detected_at >= $1
+            AND ($2::varchar IS NULL OR market_id = $3)
+            AND ($4::varchar IS NULL OR metric = $5)
+        ORDER BY detected_at DESC
+        LIMIT $6
+    """,
+    "upsert_analysis": """
+        INSERT INTO market_analysis
+        (market_id, price_trend, volume_analysis, key_insights,
+         recommendation, risk_level, confidence, created_at)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+        ON CONFLICT (market_id)
+        DO UPDATE SET
+            price_trend = EXCLUDED.price_trend,
+            volume_analysis = EXCLUDED.volume_analysis,
+            key_insights = EXCLUDED.key_insights,
+            recommendation = EXCLUDED.recommendation,
+            risk_level = EXCLUDED.risk_level,
+            confidence = EXCLUDED.confidence,
+            created_at = EXCLUDED.created_at
+    """,
+    "enqueue_analysis_job": """
+        INSERT INTO analysis_jobs (id, market_id, input_hash, payload)
+        VALUES ($1, $2, $3, $4)
+        ON CONFLICT (input_hash) WHERE status IN ('queued', 'running')
+        DO NOTHING
+        RETURNING id, status, created_at
+    """,
+    "select_inflight_analysis_job": """
+        SELECT id, status, created_at
+        FROM analysis_jobs
+        WHERE input_hash = $1
+            AND status IN ('queued', 'running')
+    """,
+    "claim_analysis_job": """
+        UPDATE analysis_jobs j
+        SET status = 'running',
+            attempts = j.attempts + 1,
+            started_at = NOW(),
+            locked_until = NOW() + make_interval(secs => $1::float8)
+        FROM (
+            SELECT id
+            FROM analysis_jobs
+            WHERE (status = 'queued' OR (status = 'running' AND locked_until < NOW()))
+                AND attempts < $2
+            ORDER BY created_at
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        ) next_job
+        WHERE j.id = next_job.id
+        RETURNING j.id, j.market_id, j.payload, j.attempts
+    """,
+    "complete_analysis_job": """
+        UPDATE analysis_jobs
+        SET status = 'succeeded', result = $1, error = NULL,
+            finished_at = NOW(), locked_until = NULL
+        WHERE id = $2 AND status = 'running' AND attempts = $3
+    """,
+    "retry_analysis_job": """
+        UPDATE analysis_jobs
+        SET status = 'queued', error = $1, locked_until = NULL
+        WHERE id = $2 AND status = 'running' AND attempts = $3
+    """,
+    "fail_analysis_job": """
+        UPDATE analysis_jobs
+        SET status = 'failed', error = $1, finished_at = NOW(), locked_until = NULL
+        WHERE id = $2 AND status = 'running' AND attempts = $3
+    """,
+    "expire_analysis_jobs": """
+        UPDATE analysis_jobs
+        SET status = 'failed', error = 'Lease expired on final attempt',
+            finished_at = NOW(), locked_until = NULL
+        WHERE status = 'running'
+            AND locked_until < NOW()
+            AND attempts >= $1
+    """,
+    "select_analysis_job": """
+        SELECT id, market_id, status, attempts, result, error,
+               created_at, started_at, finished_at
+        FROM analysis_jobs
+        WHERE id = $1
+    """,
+}
+
+# Bucket sizes maintained in sentiment_rollups
+SENTIMENT_ROLLUP_BUCKETS = ("hour", "day")
+
+_PLACEHOLDER_RE = re.compile(r"\$\d+")
+
+# Per-statement timing counters
+_query_stats: Dict[str, Dict[str, float]] = {}
+_query_stats_lock = threading.Lock()
+
+
+def _record_query_timing(name: str, elapsed_ms: float, prepared: bool):
+    """Accumulate timing counters for a registry statement"""
+    with _query_stats_lock:
+        stats = _query_stats.setdefault(name, {
+            "calls": 0,
+            "prepares": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0
+        })
+        stats["calls"] += 1
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        if prepared:
+            stats["prepares"] += 1
+
+
+def execute_prepared(cursor, name: str, params: tuple = ()):
+    """
+    Execute a registry statement by name on the given cursor.
+
+    The statement is prepared on the cursor's connection the first time it is
+    used there; later calls only send EXECUTE with the parameters. Falls back
+    to sending the statement text when preparation is disabled or the
+    connection was not created by the pool.
+
+    Args:
+        cursor: Cursor from a pooled connection
+        name: Key in PREPARED_QUERIES
+        params: Statement parameters, in $n order
+    """
+    query = PREPARED_QUERIES[name]
+    prepared_set = getattr(cursor.connection, "prepared_statements", None)
+    did_prepare = False
+
+    start = time.perf_counter()
+    if PREPARED_STATEMENTS_ENABLED and prepared_set is not None:
+        if name not in prepared_set:
+            cursor.execute(f"PREPARE {name} AS {query}")
+            prepared_set.add(name)
+            did_prepare = True
+
+        if params:
+            placeholders = ", ".join(["%s"] * len(params))
+            cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+        else:
+            cursor.execute(f"EXECUTE {name}")
+    else:
+        cursor.execute(_PLACEHOLDER_RE.sub("%s", query), params or None)
+
+    _record_query_timing(name, (time.perf_counter() - start) * 1000, did_prepare)
+
+
+def execute_prepared_batch(cursor, name: str, params_list: List[tuple], page_size: int = 100):
+    """
+    Execute a registry statement for many parameter tuples.
+
+    Uses psycopg2's execute_batch so each round trip carries up to
+    page_size EXECUTE calls. Counted as one call in the timing counters.
+
+    Args:
+        cursor: Cursor from a pooled connection
+        name: Key in PREPARED_QUERIES
+        params_list: One parameter tuple per row, in $n order
+        page_size: Statements per round trip
+    """
+    if not params_list:
+        return
+
+    query = PREPARED_QUERIES[name]
+    prepared_set = getattr(cursor.connection, "prepared_statements", None)
+    did_prepare = False
+
+    start = time.perf_counter()
+    if PREPARED_STATEMENTS_ENABLED and prepared_set is not None:
+        if name not in prepared_set:
+            cursor.execute(f"PREPARE {name} AS {query}")
+            prepared_set.add(name)
+            did_prepare = True
+
+        placeholders = ", ".join(["%s"] * len(params_list[0]))
+        execute_batch(cursor, f"EXECUTE {name} ({placeholders})", params_list, page_size=page_size)
+    else:
+        execute_batch(cursor, _PLACEHOLDER_RE.sub("%s", query), params_list, page_size=page_size)
+
+    _record_query_timing(name, (time.perf_counter() - start) * 1000, did_prepare)
+
+
+def get_query_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Get per-statement timing counters.
+
+    Returns:
+        Dict of statement name to calls, prepares, total_ms, avg_ms and max_ms
+    """
+    with _query_stats_lock:
+        return {
+            name: {
+                **stats,
+                "total_ms": round(stats["total_ms"], 3),
+                "max_ms": round(stats["max_ms"], 3),
+                "avg_ms": round(stats["total_ms"] / stats["calls"], 3) if stats["calls"] else 0.0
+            }
+            for name, stats in _query_stats.items()
+        }
+
+
+def reset_query_stats():
+    """Clear per-statement timing counters"""
+    with _query_stats_lock:
+        _query_stats.clear()
+
+
 # =============================================================================
 # DATABASE CLIENT CLASS (Agent 4 - Backend AI)
 # =============================================================================
@@ -183,54 +732,70 @@ class DatabaseClient:
         """Get database connection from the pool"""
         return get_connection()
 
+    @staticmethod
+    def _sentiment_params(market_id: str, sentiment_data: Dict[str, Any], created_at: datetime):
+        """
+        Build parameters for the history insert and rollup upsert
+
+        Returns:
+            (history_params, rollup_params); rollup_params is None for runs
+            that should not be rolled up (failed or without a score)
+        """
+        sources = sentiment_data.get("sources", [])
+        source_scores = {
+            source.get("source"): source.get("score")
+            for source in sources
+            if source.get("source")
+        }
+        consensus_sentiment = sentiment_data.get("consensus_sentiment")
+
+        history_params = (
+            market_id,
+            consensus_sentiment,
+            sentiment_data.get("consensus_confidence"),
+            json.dumps(source_scores),
+            json.dumps(sources),
+            sentiment_data.get("news_context"),
+            sentiment_data.get("status"),
+            created_at
+        )
+
+        rollup_params = None
+        if consensus_sentiment is not None and sentiment_data.get("status") != "failed_all_sources":
+            rollup_params = (
+                market_id,
+                created_at,
+                consensus_sentiment,
+                sentiment_data.get("consensus_confidence") or 0.0
+            )
+
+        return history_params, rollup_params
+
     def store_sentiment(
         self,
         market_id: str,
         sentiment_data: Dict[str, Any]
     ) -> bool:
         """
-        Store sentiment analysis results
+        Append sentiment analysis results to the history
 
-        Table: sentiment_data
-        Columns: market_id, consensus_sentiment, consensus_confidence,
-                 sources, news_context, status, created_at
+        Table: sentiment_history (append-only), plus the hourly and daily
+        sentiment_rollups buckets, updated in the same transaction.
+        Failed runs are recorded in history but not rolled up.
         """
         conn = None
         try:
             conn = get_connection()
             cursor = conn.cursor()
 
-            # Convert sources list to JSON string
-            sources_json = json.dumps(sentiment_data.get("sources", []))
-
-            query = """
-                INSERT INTO sentiment_data
-                (market_id, consensus_sentiment, consensus_confidence,
-                 sources, news_context, status, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (market_id)
-                DO UPDATE SET
-                    consensus_sentiment = EXCLUDED.consensus_sentiment,
-                    consensus_confidence = EXCLUDED.consensus_confidence,
-                    sources = EXCLUDED.sources,
-                    news_context = EXCLUDED.news_context,
-                    status = EXCLUDED.status,
-                    created_at = EXCLUDED.created_at
-            """
-
-            cursor.execute(
-                query,
-                (
-                    market_id,
-                    sentiment_data.get("consensus_sentiment"),
-                    sentiment_data.get("consensus_confidence"),
-                    sources_json,
-                    sentiment_data.get("news_context"),
-                    sentiment_data.get("status"),
-                    datetime.utcnow()
-                )
+            history_params, rollup_params = self._sentiment_params(
+                market_id, sentiment_data, datetime.utcnow()
             )
 
+            execute_prepared(cursor, "insert_sentiment_history", history_params)
+            if rollup_params:
+                execute_prepared(cursor, "upsert_sentiment_rollups", rollup_params)
+
             conn.commit()
             logger.info(f"Sentiment data stored for market {market_id}")
             return True
@@ -244,27 +809,77 @@ class DatabaseClient:
             if conn:
                 return_connection(conn)
 
-    def get_sentiment(self, market_id: str) -> Optional[Dict[str, Any]]:
-        """Get latest sentiment data for a market"""
+    def store_sentiments_bulk(self, results: List[Dict[str, Any]]) -> bool:
+        """
+        Append many sentiment results in one transaction
+
+        Args:
+            results: Sentiment results, each with a "market_id" key
+
+        Returns:
+            True if all rows were stored
+        """
+        if not results:
+            return True
+
         conn = None
         try:
             conn = get_connection()
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor = conn.cursor()
 
-            query = """
-                SELECT * FROM sentiment_data
-                WHERE market_id = %s
-                ORDER BY created_at DESC
-                LIMIT 1
-            """
+            created_at = datetime.utcnow()
+            history_rows = []
+            rollup_rows = []
+            for result in results:
+                history_params, rollup_params = self._sentiment_params(
+                    result["market_id"], result, created_at
+                )
+                history_rows.append(history_params)
+                if rollup_params:
+                    rollup_rows.append(rollup_params)
+
+            execute_prepared_batch(cursor, "insert_sentiment_history", history_rows)
+            execute_prepared_batch(cursor, "upsert_sentiment_rollups", rollup_rows)
 
-            cursor.execute(query, (market_id,))
+            conn.commit()
+            logger.info(f"Sentiment data stored for {len(results)} markets")
+            return True
+
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            logger.error(f"Failed to store sentiment data in bulk: {e}")
+            return False
+        finally:
+            if conn:
+                return_connection(conn)
+
+    def get_sentiment(self, market_id: str, consistent: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Get latest sentiment data for a market
+
+        Index lookup on sentiment_history (market_id, created_at DESC).
+        Reads from the replica unless consistent=True (read-after-write).
+
+        Returns:
+            Latest stored result, or None if the market has none
+
+        Raises:
+            Exception: If the query fails (so a failure isn't read as "never
+            analyzed")
+        """
+        conn = None
+        try:
+            conn = get_read_connection(consistent)
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+            execute_prepared(cursor, "select_latest_sentiment", (market_id,))
             result = cursor.fetchone()
 
             if result:
                 # Parse sources JSON
                 result_dict = dict(result)
-                if result_dict.get("sources"):
+                if isinstance(result_dict.get("sources"), str):
                     result_dict["sources"] = json.loads(result_dict["sources"])
                 return result_dict
             else:
@@ -272,6 +887,204 @@ class DatabaseClient:
 
         except Exception as e:
             logger.error(f"Failed to retrieve sentiment data: {e}")
+            raise
+        finally:
+            if conn:
+                return_connection(conn)
+
+    def get_market_text(self, market_id: str) -> Optional[Dict[str, Any]]:
+        """Get stored question, description and volume for a market (None if unknown)"""
+        conn = None
+        try:
+            conn = get_read_connection()
+            with conn.cursor() as cursor:
+                execute_prepared(cursor, "select_market_text", (market_id,))
+                row = cursor.fetchone()
+            conn.commit()
+
+            if row:
+                return {
+                    "question": row[0],
+                    "description": row[1] or "",
+                    "volume": float(row[2]) if row[2] is not None else None
+                }
+            return None
+
+        except Exception as e:
+            logger.error(f"Failed to retrieve market text: {e}")
+            return None
+        finally:
+            if conn:
+                return_connection(conn)
+
+    def get_market(self, market_id: str) -> Optional[Dict[str, Any]]:
+        """Get a stored market, shaped like the /api/markets entries (None if unknown)"""
+        conn = None
+        try:
+            conn = get_read_connection()
+            with conn.cursor() as cursor:
+                execute_prepared(cursor, "select_market", (market_id,))
+                row = cursor.fetchone()
+            conn.commit()
+
+            if not row:
+                return None
+            return {
+                "token_id": row[0],
+                "question": row[1],
+                "description": row[2] or "",
+                "end_date": row[3].isoformat() if row[3] else None,
+                "outcome_prices": row[4] or {},
+                "volume": float(row[5]) if row[5] is not None else 0.0,
+                "active": row[6],
+                "updated_at": row[7].isoformat() if row[7] else None
+            }
+
+        except Exception as e:
+            logger.error(f"Failed to retrieve market: {e}")
+            return None
+        finally:
+            if conn:
+                return_connection(conn)
+
+    def get_sentiment_history(
+        self,
+        market_id: str,
+        bucket: str = "hour",
+        since: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get sentiment trend for a market from the rollup table
+
+        Args:
+            market_id: Market ID
+            bucket: "hour" or "day"
+            since: Earliest bucket start (default: 7 days ago)
+
+        Returns:
+            List of buckets, oldest first:
+            {
+                "bucket_start": str,
+                "samples": int,
+                "avg_sentiment": float,
+                "avg_confidence": float,
+                "min_sentiment": float,
+                "max_sentiment": float,
+                "last_sentiment": float
+            }
+        """
+        if bucket not in SENTIMENT_ROLLUP_BUCKETS:
+            raise ValueError(f"bucket must be one of {SENTIMENT_ROLLUP_BUCKETS}")
+
+        since = since or datetime.utcnow() - timedelta(days=7)
+
+        conn = None
+        try:
+            conn = get_read_connection()
+            with conn.cursor() as cursor:
+                execute_prepared(cursor, "select_sentiment_rollups", (market_id, bucket, since))
+                rows = cursor.fetchall()
+            conn.commit()
+
+            return [
+                {
+                    "bucket_start": row[0].isoformat(),
+                    "samples": row[1],
+                    "avg_sentiment": row[2],
+                    "avg_confidence": row[3],
+                    "min_sentiment": row[4],
+                    "max_sentiment": row[5],
+                    "last_sentiment": row[6]
+                }
+                for row in rows
+            ]
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            logger.error(f"Failed to retrieve sentiment history: {e}")
+            return []
+        finally:
+            if conn:
+                return_connection(conn)
+
+    def get_refresh_candidates(self, limit: int = 2000) -> List[Dict[str, Any]]:
+        """
+        Get active markets with the signals used to prioritize sentiment refreshes
+
+        Returns:
+            List of dicts: token_id, question, description, volume, end_date,
+            price_range (24h max - min, None without ticks) and
+            last_sentiment_at (None if never analyzed)
+        """
+        conn = None
+        try:
+            conn = get_read_connection()
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                execute_prepared(cursor, "select_refresh_candidates", (limit,))
+                rows = cursor.fetchall()
+            conn.commit()
+            return [dict(row) for row in rows]
+
+        except Exception as e:
+            logger.error(f"Failed to retrieve refresh candidates: {e}")
+            return []
+        finally:
+            if conn:
+                return_connection(conn)
+
+    def get_price_ranges(self, hours: int = 24) -> Dict[str, float]:
+        """
+        Get each market's price range over the last hours, the price
+        poller's starting volatility for markets it hasn't polled yet
+
+        Returns:
+            Dict of token_id -> max - min price (markets with ticks only)
+        """
+        conn = None
+        try:
+            conn = get_read_connection()
+            with conn.cursor() as cursor:
+                execute_prepared(cursor, "select_price_ranges", (hours,))
+                rows = cursor.fetchall()
+            conn.commit()
+            return {token_id: price_range for token_id, price_range in rows}
+
+        except Exception as e:
+            logger.error(f"Failed to retrieve price ranges: {e}")
+            return {}
+        finally:
+            if conn:
+                return_connection(conn)
+
+    def get_anomalies(
+        self,
+        since: datetime,
+        market_id: Optional[str] = None,
+        metric: Optional[str] = None,
+        limit: int = 100
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get anomalies flagged since a time, newest first
+
+        Returns:
+            List of anomaly dicts, or None if the query failed
+        """
+        conn = None
+        try:
+            conn = get_read_connection()
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                execute_prepared(
+                    cursor, "select_anomalies", (since, market_id, market_id, metric, metric, limit)
+                )
+                rows = cursor.fetchall()
+            conn.commit()
+            return [
+                {**row, "detected_at": row["detected_at"].isoformat()}
+                for row in rows
+            ]
+
+        except Exception as e:
+            logger.error(f"Failed to retrieve anomalies: {e}")
             return None
         finally:
             if conn:
@@ -297,24 +1110,9 @@ class DatabaseClient:
             # Convert key_insights list to JSON string
             insights_json = json.dumps(analysis_data.get("key_insights", []))
 
-            query = """
-                INSERT INTO market_analysis
-                (market_id, price_trend, volume_analysis, key_insights,
-                 recommendation, risk_level, confidence, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (market_id)
-                DO UPDATE SET
-                    price_trend = EXCLUDED.price_trend,
-                    volume_analysis = EXCLUDED.volume_analysis,
-                    key_insights = EXCLUDED.key_insights,
-                    recommendation = EXCLUDED.recommendation,
-                    risk_level = EXCLUDED.risk_level,
-                    confidence = EXCLUDED.confidence,
-                    created_at = EXCLUDED.created_at
-            """
-
-            cursor.execute(
-                query,
+            execute_prepared(
+                cursor,
+                "upsert_analysis",
                 (
                     market_id,
                     analysis_data.get("price_trend"),
@@ -345,46 +1143,47 @@ class DatabaseClient:
 # DATABASE SCHEMA INITIALIZATION (Agent 3 - Backend Core)
 # =============================================================================
 
-SCHEMA_SQL = """
--- Markets table
-CREATE TABLE IF NOT EXISTS markets (
-    token_id VARCHAR(100) PRIMARY KEY,
-    question TEXT NOT NULL,
-    description TEXT,
-    end_date TIMESTAMP,
-    outcome_prices JSONB,
-    volume NUMERIC(20, 2),
-    active BOOLEAN DEFAULT TRUE,
-    created_at TIMESTAMP DEFAULT NOW(),
-    updated_at TIMESTAMP DEFAULT NOW()
-);
-
--- Price history table
-CREATE TABLE IF NOT EXISTS price_history (
-    id SERIAL PRIMARY KEY,
-    token_id VARCHAR(100) NOT NULL,
-    price NUMERIC(10, 6) NOT NULL,
-    volume NUMERIC(20, 2),
-    timestamp TIMESTAMP DEFAULT NOW(),
-    CONSTRAINT fk_token FOREIGN KEY (token_id) REFERENCES markets(token_id)
-);
-
--- Create indexes for performance
-CREATE INDEX IF NOT EXISTS idx_markets_active ON markets(active);
-CREATE INDEX IF NOT EXISTS idx_price_history_token ON price_history(token_id, timestamp DESC);
-CREATE INDEX IF NOT EXISTS idx_price_history_timestamp ON price_history(timestamp DESC);
-"""
+# Apply pending migrations at startup when the schema is behind. Off by
+# default: the deploy workflow runs migrate.py, so worker startup only checks
+# the version and never runs backfills or CONCURRENTLY index builds (set to
+# true for local development without a migrate step)
+AUTO_MIGRATE = os.getenv("POSTGRES_AUTO_MIGRATE", "false").lower() == "true"
 
 
-def init_database():
+def init_database() -> int:
     """
-    Initialize database schema.
-    Creates tables and indexes if they don't exist.
+    Ensure the database schema is current.
+
+    Normally a single SELECT against schema_migrations; migrations from
+    migrations/ are only applied when the database is behind.
+
+    Returns:
+        Applied schema version
+
+    Raises:
+        RuntimeError: If the schema is behind and POSTGRES_AUTO_MIGRATE is false
     """
+    expected = latest_version()
+    conn = None
     try:
-        logger.info("Initializing database schema")
-        execute_query(SCHEMA_SQL, fetch=False)
-        logger.info("Database schema initialized successfully")
+        conn = get_connection()
+        version = get_schema_version(conn)
+
+        if version is not None and version >= expected:
+            logger.info(f"Database schema is at version {version}")
+            return version
+
+        if not AUTO_MIGRATE:
+            raise RuntimeError(
+                f"Database schema version {version} is behind {expected}; run migrate.py"
+            )
+
+        logger.info(f"Database schema at version {version}, migrating to {expected}")
+        MigrationRunner(conn).run()
+        return expected
     except Exception as e:
         logger.error(f"Failed to initialize database schema: {e}")
         raise
+    finally:
+        if conn:
+            return_connection(conn)
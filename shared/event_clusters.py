@@ -0,0 +1,326 @@
+"""
+Event clustering so sibling markets share one Perplexity news fetch.
+
+Polymarket lists many markets per event ("Will BTC reach $100k by June?",
+"... $120k by June?", "... $100k by December?"). EventClusterIndex assigns
+each market to an event cluster online: question and description text is
+normalized (numbers and dates become placeholders), MinHash/LSH finds
+candidate clusters, and a question-word overlap check plus TF-IDF cosine
+against each candidate's representative confirm the match.
+NewsContextCache then holds one news summary per cluster for
+NEWS_CONTEXT_TTL_SECONDS, fetched once even when siblings ask
+concurrently, and SentimentAnalyzer reuses it for every member's prompts.
+"""
+
+import os
+import re
+import math
+import time
+import zlib
+import random
+import hashlib
+import logging
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, Any, List, Optional, Tuple, Callable, Set
+
+logger = logging.getLogger(__name__)
+
+# Set EVENT_CLUSTERING_ENABLED=false to fetch news per market again
+EVENT_CLUSTERING_ENABLED = os.getenv("EVENT_CLUSTERING_ENABLED", "true").lower() == "true"
+
+# TF-IDF cosine a market needs with a cluster representative to join it
+EVENT_CLUSTER_THRESHOLD = float(os.getenv("EVENT_CLUSTER_THRESHOLD", "0.75"))
+
+# Minimum Jaccard overlap of normalized question words. Siblings differ only
+# in numbers and dates; this keeps "Will Bitcoin reach $X" and "Will
+# Ethereum reach $X" apart when their shared template dominates the cosine
+EVENT_TITLE_MIN_OVERLAP = float(os.getenv("EVENT_TITLE_MIN_OVERLAP", "0.8"))
+
+# How long a cluster's news summary is reused
+NEWS_CONTEXT_TTL_SECONDS = int(os.getenv("NEWS_CONTEXT_TTL_SECONDS", "1800"))
+
+# Bounds on remembered clusters and cached summaries (least recently used go first)
+MAX_CLUSTERS = 50_000
+MAX_CACHED_NEWS = 5_000
+
+# MinHash: 64 permutations in 32 bands of 2 rows, so pairs with Jaccard
+# similarity around 0.3 already become candidates; cosine decides
+NUM_PERM = 64
+BANDS = 32
+
+_MERSENNE = (1 << 61) - 1
+_rng = random.Random(1)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERM)]
+
+TITLE_WEIGHT = 2  # title tokens count twice against description tokens
+
+_NUMBER_RE = re.compile(r"[$€£]?\d[\d,.]*\s*(?:k|m|b|bn|%|st|nd|rd|th)?\b")
+_MONTH_RE = re.compile(
+    r"\b(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|"
+    r"sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\b"
+)
+_WORD_RE = re.compile(r"<num>|<date>|[a-z][a-z0-9']*")
+
+STOPWORDS = frozenset({
+    "a", "an", "the", "of", "in", "on", "at", "to", "for", "by", "be", "is", "are", "was", "will",
+    "and", "or", "if", "this", "that", "it", "its", "as", "with", "from", "any", "than", "before",
+    "after", "market", "resolve", "resolves", "yes", "no", "otherwise", "end", "utc", "et", "pm", "am",
+})
+
+
+def normalize_tokens(text: str) -> List[str]:
+    """Lowercased content words with numbers as <num> and months as <date>"""
+    text = _MONTH_RE.sub(" <date> ", _NUMBER_RE.sub(" <num> ", text.lower()))
+    return [token for token in _WORD_RE.findall(text) if token not in STOPWORDS]
+
+
+def event_terms(title: str, description: str) -> Counter:
+    """Term counts for a market, title tokens weighted by TITLE_WEIGHT"""
+    terms = Counter(normalize_tokens(description or ""))
+    for token in normalize_tokens(title):
+        terms[token] += TITLE_WEIGHT
+    return terms
+
+
+def _shingles(title: str, description: str) -> Set[str]:
+    """Title unigrams and bigrams plus description unigrams"""
+    title_tokens = normalize_tokens(title)
+    shingles = set(title_tokens)
+    shingles.update(f"{a} {b}" for a, b in zip(title_tokens, title_tokens[1:]))
+    shingles.update(normalize_tokens(description or ""))
+    return shingles
+
+
+def minhash(shingles: Set[str]) -> Tuple[int, ...]:
+    """MinHash signature of a shingle set"""
+    if not shingles:
+        return (0,) * NUM_PERM
+    hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in shingles]
+    return tuple(min((a * h + b) % _MERSENNE for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def _band_keys(signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+    rows = NUM_PERM // BANDS
+    return [(band, signature[band * rows:(band + 1) * rows]) for band in range(BANDS)]
+
+
+class EventClusterIndex:
+    """Online assignment of markets to event clusters"""
+
+    def __init__(self, threshold: float = EVENT_CLUSTER_THRESHOLD,
+                 title_overlap: float = EVENT_TITLE_MIN_OVERLAP, max_clusters: int = MAX_CLUSTERS):
+        self.threshold = threshold
+        self.title_overlap = title_overlap
+        self.max_clusters = max_clusters
+        self._clusters: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = {}
+        self._df: Counter = Counter()  # representatives containing each term
+        self._lock = threading.Lock()
+
+    def _idf(self, term: str) -> float:
+        return math.log((1 + len(self._clusters)) / (1 + self._df[term])) + 1.0
+
+    def _cosine(self, a: Counter, b: Counter) -> float:
+        """TF-IDF cosine similarity of two term counts"""
+        weights_a = {term: count * self._idf(term) for term, count in a.items()}
+        weights_b = {term: count * self._idf(term) for term, count in b.items()}
+        dot = sum(weight * weights_b.get(term, 0.0) for term, weight in weights_a.items())
+        norm = math.sqrt(sum(w * w for w in weights_a.values())) * math.sqrt(sum(w * w for w in weights_b.values()))
+        return dot / norm if norm else 0.0
+
+    def assign(self, title: str, description: str) -> Dict[str, Any]:
+        """
+        Find or create the cluster for a market.
+
+        Returns:
+            {"cluster_id", "title", "description" (the representative's text,
+             used for the shared news query), "members" (assignments so
+             far, repeats included), "similarity", "created"}
+        """
+        terms = event_terms(title, description)
+        words = frozenset(token for token in normalize_tokens(title) if token not in ("<num>", "<date>"))
+        signature = minhash(_shingles(title, description))
+        bands = _band_keys(signature)
+
+        with self._lock:
+            candidates = set()
+            for key in bands:
+                candidates.update(self._buckets.get(key, ()))
+
+            best_id, best_similarity = None, 0.0
+            for cluster_id in candidates:
+                candidate = self._clusters[cluster_id]
+                union = words | candidate["words"]
+                if union and len(words & candidate["words"]) / len(union) < self.title_overlap:
+                    continue
+                similarity = self._cosine(terms, candidate["terms"])
+                if similarity > best_similarity:
+                    best_id, best_similarity = cluster_id, similarity
+
+            if best_id is not None and best_similarity >= self.threshold:
+                cluster = self._clusters[best_id]
+                cluster["members"] += 1
+                self._clusters.move_to_end(best_id)
+                created = False
+            else:
+                normalized = " ".join(normalize_tokens(title))
+                best_id = hashlib.sha1(f"{normalized}\n{description or ''}".encode("utf-8")).hexdigest()[:16]
+                cluster = self._clusters.get(best_id)
+                if cluster is None:
+                    cluster = {
+                        "title": title,
+                        "description": description,
+                        "terms": terms,
+                        "words": words,
+                        "bands": bands,
+                        "members": 0,
+                    }
+                    self._clusters[best_id] = cluster
+                    self._df.update(terms.keys())
+                    for key in bands:
+                        self._buckets.setdefault(key, set()).add(best_id)
+                    self._evict()
+                cluster["members"] += 1
+                best_similarity = 1.0
+                created = cluster["members"] == 1
+
+            return {
+                "cluster_id": best_id,
+                "title": cluster["title"],
+                "description": cluster["description"],
+                "members": cluster["members"],
+                "similarity": round(best_similarity, 4),
+                "created": created,
+            }
+
+    def _evict(self):
+        """Drop least recently matched clusters beyond max_clusters (lock held)"""
+        while len(self._clusters) > self.max_clusters:
+            cluster_id, cluster = self._clusters.popitem(last=False)
+            self._df.subtract(cluster["terms"].keys())
+            for key in cluster["bands"]:
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(cluster_id)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            members = [cluster["members"] for cluster in self._clusters.values()]
+        return {
+            "clusters": len(members),
+            "markets": sum(members),
+            "largest": max(members, default=0),
+            "threshold": self.threshold,
+            "title_overlap": self.title_overlap,
+        }
+
+
+class NewsContextCache:
+    """
+    TTL cache of news summaries per cluster.
+
+    Concurrent misses for one key wait for a single fetch. Failed fetches
+    (None) are not cached.
+    """
+
+    def __init__(self, ttl_seconds: int = NEWS_CONTEXT_TTL_SECONDS, max_entries: int = MAX_CACHED_NEWS):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "fetches": 0, "coalesced": 0, "failed": 0}
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], Optional[str]]) -> Tuple[Optional[str], bool]:
+        """
+        Cached summary for key, or fetch() it.
+
+        Returns:
+            (summary or None, True if served without calling fetch)
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and time.monotonic() - entry[0] < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self._counts["hits"] += 1
+                    return entry[1], True
+
+                waiting = self._inflight.get(key)
+                if waiting is None:
+                    done = self._inflight[key] = threading.Event()
+                    break
+                self._counts["coalesced"] += 1
+
+            # Another caller is fetching this cluster; use its result if it landed
+            waiting.wait()
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    return entry[1], True
+            # Its fetch failed: loop round and try ourselves
+
+        value = None
+        try:
+            value = fetch()
+        finally:
+            with self._lock:
+                self._counts["fetches"] += 1
+                if value is not None:
+                    self._entries[key] = (time.monotonic(), value)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                else:
+                    self._counts["failed"] += 1
+                del self._inflight[key]
+            done.set()
+
+        return value, False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._counts, "entries": len(self._entries), "ttl_seconds": self.ttl_seconds}
+
+
+# Module-level singleton instances (shared by every SentimentAnalyzer)
+_event_index: Optional[EventClusterIndex] = None
+_news_cache: Optional[NewsContextCache] = None
+_singleton_lock = threading.Lock()
+
+
+def get_event_index() -> EventClusterIndex:
+    """
+    Get or create the event cluster index singleton.
+
+    Returns:
+        EventClusterIndex: Process-wide index
+    """
+    global _event_index
+
+    if _event_index is None:
+        with _singleton_lock:
+            if _event_index is None:
+                _event_index = EventClusterIndex()
+
+    return _event_index
+
+
+def get_news_cache() -> NewsContextCache:
+    """
+    Get or create the cluster news cache singleton.
+
+    Returns:
+        NewsContextCache: Process-wide cache
+    """
+    global _news_cache
+
+    if _news_cache is None:
+        with _singleton_lock:
+            if _news_cache is None:
+                _news_cache = NewsContextCache()
+
+    return _news_cache
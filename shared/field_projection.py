@@ -0,0 +1,66 @@
+"""
+Sparse fieldsets for the fields= query parameter.
+
+fields=a,b limits each response object to those keys plus the keys every
+response of its kind keeps (its id, and status/error markers). Unknown
+field names are rejected so typos don't silently return empty objects.
+"""
+
+from typing import Dict, Any, Optional, Tuple
+
+# Kind -> (fields that may be requested, fields always returned)
+FIELDSETS: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    "market": (
+        ("token_id", "question", "description", "end_date", "outcome_prices", "volume", "active",
+         "slug", "outcome_token_ids"),
+        ("token_id",),
+    ),
+    "price": (
+        ("token_id", "current_price", "volume", "price_history_24h", "cached", "timestamp"),
+        ("token_id", "error"),
+    ),
+    "sentiment": (
+        ("market_id", "consensus_sentiment", "consensus_confidence", "sources", "source_scores",
+         "news_context", "status", "timestamp", "age_seconds", "stale", "refreshing", "deduplicated"),
+        ("market_id", "status", "error"),
+    ),
+    "analysis": (
+        ("market_id", "price_trend", "volume_analysis", "key_insights", "recommendation",
+         "risk_level", "confidence", "sentiment_score", "timestamp"),
+        ("market_id", "error"),
+    ),
+}
+
+# Market list views rarely show descriptions; MarketIndex precomputes this projection
+MARKET_LIST_FIELDS = tuple(field for field in FIELDSETS["market"][0] if field != "description")
+
+
+def parse_fields(value: Optional[str], kind: str) -> Optional[Tuple[str, ...]]:
+    """
+    Parse a fields= value.
+
+    Returns:
+        Requested plus always-returned fields in canonical order, or None
+        (every field) when value is empty
+
+    Raises:
+        ValueError: If a field is not known for this kind
+    """
+    if not value:
+        return None
+
+    allowed, always = FIELDSETS[kind]
+    requested = {field.strip() for field in value.split(",") if field.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown))} (allowed: {', '.join(allowed)})")
+
+    return tuple(field for field in allowed if field in requested or field in always)
+
+
+def project(payload: Dict[str, Any], fields: Optional[Tuple[str, ...]], kind: str) -> Dict[str, Any]:
+    """payload limited to fields and the kind's always-returned keys (payload itself if fields is None)"""
+    if fields is None:
+        return payload
+    always = FIELDSETS[kind][1]
+    return {key: value for key, value in payload.items() if key in fields or key in always}
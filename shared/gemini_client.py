@@ -2,9 +2,12 @@
 
 import os
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Iterator
 import google.generativeai as genai
 
+from .market_features import format_market_data
+from .llm_telemetry import get_llm_telemetry
+
 logger = logging.getLogger(__name__)
 
 
@@ -17,7 +20,12 @@ class GeminiClient:
             logger.warning("GEMINI_API_KEY not found in environment")
             self.api_key = None
         else:
-            genai.configure(api_key=self.api_key)
+            endpoint = os.getenv("GEMINI_API_ENDPOINT")
+            if endpoint:
+                # Custom endpoint (e.g. the LLM stand-in) over REST
+                genai.configure(api_key=self.api_key, transport="rest", client_options={"api_endpoint": endpoint})
+            else:
+                genai.configure(api_key=self.api_key)
 
         self.model_name = "gemini-2.5-flash"  # Fast reasoning model
         self.model = None
@@ -66,26 +74,32 @@ class GeminiClient:
         try:
             prompt = self._build_sentiment_prompt(market_title, market_description, context)
 
-            response = self.model.generate_content(prompt)
-
-            if response and response.text:
-                # Parse JSON response
-                import json
-                try:
-                    sentiment_data = json.loads(response.text)
-
-                    # Validate score range
-                    score = float(sentiment_data.get("score", 0))
-                    sentiment_data["score"] = max(-1.0, min(1.0, score))
-
-                    logger.info(f"Gemini sentiment analysis complete: {sentiment_data['score']}")
-                    return sentiment_data
-                except json.JSONDecodeError:
-                    logger.warning("Failed to parse Gemini sentiment JSON")
+            with get_llm_telemetry().track("gemini", "sentiment", self.model_name) as call:
+                response = self.model.generate_content(prompt)
+                usage = getattr(response, "usage_metadata", None)
+                if usage:
+                    call.usage(usage.prompt_token_count, usage.candidates_token_count)
+
+                if response and response.text:
+                    # Parse JSON response
+                    import json
+                    try:
+                        sentiment_data = json.loads(response.text)
+
+                        # Validate score range
+                        score = float(sentiment_data.get("score", 0))
+                        sentiment_data["score"] = max(-1.0, min(1.0, score))
+
+                        logger.info(f"Gemini sentiment analysis complete: {sentiment_data['score']}")
+                        return sentiment_data
+                    except json.JSONDecodeError:
+                        call.fail("parse_failure")
+                        logger.warning("Failed to parse Gemini sentiment JSON")
+                        return None
+                else:
+                    call.fail("empty")
+                    logger.warning("No response from Gemini")
                     return None
-            else:
-                logger.warning("No response from Gemini")
-                return None
 
         except Exception as e:
             logger.error(f"Gemini sentiment analysis failed: {e}")
@@ -117,26 +131,63 @@ class GeminiClient:
         try:
             prompt = self._build_analysis_prompt(market_data, sentiment_score)
 
-            response = self.model.generate_content(prompt)
-
-            if response and response.text:
-                # Parse JSON response
-                import json
-                try:
-                    analysis = json.loads(response.text)
-                    logger.info(f"Gemini market analysis complete for {market_id}")
-                    return analysis
-                except json.JSONDecodeError:
-                    logger.warning("Failed to parse Gemini analysis JSON")
+            with get_llm_telemetry().track("gemini", "market_analysis", self.model_name) as call:
+                response = self.model.generate_content(prompt)
+                usage = getattr(response, "usage_metadata", None)
+                if usage:
+                    call.usage(usage.prompt_token_count, usage.candidates_token_count)
+
+                if response and response.text:
+                    # Parse JSON response
+                    import json
+                    try:
+                        analysis = json.loads(response.text)
+                        logger.info(f"Gemini market analysis complete for {market_id}")
+                        return analysis
+                    except json.JSONDecodeError:
+                        call.fail("parse_failure")
+                        logger.warning("Failed to parse Gemini analysis JSON")
+                        return None
+                else:
+                    call.fail("empty")
+                    logger.warning("No response from Gemini")
                     return None
-            else:
-                logger.warning("No response from Gemini")
-                return None
 
         except Exception as e:
             logger.error(f"Gemini market analysis failed: {e}")
             return None
 
+    def stream_market_analysis(
+        self,
+        market_id: str,
+        market_data: Dict[str, Any],
+        sentiment_score: Optional[float] = None
+    ) -> Iterator[str]:
+        """
+        Market analysis as a stream of text fragments (same prompt as
+        analyze_market). Unlike analyze_market, errors are raised.
+
+        Yields:
+            Text fragments as the model produces them
+        """
+        if not self.is_available() or not self.model:
+            raise RuntimeError("Gemini API not configured")
+
+        prompt = self._build_analysis_prompt(market_data, sentiment_score)
+
+        with get_llm_telemetry().track("gemini", "market_analysis_stream", self.model_name) as call:
+            for chunk in self.model.generate_content(prompt, stream=True):
+                usage = getattr(chunk, "usage_metadata", None)
+                if usage:
+                    call.usage(usage.prompt_token_count, usage.candidates_token_count)
+                # .text raises on chunks without parts (e.g. the final usage chunk)
+                text = chunk.text if chunk.parts else ""
+                if text:
+                    call.first_token()
+                    yield text
+
+        logger.info(f"Gemini market analysis stream complete for {market_id}")
+
     def _build_sentiment_prompt(
         self,
         title: str,
@@ -183,7 +234,7 @@ Return ONLY the JSON object, no additional text.
 Analyze this prediction market and return ONLY valid JSON:
 
 **Market Data:**
-{market_data}
+{format_market_data(market_data)}
 """
 
         if sentiment_score is not None:
@@ -0,0 +1,279 @@
+"""
+Per-call telemetry for LLM provider calls.
+
+Every Azure OpenAI, Perplexity and Gemini request runs inside
+get_llm_telemetry().track(...), which records wall time, time to first
+token (streaming calls only), prompt/completion tokens from the provider's
+usage fields, estimated cost and outcome. Records are kept for a rolling
+window and aggregated into per-provider percentiles for GET /api/metrics.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Records older than this are dropped from aggregates
+TELEMETRY_WINDOW_SECONDS = int(os.getenv("LLM_TELEMETRY_WINDOW_SECONDS", "3600"))
+
+# Cap on records kept per provider
+TELEMETRY_MAX_RECORDS = int(os.getenv("LLM_TELEMETRY_MAX_RECORDS", "5000"))
+
+# Estimated USD prices: per 1M input tokens, per 1M output tokens, per request.
+# Override with LLM_PRICING='{"model": {"input": 1.0, "output": 2.0}}'.
+MODEL_PRICING: Dict[str, Dict[str, float]] = {
+    "gpt-5-pro": {"input": 15.00, "output": 120.00, "request": 0.0},
+    "llama-3.1-sonar-large-128k-online": {"input": 1.00, "output": 1.00, "request": 0.005},
+    "gemini-2.5-flash": {"input": 0.30, "output": 2.50, "request": 0.0},
+}
+MODEL_PRICING.update(json.loads(os.getenv("LLM_PRICING", "{}")))
+
+OUTCOMES = ("success", "parse_failure", "empty", "timeout", "http_error", "cancelled", "error")
+
+PERCENTILES = (50, 90, 99)
+
+
+def estimate_cost(model: str, prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> Optional[float]:
+    """Estimated USD cost of one call, or None for unpriced models"""
+    pricing = MODEL_PRICING.get(model)
+    if pricing is None:
+        return None
+    return (
+        (prompt_tokens or 0) * pricing.get("input", 0.0) / 1_000_000
+        + (completion_tokens or 0) * pricing.get("output", 0.0) / 1_000_000
+        + pricing.get("request", 0.0)
+    )
+
+
+def classify_exception(error: BaseException) -> str:
+    """
+    Map a provider exception to an outcome.
+
+    Matches on class names so requests, openai and google exceptions are
+    classified without importing those packages here.
+    """
+    if isinstance(error, GeneratorExit):
+        return "cancelled"  # streaming consumer went away
+    names = {cls.__name__ for cls in type(error).__mro__}
+    if isinstance(error, TimeoutError) or any("Timeout" in name for name in names):
+        return "timeout"
+    if "JSONDecodeError" in names:
+        return "parse_failure"
+    if names & {"HTTPError", "APIStatusError", "APIConnectionError", "ConnectionError", "GoogleAPIError"}:
+        return "http_error"
+    return "error"
+
+
+def _percentile(sorted_values: List[float], pct: int) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-pct * len(sorted_values) // 100))
+    return sorted_values[rank - 1]
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    """Round milliseconds for display"""
+    return round(value, 1) if value is not None else None
+
+
+class LLMCall:
+    """One in-flight provider call; filled in by the client inside track()"""
+
+    def __init__(self, provider: str, operation: str, model: str):
+        self.provider = provider
+        self.operation = operation
+        self.model = model
+        self.outcome: Optional[str] = None
+        self.prompt_tokens: Optional[int] = None
+        self.completion_tokens: Optional[int] = None
+        self.ttft_ms: Optional[float] = None
+        self._start = time.perf_counter()
+
+    def usage(self, prompt_tokens: Optional[int], completion_tokens: Optional[int]):
+        """Record token counts from the provider's usage fields"""
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+    def first_token(self):
+        """Mark the first streamed token (streaming calls only)"""
+        if self.ttft_ms is None:
+            self.ttft_ms = (time.perf_counter() - self._start) * 1000
+
+    def fail(self, outcome: str):
+        """Record a non-exception failure such as unparseable output"""
+        self.outcome = outcome
+
+
+class LLMTelemetry:
+    """Rolling per-provider call records and aggregates"""
+
+    def __init__(
+        self,
+        window_seconds: int = TELEMETRY_WINDOW_SECONDS,
+        max_records: int = TELEMETRY_MAX_RECORDS
+    ):
+        self.window_seconds = window_seconds
+        self.max_records = max_records
+        self._records: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def track(self, provider: str, operation: str, model: str) -> "_Tracker":
+        """
+        Context manager timing one provider call.
+
+        Exceptions are classified (timeout, http_error, parse_failure,
+        error) and re-raised; otherwise the outcome is success unless the
+        client called call.fail(...).
+
+        Usage:
+            with get_llm_telemetry().track("perplexity", "news_search", self.model) as call:
+                response = requests.post(...)
+                call.usage(usage["prompt_tokens"], usage["completion_tokens"])
+        """
+        return _Tracker(self, LLMCall(provider, operation, model))
+
+    def record(self, call: LLMCall, wall_ms: float):
+        """Store a finished call"""
+        entry = {
+            "at": time.time(),
+            "operation": call.operation,
+            "model": call.model,
+            "outcome": call.outcome or "success",
+            "wall_ms": wall_ms,
+            "ttft_ms": call.ttft_ms,
+            "prompt_tokens": call.prompt_tokens,
+            "completion_tokens": call.completion_tokens,
+            "cost_usd": estimate_cost(call.model, call.prompt_tokens, call.completion_tokens),
+        }
+        with self._lock:
+            records = self._records.setdefault(call.provider, deque(maxlen=self.max_records))
+            records.append(entry)
+
+        logger.debug(
+            f"LLM call {call.provider}.{call.operation}: {entry['outcome']} in {wall_ms:.0f}ms, "
+            f"tokens {call.prompt_tokens}/{call.completion_tokens}"
+        )
+
+    def _window(self, provider: str) -> List[Dict[str, Any]]:
+        """Records for a provider inside the rolling window"""
+        cutoff = time.time() - self.window_seconds
+        with self._lock:
+            records = self._records.get(provider)
+            if not records:
+                return []
+            while records and records[0]["at"] < cutoff:
+                records.popleft()
+            return list(records)
+
+    @staticmethod
+    def _aggregate(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Percentiles, token and cost totals and outcome counts"""
+        wall = sorted(r["wall_ms"] for r in records)
+        ttft = sorted(r["ttft_ms"] for r in records if r["ttft_ms"] is not None)
+        outcomes = {outcome: 0 for outcome in OUTCOMES}
+        for r in records:
+            outcomes[r["outcome"]] = outcomes.get(r["outcome"], 0) + 1
+
+        costs = [r["cost_usd"] for r in records if r["cost_usd"] is not None]
+        prompt_tokens = sum(r["prompt_tokens"] or 0 for r in records)
+        completion_tokens = sum(r["completion_tokens"] or 0 for r in records)
+
+        return {
+            "calls": len(records),
+            "success_rate": round(outcomes["success"] / len(records), 4) if records else None,
+            "outcomes": outcomes,
+            "wall_ms": {f"p{p}": _round(_percentile(wall, p)) for p in PERCENTILES},
+            "ttft_ms": {f"p{p}": _round(_percentile(ttft, p)) for p in PERCENTILES} if ttft else None,
+            "tokens": {
+                "prompt": prompt_tokens,
+                "completion": completion_tokens,
+                "avg_prompt": round(prompt_tokens / len(records), 1) if records else None,
+                "avg_completion": round(completion_tokens / len(records), 1) if records else None,
+            },
+            "cost_usd": {
+                "total": round(sum(costs), 6),
+                "per_call": round(sum(costs) / len(costs), 6) if costs else None,
+            },
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Aggregates per provider, and per operation within each provider.
+
+        Returns:
+            {"window_seconds", "generated_at", "providers": {provider: {...,
+             "operations": {operation: {...}}}}}
+        """
+        with self._lock:
+            providers = list(self._records)
+
+        result = {}
+        for provider in providers:
+            records = self._window(provider)
+            by_operation: Dict[str, List[Dict[str, Any]]] = {}
+            for r in records:
+                by_operation.setdefault(r["operation"], []).append(r)
+
+            result[provider] = {
+                **self._aggregate(records),
+                "operations": {op: self._aggregate(rs) for op, rs in by_operation.items()},
+            }
+
+        return {
+            "window_seconds": self.window_seconds,
+            "generated_at": datetime.utcnow().isoformat(),
+            "providers": result,
+        }
+
+    def reset(self):
+        """Drop all records"""
+        with self._lock:
+            self._records.clear()
+
+
+class _Tracker:
+    """Context manager returned by LLMTelemetry.track()"""
+
+    def __init__(self, telemetry: LLMTelemetry, call: LLMCall):
+        self.telemetry = telemetry
+        self.call = call
+
+    def __enter__(self) -> LLMCall:
+        self.call._start = time.perf_counter()
+        return self.call
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        wall_ms = (time.perf_counter() - self.call._start) * 1000
+        if exc is not None:
+            self.call.outcome = classify_exception(exc)
+        self.telemetry.record(self.call, wall_ms)
+        return False
+
+
+# Module-level singleton instance
+_telemetry: Optional[LLMTelemetry] = None
+_telemetry_lock = threading.Lock()
+
+
+def get_llm_telemetry() -> LLMTelemetry:
+    """
+    Get or create the LLM telemetry singleton.
+
+    Returns:
+        LLMTelemetry: Process-wide telemetry instance
+    """
+    global _telemetry
+
+    if _telemetry is None:
+        with _telemetry_lock:
+            if _telemetry is None:
+                _telemetry = LLMTelemetry()
+
+    return _telemetry
@@ -0,0 +1,171 @@
+"""
+Local lexicon sentiment: the no-network first tier of the sentiment cascade.
+
+LexiconScorer scores market text against a small weighted keyword lexicon
+with negation and intensifier handling, in microseconds per market. Its
+result joins the cascade as the "local_lexicon" source with a low weight,
+and LocalGatePolicy decides when that result alone is good enough: for
+low-volume markets where a rough score is acceptable, a confident local
+score skips Perplexity, Azure OpenAI and Gemini entirely.
+"""
+
+import os
+import re
+import json
+import math
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+# Set LOCAL_SENTIMENT_ENABLED=false to drop the local source from the cascade
+LOCAL_SENTIMENT_ENABLED = os.getenv("LOCAL_SENTIMENT_ENABLED", "true").lower() == "true"
+
+# Consensus weight of the local source (remote sources use 0.2-0.4)
+LOCAL_SENTIMENT_WEIGHT = float(os.getenv("LOCAL_SENTIMENT_WEIGHT", "0.1"))
+
+# Ceiling on local confidence; a keyword model never beats the LLMs
+LOCAL_MAX_CONFIDENCE = 0.6
+
+# Gate tiers: [max market volume (USD), min local confidence to skip remote
+# providers]. Markets above the last tier, or of unknown volume, always go
+# to the remote providers. LOCAL_SENTIMENT_GATE='[]' disables the gate.
+LOCAL_SENTIMENT_GATE: List[Tuple[float, float]] = [
+    tuple(tier) for tier in json.loads(os.getenv("LOCAL_SENTIMENT_GATE", "[[1000, 0.3], [10000, 0.45]]"))
+]
+
+# Score normalization: raw / sqrt(raw^2 + alpha) maps summed weights to -1..1
+_ALPHA = 4.0
+
+# Tokens after a negator whose polarity is flipped
+_NEGATION_SCOPE = 3
+
+LEXICON: Dict[str, float] = {
+    # Positive: progress, approval, winning, growth
+    "approve": 0.7, "approved": 0.8, "approves": 0.7, "approval": 0.6,
+    "pass": 0.5, "passed": 0.7, "passes": 0.6,
+    "win": 0.7, "wins": 0.7, "won": 0.7, "winning": 0.6, "victory": 0.8,
+    "lead": 0.4, "leads": 0.5, "leading": 0.5, "ahead": 0.4, "frontrunner": 0.6,
+    "gain": 0.5, "gains": 0.5, "gained": 0.5, "rise": 0.4, "rises": 0.4, "rising": 0.4, "rose": 0.4,
+    "surge": 0.7, "surges": 0.7, "surged": 0.7, "soar": 0.7, "soars": 0.7, "rally": 0.6, "rallies": 0.6,
+    "record": 0.4, "high": 0.2, "beat": 0.5, "beats": 0.5, "exceeds": 0.5, "exceeded": 0.5,
+    "confirmed": 0.5, "confirms": 0.5, "agreement": 0.5, "deal": 0.4, "signed": 0.5,
+    "launch": 0.4, "launched": 0.5, "success": 0.7, "successful": 0.7, "succeeds": 0.7,
+    "support": 0.3, "supports": 0.3, "backed": 0.4, "endorses": 0.5, "endorsed": 0.5,
+    "likely": 0.4, "expected": 0.3, "favored": 0.5, "favorite": 0.4, "optimistic": 0.6,
+    "bullish": 0.7, "strong": 0.4, "strength": 0.4, "growth": 0.4, "recovery": 0.5, "boost": 0.5,
+    "adoption": 0.4, "breakthrough": 0.7, "progress": 0.4, "positive": 0.5, "upgrade": 0.5,
+    # Negative: failure, rejection, decline, risk
+    "reject": -0.7, "rejected": -0.8, "rejects": -0.7, "veto": -0.7, "vetoed": -0.8,
+    "fail": -0.7, "fails": -0.7, "failed": -0.7, "failure": -0.7,
+    "lose": -0.6, "loses": -0.6, "lost": -0.6, "losing": -0.6, "defeat": -0.7, "defeated": -0.7,
+    "trail": -0.4, "trails": -0.5, "trailing": -0.5, "behind": -0.3,
+    "drop": -0.5, "drops": -0.5, "dropped": -0.5, "fall": -0.4, "falls": -0.5, "fell": -0.5,
+    "decline": -0.5, "declines": -0.5, "declined": -0.5, "plunge": -0.7, "plunges": -0.7,
+    "crash": -0.8, "crashes": -0.8, "slump": -0.6, "low": -0.2, "miss": -0.5, "missed": -0.5,
+    "delay": -0.5, "delayed": -0.6, "delays": -0.5, "postponed": -0.6, "cancelled": -0.7, "canceled": -0.7,
+    "denied": -0.6, "denies": -0.5, "blocked": -0.6, "blocks": -0.5, "ban": -0.6, "banned": -0.7,
+    "lawsuit": -0.5, "sued": -0.5, "indicted": -0.8, "charged": -0.5, "investigation": -0.4,
+    "scandal": -0.7, "fraud": -0.8, "resigns": -0.6, "resigned": -0.6, "ousted": -0.7,
+    "unlikely": -0.5, "doubt": -0.4, "doubts": -0.4, "uncertain": -0.3, "uncertainty": -0.3,
+    "bearish": -0.7, "weak": -0.4, "weakness": -0.4, "recession": -0.6, "risk": -0.3, "risks": -0.3,
+    "concern": -0.3, "concerns": -0.3, "warning": -0.4, "warns": -0.4, "opposition": -0.3,
+    "negative": -0.5, "downgrade": -0.5, "collapse": -0.8, "collapsed": -0.8, "crisis": -0.6,
+}
+
+NEGATORS = frozenset({"not", "no", "never", "without", "neither", "nor", "cannot", "won't", "isn't",
+                      "aren't", "wasn't", "didn't", "doesn't", "don't", "hasn't", "haven't"})
+
+INTENSIFIERS = {"very": 1.5, "highly": 1.5, "strongly": 1.5, "extremely": 1.8, "sharply": 1.5,
+                "slightly": 0.5, "somewhat": 0.7, "marginally": 0.5}
+
+_TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+
+class LexiconScorer:
+    """Keyword-lexicon sentiment scorer"""
+
+    def __init__(self, lexicon: Optional[Dict[str, float]] = None, max_confidence: float = LOCAL_MAX_CONFIDENCE):
+        self.lexicon = lexicon if lexicon is not None else LEXICON
+        self.max_confidence = max_confidence
+
+    def score(self, text: str) -> Dict[str, Any]:
+        """
+        Score one text.
+
+        Returns:
+            {
+                "score": float (-1 to 1),
+                "confidence": float (0 to max_confidence),
+                "matches": int (lexicon terms found),
+                "reasoning": str
+            }
+        """
+        lexicon = self.lexicon
+        positive = negative = 0.0
+        matches = 0
+        negate_until = -1
+        boost, boost_index = 1.0, -2
+
+        for index, token in enumerate(_TOKEN_RE.findall(text.lower())):
+            if token in NEGATORS or token.endswith("n't"):
+                negate_until = index + _NEGATION_SCOPE
+                continue
+            if token in INTENSIFIERS:
+                boost, boost_index = INTENSIFIERS[token], index
+                continue
+
+            weight = lexicon.get(token)
+            if weight is None:
+                continue
+
+            if index == boost_index + 1:
+                weight *= boost
+            if index <= negate_until:
+                weight = -weight * 0.75  # "not approved" is weaker than "rejected"
+            matches += 1
+            if weight > 0:
+                positive += weight
+            else:
+                negative -= weight
+
+        if not matches:
+            return {"score": 0.0, "confidence": 0.0, "matches": 0, "reasoning": "No sentiment terms found"}
+
+        raw = positive - negative
+        score = raw / math.sqrt(raw * raw + _ALPHA)
+        # Agreement: 1 when all matches share a polarity, 0 when they cancel out
+        agreement = abs(raw) / (positive + negative)
+        coverage = 1.0 - math.exp(-matches / 3.0)
+        confidence = self.max_confidence * agreement * coverage
+
+        return {
+            "score": round(max(-1.0, min(1.0, score)), 4),
+            "confidence": round(confidence, 4),
+            "matches": matches,
+            "reasoning": f"Lexicon: {matches} sentiment terms (+{positive:.2f} / -{negative:.2f})",
+        }
+
+
+class LocalGatePolicy:
+    """Decides when the local score alone is enough for a market"""
+
+    def __init__(self, tiers: Optional[Sequence[Tuple[float, float]]] = None):
+        self.tiers = sorted(tiers if tiers is not None else LOCAL_SENTIMENT_GATE)
+
+    def allows_local_only(self, confidence: float, volume: Optional[float]) -> bool:
+        """
+        True when remote providers can be skipped.
+
+        Args:
+            confidence: Local scorer confidence
+            volume: Market volume in USD; None never skips
+
+        Returns:
+            Whether the first tier covering volume accepts confidence
+        """
+        try:
+            volume = float(volume)
+        except (TypeError, ValueError):
+            return False
+        for max_volume, min_confidence in self.tiers:
+            if volume <= max_volume:
+                return confidence >= min_confidence
+        return False
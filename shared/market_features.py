@@ -0,0 +1,302 @@
+"""
+Compact numeric summaries of market history for LLM analysis prompts.
+
+Analysis requests can carry hundreds of price points; interpolating them
+into the prompt makes token count, latency and cost grow with history
+length. extract_market_features() reduces price and volume history to a
+fixed-size summary (windowed returns, realized volatility, max drawdown,
+trend slope, volume z-score and a few downsampled points) and
+format_market_data() renders it for the prompt builders in
+azure_openai.py and gemini_client.py.
+
+Prices are outcome probabilities (0..1), so returns and drawdown are
+absolute changes in probability rather than percentages, which blow up
+near zero.
+
+The statistics use the stdlib statistics module rather than numpy: on a
+1000-point history they take ~1.5ms of an ~8ms extraction (timestamp
+parsing dominates), next to an LLM call of several seconds.
+"""
+
+import os
+import math
+import statistics
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+# Set ANALYSIS_PROMPT_FEATURES=false to send raw market_data (for A/B runs)
+PROMPT_FEATURES_ENABLED = os.getenv("ANALYSIS_PROMPT_FEATURES", "true").lower() == "true"
+
+# Series keys in market_data that are summarized instead of sent raw
+PRICE_HISTORY_KEYS = ("price_history", "price_history_24h")
+VOLUME_HISTORY_KEYS = ("volume_history",)
+
+# Return windows when points carry timestamps
+TIME_WINDOWS: Tuple[Tuple[str, timedelta], ...] = (
+    ("1h", timedelta(hours=1)),
+    ("6h", timedelta(hours=6)),
+    ("24h", timedelta(hours=24)),
+    ("7d", timedelta(days=7)),
+)
+
+# Return windows, in observations, for bare lists of prices
+POINT_WINDOWS = (5, 20, 50)
+
+# Points kept from the price series, first and last included
+DOWNSAMPLE_POINTS = 8
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    """Parse an ISO8601 string (with optional Z suffix) or pass a datetime through"""
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+        except ValueError:
+            return None
+    return None
+
+
+def _to_float(value: Any) -> Optional[float]:
+    """Coerce a number or numeric string, dropping NaN and junk"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def parse_series(raw: Any, value_key: str) -> Tuple[List[float], Optional[List[datetime]], List[float]]:
+    """
+    Normalize a history list into chronological values.
+
+    Accepts bare numbers (assumed oldest first) or dicts such as the
+    /api/price rows {"price", "timestamp"}; dict points are sorted by
+    timestamp when every point has one.
+
+    Args:
+        raw: History list from market_data
+        value_key: Key holding the value in dict points ("price" or "volume")
+
+    Returns:
+        (values, timestamps or None, volumes carried on dict points)
+    """
+    if not isinstance(raw, list):
+        return [], None, []
+
+    points = []
+    for item in raw:
+        if isinstance(item, dict):
+            value = _to_float(item.get(value_key))
+            if value is not None:
+                points.append((value, _parse_timestamp(item.get("timestamp")), _to_float(item.get("volume"))))
+        else:
+            value = _to_float(item)
+            if value is not None:
+                points.append((value, None, None))
+
+    timestamped = bool(points) and all(point[1] is not None for point in points)
+    if timestamped:
+        points.sort(key=lambda point: point[1])
+
+    values = [point[0] for point in points]
+    timestamps = [point[1] for point in points] if timestamped else None
+    volumes = [point[2] for point in points if point[2] is not None]
+    return values, timestamps, volumes
+
+
+def _downsample(values: List[float], count: int) -> List[float]:
+    """Evenly spaced points including the first and last"""
+    if len(values) <= count:
+        return list(values)
+    step = (len(values) - 1) / (count - 1)
+    return [values[round(i * step)] for i in range(count)]
+
+
+def _window_returns(values: List[float], timestamps: Optional[List[datetime]]) -> Dict[str, float]:
+    """Change from the start of each window shorter than the series to the latest value"""
+    last = values[-1]
+    returns = {}
+
+    if timestamps:
+        end = timestamps[-1]
+        span = end - timestamps[0]
+        for label, window in TIME_WINDOWS:
+            if window > span:
+                break
+            cutoff = end - window
+            # First point at or after the window start
+            start = next((v for v, t in zip(values, timestamps) if t >= cutoff), last)
+            returns[label] = last - start
+    else:
+        for window in POINT_WINDOWS:
+            if window >= len(values):
+                break
+            returns[f"{window}obs"] = last - values[-window - 1]
+
+    returns["all"] = last - values[0]
+    return returns
+
+
+def price_features(values: List[float], timestamps: Optional[List[datetime]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Summarize a chronological price series.
+
+    Returns:
+        Dict with points, span_hours, last, min, max, mean, returns,
+        volatility (stdev of step changes), max_drawdown, slope (per hour
+        with timestamps, else per observation), slope_unit and downsampled;
+        None for an empty series
+    """
+    if not values:
+        return None
+
+    steps = [b - a for a, b in zip(values, values[1:])]
+
+    peak = values[0]
+    max_drawdown = 0.0
+    for value in values:
+        peak = max(peak, value)
+        max_drawdown = max(max_drawdown, peak - value)
+
+    if timestamps:
+        origin = timestamps[0]
+        xs = [(t - origin).total_seconds() / 3600 for t in timestamps]
+        slope_unit = "per_hour"
+    else:
+        xs = list(range(len(values)))
+        slope_unit = "per_observation"
+
+    slope = 0.0
+    if len(values) > 1 and xs[-1] != xs[0]:
+        slope = statistics.linear_regression(xs, values).slope
+
+    return {
+        "points": len(values),
+        "span_hours": round((timestamps[-1] - timestamps[0]).total_seconds() / 3600, 2) if timestamps else None,
+        "last": values[-1],
+        "min": min(values),
+        "max": max(values),
+        "mean": statistics.fmean(values),
+        "returns": _window_returns(values, timestamps),
+        "volatility": statistics.pstdev(steps) if len(steps) > 1 else 0.0,
+        "max_drawdown": max_drawdown,
+        "slope": slope,
+        "slope_unit": slope_unit,
+        "downsampled": _downsample(values, DOWNSAMPLE_POINTS),
+    }
+
+
+def volume_features(volumes: List[float]) -> Optional[Dict[str, Any]]:
+    """
+    Summarize a volume series.
+
+    Returns:
+        Dict with points, latest, mean, stdev and zscore of the latest value
+        against the earlier ones (None when they have no spread); None for
+        an empty series
+    """
+    if not volumes:
+        return None
+
+    latest = volumes[-1]
+    prior = volumes[:-1]
+    mean = statistics.fmean(prior) if prior else latest
+    stdev = statistics.pstdev(prior) if len(prior) > 1 else 0.0
+
+    return {
+        "points": len(volumes),
+        "latest": latest,
+        "mean": mean,
+        "stdev": stdev,
+        "zscore": (latest - mean) / stdev if stdev > 0 else None,
+    }
+
+
+def extract_market_features(market_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Replace history lists in market_data with fixed-size summaries.
+
+    Returns:
+        Dict with "fields" (every other market_data key, unchanged),
+        "price" and "volume" (summaries or None)
+    """
+    fields = {}
+    price_raw = None
+    volume_raw = None
+
+    for key, value in market_data.items():
+        if key in PRICE_HISTORY_KEYS and isinstance(value, list):
+            price_raw = price_raw or value
+        elif key in VOLUME_HISTORY_KEYS and isinstance(value, list):
+            volume_raw = volume_raw or value
+        else:
+            fields[key] = value
+
+    prices, timestamps, point_volumes = parse_series(price_raw, "price")
+    volumes = parse_series(volume_raw, "volume")[0] if volume_raw else point_volumes
+
+    return {
+        "fields": fields,
+        "price": price_features(prices, timestamps),
+        "volume": volume_features(volumes),
+    }
+
+
+def _fmt(value: float, signed: bool = False) -> str:
+    """Four significant decimals, trimmed"""
+    text = f"{value:+.4f}" if signed else f"{value:.4f}"
+    return text.rstrip("0").rstrip(".") if "." in text else text
+
+
+def format_features(features: Dict[str, Any]) -> str:
+    """Render extracted features as compact prompt lines"""
+    lines = [f"- {key}: {value}" for key, value in features["fields"].items()]
+
+    price = features["price"]
+    if price and price["points"] <= DOWNSAMPLE_POINTS:
+        # Short series cost fewer tokens as-is than summarized
+        lines.append(f"- price_history (oldest to latest): {', '.join(_fmt(v) for v in price['downsampled'])}")
+    elif price:
+        span = f" over {price['span_hours']}h" if price["span_hours"] is not None else ""
+        returns = ", ".join(f"{label} {_fmt(change, signed=True)}" for label, change in price["returns"].items())
+        unit = "/h" if price["slope_unit"] == "per_hour" else "/obs"
+        lines += [
+            f"- price_history: {price['points']} points{span}; last {_fmt(price['last'])}, "
+            f"range {_fmt(price['min'])}-{_fmt(price['max'])}, mean {_fmt(price['mean'])}",
+            f"- price_returns: {returns}",
+            f"- realized_volatility (stdev of step changes): {_fmt(price['volatility'])}",
+            f"- max_drawdown: {_fmt(price['max_drawdown'])}",
+            f"- trend_slope: {_fmt(price['slope'], signed=True)}{unit}",
+            f"- price_samples (oldest to latest): {', '.join(_fmt(v) for v in price['downsampled'])}",
+        ]
+
+    volume = features["volume"]
+    if volume:
+        zscore = _fmt(volume["zscore"], signed=True) if volume["zscore"] is not None else "n/a"
+        lines.append(
+            f"- volume_history: {volume['points']} points; latest {volume['latest']:.2f}, "
+            f"mean {volume['mean']:.2f}, z-score {zscore}"
+        )
+
+    return "\n".join(lines)
+
+
+def format_market_data(market_data: Dict[str, Any], compact: Optional[bool] = None) -> str:
+    """
+    Market Data section for analysis prompts.
+
+    Args:
+        market_data: Request market_data dict
+        compact: Summarize history (default PROMPT_FEATURES_ENABLED);
+            False sends the raw dict as before
+
+    Returns:
+        Prompt text
+    """
+    if compact is None:
+        compact = PROMPT_FEATURES_ENABLED
+    if not compact or not isinstance(market_data, dict):
+        return str(market_data)
+    return format_features(extract_market_features(market_data))
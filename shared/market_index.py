@@ -0,0 +1,287 @@
+"""
+In-memory query index over the cached market list.
+
+Built once per markets refresh over a MarketStore (shared/market_store.py)
+and never mutated, so request threads read it without locking. It holds:
+    - each market pre-serialized to JSON, so a page is a join of
+      fragments rather than a json.dumps of the whole list; the list view
+      projection (no description) is pre-serialized too, and other
+      fields= projections are cached on first use
+    - sort orders (upstream order, volume, end_date) as sorted key arrays;
+      range filters on the sort key are two bisects
+    - an inverted index from question tokens to market positions
+    - a MarketResolver from condition ids, outcome token ids and slugs
+
+Pages use keyset cursors (the last row's sort key and token_id). For the
+volume and end_date sorts they stay valid across rebuilds: a market added
+or removed between pages shifts nothing. The default sort's key is the
+upstream position, which a refresh can reorder.
+"""
+
+import re
+import json
+import base64
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple, Set
+
+from .field_projection import FIELDSETS, MARKET_LIST_FIELDS
+from .market_store import MarketStore
+from .market_resolver import MarketResolver, Resolution
+
+SORT_KEYS = ("default", "volume", "end_date")
+DEFAULT_ORDER = {"default": "asc", "volume": "desc", "end_date": "asc"}
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Projections serialized for the whole list per index; rarer ones are
+# serialized per returned row
+MAX_CACHED_PROJECTIONS = 8
+
+# Scan the sort order unless text search leaves fewer than 1/8 of its range,
+# in which case the matches are ranked directly
+_SELECTIVE_FRACTION = 8
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_MAX_ID = "\U0010ffff"
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased alphanumeric tokens"""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def encode_cursor(sort: str, order: str, key: Any, token_id: str) -> str:
+    """Opaque cursor resuming after the row with this sort key"""
+    raw = json.dumps([sort, order, key, token_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str, Any, str]:
+    """
+    Decode a cursor from encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        sort, order, key, token_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if sort not in SORT_KEYS or order not in ("asc", "desc") or not isinstance(token_id, str):
+        raise ValueError("Invalid cursor")
+    key_type = {"default": int, "volume": (int, float), "end_date": str}[sort]
+    if not isinstance(key, key_type) or isinstance(key, bool):
+        raise ValueError("Invalid cursor")
+    return sort, order, key, token_id
+
+
+class MarketIndex:
+    """Sorted and inverted indexes over one market snapshot"""
+
+    def __init__(self, markets):
+        """
+        Args:
+            markets: MarketStore, or market dicts to build one from
+        """
+        store = markets if isinstance(markets, MarketStore) else MarketStore(markets)
+        self.store = store
+        self.resolver = MarketResolver(store)
+        self.built_at = datetime.utcnow()
+        count = len(store)
+        self.encoded = [json.dumps(store.to_dict(i)) for i in range(count)]
+        self._projections: Dict[Tuple[str, ...], List[str]] = {
+            FIELDSETS["market"][0]: self.encoded,
+        }
+        self._projected(MARKET_LIST_FIELDS)
+
+        ids = store.token_ids
+        self._volumes = store.volumes
+        # Undated markets sort before every dated one, and drop out of end_date windows
+        self._end_dates = [end_date or "" for end_date in store.end_dates]
+        self._active = store.active
+
+        key_values = {
+            "default": range(count),
+            "volume": self._volumes,
+            "end_date": self._end_dates,
+        }
+        # sort -> (ascending (key, token_id) list, positions in that order, position -> rank)
+        self._orders: Dict[str, Tuple[List[Tuple[Any, str]], List[int], List[int]]] = {}
+        for sort, values in key_values.items():
+            order = sorted(range(count), key=lambda i: (values[i], ids[i]))
+            rank = [0] * count
+            for r, i in enumerate(order):
+                rank[i] = r
+            self._orders[sort] = ([(values[i], ids[i]) for i in order], order, rank)
+
+        self._postings: Dict[str, List[int]] = {}
+        for position, question in enumerate(store.questions):
+            for token in set(tokenize(question)):
+                self._postings.setdefault(token, []).append(position)
+        self._vocabulary = sorted(self._postings)
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def get(self, token_id: str) -> Optional[Dict[str, Any]]:
+        """Full market by token_id"""
+        return self.store.get(token_id)
+
+    def resolve(self, identifier: str) -> Optional[Resolution]:
+        """Market named by a condition id, outcome token id or slug"""
+        return self.resolver.resolve(identifier)
+
+    def _projected(self, fields: Tuple[str, ...]) -> Optional[List[str]]:
+        """Serialized projection of every market, if cached or room to cache it"""
+        fragments = self._projections.get(fields)
+        if fragments is None and len(self._projections) < MAX_CACHED_PROJECTIONS:
+            # Concurrent first uses may both build it; either result is the same
+            fragments = [json.dumps(self.store.to_dict(i, fields)) for i in range(len(self.store))]
+            self._projections[fields] = fragments
+        return fragments
+
+    def fragments(self, positions: List[int], fields: Optional[Tuple[str, ...]] = None) -> List[str]:
+        """Serialized markets at positions, limited to fields (parse_fields() output)"""
+        projected = self._projected(fields) if fields is not None else self.encoded
+        if projected is not None:
+            return [projected[i] for i in positions]
+        return [json.dumps(self.store.to_dict(i, fields)) for i in positions]
+
+    def all(self, fields: Optional[Tuple[str, ...]] = None) -> List[str]:
+        """Every market, serialized, in upstream order"""
+        return self.fragments(range(len(self.store)), fields)
+
+    def search(self, text: str) -> Set[int]:
+        """
+        Positions of markets whose question has every token of text; the
+        last token also matches as a prefix ("elec" finds "election").
+        """
+        tokens = tokenize(text)
+        if not tokens:
+            return set(range(len(self.store)))
+
+        postings = []
+        for token in tokens[:-1]:
+            postings.append(self._postings.get(token, ()))
+        prefix = tokens[-1]
+        start = bisect_left(self._vocabulary, prefix)
+        end = bisect_left(self._vocabulary, prefix + _MAX_ID)
+        prefixed: Set[int] = set()
+        for word in self._vocabulary[start:end]:
+            prefixed.update(self._postings[word])
+
+        matches = prefixed
+        for positions in sorted(postings, key=len):
+            if not matches:
+                break
+            matches = matches.intersection(positions)
+        return matches
+
+    def query(
+        self,
+        q: Optional[str] = None,
+        active: Optional[bool] = None,
+        min_volume: Optional[float] = None,
+        max_volume: Optional[float] = None,
+        end_after: Optional[str] = None,
+        end_before: Optional[str] = None,
+        sort: str = "default",
+        order: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[Tuple[str, str, Any, str]] = None,
+        fields: Optional[Tuple[str, ...]] = None
+    ) -> Tuple[List[str], Optional[str]]:
+        """
+        One page of markets.
+
+        Range filters on the sort key narrow the scan by bisection; the
+        other filters are checked per row, so a page costs O(limit) rows
+        examined for unselective filters.
+
+        Args:
+            q: Question text search (all tokens, last one as a prefix)
+            active: Only markets with this active flag
+            min_volume, max_volume: Inclusive volume range
+            end_after, end_before: ISO end_date window, [after, before)
+            sort: One of SORT_KEYS
+            order: "asc" or "desc" (default per sort key)
+            limit: Page size
+            cursor: decode_cursor() result from the previous page
+            fields: Projection from parse_fields(), None for every field
+
+        Returns:
+            (JSON fragments of the page's markets, next cursor or None)
+
+        Raises:
+            ValueError: If the cursor was issued for another sort or order
+        """
+        order = order or DEFAULT_ORDER[sort]
+        descending = order == "desc"
+        keys, positions, rank = self._orders[sort]
+
+        lo, hi = 0, len(keys)
+        if sort == "volume":
+            if min_volume is not None:
+                lo = bisect_left(keys, (min_volume,))
+            if max_volume is not None:
+                hi = bisect_right(keys, (max_volume, _MAX_ID))
+        elif sort == "end_date" and (end_after or end_before):
+            lo = bisect_right(keys, ("", _MAX_ID))
+            if end_after:
+                lo = max(lo, bisect_left(keys, (end_after,)))
+            if end_before:
+                hi = bisect_left(keys, (end_before,))
+
+        if cursor is not None:
+            if cursor[0] != sort or cursor[1] != order:
+                raise ValueError("Cursor does not match sort and order")
+            if descending:
+                hi = min(hi, bisect_left(keys, (cursor[2], cursor[3])))
+            else:
+                lo = max(lo, bisect_right(keys, (cursor[2], cursor[3])))
+
+        matches = self.search(q) if q else None
+        if matches is not None and len(matches) * _SELECTIVE_FRACTION < hi - lo:
+            ranks = sorted(r for r in (rank[i] for i in matches) if lo <= r < hi)
+            candidates = reversed(ranks) if descending else iter(ranks)
+            matches = None  # already applied
+        else:
+            candidates = iter(range(hi - 1, lo - 1, -1) if descending else range(lo, hi))
+
+        check_volume = sort != "volume" and (min_volume is not None or max_volume is not None)
+        check_end = sort != "end_date" and bool(end_after or end_before)
+
+        page: List[int] = []
+        for r in candidates:
+            i = positions[r]
+            if matches is not None and i not in matches:
+                continue
+            if active is not None and self._active[i] != active:
+                continue
+            if check_volume:
+                volume = self._volumes[i]
+                if (min_volume is not None and volume < min_volume) or (max_volume is not None and volume > max_volume):
+                    continue
+            if check_end:
+                end_date = self._end_dates[i]
+                if not end_date or (end_after and end_date < end_after) or (end_before and end_date >= end_before):
+                    continue
+            page.append(r)
+            if len(page) > limit:
+                break
+
+        next_cursor = None
+        if len(page) > limit:
+            page.pop()
+            last_key, last_id = keys[page[-1]]
+            next_cursor = encode_cursor(sort, order, last_key, last_id)
+
+        return self.fragments([positions[r] for r in page], fields), next_cursor
+
+
+def page_body(fragments: List[str], meta: Dict[str, Any]) -> str:
+    """Response JSON with the pre-serialized markets spliced in front of meta"""
+    markets = '{"markets": [' + ", ".join(fragments) + "]"
+    return markets + ", " + json.dumps(meta)[1:] if meta else markets + "}"
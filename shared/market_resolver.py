@@ -0,0 +1,112 @@
+"""
+Market identifier resolution: condition id, outcome token id or slug.
+
+Polymarket names one market three ways: its condition id ("0x" + 64 hex,
+the token_id field of our market records and the key the CLOB /markets
+endpoint takes), the ERC-1155 token id of each outcome (a decimal
+string, what the order book endpoints take) and its URL slug.
+MarketResolver maps all of them to the market's row in a MarketStore
+with one dict lookup. It is built with each market refresh (MarketIndex
+holds one) and never mutated.
+
+identifier_kind() tells the three formats apart, so an identifier that
+is none of them is rejected without asking the CLOB API, and one that is
+well-formed but not in the snapshot only goes upstream when the upstream
+call can take it (condition ids).
+"""
+
+import re
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from .market_store import MarketStore
+
+CONDITION_ID = "condition_id"
+TOKEN_ID = "token_id"
+SLUG = "slug"
+
+_CONDITION_ID_RE = re.compile(r"0x[0-9a-f]{64}")
+_TOKEN_ID_RE = re.compile(r"[0-9]{1,78}")
+_SLUG_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+MAX_SLUG_LENGTH = 200
+
+# Token id entries pack (row, outcome) as row << _OUTCOME_BITS | outcome
+_OUTCOME_BITS = 8
+
+
+class Resolution(NamedTuple):
+    """A resolved identifier"""
+    condition_id: str  # canonical id (the market record's token_id)
+    row: int  # MarketStore row
+    kind: str  # which kind of identifier matched
+    outcome: Optional[int]  # outcome index, for an outcome token id
+
+
+def normalize_identifier(identifier: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(kind, lookup key) of an identifier, or None if it is none of the three"""
+    if not isinstance(identifier, str) or not identifier:
+        return None
+    key = identifier.strip()
+    if _TOKEN_ID_RE.fullmatch(key):
+        return TOKEN_ID, key
+    key = key.lower()
+    if _CONDITION_ID_RE.fullmatch(key):
+        return CONDITION_ID, key
+    if len(key) <= MAX_SLUG_LENGTH and _SLUG_RE.fullmatch(key):
+        return SLUG, key
+    return None
+
+
+def identifier_kind(identifier: Optional[str]) -> Optional[str]:
+    """CONDITION_ID, TOKEN_ID, SLUG, or None if it is none of them"""
+    normalized = normalize_identifier(identifier)
+    return normalized[0] if normalized else None
+
+
+class MarketResolver:
+    """Identifier -> market row index over one MarketStore"""
+
+    def __init__(self, store: MarketStore):
+        self.store = store
+        # Within a kind the first row wins, as for MarketStore.row()
+        self._conditions: Dict[str, int] = {}
+        self._tokens: Dict[str, int] = {}
+        self._slugs: Dict[str, int] = {}
+        for row, condition_id in enumerate(store.token_ids):
+            if condition_id:
+                self._conditions.setdefault(condition_id.lower(), row)
+        for row, token_ids in enumerate(store.outcome_token_ids):
+            for outcome, token_id in enumerate(token_ids[:1 << _OUTCOME_BITS]):
+                if token_id:
+                    self._tokens.setdefault(str(token_id), row << _OUTCOME_BITS | outcome)
+        for row, slug in enumerate(store.slugs):
+            if slug:
+                self._slugs.setdefault(slug.lower(), row)
+
+    def __len__(self) -> int:
+        return len(self._conditions) + len(self._tokens) + len(self._slugs)
+
+    def resolve(self, identifier: Optional[str]) -> Optional[Resolution]:
+        """Market an identifier names, or None (unknown or malformed)"""
+        normalized = normalize_identifier(identifier)
+        if normalized is None:
+            return None
+        kind, key = normalized
+
+        outcome = None
+        if kind == TOKEN_ID:
+            packed = self._tokens.get(key)
+            if packed is None:
+                return None
+            row, outcome = packed >> _OUTCOME_BITS, packed & ((1 << _OUTCOME_BITS) - 1)
+        else:
+            row = (self._conditions if kind == CONDITION_ID else self._slugs).get(key)
+            if row is None:
+                return None
+        return Resolution(self.store.token_ids[row], row, kind, outcome)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "condition_ids": len(self._conditions),
+            "token_ids": len(self._tokens),
+            "slugs": len(self._slugs),
+        }
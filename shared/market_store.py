@@ -0,0 +1,152 @@
+"""
+Compact, immutable column store for the cached market list.
+
+The markets cache used to be a list of the dicts PolymarketClient returns:
+one dict, one float and fresh copies of repeated strings per market.
+MarketStore keeps the same data as columns instead:
+    - volumes in an array('d') and active flags in a bytes column
+    - string columns as lists whose repeated values (end dates, sibling
+      descriptions, outcome names) share one object per build
+    - outcome_prices as tuples, identical price sets shared
+    - a token_id -> row index (shared/market_resolver.py adds outcome
+      token ids and slugs)
+
+A store is never mutated after construction. A refresh builds a new one
+and swaps the module reference, so a reader that took a reference keeps
+a consistent snapshot for as long as it holds it, without locking or
+copying. benchmarks/market_store.py measures the footprint against the
+list of dicts.
+"""
+
+from array import array
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+# Column order matches the dicts PolymarketClient.get_markets returns
+MARKET_FIELDS = (
+    "token_id", "question", "description", "end_date", "outcome_prices", "volume", "active",
+    "slug", "outcome_token_ids",
+)
+
+
+class _PriceMap(tuple):
+    """Frozen outcome -> price mapping, as (outcome, price) pairs"""
+    __slots__ = ()
+
+
+_EMPTY_PRICES = _PriceMap()
+
+
+def _volume(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class MarketStore:
+    """Columnar market table with a token_id index"""
+
+    __slots__ = (
+        "token_ids", "questions", "descriptions", "end_dates", "outcome_prices",
+        "volumes", "active", "slugs", "outcome_token_ids", "_rows",
+    )
+
+    def __init__(self, markets: Iterable[Dict[str, Any]] = ()):
+        """
+        Build a store from market dicts (PolymarketClient.get_markets output).
+
+        Args:
+            markets: Market dicts; fields other than MARKET_FIELDS are dropped
+        """
+        # Per-build pools rather than sys.intern, so values from old
+        # snapshots are freed with them
+        strings: Dict[str, str] = {}
+        prices: Dict[Any, Any] = {}
+
+        def shared(value):
+            return strings.setdefault(value, value) if isinstance(value, str) else value
+
+        def freeze(value):
+            if isinstance(value, dict):
+                frozen = _PriceMap((shared(k), v) for k, v in value.items()) if value else _EMPTY_PRICES
+            elif isinstance(value, (list, tuple)):
+                frozen = tuple(shared(v) for v in value)
+            else:
+                return value
+            try:
+                # Keyed by type too: () and an empty _PriceMap compare equal
+                return prices.setdefault((type(frozen), frozen), frozen)
+            except TypeError:  # unhashable nested values
+                return frozen
+
+        self.token_ids: List[str] = []
+        self.questions: List[str] = []
+        self.descriptions: List[Optional[str]] = []
+        self.end_dates: List[Optional[str]] = []
+        self.outcome_prices: List[Any] = []
+        self.slugs: List[Optional[str]] = []
+        self.outcome_token_ids: List[Tuple[str, ...]] = []
+        volumes: List[float] = []
+        active = bytearray()
+
+        for market in markets:
+            self.token_ids.append(shared(market.get("token_id") or ""))
+            self.questions.append(shared(market.get("question") or ""))
+            self.descriptions.append(shared(market.get("description")))
+            self.end_dates.append(shared(market.get("end_date")))
+            self.outcome_prices.append(freeze(market.get("outcome_prices", _EMPTY_PRICES)))
+            self.slugs.append(shared(market.get("slug")))
+            self.outcome_token_ids.append(tuple(market.get("outcome_token_ids") or ()))
+            volumes.append(_volume(market.get("volume")))
+            active.append(1 if market.get("active", True) else 0)
+
+        self.volumes = array("d", volumes)
+        self.active = bytes(active)
+        # First row wins for a repeated token_id, like a scan of the list would
+        self._rows: Dict[str, int] = {}
+        for row, token_id in enumerate(self.token_ids):
+            self._rows.setdefault(token_id, row)
+
+    def __len__(self) -> int:
+        return len(self.token_ids)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for row in range(len(self.token_ids)):
+            yield self.to_dict(row)
+
+    def row(self, token_id: str) -> Optional[int]:
+        """Row of a market, or None"""
+        return self._rows.get(token_id)
+
+    def value(self, row: int, field: str) -> Any:
+        """One field of one row, in its get_markets form"""
+        if field == "volume":
+            return self.volumes[row]
+        if field == "active":
+            return bool(self.active[row])
+        if field == "outcome_prices":
+            prices = self.outcome_prices[row]
+            if isinstance(prices, _PriceMap):
+                return dict(prices)
+            return list(prices) if isinstance(prices, tuple) else prices
+        if field == "outcome_token_ids":
+            return list(self.outcome_token_ids[row])
+        return getattr(self, _COLUMNS[field])[row]
+
+    def to_dict(self, row: int, fields: Tuple[str, ...] = MARKET_FIELDS) -> Dict[str, Any]:
+        """Row as a fresh market dict (callers may modify it)"""
+        return {field: self.value(row, field) for field in fields}
+
+    def get(self, token_id: str) -> Optional[Dict[str, Any]]:
+        """Market dict by token_id, or None"""
+        row = self._rows.get(token_id)
+        return self.to_dict(row) if row is not None else None
+
+
+_COLUMNS = {
+    "token_id": "token_ids",
+    "question": "questions",
+    "description": "descriptions",
+    "end_date": "end_dates",
+    "slug": "slugs",
+}
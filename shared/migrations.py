@@ -0,0 +1,437 @@
+"""
+Versioned schema migrations.
+
+Migration files live in migrations/ and are named NNN_description.sql. Each
+file is applied once, in version order, and recorded with its SHA-256
+checksum in schema_migrations. Files run inside a single transaction unless
+they start with the "-- migrate:no-transaction" directive, which is required
+for CREATE INDEX CONCURRENTLY; those run one statement at a time in
+autocommit and must be idempotent (IF NOT EXISTS).
+"""
+
+import os
+import re
+import time
+import hashlib
+import logging
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Callable
+
+import psycopg2
+from psycopg2 import errors
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+NO_TRANSACTION_DIRECTIVE = "-- migrate:no-transaction"
+
+# Arbitrary key so only one instance migrates at a time
+MIGRATION_LOCK_KEY = 724_311_026
+
+_FILENAME_RE = re.compile(r"^(\d+)_([\w-]+)\.sql$")
+_DOLLAR_TAG_RE = re.compile(r"\$([A-Za-z_][A-Za-z0-9_]*)?\$")
+
+SCHEMA_MIGRATIONS_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        checksum CHAR(64) NOT NULL,
+        execution_ms NUMERIC(12, 3),
+        applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+class MigrationError(Exception):
+    """Raised when a migration cannot be applied or history does not match the files"""
+
+
+class Migration:
+    """A single migration file"""
+
+    def __init__(self, version: int, name: str, path: Path, sql: str):
+        self.version = version
+        self.name = name
+        self.path = path
+        self.sql = sql
+        self.checksum = hashlib.sha256(sql.encode("utf-8")).hexdigest()
+        self.transactional = not sql.lstrip().startswith(NO_TRANSACTION_DIRECTIVE)
+
+    def statements(self) -> List[str]:
+        """Split the file into individual statements"""
+        return split_sql_statements(self.sql)
+
+    def __repr__(self):
+        return f"Migration({self.version:03d}_{self.name})"
+
+
+def split_sql_statements(sql: str) -> List[str]:
+    """
+    Split SQL text into statements on top-level semicolons.
+
+    Semicolons inside quoted strings, quoted identifiers, comments and
+    dollar-quoted bodies (plpgsql $$ ... $$) are not treated as separators.
+    Statements consisting only of comments are dropped.
+
+    Args:
+        sql: SQL script text
+
+    Returns:
+        List of statements without trailing semicolons
+    """
+    statements = []
+    current = []
+    has_code = False
+    i = 0
+    length = len(sql)
+
+    while i < length:
+        char = sql[i]
+        nxt = sql[i + 1] if i + 1 < length else ""
+
+        # Line comment
+        if char == "-" and nxt == "-":
+            end = sql.find("\n", i)
+            end = length if end == -1 else end
+            current.append(sql[i:end])
+            i = end
+            continue
+
+        # Block comment (Postgres allows nesting)
+        if char == "/" and nxt == "*":
+            depth = 0
+            j = i
+            while j < length:
+                if sql.startswith("/*", j):
+                    depth += 1
+                    j += 2
+                elif sql.startswith("*/", j):
+                    depth -= 1
+                    j += 2
+                    if depth == 0:
+                        break
+                else:
+                    j += 1
+            current.append(sql[i:j])
+            i = j
+            continue
+
+        # Quoted string or identifier; E'' strings honour backslash escapes
+        if char in ("'", '"'):
+            escapes = char == "'" and i > 0 and sql[i - 1] in "eE" and (
+                i < 2 or not (sql[i - 2].isalnum() or sql[i - 2] == "_")
+            )
+            j = i + 1
+            while j < length:
+                if escapes and sql[j] == "\\":
+                    j += 2
+                    continue
+                if sql[j] == char:
+                    # Doubled quote is an escaped quote
+                    if j + 1 < length and sql[j + 1] == char:
+                        j += 2
+                        continue
+                    break
+                j += 1
+            current.append(sql[i:j + 1])
+            has_code = True
+            i = j + 1
+            continue
+
+        # Dollar-quoted body
+        if char == "$" and not (i > 0 and (sql[i - 1].isalnum() or sql[i - 1] == "_")):
+            match = _DOLLAR_TAG_RE.match(sql, i)
+            if match:
+                tag = match.group(0)
+                end = sql.find(tag, match.end())
+                end = length if end == -1 else end + len(tag)
+                current.append(sql[i:end])
+                has_code = True
+                i = end
+                continue
+
+        if char == ";":
+            if has_code:
+                statements.append("".join(current).strip())
+            current = []
+            has_code = False
+            i += 1
+            continue
+
+        if not char.isspace():
+            has_code = True
+        current.append(char)
+        i += 1
+
+    if has_code:
+        statements.append("".join(current).strip())
+
+    return statements
+
+
+def load_migrations(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    """
+    Load migration files in version order.
+
+    Raises:
+        MigrationError: If two files share a version number
+    """
+    migrations = []
+    seen = {}
+
+    for path in sorted(Path(directory).glob("*.sql")):
+        match = _FILENAME_RE.match(path.name)
+        if not match:
+            logger.warning(f"Ignoring migration file with unexpected name: {path.name}")
+            continue
+
+        version = int(match.group(1))
+        if version in seen:
+            raise MigrationError(f"Duplicate migration version {version}: {seen[version]} and {path.name}")
+        seen[version] = path.name
+
+        migrations.append(Migration(version, match.group(2), path, path.read_text(encoding="utf-8")))
+
+    return sorted(migrations, key=lambda m: m.version)
+
+
+def latest_version(directory: Path = MIGRATIONS_DIR) -> int:
+    """Highest migration version on disk (0 if none)"""
+    migrations = load_migrations(directory)
+    return migrations[-1].version if migrations else 0
+
+
+def get_schema_version(conn) -> Optional[int]:
+    """
+    Get the applied schema version with a single query.
+
+    Returns:
+        Highest applied version, 0 if no migration has been applied, or None
+        if schema_migrations does not exist yet
+    """
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+            version = cursor.fetchone()[0]
+        conn.rollback()
+        return int(version)
+    except errors.UndefinedTable:
+        conn.rollback()
+        return None
+
+
+class MigrationRunner:
+    """Applies pending migrations on one connection"""
+
+    def __init__(
+        self,
+        conn,
+        directory: Path = MIGRATIONS_DIR,
+        lock_timeout: Optional[str] = None,
+        statement_timeout: Optional[str] = None,
+        index_statement_timeout: Optional[str] = None,
+        log: Optional[Callable[[str, str, Optional[Dict]], None]] = None
+    ):
+        """
+        Args:
+            conn: psycopg2 connection (autocommit is toggled per migration)
+            directory: Directory containing migration files
+            lock_timeout: Max wait for a table lock (default MIGRATION_LOCK_TIMEOUT or 5s)
+            statement_timeout: Max time per statement in transactional
+                migrations (default MIGRATION_STATEMENT_TIMEOUT or 5min)
+            index_statement_timeout: Max time per statement in no-transaction
+                migrations (default MIGRATION_INDEX_STATEMENT_TIMEOUT or 60min)
+            log: Optional callback(level, message, details) for CLI output
+        """
+        self.conn = conn
+        self.directory = directory
+        self.lock_timeout = lock_timeout or os.getenv("MIGRATION_LOCK_TIMEOUT", "5s")
+        self.statement_timeout = statement_timeout or os.getenv("MIGRATION_STATEMENT_TIMEOUT", "5min")
+        self.index_statement_timeout = index_statement_timeout or os.getenv(
+            "MIGRATION_INDEX_STATEMENT_TIMEOUT", "60min"
+        )
+        self._log_callback = log
+
+    def log(self, level: str, message: str, details: Optional[Dict] = None):
+        """Log through the callback if given, else the module logger"""
+        if self._log_callback:
+            self._log_callback(level, message, details)
+        else:
+            log_level = logging.ERROR if level == "ERROR" else (
+                logging.WARNING if level == "WARNING" else logging.INFO
+            )
+            logger.log(log_level, f"{message} {details}" if details else message)
+
+    def applied(self) -> Dict[int, str]:
+        """Applied versions mapped to their recorded checksums"""
+        with self.conn.cursor() as cursor:
+            cursor.execute("SELECT version, checksum FROM schema_migrations ORDER BY version")
+            return {row[0]: row[1].strip() for row in cursor.fetchall()}
+
+    def pending(self) -> List[Migration]:
+        """
+        Migrations not yet applied.
+
+        Raises:
+            MigrationError: If an applied migration's file was edited or removed
+        """
+        migrations = load_migrations(self.directory)
+        applied = self.applied()
+        by_version = {m.version: m for m in migrations}
+
+        for version, checksum in applied.items():
+            migration = by_version.get(version)
+            if migration is None:
+                raise MigrationError(f"Applied migration {version} has no file in {self.directory}")
+            if migration.checksum != checksum:
+                raise MigrationError(
+                    f"Checksum mismatch for {migration.path.name}: applied migrations must not be edited"
+                )
+
+        return [m for m in migrations if m.version not in applied]
+
+    def run(self) -> List[Dict[str, Any]]:
+        """
+        Apply all pending migrations in order.
+
+        Returns:
+            Per-migration results with version, name, total and per-step timings
+
+        Raises:
+            MigrationError: If a migration fails; earlier migrations stay applied
+        """
+        original_autocommit = self.conn.autocommit
+        self.conn.autocommit = True
+        results = []
+
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(SCHEMA_MIGRATIONS_SQL)
+                cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+
+            try:
+                pending = self.pending()
+                if not pending:
+                    self.log("INFO", "Schema is up to date")
+                    return results
+
+                self.log("INFO", f"Applying {len(pending)} migration(s)")
+                for migration in pending:
+                    if migration.transactional:
+                        results.append(self._apply_transactional(migration))
+                    else:
+                        results.append(self._apply_non_transactional(migration))
+            finally:
+                self.conn.autocommit = True
+                with self.conn.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+        finally:
+            self.conn.autocommit = original_autocommit
+
+        return results
+
+    def _execute_steps(self, cursor, migration: Migration) -> List[Dict[str, Any]]:
+        """Execute each statement, timing it"""
+        steps = []
+        for idx, statement in enumerate(migration.statements(), 1):
+            summary = " ".join(
+                line for line in statement.splitlines() if not line.strip().startswith("--")
+            ).split()
+            summary = " ".join(summary)[:80]
+
+            start = time.perf_counter()
+            try:
+                cursor.execute(statement)
+            except Exception as e:
+                raise MigrationError(
+                    f"{migration.path.name} step {idx} failed ({summary}): {e}"
+                ) from e
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            steps.append({"step": idx, "statement": summary, "ms": round(elapsed_ms, 3)})
+            self.log("INFO", f"  {migration.version:03d} step {idx}: {summary} ({elapsed_ms:.1f}ms)")
+        return steps
+
+    def _record(self, cursor, migration: Migration, elapsed_ms: float):
+        """Insert the schema_migrations row for a migration"""
+        cursor.execute(
+            """
+            INSERT INTO schema_migrations (version, name, checksum, execution_ms)
+            VALUES (%s, %s, %s, %s)
+            """,
+            (migration.version, migration.name, migration.checksum, round(elapsed_ms, 3))
+        )
+
+    def _apply_transactional(self, migration: Migration) -> Dict[str, Any]:
+        """Apply a migration and record it in one transaction"""
+        self.log("INFO", f"Applying {migration.path.name} (transactional)")
+        self.conn.autocommit = False
+        start = time.perf_counter()
+
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute("SET LOCAL lock_timeout = %s", (self.lock_timeout,))
+                cursor.execute("SET LOCAL statement_timeout = %s", (self.statement_timeout,))
+                steps = self._execute_steps(cursor, migration)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                self._record(cursor, migration, elapsed_ms)
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            self.log("ERROR", f"Migration {migration.path.name} rolled back", {"error": str(e)})
+            if isinstance(e, MigrationError):
+                raise
+            raise MigrationError(f"{migration.path.name} failed: {e}") from e
+        finally:
+            self.conn.autocommit = True
+
+        self.log("SUCCESS", f"Applied {migration.path.name} in {elapsed_ms:.1f}ms")
+        return {
+            "version": migration.version,
+            "name": migration.name,
+            "transactional": True,
+            "ms": round(elapsed_ms, 3),
+            "steps": steps
+        }
+
+    def _apply_non_transactional(self, migration: Migration) -> Dict[str, Any]:
+        """Apply a migration statement by statement in autocommit"""
+        self.log("INFO", f"Applying {migration.path.name} (no transaction)")
+        start = time.perf_counter()
+
+        with self.conn.cursor() as cursor:
+            cursor.execute("SET lock_timeout = %s", (self.lock_timeout,))
+            cursor.execute("SET statement_timeout = %s", (self.index_statement_timeout,))
+            try:
+                steps = self._execute_steps(cursor, migration)
+            except MigrationError as e:
+                self.log("ERROR", f"Migration {migration.path.name} failed part-way", {
+                    "error": str(e),
+                    "invalid_indexes": self._invalid_indexes(cursor),
+                    "hint": "Drop any invalid index listed above, then re-run"
+                })
+                raise
+            finally:
+                cursor.execute("RESET lock_timeout")
+                cursor.execute("RESET statement_timeout")
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._record(cursor, migration, elapsed_ms)
+
+        self.log("SUCCESS", f"Applied {migration.path.name} in {elapsed_ms:.1f}ms")
+        return {
+            "version": migration.version,
+            "name": migration.name,
+            "transactional": False,
+            "ms": round(elapsed_ms, 3),
+            "steps": steps
+        }
+
+    @staticmethod
+    def _invalid_indexes(cursor) -> List[str]:
+        """Indexes left INVALID by a failed CREATE INDEX CONCURRENTLY"""
+        try:
+            cursor.execute("SELECT indexrelid::regclass::text FROM pg_index WHERE NOT indisvalid")
+            return [row[0] for row in cursor.fetchall()]
+        except psycopg2.Error:
+            return []
@@ -1,12 +1,22 @@
 """Perplexity API Client for news research and sentiment analysis"""
 
 import os
+import re
+import json
 import logging
 import requests
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+
+from .llm_telemetry import get_llm_telemetry
 
 logger = logging.getLogger(__name__)
 
+# "combined" gets the news summary and sentiment JSON from one search
+# completion; "split" makes separate news and sentiment calls
+PERPLEXITY_MODE = os.getenv("PERPLEXITY_MODE", "combined").lower()
+
+_JSON_FENCE = re.compile(r"^```(?:json)?\s*(.*?)\s*```$", re.DOTALL)
+
 
 class PerplexityClient:
     """Client for Perplexity API news research"""
@@ -17,9 +27,10 @@ class PerplexityClient:
             logger.warning("PERPLEXITY_API_KEY not found in environment")
             self.api_key = None
 
-        self.endpoint = "https://api.perplexity.ai/chat/completions"
+        self.endpoint = os.getenv("PERPLEXITY_ENDPOINT", "https://api.perplexity.ai/chat/completions")
         self.model = "llama-3.1-sonar-large-128k-online"  # Latest web search model
         self.timeout = 30
+        self.mode = "split" if PERPLEXITY_MODE == "split" else "combined"
 
     def is_available(self) -> bool:
         """Check if Perplexity API is configured"""
@@ -72,26 +83,30 @@ class PerplexityClient:
                 "search_recency_filter": "week"  # Focus on recent news
             }
 
-            response = requests.post(
-                self.endpoint,
-                headers=headers,
-                json=payload,
-                timeout=self.timeout
-            )
-
-            response.raise_for_status()
-            result = response.json()
-
-            # Extract news summary
-            content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-            citations = result.get("citations", [])
-
-            if content:
-                logger.info(f"Perplexity found {len(citations)} news sources")
-                return self._format_news_summary(content, citations)
-            else:
-                logger.warning("No news content returned from Perplexity")
-                return None
+            with get_llm_telemetry().track("perplexity", "news_search", self.model) as call:
+                response = requests.post(
+                    self.endpoint,
+                    headers=headers,
+                    json=payload,
+                    timeout=self.timeout
+                )
+
+                response.raise_for_status()
+                result = response.json()
+                usage = result.get("usage") or {}
+                call.usage(usage.get("prompt_tokens"), usage.get("completion_tokens"))
+
+                # Extract news summary
+                content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+                citations = result.get("citations", [])
+
+                if content:
+                    logger.info(f"Perplexity found {len(citations)} news sources")
+                    return self._format_news_summary(content, citations)
+                else:
+                    call.fail("empty")
+                    logger.warning("No news content returned from Perplexity")
+                    return None
 
         except requests.exceptions.RequestException as e:
             logger.error(f"Perplexity API request failed: {e}")
@@ -151,40 +166,44 @@ class PerplexityClient:
                 "search_recency_filter": "week"
             }
 
-            response = requests.post(
-                self.endpoint,
-                headers=headers,
-                json=payload,
-                timeout=self.timeout
-            )
-
-            response.raise_for_status()
-            result = response.json()
-
-            # Extract sentiment analysis
-            content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-            citations = result.get("citations", [])
-
-            if content:
-                import json
-                # Try to parse JSON response
-                try:
-                    sentiment_data = json.loads(content)
-                    # Add citations
-                    sentiment_data["sources"] = citations[:5]  # Top 5 sources
-
-                    # Validate score range
-                    score = float(sentiment_data.get("score", 0))
-                    sentiment_data["score"] = max(-1.0, min(1.0, score))
-
-                    logger.info(f"Perplexity sentiment analysis complete: {sentiment_data['score']}")
-                    return sentiment_data
-                except json.JSONDecodeError:
-                    logger.warning("Failed to parse Perplexity sentiment JSON")
+            with get_llm_telemetry().track("perplexity", "news_sentiment", self.model) as call:
+                response = requests.post(
+                    self.endpoint,
+                    headers=headers,
+                    json=payload,
+                    timeout=self.timeout
+                )
+
+                response.raise_for_status()
+                result = response.json()
+                usage = result.get("usage") or {}
+                call.usage(usage.get("prompt_tokens"), usage.get("completion_tokens"))
+
+                # Extract sentiment analysis
+                content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+                citations = result.get("citations", [])
+
+                if content:
+                    # Try to parse JSON response
+                    try:
+                        sentiment_data = json.loads(content)
+                        # Add citations
+                        sentiment_data["sources"] = citations[:5]  # Top 5 sources
+
+                        # Validate score range
+                        score = float(sentiment_data.get("score", 0))
+                        sentiment_data["score"] = max(-1.0, min(1.0, score))
+
+                        logger.info(f"Perplexity sentiment analysis complete: {sentiment_data['score']}")
+                        return sentiment_data
+                    except json.JSONDecodeError:
+                        call.fail("parse_failure")
+                        logger.warning("Failed to parse Perplexity sentiment JSON")
+                        return None
+                else:
+                    call.fail("empty")
+                    logger.warning("No sentiment content returned from Perplexity")
                     return None
-            else:
-                logger.warning("No sentiment content returned from Perplexity")
-                return None
 
         except requests.exceptions.RequestException as e:
             logger.error(f"Perplexity API request failed: {e}")
@@ -193,6 +212,128 @@ class PerplexityClient:
             logger.error(f"Perplexity sentiment analysis failed: {e}")
             return None
 
+    def research_market(
+        self,
+        market_title: str,
+        market_description: str,
+        news_context: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        News summary and sentiment from a single search completion
+
+        Replaces search_market_news + analyze_news_sentiment (two online
+        searches on the same topic) when mode is "combined".
+
+        Args:
+            news_context: News already summarized for the market's event
+                cluster; the completion then only scores sentiment against
+                it (no summary to write) and it is returned unchanged
+
+        Returns:
+            (news summary with citations or None,
+             {"score", "confidence", "reasoning", "sources"} or None)
+        """
+        if not self.is_available():
+            logger.warning("Perplexity API not configured, skipping news research")
+            return None, None
+
+        try:
+            if news_context:
+                query = self._build_scoring_query(market_title, market_description, news_context)
+                instructions = (
+                    "You are a market research analyst. "
+                    "Score the sentiment of the news you are given for this market "
+                    "from -1 (very negative) to 1 (very positive). Return ONLY valid JSON "
+                    "with keys: score, confidence, reasoning."
+                )
+                max_tokens = 500
+            else:
+                query = self._build_research_query(market_title, market_description)
+                instructions = (
+                    "You are a market research analyst. "
+                    "Search for the latest news, summarize it, and score its sentiment "
+                    "from -1 (very negative) to 1 (very positive). Return ONLY valid JSON "
+                    "with keys: summary, score, confidence, reasoning."
+                )
+                max_tokens = 1200
+
+            headers = {
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            }
+
+            payload = {
+                "model": self.model,
+                "messages": [
+                    {
+                        "role": "system",
+                        "content": instructions
+                    },
+                    {
+                        "role": "user",
+                        "content": query
+                    }
+                ],
+                "max_tokens": max_tokens,
+                "temperature": 0.2,
+                "top_p": 0.9,
+                "return_citations": True,
+                "search_recency_filter": "week"
+            }
+
+            operation = "cluster_news_sentiment" if news_context else "news_and_sentiment"
+            with get_llm_telemetry().track("perplexity", operation, self.model) as call:
+                response = requests.post(
+                    self.endpoint,
+                    headers=headers,
+                    json=payload,
+                    timeout=self.timeout
+                )
+
+                response.raise_for_status()
+                result = response.json()
+                usage = result.get("usage") or {}
+                call.usage(usage.get("prompt_tokens"), usage.get("completion_tokens"))
+
+                content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+                citations = result.get("citations", [])
+
+                if not content:
+                    call.fail("empty")
+                    logger.warning("No research content returned from Perplexity")
+                    return None, None
+
+                try:
+                    data = json.loads(_JSON_FENCE.sub(r"\1", content.strip()))
+                    score = max(-1.0, min(1.0, float(data.get("score", 0))))
+                except (ValueError, TypeError, AttributeError):
+                    call.fail("parse_failure")
+                    logger.warning("Failed to parse Perplexity research JSON")
+                    return None, None
+
+                if not news_context:
+                    summary = data.get("summary")
+                    news_context = self._format_news_summary(summary, citations) if summary else None
+                sentiment_data = {
+                    "score": score,
+                    "confidence": data.get("confidence", 0.5),
+                    "reasoning": data.get("reasoning", "News-based sentiment"),
+                    "sources": citations[:5]  # Top 5 sources
+                }
+
+                logger.info(
+                    f"Perplexity research complete: {len(citations)} news sources, "
+                    f"sentiment {sentiment_data['score']}"
+                )
+                return news_context, sentiment_data
+
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Perplexity API request failed: {e}")
+            return None, None
+        except Exception as e:
+            logger.error(f"Perplexity research failed: {e}")
+            return None, None
+
     def _build_search_query(self, title: str, description: str) -> str:
         """Build search query for news"""
         return f"""
@@ -231,6 +372,50 @@ Consider:
 - Negative news and concerns (-1 direction)
 - Neutral or mixed sentiment (0 direction)
 - Confidence based on consensus and source quality
+"""
+
+    def _build_research_query(self, title: str, description: str) -> str:
+        """Build query for combined news research and sentiment"""
+        return f"""
+Research the latest news and developments about:
+
+**Topic:** {title}
+**Context:** {description}
+
+Return JSON:
+{{
+    "summary": "<concise summary of recent news, key events, public reactions and expert predictions>",
+    "score": <float from -1 to 1>,
+    "confidence": <float from 0 to 1>,
+    "reasoning": "<explanation of sentiment>"
+}}
+
+Focus on factual information from the past week. Score positive news and
+developments toward +1, negative news and concerns toward -1, and neutral
+or mixed news near 0; base confidence on consensus and source quality.
+"""
+
+    def _build_scoring_query(self, title: str, description: str, news_context: str) -> str:
+        """Build query scoring a market's sentiment against news already gathered"""
+        return f"""
+Score news sentiment about:
+
+**Topic:** {title}
+**Context:** {description}
+
+**Recent news about this event:**
+{news_context}
+
+Return JSON:
+{{
+    "score": <float from -1 to 1>,
+    "confidence": <float from 0 to 1>,
+    "reasoning": "<explanation of sentiment>"
+}}
+
+Score positive news and developments toward +1, negative news and concerns
+toward -1, and neutral or mixed news near 0; base confidence on consensus
+and source quality.
 """
 
     def _format_news_summary(self, content: str, citations: list) -> str:
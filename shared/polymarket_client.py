@@ -17,6 +17,12 @@ from py_clob_client.constants import POLYGON
 logger = logging.getLogger(__name__)
 
 
+def _is_client_error(error: Exception) -> bool:
+    """True for 4xx responses other than 429, which no retry will fix"""
+    status = getattr(error, 'status_code', None)
+    return isinstance(status, int) and 400 <= status < 500 and status != 429
+
+
 class PolymarketClient:
     """Wrapper for Polymarket CLOB API client."""
 
@@ -50,12 +56,15 @@ class PolymarketClient:
             Result of function execution
 
         Raises:
-            Exception: If all retry attempts fail
+            Exception: If all retry attempts fail, or at once on a 4xx
+                response (other than 429)
         """
         for attempt in range(max_attempts):
             try:
                 return func(*args, **kwargs)
             except Exception as e:
+                if _is_client_error(e):
+                    raise
                 if attempt == max_attempts - 1:
                     logger.error(f"Failed after {max_attempts} attempts: {e}")
                     raise
@@ -80,7 +89,9 @@ class PolymarketClient:
                 'end_date': str (ISO format),
                 'outcome_prices': dict,
                 'volume': float,
-                'active': bool
+                'active': bool,
+                'slug': str,
+                'outcome_token_ids': list of str (outcome token ids, in outcome order)
             }
         """
         logger.info(f"Fetching markets (active_only={active_only})")
@@ -117,7 +128,12 @@ class PolymarketClient:
                         'end_date': market.get('end_date_iso', None),
                         'outcome_prices': market.get('outcome_prices', {}),
                         'volume': float(market.get('volume', 0)),
-                        'active': is_active
+                        'active': is_active,
+                        'slug': market.get('market_slug'),
+                        'outcome_token_ids': [
+                            str(token['token_id']) for token in market.get('tokens') or []
+                            if token.get('token_id')
+                        ]
                     }
 
                     markets.append(market_data)
@@ -154,10 +170,15 @@ class PolymarketClient:
 
         try:
             # Get market details including price
-            market = self._retry_request(
-                self.client.get_market,
-                token_id
-            )
+            try:
+                market = self._retry_request(
+                    self.client.get_market,
+                    token_id
+                )
+            except Exception as e:
+                if getattr(e, 'status_code', None) != 404:
+                    raise
+                market = None
 
             if not market:
                 logger.warning(f"Market {token_id} not found")
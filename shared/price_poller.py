@@ -0,0 +1,527 @@
+"""
+Adaptive per-market price polling.
+
+Prices used to be refreshed on one 5 second cache TTL for every market, so
+quiet markets cost as much CLOB quota as markets about to resolve.
+PricePollScheduler gives each active market its own poll interval from
+    - volatility: the 24h price range in price_history when the market is
+      first seen, then an EWMA of the moves observed between polls
+    - volume
+    - time to end_date
+keeps a min-heap of next-due times, and polls due markets through the
+price ingestion path (function_app._poll_price: CLOB fetch, price_history
+write, price cache) while polling and on-demand price fetches together
+stay inside CLOB_POLL_BUDGET_PER_MINUTE. When the intervals ask for more
+than the budget, every interval is stretched by the same factor, so the
+relative cadence is kept.
+
+Driven by the price_polling timer trigger in function_app.py.
+benchmarks/price_polling.py compares it with fixed-interval polling.
+"""
+
+import os
+import math
+import time
+import heapq
+import random
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+from .market_store import MarketStore
+
+logger = logging.getLogger(__name__)
+
+# Poll interval bounds in seconds: the most active markets are polled every
+# PRICE_POLL_MIN_SECONDS, the quietest every PRICE_POLL_MAX_SECONDS
+MIN_POLL_INTERVAL = float(os.getenv("PRICE_POLL_MIN_SECONDS", "5"))
+MAX_POLL_INTERVAL = float(os.getenv("PRICE_POLL_MAX_SECONDS", "900"))
+
+# CLOB requests per minute shared by polling and on-demand price fetches
+CLOB_BUDGET_PER_MINUTE = float(os.getenv("CLOB_POLL_BUDGET_PER_MINUTE", "120"))
+
+# Share of the budget the intervals are planned against; the rest absorbs
+# on-demand fetches from GET /api/price
+POLL_BUDGET_SHARE = 0.9
+
+# Seconds of budget that may be spent in one burst
+BURST_SECONDS = 10
+
+# Volatility (mean absolute price move per sqrt(hour)) that scores 1
+VOLATILITY_SCALE = 0.02
+
+# Volatility assumed for a market without price history
+DEFAULT_VOLATILITY = VOLATILITY_SCALE / 2
+
+# Weight of each observed move in the volatility EWMA
+VOLATILITY_ALPHA = 0.3
+
+# Activity weights (sum to 1)
+ACTIVITY_WEIGHTS = {
+    "movement": 0.45,
+    "urgency": 0.35,
+    "volume": 0.20,
+}
+
+# The poller counts as running (and its intervals as cache TTLs) for this
+# long after its last run ended
+ACTIVE_GRACE_SECONDS = 120
+
+# Longest a polled price is served from cache by GET /api/price; quiet
+# markets are polled far less often than this, and reads past it fetch
+PRICE_POLL_MAX_CACHE_SECONDS = float(os.getenv("PRICE_POLL_MAX_CACHE_SECONDS", "60"))
+
+# Number of heap entries shown by the status endpoint
+STATUS_QUEUE_SIZE = 20
+
+
+def volatility_from_range(price_range: float, hours: float = 24.0) -> float:
+    """
+    Mean absolute move per sqrt(hour) from the price range over a window.
+
+    For a random walk the expected range over T hours is about twice the
+    mean absolute move over T, so this matches what observe() measures.
+    """
+    return price_range / (2.0 * math.sqrt(hours))
+
+
+def parse_end_date(end_date: Optional[str]) -> Optional[float]:
+    """Epoch seconds of an ISO end date (naive dates are UTC), or None"""
+    if not end_date:
+        return None
+    try:
+        parsed = datetime.fromisoformat(end_date.replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def activity(volume: float, volatility: float, end_ts: Optional[float], now: float) -> Dict[str, float]:
+    """
+    Score how closely one market should be watched.
+
+    Components are each scaled to 0..1:
+        movement: volatility / VOLATILITY_SCALE
+        urgency: 1 / (1 + days to end_date); 0.1 when end_date is unknown,
+            0 once it has passed (the price only moves again on resolution)
+        volume: log10(volume + 1) / 7, so $10M and above scores 1
+
+    Returns:
+        Dict with "score" and each component
+    """
+    if end_ts is None:
+        urgency = 0.1
+    elif end_ts <= now:
+        urgency = 0.0
+    else:
+        urgency = 1.0 / (1.0 + (end_ts - now) / 86400.0)
+
+    components = {
+        "movement": min(volatility / VOLATILITY_SCALE, 1.0),
+        "urgency": urgency,
+        "volume": min(math.log10(max(volume, 0.0) + 1) / 7.0, 1.0),
+    }
+    components["score"] = sum(ACTIVITY_WEIGHTS[name] * value for name, value in components.items())
+    return components
+
+
+def poll_interval(score: float, min_interval: float = MIN_POLL_INTERVAL,
+                  max_interval: float = MAX_POLL_INTERVAL) -> float:
+    """Interval for an activity score: geometric from max_interval (0) to min_interval (1)"""
+    score = min(max(score, 0.0), 1.0)
+    return max_interval * (min_interval / max_interval) ** score
+
+
+class _Market:
+    """Polling state of one market"""
+
+    __slots__ = ("volume", "end_ts", "volatility", "last_price", "last_polled",
+                 "base_interval", "due", "polls", "failures")
+
+    def __init__(self, volume: float, end_ts: Optional[float], volatility: float):
+        self.volume = volume
+        self.end_ts = end_ts
+        self.volatility = volatility
+        self.last_price: Optional[float] = None
+        self.last_polled: Optional[float] = None
+        self.base_interval = MAX_POLL_INTERVAL
+        self.due = 0.0
+        self.polls = 0
+        self.failures = 0
+
+
+class PricePollScheduler:
+    """Polls each market's price at a cadence set by its activity, within a CLOB budget"""
+
+    def __init__(
+        self,
+        budget_per_minute: float = CLOB_BUDGET_PER_MINUTE,
+        min_interval: float = MIN_POLL_INTERVAL,
+        max_interval: float = MAX_POLL_INTERVAL,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+        seed: Optional[int] = None
+    ):
+        """
+        Args:
+            budget_per_minute: CLOB requests per minute for polling and
+                on-demand fetches together
+            min_interval, max_interval: Poll interval bounds in seconds
+            clock, sleep: Time source and sleep (benchmarks pass a
+                simulated clock)
+            seed: Seed for staggering new markets' first polls
+        """
+        self.budget_per_minute = budget_per_minute
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._clock = clock
+        self._sleep = sleep
+        self._rng = random.Random(seed)
+
+        self.store: Optional[MarketStore] = None
+        self._markets: Dict[str, _Market] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._demand = 0.0  # polls per second the base intervals ask for
+
+        self._rate = budget_per_minute / 60.0
+        self._capacity = max(self._rate * BURST_SECONDS, 1.0)
+        self._tokens = self._capacity
+        self._refilled_at = clock()
+        self._requests = 0
+
+        self._last_run: Optional[Dict[str, Any]] = None
+        self._last_run_end: Optional[float] = None
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+
+    # -- budget -------------------------------------------------------------
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self._capacity, self._tokens + (now - self._refilled_at) * self._rate)
+        self._refilled_at = now
+
+    def _acquire(self, now: float) -> float:
+        """Take one request from the budget; seconds to wait if none is available"""
+        with self._lock:
+            self._refill(now)
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                self._requests += 1
+                return 0.0
+            return (1.0 - self._tokens) / self._rate
+
+    def record_request(self) -> None:
+        """Charge a CLOB request made outside the poller (on-demand price or market fetches)"""
+        with self._lock:
+            self._refill(self._clock())
+            # May go negative: polling then waits until the budget has recovered
+            self._tokens = max(self._tokens - 1.0, -self._capacity)
+            self._requests += 1
+
+    def stretch(self) -> float:
+        """Factor applied to every base interval to keep polling inside the budget"""
+        planned = self._rate * POLL_BUDGET_SHARE
+        return max(self._demand / planned, 1.0) if planned > 0 else 1.0
+
+    # -- schedule -----------------------------------------------------------
+
+    def _set_interval(self, market: _Market, now: float) -> None:
+        score = activity(market.volume, market.volatility, market.end_ts, now)["score"]
+        interval = poll_interval(score, self.min_interval, self.max_interval)
+        self._demand += 1.0 / interval - 1.0 / market.base_interval
+        market.base_interval = interval
+
+    def _schedule(self, token_id: str, market: _Market, due: float) -> None:
+        market.due = due
+        heapq.heappush(self._heap, (due, token_id))
+
+    def sync(self, store: MarketStore, price_ranges: Optional[Dict[str, float]] = None) -> Dict[str, int]:
+        """
+        Track the active markets of a new snapshot.
+
+        Markets already tracked keep their state (volume and end_date are
+        updated); new ones start from their 24h price range, if given, and
+        have their first poll spread over one interval; markets no longer
+        active are dropped.
+
+        Args:
+            store: Current market snapshot
+            price_ranges: token_id -> 24h price range (DatabaseClient.get_price_ranges)
+
+        Returns:
+            Counts of added, removed and tracked markets
+        """
+        now = self._clock()
+        price_ranges = price_ranges or {}
+        active = {}
+        for row, token_id in enumerate(store.token_ids):
+            if token_id and store.active[row]:
+                active.setdefault(token_id, row)
+
+        with self._lock:
+            added = 0
+            removed = [token_id for token_id in self._markets if token_id not in active]
+            for token_id in removed:
+                del self._markets[token_id]
+
+            for token_id, row in active.items():
+                end_ts = parse_end_date(store.end_dates[row])
+                market = self._markets.get(token_id)
+                if market is None:
+                    price_range = price_ranges.get(token_id)
+                    volatility = (
+                        volatility_from_range(price_range) if price_range is not None else DEFAULT_VOLATILITY
+                    )
+                    market = self._markets[token_id] = _Market(store.volumes[row], end_ts, volatility)
+                    self._set_interval(market, now)
+                    self._schedule(token_id, market, now + self._rng.uniform(0, market.base_interval))
+                    added += 1
+                else:
+                    market.volume, market.end_ts = store.volumes[row], end_ts
+
+            # Recompute from scratch: urgency moves with the clock, and the
+            # running sum drifts
+            self._demand = 0.0
+            for market in self._markets.values():
+                market.base_interval = self.max_interval
+                self._demand += 1.0 / self.max_interval
+                self._set_interval(market, now)
+
+            # Drop entries of removed and rescheduled markets
+            if len(self._heap) > 2 * len(self._markets):
+                self._heap = [
+                    (due, token_id) for due, token_id in self._heap
+                    if token_id in self._markets and self._markets[token_id].due == due
+                ]
+                heapq.heapify(self._heap)
+            self.store = store
+
+        logger.info(f"Price poller tracking {len(self._markets)} markets (+{added} -{len(removed)}), "
+                    f"stretch {self.stretch():.2f}")
+        return {"added": added, "removed": len(removed), "tracked": len(self._markets)}
+
+    def observe(self, token_id: str, price: float, now: Optional[float] = None) -> Optional[float]:
+        """
+        Record a fresh price for a market (polled, or fetched on demand) and
+        schedule its next poll one interval later. Prices less than
+        min_interval after the last one don't update the volatility.
+
+        Returns:
+            The market's poll interval in seconds, or None if it isn't tracked
+        """
+        now = self._clock() if now is None else now
+        with self._lock:
+            market = self._markets.get(token_id)
+            if market is None:
+                return None
+            if market.last_price is None or market.last_polled is None:
+                market.last_price, market.last_polled = price, now
+            elif now > market.last_polled and now - market.last_polled >= self.min_interval:
+                hours = (now - market.last_polled) / 3600.0
+                move = abs(price - market.last_price) / math.sqrt(hours)
+                market.volatility += VOLATILITY_ALPHA * (move - market.volatility)
+                market.last_price, market.last_polled = price, now
+            # Closer than min_interval to the last price (an on-demand fetch
+            # just after a poll): bid/ask noise over a tiny interval would
+            # swamp the volatility, so keep the older baseline
+            market.polls += 1
+            self._set_interval(market, now)
+            interval = market.base_interval * self.stretch()
+            self._schedule(token_id, market, now + interval)
+            return interval
+
+    def _failed(self, token_id: str, now: float) -> None:
+        with self._lock:
+            market = self._markets.get(token_id)
+            if market is not None:
+                market.failures += 1
+                self._schedule(token_id, market, now + market.base_interval * self.stretch())
+
+    def _pop_due(self, now: float) -> Tuple[Optional[str], Optional[float]]:
+        """(token_id due now, None) or (None, when the next market is due)"""
+        with self._lock:
+            while self._heap:
+                due, token_id = self._heap[0]
+                market = self._markets.get(token_id)
+                if market is None or market.due != due:
+                    heapq.heappop(self._heap)  # superseded entry
+                    continue
+                if due > now:
+                    return None, due
+                heapq.heappop(self._heap)
+                return token_id, None
+            return None, None
+
+    def interval(self, token_id: str) -> Optional[float]:
+        """Current poll interval of a market in seconds, or None if it isn't tracked"""
+        market = self._markets.get(token_id)
+        return market.base_interval * self.stretch() if market is not None else None
+
+    def is_active(self) -> bool:
+        """Whether the poller is running or ran recently"""
+        if self._run_lock.locked():
+            return True
+        return self._last_run_end is not None and self._clock() - self._last_run_end < ACTIVE_GRACE_SECONDS
+
+    def cache_ttl(self, token_id: str) -> Optional[float]:
+        """
+        How long a cached price stays fresh while the poller keeps it updated:
+        its poll interval, capped at PRICE_POLL_MAX_CACHE_SECONDS
+        """
+        if not self.is_active():
+            return None
+        interval = self.interval(token_id)
+        return min(interval, PRICE_POLL_MAX_CACHE_SECONDS) if interval is not None else None
+
+    # -- driving --------------------------------------------------------------
+
+    def run_for(self, seconds: float, fetch: Callable[[str], Optional[float]]) -> Dict[str, Any]:
+        """
+        Poll due markets for up to seconds, sleeping until the next one is
+        due or the budget allows another request.
+
+        Args:
+            seconds: How long to run
+            fetch: Price ingestion for one market: returns its price, or
+                None if the CLOB API doesn't know it
+
+        Returns:
+            Run summary
+        """
+        if not self._run_lock.acquire(blocking=False):
+            logger.info("Price polling already running, skipping")
+            return {"skipped": True, "reason": "already running"}
+
+        try:
+            start = self._clock()
+            deadline = start + seconds
+            polled = failed = not_found = budget_waits = 0
+            lateness = 0.0
+
+            while True:
+                now = self._clock()
+                if now >= deadline:
+                    break
+                token_id, next_due = self._pop_due(now)
+                if token_id is None:
+                    self._sleep(min((next_due or deadline) - now, deadline - now))
+                    continue
+
+                wait = self._acquire(now)
+                if wait > 0:
+                    budget_waits += 1
+                    with self._lock:
+                        market = self._markets.get(token_id)
+                        if market is not None:
+                            self._schedule(token_id, market, market.due)
+                    self._sleep(min(wait, deadline - now))
+                    continue
+
+                lateness += now - self._markets[token_id].due if token_id in self._markets else 0.0
+                try:
+                    price = fetch(token_id)
+                except Exception as e:
+                    logger.warning(f"Price poll failed for {token_id}: {e}")
+                    self._failed(token_id, self._clock())
+                    failed += 1
+                    continue
+
+                if price is None:
+                    not_found += 1
+                    self._failed(token_id, self._clock())
+                else:
+                    self.observe(token_id, price)
+                    polled += 1
+
+            elapsed = self._clock() - start
+            summary = {
+                "started_at": datetime.utcfromtimestamp(start).isoformat(),
+                "elapsed_s": round(elapsed, 1),
+                "polled": polled,
+                "failed": failed,
+                "not_found": not_found,
+                "budget_waits": budget_waits,
+                "mean_lateness_s": round(lateness / polled, 2) if polled else None,
+                "polls_per_minute": round(60 * polled / elapsed, 1) if elapsed else None,
+            }
+            with self._lock:
+                self._last_run = summary
+                self._last_run_end = self._clock()
+
+            logger.info(f"Price polling: {polled} polled, {failed} failed, {not_found} not found, "
+                        f"{budget_waits} budget waits in {elapsed:.0f}s")
+            return summary
+        finally:
+            self._run_lock.release()
+
+    def status(self) -> Dict[str, Any]:
+        """Budget, interval distribution, next due markets and last run summary"""
+        now = self._clock()
+        with self._lock:
+            self._refill(now)
+            stretch = self.stretch()
+            intervals = sorted(market.base_interval * stretch for market in self._markets.values())
+            head = []
+            for due, token_id in heapq.nsmallest(STATUS_QUEUE_SIZE * 2, self._heap):
+                market = self._markets.get(token_id)
+                if market is None or market.due != due:
+                    continue
+                components = activity(market.volume, market.volatility, market.end_ts, now)
+                head.append({
+                    "market_id": token_id,
+                    "due_in_s": round(due - now, 1),
+                    "interval_s": round(market.base_interval * stretch, 1),
+                    "volatility": round(market.volatility, 5),
+                    "activity": {name: round(value, 4) for name, value in components.items()},
+                    "polls": market.polls,
+                    "failures": market.failures,
+                })
+                if len(head) == STATUS_QUEUE_SIZE:
+                    break
+            tokens, requests, last_run = self._tokens, self._requests, self._last_run
+
+        def percentile(q):
+            return round(intervals[min(int(q * len(intervals)), len(intervals) - 1)], 1) if intervals else None
+
+        return {
+            "running": self._run_lock.locked(),
+            "active": self.is_active(),
+            "markets": len(intervals),
+            "budget": {
+                "per_minute": self.budget_per_minute,
+                "available": round(tokens, 1),
+                "planned_polls_per_minute": round(60 * self._demand / stretch, 1),
+                "stretch": round(stretch, 3),
+                "requests_total": requests,
+            },
+            "interval_s": {"min": percentile(0), "p50": percentile(0.5),
+                           "p90": percentile(0.9), "max": percentile(1)},
+            "queue": head,
+            "last_run": last_run,
+        }
+
+
+# Module-level singleton instance
+_poller: Optional[PricePollScheduler] = None
+_poller_lock = threading.Lock()
+
+
+def get_price_poller() -> PricePollScheduler:
+    """
+    Get or create the price poll scheduler singleton.
+
+    Returns:
+        PricePollScheduler: Scheduler instance
+    """
+    global _poller
+
+    if _poller is None:
+        with _poller_lock:
+            if _poller is None:
+                logger.info("Creating price poll scheduler")
+                _poller = PricePollScheduler()
+
+    return _poller
@@ -1,13 +1,26 @@
 """Multi-source sentiment aggregation with cascading fallback"""
 
+import os
 import logging
-from typing import Dict, Any, List, Optional, Tuple
+import threading
+from typing import Dict, Any, List, Optional, Tuple, Iterator
 from .perplexity_client import PerplexityClient
 from .azure_openai import AzureOpenAIClient
 from .gemini_client import GeminiClient
+from .local_sentiment import LexiconScorer, LocalGatePolicy, LOCAL_SENTIMENT_ENABLED
+from .event_clusters import get_event_index, get_news_cache, EVENT_CLUSTERING_ENABLED
+from .consensus import consensus_from_sources, get_source_weights
 
 logger = logging.getLogger(__name__)
 
+# Max concurrent in-flight calls per provider, shared by every caller of one
+# analyzer (single requests and batch workers alike)
+PROVIDER_CONCURRENCY = {
+    "perplexity": int(os.getenv("PERPLEXITY_MAX_CONCURRENCY", "4")),
+    "azure_openai": int(os.getenv("AZURE_OPENAI_MAX_CONCURRENCY", "8")),
+    "gemini": int(os.getenv("GEMINI_MAX_CONCURRENCY", "4")),
+}
+
 
 class SentimentAnalyzer:
     """Aggregates sentiment from multiple AI sources with intelligent fallback"""
@@ -16,21 +29,42 @@ class SentimentAnalyzer:
         self.perplexity = PerplexityClient()
         self.azure_openai = AzureOpenAIClient()
         self.gemini = GeminiClient()
+        self.local = LexiconScorer() if LOCAL_SENTIMENT_ENABLED else None
+        self.local_gate = LocalGatePolicy()
+        self.event_index = get_event_index() if EVENT_CLUSTERING_ENABLED else None
+        self.news_cache = get_news_cache()
+        # Fixed cascade weights, or the SENTIMENT_CALIBRATION_FILE table
+        self.source_weights = get_source_weights()
+        self.provider_slots = {
+            provider: threading.BoundedSemaphore(limit)
+            for provider, limit in PROVIDER_CONCURRENCY.items()
+        }
 
     def analyze_multi_source(
         self,
         market_title: str,
-        market_description: str
+        market_description: str,
+        volume: Optional[float] = None
     ) -> Dict[str, Any]:
         """
         Analyze sentiment from multiple sources with cascading fallback
 
         Cascade order:
+        0. Local lexicon (no network); alone if confident enough for the
+           market's volume (status "local_only")
         1. Perplexity (latest news + sentiment)
         2. Azure OpenAI GPT-5-Pro (deep analysis)
         3. Google Gemini (fallback analysis)
         4. Neutral (0.0) if all fail
 
+        Runs iter_multi_source() to completion and returns its final result.
+
+        Args:
+            market_title: Market question
+            market_description: Market description
+            volume: Market volume in USD, for the local-only gate (None
+                always calls the remote providers)
+
         Returns:
             {
                 "consensus_sentiment": float (-1 to 1),
@@ -48,25 +82,93 @@ class SentimentAnalyzer:
                 "status": str
             }
         """
+        for event, data in self.iter_multi_source(market_title, market_description, volume):
+            if event == "consensus":
+                return data
+
+    def iter_multi_source(
+        self,
+        market_title: str,
+        market_description: str,
+        volume: Optional[float] = None
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Run the analyze_multi_source cascade, yielding events as it goes
+
+        Events (name, data):
+            ("progress", {"stage": provider}) before each provider is called
+            ("news", {"news_context": str|None, "event_cluster": str|None,
+                      "news_cached": bool}) after the Perplexity news search
+                (or its event cluster's cached summary)
+            ("source", {...}) as each source's result lands (same shape as
+                the entries of "sources")
+            ("source_failed", {"source": provider, "error": str})
+            ("consensus", {...}) last, the analyze_multi_source result
+
+        Status is "success", "partial" (a provider failed), "local_only"
+        (gated, no remote calls) or "failed_all_sources".
+        """
         sources = []
         news_context = None
         status = "success"
 
+        # Source 0: local lexicon (no network, low weight); skipped when no
+        # lexicon terms match so it doesn't dilute consensus confidence
+        local_result = self.local.score(f"{market_title}\n{market_description}") if self.local else None
+        if local_result and local_result["matches"]:
+            sources.append({
+                "source": "local_lexicon",
+                "score": local_result["score"],
+                "confidence": local_result["confidence"],
+                "reasoning": local_result["reasoning"],
+                "weight": self.source_weights["local_lexicon"]
+            })
+            yield "source", sources[-1]
+
+            if self.local_gate.allows_local_only(local_result["confidence"], volume):
+                logger.info(
+                    f"Local sentiment confidence {local_result['confidence']:.2f} is enough "
+                    f"at volume {volume}, skipping remote providers"
+                )
+                consensus_sentiment, consensus_confidence = self._calculate_consensus(sources)
+                yield "consensus", {
+                    "consensus_sentiment": consensus_sentiment,
+                    "consensus_confidence": consensus_confidence,
+                    "sources": sources,
+                    "news_context": None,
+                    "status": "local_only"
+                }
+                return
+        local_count = len(sources)
+
         # Source 1: Perplexity (latest news)
         perplexity_result = None
         if self.perplexity.is_available():
+            yield "progress", {"stage": "perplexity"}
             try:
-                logger.info("Fetching news from Perplexity...")
-                news_context = self.perplexity.search_market_news(
-                    market_title,
-                    market_description
-                )
+                with self.provider_slots["perplexity"]:
+                    if self.perplexity.mode == "combined":
+                        news_context, perplexity_result, event_cluster, news_cached = self._event_research(
+                            market_title,
+                            market_description
+                        )
+                    else:
+                        news_context, event_cluster, news_cached = self._event_news(
+                            market_title,
+                            market_description
+                        )
 
-                logger.info("Analyzing sentiment with Perplexity...")
-                perplexity_result = self.perplexity.analyze_news_sentiment(
-                    market_title,
-                    market_description
-                )
+                        logger.info("Analyzing sentiment with Perplexity...")
+                        perplexity_result = self.perplexity.analyze_news_sentiment(
+                            market_title,
+                            market_description
+                        )
+
+                yield "news", {
+                    "news_context": news_context,
+                    "event_cluster": event_cluster,
+                    "news_cached": news_cached
+                }
 
                 if perplexity_result:
                     sources.append({
@@ -74,21 +176,25 @@ class SentimentAnalyzer:
                         "score": perplexity_result.get("score", 0),
                         "confidence": perplexity_result.get("confidence", 0.5),
                         "reasoning": perplexity_result.get("reasoning", "News-based sentiment"),
-                        "weight": 0.4  # High weight for news-based analysis
+                        "weight": self.source_weights["perplexity"]
                     })
                     logger.info(f"Perplexity analysis: score={perplexity_result.get('score')}")
+                    yield "source", sources[-1]
             except Exception as e:
                 logger.warning(f"Perplexity analysis failed: {e}")
                 status = "partial"
+                yield "source_failed", {"source": "perplexity", "error": str(e)}
 
         # Source 2: Azure OpenAI GPT-5-Pro (primary analyzer)
+        yield "progress", {"stage": "azure_openai_gpt5_pro"}
         try:
             logger.info("Analyzing sentiment with Azure OpenAI GPT-5-Pro...")
-            azure_result = self.azure_openai.analyze_sentiment(
-                market_title,
-                market_description,
-                news_context
-            )
+            with self.provider_slots["azure_openai"]:
+                azure_result = self.azure_openai.analyze_sentiment(
+                    market_title,
+                    market_description,
+                    news_context
+                )
 
             if azure_result:
                 sources.append({
@@ -96,22 +202,26 @@ class SentimentAnalyzer:
                     "score": azure_result.get("score", 0),
                     "confidence": azure_result.get("confidence", 0.7),
                     "reasoning": azure_result.get("reasoning", "Deep AI analysis"),
-                    "weight": 0.4  # High weight for advanced model
+                    "weight": self.source_weights["azure_openai_gpt5_pro"]
                 })
                 logger.info(f"Azure OpenAI analysis: score={azure_result.get('score')}")
+                yield "source", sources[-1]
         except Exception as e:
             logger.warning(f"Azure OpenAI analysis failed: {e}")
             status = "partial"
+            yield "source_failed", {"source": "azure_openai_gpt5_pro", "error": str(e)}
 
         # Source 3: Google Gemini (fallback)
-        if len(sources) < 2 and self.gemini.is_available():
+        if len(sources) - local_count < 2 and self.gemini.is_available():
+            yield "progress", {"stage": "google_gemini"}
             try:
                 logger.info("Analyzing sentiment with Google Gemini (fallback)...")
-                gemini_result = self.gemini.analyze_sentiment(
-                    market_title,
-                    market_description,
-                    news_context
-                )
+                with self.provider_slots["gemini"]:
+                    gemini_result = self.gemini.analyze_sentiment(
+                        market_title,
+                        market_description,
+                        news_context
+                    )
 
                 if gemini_result:
                     sources.append({
@@ -119,23 +229,28 @@ class SentimentAnalyzer:
                         "score": gemini_result.get("score", 0),
                         "confidence": gemini_result.get("confidence", 0.6),
                         "reasoning": gemini_result.get("reasoning", "Gemini fallback analysis"),
-                        "weight": 0.2  # Lower weight for fallback
+                        "weight": self.source_weights["google_gemini"]
                     })
                     logger.info(f"Gemini analysis: score={gemini_result.get('score')}")
+                    yield "source", sources[-1]
             except Exception as e:
                 logger.warning(f"Gemini analysis failed: {e}")
                 status = "partial"
+                yield "source_failed", {"source": "google_gemini", "error": str(e)}
 
         # Calculate consensus
         if sources:
             consensus_sentiment, consensus_confidence = self._calculate_consensus(sources)
+            if len(sources) == local_count:
+                logger.warning("All remote sentiment sources failed, using local sentiment only")
+                status = "partial"
         else:
             logger.warning("All sentiment sources failed, returning neutral")
             consensus_sentiment = 0.0
             consensus_confidence = 0.0
             status = "failed_all_sources"
 
-        return {
+        yield "consensus", {
             "consensus_sentiment": consensus_sentiment,
             "consensus_confidence": consensus_confidence,
             "sources": sources,
@@ -143,6 +258,78 @@ class SentimentAnalyzer:
             "status": status
         }
 
+    def _event_news(
+        self,
+        market_title: str,
+        market_description: str
+    ) -> Tuple[Optional[str], Optional[str], bool]:
+        """
+        News summary for a market, shared across its event cluster
+        (PERPLEXITY_MODE=split)
+
+        Sibling markets (same event, different thresholds or dates) map to
+        one cluster; the cluster representative's question is searched once
+        and the summary is reused for NEWS_CONTEXT_TTL_SECONDS.
+
+        Returns:
+            (news_context, event cluster id or None, served from cache)
+        """
+        if self.event_index is None:
+            logger.info("Fetching news from Perplexity...")
+            return self.perplexity.search_market_news(market_title, market_description), None, False
+
+        cluster = self.event_index.assign(market_title, market_description)
+
+        def fetch() -> Optional[str]:
+            logger.info(f"Fetching news from Perplexity for event cluster {cluster['cluster_id']}...")
+            return self.perplexity.search_market_news(cluster["title"], cluster["description"])
+
+        news_context, cached = self.news_cache.get_or_fetch(cluster["cluster_id"], fetch)
+        if cached:
+            logger.info(f"Reusing news for event cluster {cluster['cluster_id']} ({cluster['members']} markets)")
+        return news_context, cluster["cluster_id"], cached
+
+    def _event_research(
+        self,
+        market_title: str,
+        market_description: str
+    ) -> Tuple[Optional[str], Optional[Dict[str, Any]], Optional[str], bool]:
+        """
+        News summary and Perplexity sentiment for a market in one call,
+        sharing the summary across its event cluster (PERPLEXITY_MODE=combined)
+
+        The first market of a cluster gets both from research_market and its
+        summary is cached for NEWS_CONTEXT_TTL_SECONDS; siblings still make
+        one call for their own score, but against the cached summary, so
+        they see the same news and the completion writes no summary.
+
+        Returns:
+            (news_context, sentiment or None, event cluster id or None,
+             news served from cache)
+        """
+        if self.event_index is None:
+            logger.info("Fetching news and sentiment from Perplexity...")
+            news_context, sentiment = self.perplexity.research_market(market_title, market_description)
+            return news_context, sentiment, None, False
+
+        cluster = self.event_index.assign(market_title, market_description)
+        researched = {}
+
+        def fetch() -> Optional[str]:
+            logger.info(f"Fetching news and sentiment from Perplexity for event cluster {cluster['cluster_id']}...")
+            news, researched["sentiment"] = self.perplexity.research_market(market_title, market_description)
+            return news
+
+        news_context, cached = self.news_cache.get_or_fetch(cluster["cluster_id"], fetch)
+        if not cached:
+            return news_context, researched.get("sentiment"), cluster["cluster_id"], False
+
+        logger.info(f"Scoring against news for event cluster {cluster['cluster_id']} ({cluster['members']} markets)")
+        news_context, sentiment = self.perplexity.research_market(
+            market_title, market_description, news_context=news_context
+        )
+        return news_context, sentiment, cluster["cluster_id"], True
+
     def _calculate_consensus(
         self,
         sources: List[Dict[str, Any]]
@@ -150,37 +337,13 @@ class SentimentAnalyzer:
         """
         Calculate weighted consensus sentiment and confidence
 
-        Weighted by confidence and source weight
+        Weighted by confidence and source weight; the one-market case of
+        consensus.batch_consensus()
         """
         if not sources:
             return 0.0, 0.0
 
-        total_weight = 0.0
-        weighted_sentiment = 0.0
-        weighted_confidence = 0.0
-
-        for source in sources:
-            score = source.get("score", 0)
-            confidence = source.get("confidence", 0.5)
-            weight = source.get("weight", 1.0)
-
-            # Combine confidence and weight
-            effective_weight = confidence * weight
-            total_weight += effective_weight
-
-            weighted_sentiment += score * effective_weight
-            weighted_confidence += confidence * weight
-
-        if total_weight > 0:
-            consensus_sentiment = weighted_sentiment / total_weight
-            consensus_confidence = weighted_confidence / sum(s.get("weight", 1.0) for s in sources)
-        else:
-            consensus_sentiment = 0.0
-            consensus_confidence = 0.0
-
-        # Clamp values
-        consensus_sentiment = max(-1.0, min(1.0, consensus_sentiment))
-        consensus_confidence = max(0.0, min(1.0, consensus_confidence))
+        consensus_sentiment, consensus_confidence = consensus_from_sources([sources])[0]
 
         logger.info(
             f"Consensus calculated: sentiment={consensus_sentiment:.3f}, "
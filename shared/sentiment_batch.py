@@ -0,0 +1,152 @@
+"""Batch sentiment analysis with de-duplication and bounded concurrency"""
+
+import os
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Any, List, Iterator, Optional, Tuple, Callable
+
+from .sentiment_analyzer import SentimentAnalyzer, PROVIDER_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+# Max markets accepted in one batch request
+MAX_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_MAX_SIZE", "500"))
+
+# Results are persisted in chunks of this size as they complete
+PERSIST_CHUNK_SIZE = int(os.getenv("SENTIMENT_BATCH_PERSIST_CHUNK", "25"))
+
+
+def _dedup_key(title: str, description: str) -> Tuple[str, str]:
+    """Normalize title/description so trivially different copies share one analysis"""
+    return (
+        " ".join(title.lower().split()),
+        " ".join((description or "").lower().split())
+    )
+
+
+def _group_volume(members: List[Dict[str, Any]]) -> Optional[float]:
+    """
+    Volume used for a group's local-only gate: the largest member volume,
+    or None (always call remote providers) if any member has none
+    """
+    volumes = []
+    for market in members:
+        try:
+            volumes.append(float(market["volume"]))
+        except (KeyError, TypeError, ValueError):
+            return None
+    return max(volumes)
+
+
+class BatchSentimentRunner:
+    """Runs the multi-source cascade for many markets through a shared worker pool"""
+
+    def __init__(
+        self,
+        analyzer: SentimentAnalyzer,
+        max_workers: Optional[int] = None,
+        persist: Optional[Callable[[List[Dict[str, Any]]], bool]] = None
+    ):
+        """
+        Args:
+            analyzer: Analyzer whose provider slots bound per-provider concurrency
+            max_workers: Markets analyzed at once (default SENTIMENT_BATCH_WORKERS,
+                else the sum of provider limits so every slot can be busy)
+            persist: Optional callback storing a chunk of results
+        """
+        self.analyzer = analyzer
+        self.max_workers = max_workers or int(
+            os.getenv("SENTIMENT_BATCH_WORKERS", str(sum(PROVIDER_CONCURRENCY.values())))
+        )
+        self.persist = persist
+
+    def run(self, markets: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Analyze markets, yielding one result per market as each finishes.
+
+        Markets with the same normalized title and description are analyzed
+        once; every market_id in the group receives the result. A final item
+        with a "summary" key reports counts and timing.
+
+        Args:
+            markets: [{"market_id", "market_title", "market_description"}]
+
+        Yields:
+            Sentiment result dicts with market_id, timestamp and
+            "deduplicated" (True for all but the first market in a group),
+            then the summary dict
+        """
+        start = time.perf_counter()
+
+        groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for market in markets:
+            key = _dedup_key(market["market_title"], market.get("market_description", ""))
+            groups.setdefault(key, []).append(market)
+
+        logger.info(f"Batch sentiment: {len(markets)} markets, {len(groups)} unique analyses")
+
+        pending_persist: List[Dict[str, Any]] = []
+        counts = {"success": 0, "partial": 0, "local_only": 0, "failed_all_sources": 0, "error": 0}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="sentiment-batch") as executor:
+            futures = {
+                executor.submit(
+                    self.analyzer.analyze_multi_source,
+                    members[0]["market_title"],
+                    members[0].get("market_description", ""),
+                    _group_volume(members)
+                ): members
+                for members in groups.values()
+            }
+
+            for future in as_completed(futures):
+                members = futures[future]
+                try:
+                    analysis = future.result()
+                    error = None
+                except Exception as e:
+                    logger.warning(f"Batch sentiment failed for {members[0]['market_id']}: {e}")
+                    analysis = None
+                    error = str(e)
+
+                for idx, market in enumerate(members):
+                    if analysis is None:
+                        counts["error"] += 1
+                        yield {"market_id": market["market_id"], "status": "error", "error": error}
+                        continue
+
+                    result = {
+                        **analysis,
+                        "market_id": market["market_id"],
+                        "timestamp": datetime.utcnow().isoformat(),
+                        "deduplicated": idx > 0
+                    }
+                    counts[result.get("status", "success")] = counts.get(result.get("status", "success"), 0) + 1
+                    pending_persist.append(result)
+                    yield result
+
+                if self.persist and len(pending_persist) >= PERSIST_CHUNK_SIZE:
+                    self._flush(pending_persist)
+                    pending_persist = []
+
+        if self.persist and pending_persist:
+            self._flush(pending_persist)
+
+        yield {
+            "summary": {
+                "markets": len(markets),
+                "unique_analyses": len(groups),
+                "statuses": counts,
+                "workers": self.max_workers,
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)
+            }
+        }
+
+    def _flush(self, results: List[Dict[str, Any]]):
+        """Persist a chunk of results; storage failures don't fail the batch"""
+        try:
+            self.persist(results)
+        except Exception as e:
+            logger.warning(f"Failed to persist batch sentiment chunk: {e}")
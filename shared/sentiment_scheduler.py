@@ -0,0 +1,310 @@
+"""
+Priority-driven background sentiment refresh.
+
+Scores active markets by volume, 24h price movement, time to end_date and
+age of the last stored sentiment, then refreshes the highest-priority ones
+while staying inside an hourly LLM call budget. Driven by the
+sentiment_refresh timer trigger in function_app.py, or locally with:
+
+    python -m shared.sentiment_scheduler --loop --interval 600
+"""
+
+import os
+import math
+import time
+import heapq
+import logging
+import argparse
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from .database import DatabaseClient
+from .anomaly_detector import get_anomaly_detector
+from .sentiment_analyzer import SentimentAnalyzer
+
+logger = logging.getLogger(__name__)
+
+# LLM calls the scheduler may spend per rolling hour
+HOURLY_LLM_BUDGET = int(os.getenv("SENTIMENT_REFRESH_HOURLY_BUDGET", "300"))
+
+# Markets analyzed more recently than this are not queued
+MIN_REFRESH_AGE = timedelta(minutes=int(os.getenv("SENTIMENT_REFRESH_MIN_AGE_MINUTES", "30")))
+
+# Sentiment this old counts as fully stale
+STALE_AFTER = timedelta(hours=24)
+
+# Markets considered per run (highest volume first)
+CANDIDATE_LIMIT = int(os.getenv("SENTIMENT_REFRESH_CANDIDATES", "2000"))
+
+# Priority weights (sum to 1)
+PRIORITY_WEIGHTS = {
+    "volume": 0.30,
+    "movement": 0.25,
+    "urgency": 0.20,
+    "staleness": 0.25,
+}
+
+# Number of queue entries kept for the status endpoint
+STATUS_QUEUE_SIZE = 50
+
+
+def score_market(candidate: Dict[str, Any], now: datetime) -> Optional[Dict[str, float]]:
+    """
+    Compute refresh priority for one market.
+
+    Components are each scaled to 0..1:
+        volume: log10(volume + 1) / 7, so $10M and above scores 1
+        movement: 24h price range / 0.2 (a 20 point swing scores 1)
+        urgency: 1 / (1 + weeks to end_date); 0.2 when end_date is unknown
+        staleness: age of last sentiment / 24h; 1 if never analyzed
+
+    Returns:
+        Dict with "score" and each component, or None if the market should
+        not be refreshed (analyzed recently or already ended)
+    """
+    last_at = candidate.get("last_sentiment_at")
+    if last_at is not None and now - last_at < MIN_REFRESH_AGE:
+        return None
+
+    end_date = candidate.get("end_date")
+    if end_date is not None:
+        if end_date <= now:
+            return None
+        urgency = 1.0 / (1.0 + (end_date - now).total_seconds() / timedelta(weeks=1).total_seconds())
+    else:
+        urgency = 0.2
+
+    volume = candidate.get("volume") or 0.0
+    components = {
+        "volume": min(math.log10(volume + 1) / 7.0, 1.0),
+        "movement": min((candidate.get("price_range") or 0.0) / 0.2, 1.0),
+        "urgency": urgency,
+        "staleness": 1.0 if last_at is None else min((now - last_at) / STALE_AFTER, 1.0),
+    }
+    components["score"] = sum(PRIORITY_WEIGHTS[name] * value for name, value in components.items())
+    return components
+
+
+def llm_calls_for(result: Dict[str, Any], perplexity_available: bool, perplexity_mode: str = "combined") -> int:
+    """Estimate LLM calls one analyze_multi_source run made"""
+    if result.get("status") == "local_only":
+        return 0
+    calls = 1  # Azure OpenAI is always attempted
+    if perplexity_available:
+        # combined: one research call; split: news search + news sentiment
+        calls += 1 if perplexity_mode == "combined" else 2
+    if any(source.get("source") == "google_gemini" for source in result.get("sources", [])):
+        calls += 1
+    return calls
+
+
+class SentimentRefreshScheduler:
+    """Keeps the most important markets' stored sentiment fresh within a budget"""
+
+    def __init__(
+        self,
+        analyzer: Optional[SentimentAnalyzer] = None,
+        db_client: Optional[DatabaseClient] = None,
+        hourly_budget: int = HOURLY_LLM_BUDGET
+    ):
+        self._analyzer = analyzer
+        self.db_client = db_client or DatabaseClient()
+        self.hourly_budget = hourly_budget
+
+        self._spend = deque()  # (monotonic time, llm calls)
+        self._queue: List[Dict[str, Any]] = []
+        self._last_run: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+
+    @property
+    def analyzer(self) -> SentimentAnalyzer:
+        """Create the analyzer on first use so status checks don't build LLM clients"""
+        if self._analyzer is None:
+            self._analyzer = SentimentAnalyzer()
+        return self._analyzer
+
+    def budget_used(self) -> int:
+        """LLM calls spent in the last hour"""
+        cutoff = time.monotonic() - 3600
+        with self._lock:
+            while self._spend and self._spend[0][0] < cutoff:
+                self._spend.popleft()
+            return sum(calls for _, calls in self._spend)
+
+    def budget_remaining(self) -> int:
+        """LLM calls still available in the current rolling hour"""
+        return max(self.hourly_budget - self.budget_used(), 0)
+
+    def build_queue(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Score candidates and return them as a heap ordered by priority.
+
+        Returns:
+            Heap of (-score, token_id, entry) tuples
+        """
+        now = now or datetime.utcnow()
+        heap = []
+        for candidate in self.db_client.get_refresh_candidates(CANDIDATE_LIMIT):
+            priority = score_market(candidate, now)
+            if priority is None:
+                continue
+            entry = {
+                "market_id": candidate["token_id"],
+                "question": candidate["question"],
+                "description": candidate.get("description") or "",
+                "volume": candidate.get("volume"),
+                "priority": {name: round(value, 4) for name, value in priority.items()},
+            }
+            heapq.heappush(heap, (-priority["score"], candidate["token_id"], entry))
+        return heap
+
+    def run_once(self, max_refreshes: Optional[int] = None, time_budget: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Refresh the top of the queue until the budget or max_refreshes runs out.
+
+        Args:
+            max_refreshes: Most markets to refresh
+            time_budget: Seconds the run may take; no refresh is started
+                unless the slowest one so far would still finish in time
+
+        Returns:
+            Run summary with refreshed market ids and budget figures
+        """
+        if not self._run_lock.acquire(blocking=False):
+            logger.info("Sentiment refresh already running, skipping")
+            return {"skipped": True, "reason": "already running"}
+
+        try:
+            start = time.perf_counter()
+            heap = self.build_queue()
+            queued = len(heap)
+            refreshed = []
+            failed = []
+            perplexity_available = self.analyzer.perplexity.is_available()
+            perplexity_mode = self.analyzer.perplexity.mode
+            cost_estimate = llm_calls_for({}, perplexity_available, perplexity_mode)
+            slowest = 0.0
+            out_of_time = False
+
+            while heap and (max_refreshes is None or len(refreshed) < max_refreshes):
+                if self.budget_remaining() < cost_estimate:
+                    logger.info("Sentiment refresh budget exhausted for this hour")
+                    break
+                if time_budget is not None and time.perf_counter() - start + slowest > time_budget:
+                    logger.info("Sentiment refresh stopped at its time budget")
+                    out_of_time = True
+                    break
+
+                _, market_id, entry = heapq.heappop(heap)
+                refresh_start = time.perf_counter()
+                try:
+                    result = self.analyzer.analyze_multi_source(
+                        entry["question"], entry["description"], entry.get("volume")
+                    )
+                    calls = llm_calls_for(result, perplexity_available, perplexity_mode)
+                    with self._lock:
+                        self._spend.append((time.monotonic(), calls))
+                    self.db_client.store_sentiment(market_id, result)
+                    get_anomaly_detector().observe_sentiment_result(market_id, result)
+                    refreshed.append(market_id)
+                except Exception as e:
+                    logger.warning(f"Scheduled sentiment refresh failed for {market_id}: {e}")
+                    with self._lock:
+                        self._spend.append((time.monotonic(), cost_estimate))
+                    failed.append(market_id)
+                slowest = max(slowest, time.perf_counter() - refresh_start)
+
+            remaining = [item[2] for item in heapq.nsmallest(STATUS_QUEUE_SIZE, heap)]
+            summary = {
+                "started_at": datetime.utcnow().isoformat(),
+                "queued": queued,
+                "refreshed": refreshed,
+                "failed": failed,
+                "left_in_queue": len(heap),
+                "out_of_time": out_of_time,
+                "budget_used": self.budget_used(),
+                "budget_remaining": self.budget_remaining(),
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+            }
+
+            with self._lock:
+                self._queue = remaining
+                self._last_run = summary
+
+            logger.info(
+                f"Sentiment refresh: {len(refreshed)} refreshed, {len(failed)} failed, "
+                f"{len(heap)} left, budget {summary['budget_used']}/{self.hourly_budget}"
+            )
+            return summary
+        finally:
+            self._run_lock.release()
+
+    def status(self) -> Dict[str, Any]:
+        """Queue head, budget consumption and last run summary"""
+        with self._lock:
+            queue = list(self._queue)
+            last_run = self._last_run
+        return {
+            "running": self._run_lock.locked(),
+            "budget": {
+                "hourly_limit": self.hourly_budget,
+                "used_last_hour": self.budget_used(),
+                "remaining": self.budget_remaining(),
+            },
+            "queue": queue,
+            "last_run": last_run,
+        }
+
+
+# Module-level singleton instance
+_scheduler: Optional[SentimentRefreshScheduler] = None
+
+
+def get_refresh_scheduler(
+    analyzer: Optional[SentimentAnalyzer] = None,
+    db_client: Optional[DatabaseClient] = None
+) -> SentimentRefreshScheduler:
+    """
+    Get or create the sentiment refresh scheduler singleton.
+
+    Args:
+        analyzer, db_client: Shared instances to use when the scheduler is
+            first created (so provider concurrency limits are shared)
+
+    Returns:
+        SentimentRefreshScheduler: Scheduler instance
+    """
+    global _scheduler
+
+    if _scheduler is None:
+        logger.info("Creating sentiment refresh scheduler")
+        _scheduler = SentimentRefreshScheduler(analyzer=analyzer, db_client=db_client)
+
+    return _scheduler
+
+
+def main():
+    """Local runner"""
+    parser = argparse.ArgumentParser(description="Run the priority sentiment refresh scheduler")
+    parser.add_argument("--loop", action="store_true", help="Keep running every --interval seconds")
+    parser.add_argument("--interval", type=int, default=600)
+    parser.add_argument("--max-refreshes", type=int, default=None)
+    parser.add_argument("--time-budget", type=float, default=None, help="Seconds each run may take")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    scheduler = get_refresh_scheduler()
+
+    while True:
+        summary = scheduler.run_once(max_refreshes=args.max_refreshes, time_budget=args.time_budget)
+        logger.info(f"Run summary: {summary}")
+        if not args.loop:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Server-Sent Events for the streaming analyze and sentiment endpoints.
+
+The generators here produce (event, data) pairs independent of the HTTP
+layer; function_app.py formats them with sse_event() and writes them to a
+streaming response as they are produced.
+"""
+
+import json
+import time
+import logging
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds between "generating" progress events while a completion streams
+PROGRESS_INTERVAL = 1.0
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class PartialJSONFields:
+    """
+    Extracts top-level fields from a JSON object as its text streams in.
+
+    Tracks nesting and string state across fed fragments; a field is
+    emitted once the "," or "}" ending its value arrives.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect = "key"  # key, colon or value at depth 1
+        self._key_start = 0
+        self._key: Optional[str] = None
+        self._value_start = 0
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """
+        Add streamed text.
+
+        Returns:
+            (key, value) for each top-level field completed by this fragment
+        """
+        self.buffer += text
+        completed = []
+
+        for i in range(self._pos, len(self.buffer)):
+            char = self.buffer[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect == "key":
+                        self._key = json.loads(self.buffer[self._key_start:i + 1])
+                        self._expect = "colon"
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._key_start = i
+            elif char in "{[":
+                self._depth += 1
+            elif char == ":" and self._depth == 1 and self._expect == "colon":
+                self._expect = "value"
+                self._value_start = i + 1
+            elif char in ",}" and self._depth == 1:
+                if self._expect == "value":
+                    field = self._finish(i)
+                    if field:
+                        completed.append(field)
+                self._expect = "key"
+                if char != ",":
+                    self._depth -= 1
+            elif char in "}]":
+                self._depth -= 1
+
+        self._pos = len(self.buffer)
+        return completed
+
+    def _finish(self, end: int) -> Optional[Tuple[str, Any]]:
+        """Decode the value that ended at end"""
+        try:
+            return self._key, json.loads(self.buffer[self._value_start:end])
+        except ValueError:
+            return None
+
+
+def _parse_document(text: str) -> Dict[str, Any]:
+    """Parse the completed JSON object, ignoring any markdown fence around it"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        start, end = text.find("{"), text.rfind("}")
+        if start < 0 or end < start:
+            raise
+        return json.loads(text[start:end + 1])
+
+
+def analysis_events(
+    azure_openai,
+    gemini,
+    market_id: str,
+    market_data: Dict[str, Any],
+    sentiment_score: Optional[float]
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Stream a market analysis.
+
+    Streams from Azure OpenAI; if it fails before producing any text and
+    Gemini is configured, streams from Gemini instead.
+
+    Yields (event, data):
+        ("progress", {"stage": "started"|"generating"|"fallback", ...})
+        ("field", {"name", "value"}) as each top-level field completes
+        ("analysis", {...}) the parsed analysis, last on success
+        ("error", {"error"}) last on failure
+    """
+    start = time.perf_counter()
+    providers = [("azure_openai", azure_openai)]
+    if gemini is not None and gemini.is_available():
+        providers.append(("gemini", gemini))
+
+    for index, (provider, client) in enumerate(providers):
+        yield "progress", {"stage": "started" if index == 0 else "fallback", "provider": provider}
+
+        fields = PartialJSONFields()
+        last_progress = time.perf_counter()
+        try:
+            for delta in client.stream_market_analysis(market_id, market_data, sentiment_score):
+                for name, value in fields.feed(delta):
+                    yield "field", {"name": name, "value": value}
+
+                now = time.perf_counter()
+                if now - last_progress >= PROGRESS_INTERVAL:
+                    last_progress = now
+                    yield "progress", {
+                        "stage": "generating",
+                        "provider": provider,
+                        "chars": len(fields.buffer),
+                        "elapsed_ms": round((now - start) * 1000)
+                    }
+
+            analysis = _parse_document(fields.buffer)
+        except Exception as e:
+            logger.warning(f"Streaming analysis via {provider} failed for {market_id}: {e}")
+            # Only fall back when nothing has been sent from this provider yet
+            if fields.buffer or index == len(providers) - 1:
+                yield "error", {"error": str(e), "provider": provider}
+                return
+            continue
+
+        analysis["provider"] = provider
+        yield "analysis", analysis
+        return
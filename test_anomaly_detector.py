@@ -0,0 +1,40 @@
+"""Anomaly detector slot bounds and flushing"""
+
+import time
+from unittest import mock
+
+from shared.anomaly_detector import AnomalyDetector, ANOMALY_FLUSH_SECONDS
+
+
+def test_slots_limited_to_snapshot():
+    """Ids outside the snapshot get no slot, and dropped markets' slots are reused"""
+    detector = AnomalyDetector(alerts=False, persist=False)
+    for index in range(100):
+        detector.observe_sentiment(f"free-form-{index}", 0.1, now=1000.0)
+    assert len(detector) == 100
+
+    assert detector.retain(["0xa", "0xb"]) == 100
+    assert len(detector) == 0
+
+    for index in range(100, 200):
+        assert detector.observe_sentiment(f"free-form-{index}", 0.1, now=1000.0) == []
+    assert len(detector) == 0
+
+    detector.observe_price("0xa", 0.5, 100.0, now=1000.0)
+    detector.observe_price("0xa", 0.51, 200.0, now=1060.0)
+    detector.observe_sentiment("0xb", 0.2, now=1060.0)
+    assert len(detector) == 2
+    assert len(detector._last_tick) == 100  # no new slots allocated
+    assert detector.stats("0xa")["price"]["count"] == 1  # reused slot starts clean
+    assert detector.stats("0xb")["sentiment"]["count"] == 1
+
+
+def test_due_anomalies_flush_on_any_observation():
+    """A queued anomaly is written on the next observation once it is due, flagged or not"""
+    detector = AnomalyDetector(alerts=False, persist=True)
+    detector._pending.append(("0xa", "price", "spike", 1.0, 5.0, 0.0, 0.2, None))
+    detector._pending_since = time.monotonic() - ANOMALY_FLUSH_SECONDS
+
+    with mock.patch.object(detector, "flush", return_value=1) as flush:
+        assert detector.observe_sentiment("0xb", 0.1) == []
+    flush.assert_called_once()
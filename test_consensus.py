@@ -0,0 +1,79 @@
+"""Batch consensus against the one-market loop it replaced"""
+
+import random
+
+import pytest
+
+import shared.consensus as consensus
+from shared.consensus import consensus_from_sources
+
+SOURCES = [("local_lexicon", 0.1), ("perplexity", 0.4), ("azure_openai_gpt5_pro", 0.4), ("google_gemini", 0.2)]
+
+
+def _reference_consensus(sources):
+    """SentimentAnalyzer._calculate_consensus before the batch engine"""
+    if not sources:
+        return 0.0, 0.0
+
+    total_weight = 0.0
+    weighted_sentiment = 0.0
+    weighted_confidence = 0.0
+    for source in sources:
+        score = source.get("score", 0)
+        confidence = source.get("confidence", 0.5)
+        weight = source.get("weight", 1.0)
+        effective_weight = confidence * weight
+        total_weight += effective_weight
+        weighted_sentiment += score * effective_weight
+        weighted_confidence += confidence * weight
+
+    if total_weight > 0:
+        consensus_sentiment = weighted_sentiment / total_weight
+        consensus_confidence = weighted_confidence / sum(s.get("weight", 1.0) for s in sources)
+    else:
+        consensus_sentiment = 0.0
+        consensus_confidence = 0.0
+
+    return max(-1.0, min(1.0, consensus_sentiment)), max(0.0, min(1.0, consensus_confidence))
+
+
+def _source_lists(count, rng):
+    """Random cascade outputs: missing sources and fields, out-of-range values, odd weights"""
+    lists = []
+    for _ in range(count):
+        sources = []
+        for name, weight in SOURCES:
+            if rng.random() < 0.4:
+                continue
+            source = {
+                "source": name,
+                "weight": weight if rng.random() < 0.95 else rng.choice([0, 1, 0.3]),
+                "score": rng.choice([rng.uniform(-1, 1), 0, 1, -1, rng.uniform(-3, 3)]),
+                "confidence": rng.choice([rng.uniform(0, 1), 0, 0.5, 1, rng.uniform(0, 2)]),
+            }
+            if rng.random() < 0.05:
+                del source["score"]
+            if rng.random() < 0.05:
+                del source["confidence"]
+            sources.append(source)
+        lists.append(sources)
+    return lists
+
+
+def _assert_bit_identical(lists):
+    expected = [_reference_consensus(sources) for sources in lists]
+    assert consensus_from_sources(lists) == expected
+
+
+def test_loop_matches_reference(monkeypatch):
+    monkeypatch.setattr(consensus, "np", None)
+    _assert_bit_identical(_source_lists(20000, random.Random(0)))
+
+
+def test_numpy_matches_reference():
+    if consensus.np is None:
+        pytest.skip("numpy not installed")
+    rng = random.Random(1)
+    _assert_bit_identical(_source_lists(20000, rng))
+    # Below NUMPY_MIN_ROWS the loop runs
+    _assert_bit_identical(_source_lists(consensus.NUMPY_MIN_ROWS - 1, rng))
@@ -0,0 +1,89 @@
+"""Market index queries against a brute-force filter and sort"""
+
+import re
+import json
+import random
+
+from shared.market_index import MarketIndex, DEFAULT_ORDER, decode_cursor
+
+WORDS = "election trump biden bitcoin price above below fed rate cut nba finals win eth".split()
+
+
+def _markets(count, rng):
+    markets = []
+    for index in range(count):
+        end_date = None
+        if rng.random() < 0.8:
+            end_date = f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T00:00:00Z"
+        markets.append({
+            "token_id": f"0x{rng.randrange(16 ** 12):012x}{index:052x}",
+            "question": " ".join(rng.sample(WORDS, 4)).capitalize() + "?",
+            "description": "",
+            "end_date": end_date,
+            "volume": rng.choice([None, 0, 1, 2, 3.5, 100, rng.uniform(0, 1e6)]),
+            "active": rng.random() < 0.7,
+        })
+    return markets
+
+
+def _words(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def _brute_force(markets, words, q=None, active=None, min_volume=None, max_volume=None,
+                 end_after=None, end_before=None, sort="default", order=None):
+    """Token ids of the matching markets, in the query's order, from a plain scan"""
+    tokens = _words(q or "")
+    rows = []
+    for position, market in enumerate(markets):
+        question = words[position]
+        if tokens and not (all(token in question for token in tokens[:-1]) and
+                           any(word.startswith(tokens[-1]) for word in question)):
+            continue
+        if active is not None and market["active"] != active:
+            continue
+        volume = float(market["volume"] or 0)
+        if (min_volume is not None and volume < min_volume) or (max_volume is not None and volume > max_volume):
+            continue
+        end_date = market["end_date"] or ""
+        if (end_after or end_before) and not end_date:
+            continue
+        if (end_after and end_date < end_after) or (end_before and end_date >= end_before):
+            continue
+        key = {"default": position, "volume": volume, "end_date": end_date}[sort]
+        rows.append((key, market["token_id"]))
+    rows.sort(reverse=(order or DEFAULT_ORDER[sort]) == "desc")
+    return [token_id for _, token_id in rows]
+
+
+def test_query_pages_match_brute_force():
+    """Every filter/sort/order combination, paged with cursors, returns exactly the scan's rows"""
+    rng = random.Random(0)
+    markets = _markets(3000, rng)
+    index = MarketIndex(markets)
+    words = [set(_words(market["question"])) for market in markets]
+
+    for _ in range(400):
+        filters = {
+            "q": rng.choice([None, "elec", "trump b", "bitcoin price", "fed rate cut nb", "zzz"]),
+            "active": rng.choice([None, True, False]),
+            "min_volume": rng.choice([None, 1, 3.5, 5e5]),
+            "max_volume": rng.choice([None, 3.5, 100, 9e5]),
+            "end_after": rng.choice([None, "2026-03-10T00:00:00Z", "2026-06-01"]),
+            "end_before": rng.choice([None, "2026-07-10T00:00:00Z", "2026-12"]),
+            "sort": rng.choice(["default", "volume", "end_date"]),
+            "order": rng.choice([None, "asc", "desc"]),
+        }
+        limit = rng.choice([3, 25, 1000])
+
+        pages, cursor = [], None
+        while True:
+            fragments, next_cursor = index.query(**filters, limit=limit, cursor=cursor)
+            assert len(fragments) <= limit
+            pages.extend(json.loads(fragment)["token_id"] for fragment in fragments)
+            if next_cursor is None:
+                break
+            assert len(fragments) == limit
+            cursor = decode_cursor(next_cursor)
+
+        assert pages == _brute_force(markets, words, **filters), filters
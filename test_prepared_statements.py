@@ -0,0 +1,21 @@
+"""Prepared statement registry placeholders"""
+
+import re
+
+from shared.database import PREPARED_QUERIES, _PLACEHOLDER_RE
+from benchmarks.prepared_statements import SAMPLE_PARAMS
+
+
+def test_placeholders_once_and_in_order():
+    """$1..$n each appear once, in order, so the %s conversion lines up with the params"""
+    for name, query in PREPARED_QUERIES.items():
+        numbers = [int(placeholder[1:]) for placeholder in _PLACEHOLDER_RE.findall(query)]
+        assert numbers == list(range(1, len(numbers) + 1)), name
+
+
+def test_sample_params_match_placeholders():
+    """Every statement has benchmark params, one per %s of its unprepared form"""
+    assert set(SAMPLE_PARAMS) == set(PREPARED_QUERIES)
+    for name, query in PREPARED_QUERIES.items():
+        unprepared = _PLACEHOLDER_RE.sub("%s", query)
+        assert len(re.findall(r"%s", unprepared)) == len(SAMPLE_PARAMS[name]), name
@@ -0,0 +1,74 @@
+"""Price poller cache freshness"""
+
+from datetime import datetime, timedelta
+
+from shared.market_store import MarketStore
+from shared.price_poller import PricePollScheduler, PRICE_POLL_MAX_CACHE_SECONDS
+
+
+def _poller(markets, now):
+    clock = {"now": now}
+    poller = PricePollScheduler(
+        budget_per_minute=120,
+        clock=lambda: clock["now"],
+        sleep=lambda seconds: clock.update(now=clock["now"] + seconds),
+        seed=0
+    )
+    poller.sync(MarketStore(markets), {})
+    return poller, clock
+
+
+def _market(index, volume, end):
+    return {
+        "token_id": f"0x{index:064x}",
+        "question": f"Market {index}?",
+        "end_date": end.isoformat() + "Z",
+        "volume": volume,
+        "active": True,
+    }
+
+
+def test_quiet_market_cache_expires_within_bound():
+    """A quiet market's price is polled rarely but served from cache for at most a minute"""
+    start = datetime(2026, 1, 1)
+    quiet = _market(0, 10.0, start + timedelta(days=300))
+    # Enough markets that the budget stretches every interval far past the cap
+    others = [_market(index, 1e5, start + timedelta(days=30)) for index in range(1, 5000)]
+    poller, _ = _poller([quiet] + others, start.timestamp())
+
+    assert poller.cache_ttl(quiet["token_id"]) is None  # not polling yet: on-demand TTL
+
+    poller.run_for(0, lambda token_id: 0.5)
+    assert poller.stretch() > 1
+    assert poller.interval(quiet["token_id"]) > PRICE_POLL_MAX_CACHE_SECONDS
+    assert poller.cache_ttl(quiet["token_id"]) == PRICE_POLL_MAX_CACHE_SECONDS
+
+
+def test_cache_ttl_stops_when_poller_idle():
+    """Without recent polling runs a cached price falls back to the on-demand TTL"""
+    start = datetime(2026, 1, 1)
+    market = _market(0, 1e6, start + timedelta(hours=6))
+    poller, clock = _poller([market], start.timestamp())
+
+    poller.run_for(0, lambda token_id: 0.5)
+    assert 0 < poller.cache_ttl(market["token_id"]) <= PRICE_POLL_MAX_CACHE_SECONDS
+
+    clock["now"] += 3600
+    assert poller.cache_ttl(market["token_id"]) is None
+
+
+def test_close_prices_leave_volatility_alone():
+    """An on-demand price seconds after a poll doesn't feed the volatility estimate"""
+    start = datetime(2026, 1, 1)
+    market = _market(0, 1e6, start + timedelta(days=30))
+    poller, clock = _poller([market], start.timestamp())
+    token_id = market["token_id"]
+
+    poller.observe(token_id, 0.50)
+    volatility = poller._markets[token_id].volatility
+    poller.observe(token_id, 0.52, now=clock["now"] + 1)
+    assert poller._markets[token_id].volatility == volatility
+
+    # A full interval later the move counts, measured from the older price
+    poller.observe(token_id, 0.52, now=clock["now"] + poller.min_interval + 1)
+    assert poller._markets[token_id].volatility > volatility